@@ -30,6 +30,7 @@
 
 import os
 from abc import abstractmethod
+from tvb.adapters.analyzers import bct_native
 from tvb.adapters.analyzers.matlab_worker import MatlabWorker
 from tvb.basic.filters.chain import FilterChain
 from tvb.basic.profile import TvbProfile
@@ -61,9 +62,12 @@ def bct_description(mat_file_name):
 class BaseBCT(ABCAsynchronous):
     """
     Interface between Brain Connectivity Toolbox of Olaf Sporns and TVB Framework.
-    This adapter requires BCT deployed locally, and Matlab or Octave installed separately of TVB.
+    The BCT functions are computed in-process (see bct_native) when implemented there, and the adapter is not
+    listed in the BCT_MATLAB_ADAPTERS setting. Otherwise, BCT deployed locally and Matlab or Octave installed
+    separately of TVB are required.
     """
     _ui_connectivity_label = "Connection matrix:"
+    _matlab_code = ""
 
 
     def __init__(self):
@@ -71,9 +75,15 @@ class BaseBCT(ABCAsynchronous):
         self.matlab_worker = MatlabWorker()
 
 
-    @staticmethod
-    def can_be_active():
-        return not not TvbProfile.current.MATLAB_EXECUTABLE
+    @classmethod
+    def can_be_active(cls):
+        return cls.uses_native_engine() or not not TvbProfile.current.MATLAB_EXECUTABLE
+
+
+    @classmethod
+    def uses_native_engine(cls):
+        matlab_adapters = [name.strip() for name in TvbProfile.current.BCT_MATLAB_ADAPTERS.split(',')]
+        return cls.__name__ not in matlab_adapters and bct_native.is_supported(cls._matlab_code)
 
 
     def get_input_tree(self):
@@ -93,6 +103,19 @@ class BaseBCT(ABCAsynchronous):
         return 0
 
 
+    def execute_bct(self, matlab_code, **kwargs):
+        """
+        Run the BCT code in-process when possible, or else in MATLAB.
+        :return: dictionary with the variables of the MATLAB workspace after execution
+        """
+        if not self.uses_native_engine():
+            return self.execute_matlab(matlab_code, **kwargs)
+        self.log.info("Starting native execution of BCT code:" + matlab_code)
+        result = bct_native.execute(matlab_code, kwargs)
+        self.log.debug("Finished native execution:" + str(result))
+        return result
+
+
     def execute_matlab(self, matlab_code, **kwargs):
         self.matlab_worker.add_to_path(BCT_PATH)
         self.log.info("Starting execution of MATLAB code:" + matlab_code)
@@ -165,7 +188,7 @@ class ModularityOCSM(BaseBCT):
         # Prepare parameters
         kwargs['CW'] = connectivity.weights
         # Execute the matlab code
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         # Gather results
         measure = self.build_connectivity_measure(result, 'Ci', connectivity, "Optimal Community Structure")
         value = self.build_float_value_wrapper(result, 'Q', title="Maximized Modularity")
@@ -192,7 +215,7 @@ class DistanceDBIN(BaseBCT):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         measure = self.build_connectivity_measure(result, 'D', connectivity, "Distance matrix")
         return [measure]
 
@@ -216,7 +239,7 @@ class DistanceRDM(DistanceDBIN):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
 
         measure1 = self.build_connectivity_measure(result, 'R', connectivity, "Reachability matrix")
         measure2 = self.build_connectivity_measure(result, 'D', connectivity, "Distance matrix")
@@ -241,7 +264,7 @@ class DistanceNETW(DistanceDBIN):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
 
         measure1 = self.build_connectivity_measure(result, 'Wq', connectivity, "3D matrix")
         measure2 = self.build_connectivity_measure(result, 'wlq', connectivity, "Walk length distribution")
@@ -49,7 +49,7 @@ class ClusteringCoefficient(BaseBCT):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         measure = self.build_connectivity_measure(result, 'C', connectivity, "Clustering Coefficient BD")
         return [measure]
 
@@ -65,7 +65,7 @@ class ClusteringCoefficientBU(BaseUndirected):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         measure = self.build_connectivity_measure(result, 'C', connectivity, "Clustering Coefficient BU")
         return [measure]
 
@@ -82,7 +82,7 @@ class ClusteringCoefficientWU(BaseUndirected):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.scaled_weights()
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         measure = self.build_connectivity_measure(result, 'C', connectivity, "Clustering Coefficient WU")
         return [measure]
 
@@ -98,7 +98,7 @@ class ClusteringCoefficientWD(ClusteringCoefficient):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.scaled_weights()
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         measure = self.build_connectivity_measure(result, 'C', connectivity, "Clustering Coefficient WD")
         return [measure]
 
@@ -115,7 +115,7 @@ class TransitivityBinaryDirected(BaseBCT):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         value = self.build_float_value_wrapper(result, 'T', "Transitivity Binary Directed")
         return [value]
 
@@ -131,7 +131,7 @@ class TransitivityWeightedDirected(TransitivityBinaryDirected):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.scaled_weights()
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         value = self.build_float_value_wrapper(result, 'T', "Transitivity Weighted Directed")
         return [value]
 
@@ -147,7 +147,7 @@ class TransitivityBinaryUnDirected(BaseUndirected):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.weights
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         value = self.build_float_value_wrapper(result, 'T', "Transitivity Binary Undirected")
         return [value]
 
@@ -163,6 +163,6 @@ class TransitivityWeightedUnDirected(TransitivityBinaryUnDirected):
 
     def launch(self, connectivity, **kwargs):
         kwargs['A'] = connectivity.scaled_weights()
-        result = self.execute_matlab(self._matlab_code, **kwargs)
+        result = self.execute_bct(self._matlab_code, **kwargs)
         value = self.build_float_value_wrapper(result, 'T', "Transitivity Weighted Undirected")
         return [value]
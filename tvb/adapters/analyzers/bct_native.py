@@ -0,0 +1,554 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+In-process NumPy / SciPy implementations of the Brain Connectivity Toolbox functions used by the BCT adapters.
+
+Functions keep the names, arguments and outputs of their MATLAB counterparts, so that the MATLAB code of an adapter
+(e.g. "[Ci, Q] = modularity_dir(W); P = participation_coef(W, Ci);") can be executed here as it is, without
+starting Octave. Results are expected equal to the MATLAB ones, except for the labels of the communities found
+by modularity, which might be permuted.
+"""
+
+import re
+import numpy
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import eigsh
+
+# Sources for which shortest paths are computed together, and max elements of a (sources x edges) array
+_SOURCES_BLOCK_SIZE = 256
+_BLOCK_MAX_ELEMENTS = 2 ** 24
+# Starting with this size, only the leading eigenvector is computed, with an iterative solver (as BCT does)
+_DENSE_EIGEN_MAX_SIZE = 1000
+# Relative tolerance when comparing the lengths of alternative shortest paths
+_PATH_TIE_TOLERANCE = 1e-10
+
+# A MATLAB statement like "[out1, out2] = function(arg1, arg2)"
+_STATEMENT = re.compile(r"^\s*(?:\[(?P<outputs>[^\]]*)\]|(?P<output>\w+))\s*=\s*"
+                        r"(?P<function>\w+)\s*\((?P<args>[^)]*)\)\s*$")
+
+
+def _dense(matrix):
+    if sparse.issparse(matrix):
+        return matrix.toarray().astype(numpy.float64)
+    return numpy.array(matrix, dtype=numpy.float64)
+
+
+def _binary(matrix):
+    return (_dense(matrix) != 0).astype(numpy.float64)
+
+
+def _cube_diagonal(matrix):
+    """
+    :return: diag(matrix ^ 3), without computing the full cube
+    """
+    matrix = sparse.csr_matrix(matrix)
+    return numpy.asarray(matrix.dot(matrix).multiply(matrix.T).sum(axis=1)).ravel()
+
+
+def _square_diagonal(matrix):
+    """
+    :return: diag(matrix ^ 2)
+    """
+    return (matrix * matrix.T).sum(axis=1)
+
+
+def _safe_divide(numerator, denominator):
+    """
+    Element-wise division, giving zero where the denominator is zero.
+    """
+    result = numpy.zeros(numpy.broadcast(numerator, denominator).shape)
+    non_zero = denominator != 0
+    numpy.divide(numerator, denominator, out=result, where=non_zero)
+    return result
+
+
+def _leading_eigenvector(matrix):
+    """
+    :param matrix: symmetric matrix
+    :return: eigenvector of the largest eigenvalue
+    """
+    if matrix.shape[0] < _DENSE_EIGEN_MAX_SIZE:
+        values, vectors = numpy.linalg.eigh(matrix)
+        return vectors[:, numpy.argmax(values)]
+    return eigsh(matrix, k=1, which='LA')[1][:, 0]
+
+
+def degrees_und(cij):
+    return _binary(cij).sum(axis=0)
+
+
+def degrees_dir(cij):
+    binary = _binary(cij)
+    in_degree = binary.sum(axis=0)
+    out_degree = binary.sum(axis=1)
+    return in_degree, out_degree, in_degree + out_degree
+
+
+def jdegree(cij):
+    binary = _binary(cij)
+    in_degree = binary.sum(axis=0).astype(int)
+    out_degree = binary.sum(axis=1).astype(int)
+    size = max(in_degree.max(), out_degree.max()) + 1
+    joint = numpy.zeros((size, size))
+    numpy.add.at(joint, (in_degree, out_degree), 1)
+    return joint, numpy.triu(joint, 1).sum(), numpy.tril(joint, -1).sum(), numpy.trace(joint)
+
+
+def _matching_terms(cij):
+    """
+    For all pairs of columns (i, j): the number of common neighbours and the total connections, ignoring i and j.
+    """
+    binary = sparse.csc_matrix(cij != 0, dtype=numpy.float64)
+    binary_diagonal = binary.diagonal()
+    common = binary.T.dot(binary).toarray()
+    common -= binary_diagonal[:, numpy.newaxis] * binary.toarray()
+    common -= binary.toarray().T * binary_diagonal[numpy.newaxis, :]
+    sums = cij.sum(axis=0) - cij.diagonal()
+    connections = sums[:, numpy.newaxis] + sums[numpy.newaxis, :] - cij - cij.T
+    return common, connections
+
+
+def _matching_index(common, connections):
+    index = _safe_divide(2 * common, connections)
+    numpy.fill_diagonal(index, 0)
+    return index
+
+
+def matching_ind(cij):
+    cij = _dense(cij)
+    common_in, connections_in = _matching_terms(cij)
+    common_out, connections_out = _matching_terms(cij.T)
+    return (_matching_index(common_in, connections_in),
+            _matching_index(common_out, connections_out),
+            _matching_index(common_in + common_out, connections_in + connections_out))
+
+
+def strengths_und(cij):
+    return _dense(cij).sum(axis=0)
+
+
+def strengths_dir(cij):
+    cij = _dense(cij)
+    in_strength = cij.sum(axis=0)
+    out_strength = cij.sum(axis=1)
+    return in_strength, out_strength, in_strength + out_strength
+
+
+def strengths_und_sign(w):
+    w = _dense(w)
+    numpy.fill_diagonal(w, 0)
+    positive = numpy.where(w > 0, w, 0).sum(axis=0)
+    negative = -numpy.where(w < 0, w, 0).sum(axis=0)
+    return positive, negative, positive.sum(), negative.sum()
+
+
+def density_dir(cij):
+    nr_nodes = cij.shape[0]
+    nr_edges = numpy.count_nonzero(cij)
+    return float(nr_edges) / (nr_nodes ** 2 - nr_nodes), nr_nodes, nr_edges
+
+
+def density_und(cij):
+    nr_nodes = cij.shape[0]
+    nr_edges = numpy.count_nonzero(numpy.triu(cij))
+    return float(nr_edges) / ((nr_nodes ** 2 - nr_nodes) / 2.0), nr_nodes, nr_edges
+
+
+def _directed_triangles(weights, adjacency):
+    """
+    :return: triangles around each node (cyc3) and the possible ones (CYC3), as in clustering_coef_bd/wd
+    """
+    symmetric = weights + weights.T
+    degree = (adjacency + adjacency.T).sum(axis=1)
+    triangles = _cube_diagonal(symmetric) / 2
+    possible = degree * (degree - 1) - 2 * _square_diagonal(adjacency)
+    return triangles, possible
+
+
+def clustering_coef_bd(a):
+    a = _dense(a)
+    triangles, possible = _directed_triangles(a, a)
+    return _safe_divide(triangles, numpy.where(triangles == 0, 0, possible))
+
+
+def clustering_coef_bu(g):
+    g = _dense(g)
+    neighbours = sparse.csr_matrix(g != 0, dtype=numpy.float64)
+    degree = numpy.asarray(neighbours.sum(axis=1)).ravel()
+    # sum of the weights between the neighbours of each node
+    links = numpy.asarray(neighbours.multiply(neighbours.dot(g)).sum(axis=1)).ravel()
+    return _safe_divide(links, numpy.where(degree >= 2, degree ** 2 - degree, 0))
+
+
+def clustering_coef_wu(w):
+    w = _dense(w)
+    degree = (w != 0).sum(axis=1)
+    triangles = _cube_diagonal(w ** (1.0 / 3))
+    return _safe_divide(triangles, numpy.where(triangles == 0, 0, degree * (degree - 1)))
+
+
+def clustering_coef_wd(w):
+    w = _dense(w)
+    triangles, possible = _directed_triangles(w ** (1.0 / 3), (w != 0).astype(numpy.float64))
+    return _safe_divide(triangles, numpy.where(triangles == 0, 0, possible))
+
+
+def transitivity_bd(a):
+    a = _dense(a)
+    triangles, possible = _directed_triangles(a, a)
+    return triangles.sum() / possible.sum()
+
+
+def transitivity_wd(w):
+    w = _dense(w)
+    triangles, possible = _directed_triangles(w ** (1.0 / 3), (w != 0).astype(numpy.float64))
+    return triangles.sum() / possible.sum()
+
+
+def transitivity_bu(a):
+    a = _dense(a)
+    square_trace = _square_diagonal(a).sum()
+    return _cube_diagonal(a).sum() / (a.sum(axis=0).dot(a.sum(axis=1)) - square_trace)
+
+
+def transitivity_wu(w):
+    w = _dense(w)
+    degree = (w != 0).sum(axis=1)
+    return _cube_diagonal(w ** (1.0 / 3)).sum() / (degree * (degree - 1)).sum()
+
+
+def distance_bin(a):
+    return csgraph.shortest_path(sparse.csr_matrix(_binary(a)), method='D', directed=True, unweighted=True)
+
+
+def distance_wei(g):
+    return csgraph.shortest_path(sparse.csr_matrix(_dense(g)), method='D', directed=True)
+
+
+def breadthdist(cij):
+    distance = distance_bin(cij)
+    distance[distance == 0] = numpy.inf
+    return numpy.isfinite(distance).astype(numpy.float64), distance
+
+
+def reachdist(cij):
+    cij = _dense(cij)
+    nr_nodes = cij.shape[0]
+    step = sparse.csr_matrix(cij != 0)
+    walks = step.copy()
+    reachable, distance = cij.copy(), cij.copy()
+    # vertices without incoming or outgoing connections are ignored when checking for reachability
+    in_strength, out_strength = cij.sum(axis=0), cij.sum(axis=1)
+    check = numpy.ix_(numpy.flatnonzero(out_strength != 0), numpy.flatnonzero(in_strength != 0))
+    power = 2
+    while True:
+        walks = walks.dot(step)
+        reachable = numpy.logical_or(reachable != 0, walks.toarray()).astype(numpy.float64)
+        distance += reachable
+        if power > nr_nodes or numpy.all(reachable[check] != 0):
+            break
+        power += 1
+    distance = power - distance + 1
+    distance[distance == nr_nodes + 2] = numpy.inf
+    distance[:, in_strength == 0] = numpy.inf
+    distance[out_strength == 0, :] = numpy.inf
+    return reachable, distance
+
+
+def _brandes_betweenness(lengths, unweighted):
+    """
+    Betweenness over all ordered pairs of nodes, counted as BCT does (not normalized).
+    Brandes' accumulation is done for a block of sources at once: the number of shortest paths and the
+    dependencies are propagated along the edges on shortest paths from each source, until they stop changing
+    (i.e. as many times as edges in the longest shortest path).
+
+    :param lengths: connection lengths matrix
+    :return: edge betweenness matrix, node betweenness vector
+    """
+    graph = sparse.csr_matrix(_dense(lengths))
+    graph.eliminate_zeros()
+    nr_nodes = graph.shape[0]
+    edges = graph.tocoo()
+    tails, heads = edges.row, edges.col
+    edge_lengths = numpy.ones(edges.nnz) if unweighted else edges.data
+    node_betweenness = numpy.zeros(nr_nodes)
+    edge_betweenness = numpy.zeros(edges.nnz)
+    block_size = max(1, min(_SOURCES_BLOCK_SIZE, _BLOCK_MAX_ELEMENTS // max(1, edges.nnz)))
+
+    for block_start in range(0, nr_nodes, block_size):
+        sources = numpy.arange(block_start, min(block_start + block_size, nr_nodes))
+        block_shape = (len(sources), nr_nodes)
+        distances = csgraph.shortest_path(graph, method='D', directed=True, unweighted=unweighted, indices=sources)
+        with numpy.errstate(invalid='ignore'):
+            on_path = numpy.abs(distances[:, tails] + edge_lengths - distances[:, heads]) <= \
+                      _PATH_TIE_TOLERANCE * distances[:, heads]
+        # (source row, edge) pairs on shortest paths, and their tail and head as flat indices in a block array
+        rows, path_edges = numpy.nonzero(on_path)
+        path_tails = rows * nr_nodes + tails[path_edges]
+        path_heads = rows * nr_nodes + heads[path_edges]
+        source_indices = numpy.arange(len(sources)) * nr_nodes + sources
+
+        nr_paths = numpy.zeros(block_shape).ravel()
+        nr_paths[source_indices] = 1
+        while True:
+            propagated = numpy.bincount(path_heads, nr_paths[path_tails], nr_paths.size)
+            propagated[source_indices] = 1
+            if numpy.array_equal(propagated, nr_paths):
+                break
+            nr_paths = propagated
+
+        ratios = nr_paths[path_tails] / nr_paths[path_heads]
+        dependencies = numpy.zeros(nr_paths.size)
+        while True:
+            propagated = numpy.bincount(path_tails, ratios * (1 + dependencies[path_heads]), dependencies.size)
+            if numpy.array_equal(propagated, dependencies):
+                break
+            dependencies = propagated
+
+        edge_betweenness += numpy.bincount(path_edges, ratios * (1 + dependencies[path_heads]), edges.nnz)
+        dependencies[source_indices] = 0
+        node_betweenness += dependencies.reshape(block_shape).sum(axis=0)
+
+    edge_matrix = sparse.coo_matrix((edge_betweenness, (tails, heads)), shape=graph.shape).toarray()
+    return edge_matrix, node_betweenness
+
+
+def betweenness_bin(g):
+    return _brandes_betweenness(g, True)[1]
+
+
+def betweenness_wei(g):
+    return _brandes_betweenness(g, False)[1]
+
+
+def edge_betweenness_bin(g):
+    return _brandes_betweenness(g, True)
+
+
+def edge_betweenness_wei(g):
+    return _brandes_betweenness(g, False)
+
+
+def eigenvector_centrality_und(cij):
+    return numpy.abs(_leading_eigenvector(_dense(cij)))
+
+
+def subgraph_centrality(cij):
+    cij = _dense(cij)
+    if numpy.array_equal(cij, cij.T):
+        values, vectors = numpy.linalg.eigh(cij)
+    else:
+        values, vectors = numpy.linalg.eig(cij)
+    return numpy.real((vectors ** 2).dot(numpy.exp(values)))
+
+
+def _kcoreness(cij, directed):
+    """
+    Peel nodes with degree (in + out, when directed) under k, for increasing k, as kcore_bu/kcore_bd do.
+    A node has coreness k when it still has incoming connections in the k-core, while the size of the k-core
+    counts all nodes with connections left (kn = sum(deg > 0) in kcore_bd).
+    """
+    adjacency = sparse.csr_matrix(_binary(cij))
+    nr_nodes = adjacency.shape[0]
+    alive = numpy.ones(nr_nodes)
+    coreness = numpy.zeros(nr_nodes)
+    core_sizes = numpy.zeros(nr_nodes)
+    for k in range(1, nr_nodes + 1):
+        while True:
+            in_degree = adjacency.T.dot(alive) * alive
+            degree = in_degree + adjacency.dot(alive) * alive if directed else in_degree
+            peeled = (degree < k) & (degree > 0)
+            if not peeled.any():
+                break
+            alive[peeled] = 0
+        core_sizes[k - 1] = numpy.count_nonzero(degree)
+        if not core_sizes[k - 1]:
+            break
+        coreness[in_degree > 0] = k
+    return coreness, core_sizes
+
+
+def kcoreness_centrality_bu(cij):
+    return _kcoreness(cij, False)
+
+
+def kcoreness_centrality_bd(cij):
+    return _kcoreness(cij, True)
+
+
+def _modularity(modularity_matrix):
+    """
+    Newman's spectral community detection, with the fine-tuning step, as in modularity_und/modularity_dir.
+    :return: community index of each node (starting from 1)
+    """
+    nr_nodes = modularity_matrix.shape[0]
+    communities = numpy.ones(nr_nodes, dtype=int)
+    nr_communities = 1
+    to_split = [1, 0]
+    indices = numpy.arange(nr_nodes)
+    group_matrix = modularity_matrix
+
+    while to_split[0]:
+        split = numpy.where(_leading_eigenvector(group_matrix) < 0, -1., 1.)
+        gain = split.dot(group_matrix).dot(split)
+        if gain > 1e-10:
+            best_gain = gain
+            group_matrix = group_matrix.copy()
+            numpy.fill_diagonal(group_matrix, 0)
+            movable = numpy.ones(len(indices))
+            moved_split = split.copy()
+            while not numpy.isnan(movable).all():
+                moved_gains = best_gain - 4 * moved_split * group_matrix.dot(moved_split)
+                best_gain = numpy.nanmax(moved_gains * movable)
+                best_moves = moved_gains == best_gain
+                moved_split[best_moves] = -moved_split[best_moves]
+                movable[best_moves] = numpy.nan
+                if best_gain > gain:
+                    gain = best_gain
+                    split = moved_split.copy()
+            if abs(split.sum()) == len(indices):
+                to_split.pop(0)
+            else:
+                nr_communities += 1
+                communities[indices[split == 1]] = to_split[0]
+                communities[indices[split == -1]] = nr_communities
+                to_split.insert(0, nr_communities)
+        else:
+            to_split.pop(0)
+
+        indices = numpy.flatnonzero(communities == to_split[0])
+        group_matrix = modularity_matrix[numpy.ix_(indices, indices)]
+        group_matrix = group_matrix - numpy.diag(group_matrix.sum(axis=0))
+
+    return communities
+
+
+def _modularity_value(modularity_matrix, communities, nr_edges):
+    same_community = communities[:, numpy.newaxis] == communities[numpy.newaxis, :]
+    return modularity_matrix[same_community].sum() / nr_edges
+
+
+def modularity_und(a):
+    a = _dense(a)
+    degree = a.sum(axis=0)
+    nr_edges = degree.sum()
+    modularity_matrix = a - numpy.outer(degree, degree) / nr_edges
+    communities = _modularity(modularity_matrix)
+    return communities, _modularity_value(modularity_matrix, communities, nr_edges)
+
+
+def modularity_dir(a):
+    a = _dense(a)
+    in_degree, out_degree = a.sum(axis=0), a.sum(axis=1)
+    nr_edges = in_degree.sum()
+    half_matrix = a - numpy.outer(out_degree, in_degree) / nr_edges
+    modularity_matrix = half_matrix + half_matrix.T
+    communities = _modularity(modularity_matrix)
+    return communities, _modularity_value(modularity_matrix, communities, 2 * nr_edges)
+
+
+def _participation(w, ci):
+    """
+    :return: 1 - sum over communities of (strength inside the community / strength) ^ 2, for each node
+    """
+    ci = numpy.asarray(ci, dtype=int).ravel()
+    memberships = sparse.csr_matrix((numpy.ones(len(ci)), (numpy.arange(len(ci)), ci - 1)))
+    community_strengths = sparse.csr_matrix(w).dot(memberships).toarray()
+    strength = w.sum(axis=1)
+    participation = 1 - _safe_divide((community_strengths ** 2).sum(axis=1), strength ** 2)
+    participation[strength == 0] = 0
+    return participation
+
+
+def participation_coef(w, ci):
+    return _participation(_dense(w), ci)
+
+
+def participation_coef_sign(w, ci):
+    w = _dense(w)
+    return _participation(numpy.where(w > 0, w, 0), ci), _participation(numpy.where(w < 0, -w, 0), ci)
+
+
+FUNCTIONS = dict((function.__name__, function) for function in [
+    degrees_und, degrees_dir, jdegree, matching_ind, strengths_und, strengths_dir, strengths_und_sign,
+    density_dir, density_und,
+    clustering_coef_bd, clustering_coef_bu, clustering_coef_wu, clustering_coef_wd,
+    transitivity_bd, transitivity_wd, transitivity_bu, transitivity_wu,
+    distance_bin, distance_wei, breadthdist, reachdist,
+    betweenness_bin, betweenness_wei, edge_betweenness_bin, edge_betweenness_wei,
+    eigenvector_centrality_und, subgraph_centrality, kcoreness_centrality_bu, kcoreness_centrality_bd,
+    modularity_und, modularity_dir, participation_coef, participation_coef_sign])
+
+
+def _parse(matlab_code):
+    """
+    :return: list of (output names, function name, argument names) for each statement, or None when the code has
+             other statements than calls of a function
+    """
+    statements = []
+    for line in re.split(r"[;\n]", matlab_code):
+        if not line.strip():
+            continue
+        match = _STATEMENT.match(line)
+        if match is None:
+            return None
+        outputs = match.group('outputs') or match.group('output')
+        arguments = match.group('args').split(',')
+        statements.append(([name.strip() for name in outputs.split(',')], match.group('function'),
+                           [name.strip() for name in arguments if name.strip()]))
+    return statements
+
+
+def is_supported(matlab_code):
+    """
+    :return: True when all functions called by the given MATLAB code have an implementation here
+    """
+    statements = _parse(matlab_code)
+    return bool(statements) and all(function in FUNCTIONS for _, function, _ in statements)
+
+
+def execute(matlab_code, workspace):
+    """
+    Execute MATLAB code made of BCT function calls, like MatlabWorker would.
+
+    :param workspace: dictionary with the input variables
+    :return: dictionary with the input and the output variables
+    """
+    if not is_supported(matlab_code):
+        raise ValueError("No native implementation for: " + matlab_code)
+    workspace = dict(workspace)
+    for outputs, function, arguments in _parse(matlab_code):
+        values = FUNCTIONS[function](*[workspace[name] for name in arguments])
+        if len(outputs) == 1:
+            values = [values]
+        workspace.update(zip(outputs, values))
+    return workspace
@@ -37,6 +37,8 @@ Adapter that uses the traits module to generate interfaces for ... Analyzer.
 """
 
 import numpy
+from tvb.adapters.analyzers import streaming_covariance
+from tvb.core.adapters import parallel_blocks
 from tvb.core.adapters.abcadapter import ABCAsynchronous
 from tvb.core.adapters.exceptions import LaunchException
 from tvb.basic.logger.builder import get_logger
@@ -51,6 +53,24 @@ from tvb.analyzers.correlation_coefficient import CorrelationCoefficient
 LOG = get_logger(__name__)
 
 
+
+def _cross_correlate_block(block):
+    """
+    Executed in a worker process (or in-process), for one state variable.
+    :param block: tuple (data, sample_period)
+    :returns: tuple (cross correlation array, time offsets)
+    """
+    data, sample_period = block
+    small_ts = TimeSeries(use_storage=False)
+    small_ts.data = data
+    small_ts.sample_period = sample_period
+    algorithm = CrossCorrelate()
+    algorithm.time_series = small_ts
+    partial_cross_corr = algorithm.evaluate()
+    return partial_cross_corr.array_data, partial_cross_corr.time
+
+
+
 class CrossCorrelateAdapter(ABCAsynchronous):
     """ TVB adapter for calling the CrossCorrelate algorithm. """
     
@@ -94,11 +114,12 @@ class CrossCorrelateAdapter(ABCAsynchronous):
         """
         Returns the required memory to be able to run the adapter.
         """
-        #Not all the data is loaded into memory at one time here.
+        #Not all the data is loaded into memory at one time here, only one state variable for each worker.
         used_shape = (self.input_shape[0], 1, self.input_shape[2], self.input_shape[3])
         input_size = numpy.prod(used_shape) * 8.0
         output_size = self.algorithm.result_size(used_shape)
-        return input_size + output_size
+        nr_of_workers = parallel_blocks.get_nr_of_workers(self.input_shape[1])
+        return parallel_blocks.get_blocks_in_memory(nr_of_workers) * (input_size + output_size)
 
 
     def get_required_disk_size(self, **kwargs):
@@ -123,16 +144,16 @@ class CrossCorrelateAdapter(ABCAsynchronous):
         
         node_slice = [slice(self.input_shape[0]), None, slice(self.input_shape[2]), slice(self.input_shape[3])]
         ##---------- Iterate over slices and compose final result ------------##
-        small_ts = TimeSeries(use_storage=False)
-        small_ts.sample_period = time_series.sample_period
-        partial_cross_corr = None
-        for var in range(self.input_shape[1]):
-            node_slice[1] = slice(var, var + 1)
-            small_ts.data = time_series.read_data_slice(tuple(node_slice))
-            self.algorithm.time_series = small_ts
-            partial_cross_corr = self.algorithm.evaluate()
-            cross_corr.write_data_slice(partial_cross_corr)
-        cross_corr.time = partial_cross_corr.time
+        def read_blocks():
+            for var in range(self.input_shape[1]):
+                node_slice[1] = slice(var, var + 1)
+                yield time_series.read_data_slice(tuple(node_slice)), time_series.sample_period
+
+        nr_of_workers = parallel_blocks.get_nr_of_workers(self.input_shape[1])
+        offsets = None
+        for array_data, offsets in parallel_blocks.map_blocks(_cross_correlate_block, read_blocks(), nr_of_workers):
+            cross_corr.write_data_slice(CrossCorrelation(array_data=array_data, use_storage=False))
+        cross_corr.time = offsets
         cross_corr.labels_ordering[1] = time_series.labels_ordering[2]
         cross_corr.labels_ordering[2] = time_series.labels_ordering[2]
         cross_corr.close_file()
@@ -188,10 +209,10 @@ class PearsonCorrelationCoefficientAdapter(ABCAsynchronous):
         """
         Returns the required memory to be able to run this adapter.
         """
-        in_memory_input = [self.input_shape[0], 1, self.input_shape[2], 1]
-        input_size = numpy.prod(in_memory_input) * 8.0
+        # Time points are read in blocks, only one nodes x nodes matrix is accumulated at a time
+        streaming_size = streaming_covariance.get_required_memory_size(self.input_shape[0], self.input_shape[2])
         output_size = self.algorithm.result_size(self.input_shape)
-        return input_size + output_size
+        return streaming_size + output_size
 
 
     def get_required_disk_size(self, **kwargs):
@@ -212,9 +233,23 @@ class PearsonCorrelationCoefficientAdapter(ABCAsynchronous):
         :returns: the correlation coefficient for the given time series
         :rtype: `CorrelationCoefficients`
         """
-        not_stored_result = self.algorithm.evaluate()
+        input_shape = time_series.read_data_shape()
+        sample_period = time_series.sample_period
+        # Same time interval as CorrelationCoefficient.evaluate
+        t_lo = max(int((1. / sample_period) * (self.algorithm.t_start - sample_period)), 0)
+        t_hi = max(int((1. / sample_period) * (self.algorithm.t_end - sample_period)), input_shape[0])
+        t_hi = min(t_hi + 1, input_shape[0])
+
+        array_data = numpy.zeros(self.algorithm.result_shape(input_shape))
+        for mode in range(input_shape[3]):
+            for var in range(input_shape[1]):
+                covariance = streaming_covariance.StreamingCovariance(input_shape[2])
+                for block in streaming_covariance.read_time_blocks(time_series, var, mode, t_lo, t_hi):
+                    covariance.update(block)
+                array_data[:, :, var, mode] = covariance.correlation()
+
         result = CorrelationCoefficients(storage_path=self.storage_path, source=time_series)
-        result.array_data = not_stored_result.array_data
+        result.array_data = array_data
 
         if isinstance(time_series, TimeSeriesEEG) or isinstance(time_series, TimeSeriesMEG) \
                 or isinstance(time_series, TimeSeriesSEEG):
@@ -37,7 +37,9 @@ Adapter that uses the traits module to generate interfaces for FCD Analyzer.
 """
 
 import numpy as np
-from tvb.analyzers.fcd_matrix import FcdCalculator
+from numpy import linalg
+from tvb.adapters.analyzers import sliding_window_fcd, streaming_covariance
+from tvb.analyzers.fcd_matrix import FcdCalculator, spectral_embedding, epochs_interval
 from tvb.basic.traits.util import log_debug_array
 from tvb.basic.filters.chain import FilterChain
 from tvb.core.adapters.abcadapter import ABCAsynchronous
@@ -99,11 +101,17 @@ class FunctionalConnectivityDynamicsAdapter(ABCAsynchronous):
 
         # -------------------- Fill Algorithm for Analysis -------------------##
         self.algorithm = FcdCalculator(time_series=time_series, sw=sw, sp=sp)
+        self.actual_sw = actual_sw
+        self.actual_sp = actual_sp
 
 
     def get_required_memory_size(self, **kwargs):
-        # We do not know how much memory is needed.
-        return -1
+        """
+        Windows are read and correlated incrementally, and the FC over epochs is computed in blocks of time points.
+        """
+        fcd_size = sliding_window_fcd.get_required_memory_size(self.input_shape, self.actual_sw, self.actual_sp)
+        epochs_size = streaming_covariance.get_required_memory_size(self.input_shape[0], self.input_shape[2])
+        return fcd_size + epochs_size
 
 
     def get_required_disk_size(self, **kwargs):
@@ -123,7 +131,9 @@ class FunctionalConnectivityDynamicsAdapter(ABCAsynchronous):
 
         result = []  # where fcd, fcd_segmented (eventually), and connectivity measures will be stored
 
-        [fcd, fcd_segmented, eigvect_dict, eigval_dict, Connectivity] = self.algorithm.evaluate()
+        fcd = sliding_window_fcd.compute_fcd(time_series, self.actual_sw, self.actual_sp)
+        fcd_segmented, eigvect_dict, eigval_dict = self._compute_epochs_eigenvectors(time_series, fcd)
+        Connectivity = time_series.connectivity
 
         # Create a Fcd dataType object.
         result_fcd = Fcd(storage_path=self.storage_path, source=time_series, sw=sw, sp=sp)
@@ -147,3 +157,62 @@ class FunctionalConnectivityDynamicsAdapter(ABCAsynchronous):
                                            "mode = %s." % (ep, eigval_dict[mode][var][ep][eig], var, mode)
                         result.append(result_eig)
         return result
+
+
+    def _compute_epochs_eigenvectors(self, time_series, fcd, num_eig=3):
+        """
+        Same results as the second part of FcdCalculator.evaluate: find the epochs of stability in the FCD, and the
+        main eigenvectors of the FC over each of them (or over the entire TimeSeries, when no epochs are found).
+        As there, the windows and epochs restart for each state variable and mode: the TimeSeries is read once for
+        each (state variable, mode), and the segmented FCD returned is the one of the last of them.
+        :returns: fcd segmented, dictionaries of eigenvectors and of eigenvalues (keys: mode, var, epoch)
+        """
+        nr_of_time_points = time_series.read_data_shape()[0]
+        eigvect_dict = {}
+        eigval_dict = {}
+        fcd_segmented = None
+        for mode in range(fcd.shape[3]):
+            eigvect_dict[mode] = {}
+            eigval_dict[mode] = {}
+            for var in range(fcd.shape[2]):
+                eigvect_dict[mode][var] = {}
+                eigval_dict[mode][var] = {}
+                [xir, xir_cutoff] = spectral_embedding(fcd[:, :, var, mode])
+                epochs_extremes = epochs_interval(xir, xir_cutoff, self.actual_sp, self.actual_sw)
+                fcd_segmented = fcd.copy()
+                if epochs_extremes.shape[0] <= 1:
+                    # no more than 1 epoch of stability: use the FC over the entire TimeSeries
+                    epochs_extremes = np.zeros((2, 2), dtype=float)
+                    epochs_extremes[1, 1] = nr_of_time_points
+                else:
+                    fcd_segmented[xir > xir_cutoff, :, var, mode] = 1.1
+                    fcd_segmented[:, xir > xir_cutoff, var, mode] = 1.1
+
+                for ep in range(1, epochs_extremes.shape[0]):
+                    epoch_start = int(epochs_extremes[ep][0])
+                    epoch_end = min(int(epochs_extremes[ep][1]) + 1, nr_of_time_points)
+                    eigvect_dict[mode][var][ep], eigval_dict[mode][var][ep] = self._main_eigenvectors(
+                        time_series, var, mode, epoch_start, epoch_end, num_eig)
+        return fcd_segmented, eigvect_dict, eigval_dict
+
+
+    @staticmethod
+    def _main_eigenvectors(time_series, var, mode, epoch_start, epoch_end, num_eig):
+        """
+        :returns: the num_eig eigenvectors (absolute values) with the largest eigenvalues of the FC over the epoch,
+                  and those eigenvalues, normalized by the sum of all eigenvalues
+        """
+        fc = streaming_covariance.StreamingCovariance(time_series.read_data_shape()[2])
+        for block in streaming_covariance.read_time_blocks(time_series, var, mode, epoch_start, epoch_end):
+            fc.update(block)
+        eigval_matrix, eigvect_matrix = linalg.eig(fc.correlation())
+        eigval_matrix = np.real(eigval_matrix)
+        eigvect_matrix = np.real(eigvect_matrix)
+        eigval_matrix = eigval_matrix / np.sum(np.abs(eigval_matrix))  # normalize eigenvalues to [0 and 1)
+        eigenvectors, eigenvalues = [], []
+        for _ in range(num_eig):
+            index = np.argmax(eigval_matrix)
+            eigenvectors.append(abs(eigvect_matrix[:, index]))
+            eigenvalues.append(eigval_matrix[index])
+            eigval_matrix[index] = 0
+        return eigenvectors, eigenvalues
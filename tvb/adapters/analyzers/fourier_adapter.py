@@ -35,11 +35,11 @@ Adapter that uses the traits module to generate interfaces for FFT Analyzer.
 .. moduleauthor:: Stuart A. Knock <Stuart@tvb.invalid>
 
 """
-import psutil
 import numpy
 import math
 import tvb.analyzers.fft as fft
 import tvb.core.adapters.abcadapter as abcadapter
+import tvb.core.adapters.parallel_blocks as parallel_blocks
 import tvb.basic.filters.chain as entities_filter
 import tvb.datatypes.time_series as datatypes_time_series
 import tvb.datatypes.spectral as spectral
@@ -48,6 +48,34 @@ from tvb.basic.logger.builder import get_logger
 LOG = get_logger(__name__)
 
 
+
+def _build_algorithm(segment_length=None, window_function=None, detrend=None):
+    #The enumerate set function isn't working well. A get around strategy is to create a new algorithm
+    algorithm = fft.FFT()
+    if segment_length is not None:
+        algorithm.segment_length = segment_length
+    algorithm.window_function = window_function
+    algorithm.detrend = detrend
+    return algorithm
+
+
+def _compute_fft_block(block):
+    """
+    Executed in a worker process (or in-process), for a block of nodes.
+    :param block: tuple (data, sample_period, segment_length, window_function, detrend)
+    :returns: tuple (FFT result array, segment length used)
+    """
+    data, sample_period, segment_length, window_function, detrend = block
+    small_ts = datatypes_time_series.TimeSeries(use_storage=False)
+    small_ts.data = data
+    small_ts.sample_period = sample_period
+    algorithm = _build_algorithm(segment_length, window_function, detrend)
+    algorithm.time_series = small_ts
+    partial_result = algorithm.evaluate()
+    return partial_result.array_data, partial_result.segment_length
+
+
+
 class FourierAdapter(abcadapter.ABCAsynchronous):
     """ TVB adapter for calling the FFT algorithm. """
     
@@ -99,33 +127,34 @@ class FourierAdapter(abcadapter.ABCAsynchronous):
         LOG.debug("Provided window_function is %s" % (str(window_function)))
         LOG.debug("Detrend is %s" % (str(detrend)))
         ##-------------------- Fill Algorithm for Analysis -------------------##
-        #The enumerate set function isn't working well. A get around strategy is to create a new algorithm
-        algorithm = fft.FFT()
-        if segment_length is not None:
-            algorithm.segment_length = segment_length
-
-        algorithm.window_function = window_function
-        algorithm.time_series = time_series
-        algorithm.detrend = detrend
-        self.algorithm = algorithm
+        self.algorithm = _build_algorithm(segment_length, window_function, detrend)
+        self.algorithm.time_series = time_series
         LOG.debug("Using segment_length is %s" % (str(self.algorithm.segment_length)))
         LOG.debug("Using window_function  is %s" % (str(self.algorithm.window_function)))
         LOG.debug("Using detrend  is %s" % (str(self.algorithm.detrend)))
 
 
-    def get_required_memory_size(self, **kwargs):
+    def _prepare_blocks(self):
         """
-        Returns the required memory to be able to run the adapter.
+        Split the nodes in blocks, one for each worker process at least, and small enough to fit in memory.
+        :returns: the number of workers, and the memory needed for all the nodes at once
         """
         input_shape = self.algorithm.time_series.read_data_shape()
         input_size = numpy.prod(input_shape) * 8.0
         output_size = self.algorithm.result_size(input_shape, self.algorithm.segment_length,
                                                  self.algorithm.time_series.sample_period)
-        total_free_memory = psutil.virtual_memory().free + psutil.swap_memory().free
         total_required_memory = input_size + output_size
-        while total_required_memory / self.memory_factor / total_free_memory > 0.8:
-            self.memory_factor += 1
-        return total_required_memory / self.memory_factor
+        nr_of_workers = parallel_blocks.get_nr_of_workers(input_shape[2])
+        self.memory_factor = parallel_blocks.get_nr_of_blocks(total_required_memory, input_shape[2], nr_of_workers)
+        return nr_of_workers, total_required_memory
+
+
+    def get_required_memory_size(self, **kwargs):
+        """
+        Returns the required memory to be able to run the adapter.
+        """
+        nr_of_workers, total_required_memory = self._prepare_blocks()
+        return parallel_blocks.get_blocks_in_memory(nr_of_workers) * total_required_memory / self.memory_factor
 
 
     def get_required_disk_size(self, **kwargs):
@@ -152,8 +181,9 @@ class FourierAdapter(abcadapter.ABCAsynchronous):
 
         """
         shape = time_series.read_data_shape()
-        block_size = int(math.floor(time_series.read_data_shape()[2] / self.memory_factor))
-        blocks = int(math.ceil(time_series.read_data_shape()[2] / block_size))
+        nr_of_workers, _ = self._prepare_blocks()
+        block_size = int(math.floor(shape[2] / self.memory_factor))
+        blocks = int(math.ceil(float(shape[2]) / block_size))
         
         ##----------- Prepare a FourierSpectrum object for result ------------##
         spectra = spectral.FourierSpectrum(source=time_series,
@@ -165,19 +195,23 @@ class FourierAdapter(abcadapter.ABCAsynchronous):
         node_slice = [slice(shape[0]), slice(shape[1]), None, slice(shape[3])]
         
         ##---------- Iterate over slices and compose final result ------------##
-        small_ts = datatypes_time_series.TimeSeries(use_storage=False)
-        small_ts.sample_period = time_series.sample_period
-        for block in range(blocks):
-            node_slice[2] = slice(block * block_size, min([(block+1) * block_size, shape[2]]), 1)
-            small_ts.data = time_series.read_data_slice(tuple(node_slice))
-            self.algorithm.time_series = small_ts
-            partial_result = self.algorithm.evaluate()
-            if blocks <= 1 and len(partial_result.array_data) == 0:
+        def read_blocks():
+            for block in range(blocks):
+                node_slice[2] = slice(block * block_size, min([(block+1) * block_size, shape[2]]), 1)
+                yield (time_series.read_data_slice(tuple(node_slice)), time_series.sample_period,
+                       self.algorithm.segment_length, window_function, detrend)
+
+        partial_result = None
+        for array_data, partial_segment_length in parallel_blocks.map_blocks(_compute_fft_block, read_blocks(),
+                                                                              nr_of_workers):
+            if blocks <= 1 and len(array_data) == 0:
                 self.add_operation_additional_info(
                     "Fourier produced empty result (most probably due to a very short input TimeSeries).")
                 return None
+            partial_result = spectral.FourierSpectrum(segment_length=partial_segment_length,
+                                                      array_data=array_data, use_storage=False)
             spectra.write_data_slice(partial_result)
-        
+
         LOG.debug("partial segment_length is %s" % (str(partial_result.segment_length)))
         spectra.segment_length = partial_result.segment_length
         spectra.close_file()
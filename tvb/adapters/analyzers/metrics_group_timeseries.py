@@ -40,6 +40,7 @@ Analyzer used to calculate a single measure for TimeSeries.
 """
 
 import numpy
+from tvb.adapters.analyzers import streaming_metrics
 from tvb.analyzers.metrics_base import BaseTimeseriesMetricAlgorithm
 from tvb.basic.traits.util import log_debug_array
 from tvb.basic.traits.parameters_factory import get_traited_subclasses
@@ -90,17 +91,30 @@ class TimeseriesMetricsAdapter(ABCAsynchronous):
         return [DatatypeMeasure]
 
 
-    def configure(self, time_series, **kwargs):
+    def configure(self, time_series, algorithms=None, **kwargs):
         """
-        Store the input shape to be later used to estimate memory usage.
+        Store the input shape and the selected algorithms, to be later used to estimate memory usage.
         """
         self.input_shape = time_series.read_data_shape()
+        self.algorithms = algorithms
+
+
+    def _get_algorithm_names(self, algorithms):
+        if algorithms is None:
+            return self.available_algorithms.keys()
+        return algorithms
+
+
+    def _is_streaming(self, algorithm_names):
+        return all(name in streaming_metrics.STREAMING_METRICS for name in algorithm_names)
 
 
     def get_required_memory_size(self, **kwargs):
         """
         Return the required memory to run this algorithm.
         """
+        if self._is_streaming(self._get_algorithm_names(self.algorithms)):
+            return streaming_metrics.get_required_memory_size(self.input_shape)
         input_size = numpy.prod(self.input_shape) * 8.0
         return input_size
 
@@ -122,22 +136,13 @@ class TimeseriesMetricsAdapter(ABCAsynchronous):
                             (KuramotoIndex, GlobalVariance, VarianceNodeVariance)
         :rtype: `DatatypeMeasure`
         """
-        if algorithms is None:
-            algorithms = self.available_algorithms.keys()
-
         shape = time_series.read_data_shape()
         log_debug_array(LOG, time_series, "time_series")
 
-        metrics_results = {}
-        for algorithm_name in algorithms:
-            ##------------- NOTE: Assumes 4D, Simulator timeSeries. --------------##
-            node_slice = [slice(shape[0]), slice(shape[1]), slice(shape[2]), slice(shape[3])]
-
-            ##---------- Iterate over slices and compose final result ------------##
-            unstored_ts = TimeSeries(use_storage=False)
-
-            unstored_ts.data = time_series.read_data_slice(tuple(node_slice))
-
+        # The data is read once, and shared by all the selected algorithms
+        unstored_ts = TimeSeries(use_storage=False)
+        selected_algorithms = []
+        for algorithm_name in self._get_algorithm_names(algorithms):
             ##-------------------- Fill Algorithm for Analysis -------------------##
             algorithm = self.available_algorithms[algorithm_name](time_series=unstored_ts)
             if segment is not None:
@@ -153,8 +158,19 @@ class TimeseriesMetricsAdapter(ABCAsynchronous):
                 continue
             else:
                 LOG.debug("Applying measure: " + str(algorithm_name))
+            selected_algorithms.append((algorithm_name, algorithm))
+
+        if self._is_streaming([algorithm_name for algorithm_name, _ in selected_algorithms]):
+            unstored_results = self._evaluate_in_time_blocks(time_series, shape, selected_algorithms)
+        else:
+            ##------------- NOTE: Assumes 4D, Simulator timeSeries. --------------##
+            node_slice = [slice(shape[0]), slice(shape[1]), slice(shape[2]), slice(shape[3])]
+            unstored_ts.data = time_series.read_data_slice(tuple(node_slice))
+            unstored_results = [(algorithm_name, algorithm.evaluate())
+                                for algorithm_name, algorithm in selected_algorithms]
 
-            unstored_result = algorithm.evaluate()
+        metrics_results = {}
+        for algorithm_name, unstored_result in unstored_results:
             ##----------------- Prepare a Float object(s) for result ----------------##
             if isinstance(unstored_result, dict):
                 metrics_results.update(unstored_result)
@@ -166,3 +182,23 @@ class TimeseriesMetricsAdapter(ABCAsynchronous):
         return result
 
 
+    @staticmethod
+    def _evaluate_in_time_blocks(time_series, shape, selected_algorithms):
+        """
+        Read the time series once, in blocks of time points, and update the metrics of all algorithms with each.
+        :returns: list of (algorithm name, result of the metric)
+        """
+        metrics = [(algorithm_name, streaming_metrics.STREAMING_METRICS[algorithm_name](algorithm, shape))
+                   for algorithm_name, algorithm in selected_algorithms]
+        if not metrics:
+            return []
+
+        block_length = streaming_metrics.get_time_block_length(shape)
+        first_time_point = min(metric.start_time_point for _, metric in metrics)
+        for block_start in range(first_time_point, shape[0], block_length):
+            block_slice = (slice(block_start, min(block_start + block_length, shape[0])),
+                           slice(shape[1]), slice(shape[2]), slice(shape[3]))
+            block = time_series.read_data_slice(block_slice)
+            for _, metric in metrics:
+                metric.update(block, block_start)
+        return [(algorithm_name, metric.result()) for algorithm_name, metric in metrics]
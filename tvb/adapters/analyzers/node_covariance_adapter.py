@@ -37,9 +37,9 @@ Adapter that uses the traits module to generate interfaces for FFT Analyzer.
 """
 
 import numpy
+from tvb.adapters.analyzers import streaming_covariance
 from tvb.analyzers.node_covariance import NodeCovariance
 from tvb.core.adapters.abcadapter import ABCAsynchronous
-from tvb.datatypes.time_series import TimeSeries
 from tvb.datatypes.graph import Covariance
 from tvb.basic.traits.util import log_debug_array
 from tvb.basic.filters.chain import FilterChain
@@ -89,10 +89,11 @@ class NodeCovarianceAdapter(ABCAsynchronous):
         """
         Return the required memory to run this algorithm.
         """
+        # Time points are read in blocks, and each nodes x nodes matrix is written before computing the next one
         used_shape = (self.input_shape[0], 1, self.input_shape[2], 1)
-        input_size = numpy.prod(used_shape) * 8.0
+        streaming_size = streaming_covariance.get_required_memory_size(self.input_shape[0], self.input_shape[2])
         output_size = self.algorithm.result_size(used_shape)
-        return input_size + output_size    
+        return streaming_size + output_size
 
 
     def get_required_disk_size(self, **kwargs):
@@ -114,17 +115,12 @@ class NodeCovarianceAdapter(ABCAsynchronous):
         covariance = Covariance(source=time_series, storage_path=self.storage_path)
         
         #NOTE: Assumes 4D, Simulator timeSeries.
-        node_slice = [slice(self.input_shape[0]), None, slice(self.input_shape[2]), None]
-        
         for mode in range(self.input_shape[3]):
             for var in range(self.input_shape[1]):
-                small_ts = TimeSeries(use_storage=False)
-                node_slice[1] = slice(var, var + 1)
-                node_slice[3] = slice(mode, mode + 1)
-                small_ts.data = time_series.read_data_slice(tuple(node_slice))
-                self.algorithm.time_series = small_ts 
-                partial_cov = self.algorithm.evaluate()
-                covariance.write_data_slice(partial_cov.array_data)
+                partial_cov = streaming_covariance.StreamingCovariance(self.input_shape[2])
+                for block in streaming_covariance.read_time_blocks(time_series, var, mode, 0, self.input_shape[0]):
+                    partial_cov.update(block)
+                covariance.write_data_slice(partial_cov.covariance()[:, :, numpy.newaxis, numpy.newaxis])
         covariance.close_file()
         return covariance
 
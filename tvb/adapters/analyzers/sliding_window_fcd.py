@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+FCD matrix (correlation between the functional connectivity of sliding windows), as in FcdCalculator.evaluate.
+
+The window statistics (sums and cross-products of the nodes) are updated as the window slides: the rows leaving the
+window are subtracted and the ones entering it are added, so each time point is read only once. The FC of all windows
+(upper triangles, standardized) are then correlated at once, with a single BLAS rank-k update.
+"""
+
+import numpy
+from scipy.linalg import blas
+
+
+# Recompute the window statistics from scratch after this many incremental updates, to bound rounding errors
+MAX_INCREMENTAL_UPDATES = 100
+
+
+
+def get_nr_of_windows(nr_of_time_points, sw, sp):
+    """
+    :param sw: sliding window length, in time points
+    :param sp: spanning between two consecutive windows, in time points
+    """
+    return int((nr_of_time_points - sw) / sp)
+
+
+def get_window_bounds(nr_of_time_points, sw, sp):
+    """
+    :returns: list of (first, last + 1) time point of each window, with the same rounding as FcdCalculator
+    """
+    bounds = []
+    start = -sp
+    for _ in range(get_nr_of_windows(nr_of_time_points, sw, sp)):
+        start += sp
+        bounds.append((int(start), min(int(start + sw) + 1, nr_of_time_points)))
+    return bounds
+
+
+def get_required_memory_size(input_shape, sw, sp):
+    """
+    :returns: bytes for the window data, the nodes x nodes statistics, the FC of all windows and the FCD matrices
+    """
+    nr_of_nodes = input_shape[2]
+    nr_of_windows = get_nr_of_windows(input_shape[0], sw, sp)
+    window_size = 3 * (int(sw) + 2) * nr_of_nodes
+    statistics_size = nr_of_nodes * nr_of_nodes + 2 * nr_of_nodes
+    fc_size = nr_of_windows * nr_of_nodes * (nr_of_nodes - 1) / 2
+    fcd_size = nr_of_windows * nr_of_windows * (1 + input_shape[1] * input_shape[3])
+    return (window_size + statistics_size + fc_size + fcd_size) * 8.0
+
+
+def compute_fcd(time_series, sw, sp):
+    """
+    :param sw: sliding window length, in time points
+    :param sp: spanning between two consecutive windows, in time points
+    :returns: array (windows, windows, state variables, modes)
+    """
+    input_shape = time_series.read_data_shape()
+    nr_of_nodes = input_shape[2]
+    window_bounds = get_window_bounds(input_shape[0], sw, sp)
+    triangular = numpy.triu_indices(nr_of_nodes, 1)
+
+    # Fortran order, so that each (state variable, mode) matrix is contiguous and written in place
+    fcd = numpy.zeros((len(window_bounds), len(window_bounds), input_shape[1], input_shape[3]), order='F')
+    for mode in range(input_shape[3]):
+        for var in range(input_shape[1]):
+            def read_rows(start, end):
+                data_slice = (slice(start, end), slice(var, var + 1), slice(nr_of_nodes), slice(mode, mode + 1))
+                return time_series.read_data_slice(data_slice)[:, 0, :, 0]
+
+            window = SlidingWindow(read_rows, nr_of_nodes)
+            fc_stream = numpy.empty((len(window_bounds), len(triangular[0])))
+            for index, (start, end) in enumerate(window_bounds):
+                window.move(start, end)
+                fc_stream[index] = window.correlations(triangular)
+            fcd[:, :, var, mode] = correlate_rows(fc_stream, out=fcd[:, :, var, mode])
+    return fcd
+
+
+def correlate_rows(vectors, out=None):
+    """
+    Pearson correlation between all rows, as numpy.corrcoef, but overwriting `vectors`.
+    :param out: optional Fortran ordered (rows x rows) array, where the result is written
+    """
+    vectors -= vectors.mean(axis=1)[:, numpy.newaxis]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        vectors /= numpy.sqrt(numpy.einsum('ij,ij->i', vectors, vectors))[:, numpy.newaxis]
+    # Only the upper triangle is computed; copy it below the diagonal row by row, to avoid a full temporary
+    if out is None:
+        out = numpy.zeros((len(vectors), len(vectors)), order='F')
+    correlations = blas.dsyrk(1.0, vectors.T, trans=1, c=out, overwrite_c=1)
+    for row in range(1, len(correlations)):
+        correlations[row, :row] = correlations[:row, row]
+    numpy.clip(correlations, -1, 1, out=correlations)
+    return correlations
+
+
+
+class SlidingWindow(object):
+    """
+    Data, sums and cross-products of the nodes, over the time points of the current window.
+    Both are shifted by the mean of the window where they were last recomputed from scratch, to avoid cancellation.
+    """
+
+
+    def __init__(self, read_rows, nr_of_nodes):
+        """
+        :param read_rows: function (first, last + 1) returning the data of those time points, as (time x nodes)
+        """
+        self.read_rows = read_rows
+        self.start = 0
+        self.end = 0
+        self.data = numpy.zeros((0, nr_of_nodes))
+        self._shift = None
+        self._sum = None
+        self._cross_products = None
+        self._updates = 0
+
+
+    def move(self, start, end):
+        """
+        Move forward to the time points [start, end). Only the ones after the previous window are read.
+        """
+        kept = self.data[max(0, start - self.start):]
+        if start >= self.end:
+            kept = kept[:0]
+        entering = self.read_rows(max(start, self.end), end).astype(numpy.float64)
+        leaving = self.data[:max(0, start - self.start)]
+
+        self.data = numpy.concatenate((kept, entering))
+        self.start, self.end = start, end
+
+        if (self._shift is None or len(kept) == 0 or self._updates >= MAX_INCREMENTAL_UPDATES
+                or len(entering) + len(leaving) >= len(self.data)):
+            self._recompute()
+        else:
+            self._add(entering, 1.0)
+            self._add(leaving, -1.0)
+            self._updates += 1
+
+
+    def _recompute(self):
+        self._shift = self.data.mean(axis=0)
+        self._sum = numpy.zeros(self.data.shape[1])
+        self._cross_products = numpy.zeros((self.data.shape[1], self.data.shape[1]), order='F')
+        self._updates = 0
+        self._add(self.data, 1.0)
+
+
+    def _add(self, rows, sign):
+        if len(rows) == 0:
+            return
+        shifted = numpy.ascontiguousarray(rows - self._shift)
+        self._sum += sign * shifted.sum(axis=0)
+        self._cross_products = blas.dsyrk(sign, shifted.T, beta=1.0, c=self._cross_products, overwrite_c=1)
+
+
+    def correlations(self, triangular):
+        """
+        :param triangular: indices (i, j) with i < j, of the correlations to return
+        :returns: Pearson correlation between nodes i and j over the window, as numpy.corrcoef (NaN for constant nodes)
+        """
+        count = float(len(self.data))
+        rows, columns = triangular
+        variance = numpy.diag(self._cross_products) - self._sum * self._sum / count
+        covariance = self._cross_products[rows, columns] - self._sum[rows] * self._sum[columns] / count
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            result = covariance / numpy.sqrt(variance[rows] * variance[columns])
+        numpy.clip(result, -1, 1, out=result)
+        return result
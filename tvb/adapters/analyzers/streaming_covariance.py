@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Covariance and Pearson correlation between nodes, accumulated over blocks of time points.
+
+Only the sums and the cross-products (nodes x nodes) are kept, so memory does not grow with the length of the
+time series. To avoid cancellation, the data is shifted by the mean of the first block before accumulating.
+"""
+
+import numpy
+from scipy.linalg import blas
+
+
+# Values (time points x nodes) read from the time series at once
+TIME_BLOCK_ELEMENTS = 2 ** 22
+
+
+
+def get_time_block_length(nr_of_nodes):
+    """
+    :returns: number of time points read at once, for all nodes
+    """
+    return max(1, TIME_BLOCK_ELEMENTS // max(1, nr_of_nodes))
+
+
+def get_required_memory_size(nr_of_time_points, nr_of_nodes):
+    """
+    :returns: bytes for one block (as read and shifted), the sums and cross-products, and the final matrix
+    """
+    block_length = min(nr_of_time_points, get_time_block_length(nr_of_nodes))
+    return (2 * block_length * nr_of_nodes + 3 * nr_of_nodes * nr_of_nodes + 2 * nr_of_nodes) * 8.0
+
+
+def read_time_blocks(time_series, var, mode, t_start, t_end):
+    """
+    Generator of (time points x nodes) blocks, read with `read_data_slice` between t_start and t_end (indices).
+    """
+    nr_of_nodes = time_series.read_data_shape()[2]
+    block_length = get_time_block_length(nr_of_nodes)
+    for start in range(t_start, t_end, block_length):
+        data_slice = (slice(start, min(start + block_length, t_end)), slice(var, var + 1),
+                      slice(nr_of_nodes), slice(mode, mode + 1))
+        yield time_series.read_data_slice(data_slice)[:, 0, :, 0]
+
+
+
+class StreamingCovariance(object):
+    """
+    Accumulate blocks of (time points x nodes), to get the same matrices as numpy.cov and numpy.corrcoef
+    on all the time points at once.
+    """
+
+
+    def __init__(self, nr_of_nodes):
+        self.count = 0
+        self._shift = None
+        self._sum = numpy.zeros(nr_of_nodes)
+        # Only the upper triangle is filled by syrk
+        self._cross_products = numpy.zeros((nr_of_nodes, nr_of_nodes), order='F')
+
+
+    def update(self, block):
+        """
+        :param block: array (time points x nodes)
+        """
+        if block.shape[0] == 0:
+            return
+        block = numpy.asarray(block, dtype=numpy.float64)
+        if self._shift is None:
+            self._shift = block.mean(axis=0)
+        shifted = numpy.ascontiguousarray(block - self._shift)
+        self._sum += shifted.sum(axis=0)
+        self._cross_products = blas.dsyrk(1.0, shifted.T, beta=1.0, c=self._cross_products, overwrite_c=1)
+        self.count += shifted.shape[0]
+
+
+    def _comoments(self):
+        """
+        :returns: full symmetric matrix of sums of products of the deviations from the mean
+        """
+        comoments = blas.dsyr(-1.0 / self.count, self._sum, a=self._cross_products.copy(order='F'), overwrite_a=1)
+        comoments += numpy.triu(comoments, 1).T
+        return comoments
+
+
+    def covariance(self):
+        """
+        :returns: nodes x nodes covariance, normalized by count - 1, as numpy.cov
+        """
+        comoments = self._comoments()
+        comoments /= self.count - 1
+        return comoments
+
+
+    def correlation(self):
+        """
+        :returns: nodes x nodes Pearson correlation coefficients, as numpy.corrcoef (NaN for constant nodes)
+        """
+        comoments = self._comoments()
+        stddev = numpy.sqrt(numpy.diag(comoments))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            comoments /= stddev[:, numpy.newaxis]
+            comoments /= stddev[numpy.newaxis, :]
+        numpy.clip(comoments, -1, 1, out=comoments)
+        return comoments
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Metrics of TimeseriesMetricsAdapter computed incrementally, on blocks of time points read once for all of them.
+
+Each class mirrors the `evaluate` of the algorithm with the same name (from tvb.analyzers), which it receives
+configured (start_point, segment), but without data. Variances are merged over blocks with the pairwise update
+of Chan et al., so results equal those on the full time series.
+"""
+
+import numpy
+from abc import ABCMeta, abstractmethod
+from tvb.basic.logger.builder import get_logger
+
+LOG = get_logger(__name__)
+
+# Values (time points x state variables x nodes x modes) read from the time series at once
+TIME_BLOCK_ELEMENTS = 2 ** 22
+
+
+
+def get_time_block_length(shape):
+    """
+    :returns: number of time points read at once, for all state variables, nodes and modes
+    """
+    return max(1, TIME_BLOCK_ELEMENTS // max(1, int(numpy.prod(shape[1:]))))
+
+
+def get_required_memory_size(shape):
+    """
+    :returns: bytes for one block of time points and its temporary copies, and the moments of each time series
+    """
+    block_length = min(shape[0], get_time_block_length(shape))
+    return (4 * block_length + 3) * numpy.prod(shape[1:]) * 8.0
+
+
+def get_start_time_point(algorithm, nr_of_time_points):
+    """
+    :returns: index of the first time point used by `algorithm`, as computed in its `evaluate`
+    """
+    if algorithm.start_point != 0.0:
+        start_tpt = algorithm.start_point / algorithm.time_series.sample_period
+        LOG.debug("Will discard: %s time points" % start_tpt)
+    else:
+        start_tpt = 0
+
+    if start_tpt > nr_of_time_points:
+        LOG.warning("The time-series is shorter than the starting point")
+        LOG.debug("Will divide the time-series into %d segments." % algorithm.segment)
+        start_tpt = int((algorithm.segment - 1) * (nr_of_time_points // algorithm.segment))
+    return int(start_tpt)
+
+
+
+class _RunningMoments(object):
+    """
+    Count, mean and sum of squared deviations from the mean, over the first axis of the blocks seen so far.
+    """
+
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+    def update(self, values):
+        count = values.shape[0]
+        if count == 0:
+            return
+        block_mean = values.mean(axis=0)
+        block_m2 = ((values - block_mean) ** 2).sum(axis=0)
+
+        total = self.count + count
+        delta = block_mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + block_m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+
+
+class _StreamingMetric(object):
+    """
+    Receive consecutive blocks of the time series, and keep only the time points from `start_time_point` on.
+    """
+    __metaclass__ = ABCMeta
+
+    start_time_point = 0
+
+
+    def __init__(self, algorithm, shape):
+        self.algorithm = algorithm
+        self.shape = shape
+
+
+    def update(self, block, block_start):
+        """
+        :param block: data of the time points from `block_start` on
+        """
+        self._update(block[max(0, self.start_time_point - block_start):])
+
+
+    @abstractmethod
+    def _update(self, block):
+        """
+        :param block: data of the next time points to take into account
+        """
+
+
+    @abstractmethod
+    def result(self):
+        """
+        :returns: the metric value, over all time points received
+        """
+
+
+
+class KuramotoIndexMetric(_StreamingMetric):
+    """
+    Mean over time of the Kuramoto order parameter, from the phases given by the first two state variables.
+    """
+
+
+    def __init__(self, algorithm, shape):
+        super(KuramotoIndexMetric, self).__init__(algorithm, shape)
+        if shape[1] < 2:
+            msg = " The number of state variables should be at least 2."
+            LOG.error(msg)
+            raise Exception(msg)
+        self.order_sum = 0.0
+        self.count = 0
+
+
+    def _update(self, block):
+        theta = numpy.arctan2(block[:, 1, :, 0], block[:, 0, :, 0])
+        order = numpy.abs(numpy.exp(1j * theta).sum(axis=1) / self.shape[2])
+        self.order_sum += order.sum()
+        self.count += order.shape[0]
+
+
+    def result(self):
+        return self.order_sum / self.count
+
+
+
+class _SeriesVarianceMetric(_StreamingMetric):
+    """
+    Accumulate the variance over time of each (state variable, node, mode) series.
+    """
+
+
+    def __init__(self, algorithm, shape):
+        super(_SeriesVarianceMetric, self).__init__(algorithm, shape)
+        self.start_time_point = get_start_time_point(algorithm, shape[0])
+        self.moments = _RunningMoments()
+
+
+    def _update(self, block):
+        self.moments.update(block)
+
+
+
+class GlobalVarianceMetric(_SeriesVarianceMetric):
+    """
+    Variance over all data points, after zero-centering each series.
+    """
+
+
+    def result(self):
+        return self.moments.m2.sum() / (self.moments.count * self.moments.m2.size)
+
+
+
+class VarianceNodeVarianceMetric(_SeriesVarianceMetric):
+    """
+    Variance over nodes of the zero-centered node variances (over time points, state variables and modes).
+    """
+
+
+    def result(self):
+        node_variance = self.moments.m2.sum(axis=(0, 2)) / (self.moments.count * self.shape[1] * self.shape[3])
+        return node_variance.var()
+
+
+
+class ProxyMetastabilitySynchronyMetric(_StreamingMetric):
+    """
+    Standard deviation and inverse of the mean, over all time points, of the spatial deviation from the mean.
+    """
+
+
+    def __init__(self, algorithm, shape):
+        super(ProxyMetastabilitySynchronyMetric, self).__init__(algorithm, shape)
+        self.start_time_point = get_start_time_point(algorithm, shape[0])
+        self.moments = _RunningMoments()
+
+
+    def _update(self, block):
+        deviation = abs(block - block.mean(axis=2)[:, :, numpy.newaxis, :]).mean(axis=2)
+        self.moments.update(deviation.reshape((-1,)))
+
+
+    def result(self):
+        return {"Metastability": numpy.sqrt(self.moments.m2 / self.moments.count),
+                "Synchrony": 1. / self.moments.mean}
+
+
+
+# Algorithm class names (from TimeseriesMetricsAdapter.available_algorithms) which can be computed incrementally
+STREAMING_METRICS = {'KuramotoIndex': KuramotoIndexMetric,
+                     'GlobalVariance': GlobalVarianceMetric,
+                     'VarianceNodeVariance': VarianceNodeVarianceMetric,
+                     'ProxyMetastabilitySynchrony': ProxyMetastabilitySynchronyMetric}
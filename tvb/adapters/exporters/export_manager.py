@@ -36,14 +36,18 @@ Class responsible for all TVB exports (datatype or project).
 
 import os
 import json
+import hashlib
+from collections import deque
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from tvb.adapters.exporters.tvb_export import TVBExporter
 from tvb.adapters.exporters.exceptions import ExportException, InvalidExportDataException
 from tvb.basic.profile import TvbProfile
 from tvb.config import TVB_IMPORTER_MODULE, TVB_IMPORTER_CLASS
 from tvb.core.entities import model
 from tvb.core.entities.model.model_burst import BURST_INFO_FILE, BURSTS_DICT_KEY, DT_BURST_MAP
-from tvb.core.entities.file.files_helper import FilesHelper, TvbZip
+from tvb.core.entities.file.files_helper import FilesHelper, TvbZip, PreparedZipMember, ZipStreamBuffer
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
 from tvb.core.entities.transient.burst_export_entities import BurstInformation, WorkflowInformation
 from tvb.core.entities.transient.burst_export_entities import WorkflowStepInformation, WorkflowViewStepInformation
 from tvb.core.entities.storage import dao
@@ -57,6 +61,12 @@ KEY_DT_GID = 'gid'
 KEY_OPERATION_ID = 'operation'
 KEY_BURST_ID = 'burst'
 KEY_DT_DATE = "dt_date"
+KEY_PROJECT_GID = "project_gid"
+KEY_EXPORT_DATE = "export_date"
+KEY_OPERATION_FOLDERS = "operation_folders"
+
+# Files with most of their content in compressed datasets are stored as they are
+H5_COMPRESSED_FRACTION = 0.5
 
 
 
@@ -67,6 +77,7 @@ class ExportManager:
     all_exporters = {}  # Dictionary containing all available exporters
     export_folder = None
     EXPORT_FOLDER_NAME = "EXPORT_TMP"
+    EXPORT_MANIFEST_FILE = "export_manifest.json"
     ZIP_FILE_EXTENSION = "zip"
 
     def __init__(self):
@@ -172,13 +183,18 @@ class ExportManager:
         return paths
 
 
-    def _export_linked_datatypes(self, project, zip_file):
+    def _gather_linked_datatypes(self, project):
+        """
+        Prepare an import operation which will contain links to other projects.
+        :returns: tuple (archive name of operation.xml, its content, list of (file path, archive name)),
+            or None when the project has no links
+        """
         files_helper = FilesHelper()
         linked_paths = self._get_linked_datatypes_storage_path(project)
 
         if not linked_paths:
             # do not export an empty operation
-            return
+            return None
 
         # Make a import operation which will contain links to other projects
         algo = dao.get_algorithm_by_module(TVB_IMPORTER_MODULE, TVB_IMPORTER_CLASS)
@@ -194,27 +210,31 @@ class ExportManager:
         op_folder = files_helper.get_operation_folder(op.project.name, op.id)
         operation_xml = files_helper.get_operation_meta_file_path(op.project.name, op.id)
         op_folder_name = os.path.basename(op_folder)
-
-        # add operation.xml
-        zip_file.write(operation_xml, op_folder_name + '/' + os.path.basename(operation_xml))
-
-        # add linked datatypes to archive in the import operation
-        for pth in linked_paths:
-            zip_pth = op_folder_name + '/' + os.path.basename(pth)
-            zip_file.write(pth, zip_pth)
+        with open(operation_xml) as operation_xml_file:
+            operation_xml_content = operation_xml_file.read()
 
         # remove these files, since we only want them in export archive
         files_helper.remove_folder(op_folder)
 
+        # linked datatypes go in the archive, in the import operation
+        members = [(pth, op_folder_name + '/' + os.path.basename(pth)) for pth in linked_paths]
+        return op_folder_name + '/' + os.path.basename(operation_xml), operation_xml_content, members
 
-    def _export_bursts(self, project, project_datatypes, zip_file):
 
+    def _get_bursts_info(self, project, project_datatypes, only_referenced=False):
+        """
+        :param only_referenced: when True, only the bursts of the given DataTypes are included
+        :returns: JSON string with the burst configurations of a project, and the burst of each DataType
+        """
         bursts_dict = {}
+        referenced_ids = set(dt[KEY_BURST_ID] for dt in project_datatypes)
 
         bursts_count = dao.get_bursts_for_project(project.id, count=True)
         for start_idx in range(0, bursts_count, BURST_PAGE_SIZE):
             bursts = dao.get_bursts_for_project(project.id, page_start=start_idx, page_size=BURST_PAGE_SIZE)
             for burst in bursts:
+                if only_referenced and burst.id not in referenced_ids:
+                    continue
                 one_info = self._build_burst_export_dict(burst)
                 # Save data in dictionary form so we can just save it as a json later on
                 bursts_dict[burst.id] = one_info
@@ -223,67 +243,206 @@ class ExportManager:
         for dt in project_datatypes:
             datatype_burst_mapping[dt[KEY_DT_GID]] = dt[KEY_BURST_ID]
 
-        project_folder = FilesHelper().get_project_folder(project)
-        bursts_file_name = os.path.join(project_folder, BURST_INFO_FILE)
         burst_info = {BURSTS_DICT_KEY: bursts_dict,
                       DT_BURST_MAP: datatype_burst_mapping}
-
-        zip_file.writestr(os.path.basename(bursts_file_name), json.dumps(burst_info))
+        return json.dumps(burst_info)
 
 
-    def export_project(self, project, optimize_size=False):
+    def export_project(self, project, optimize_size=False, base_manifest=None):
         """
         Given a project root and the TVB storage_path, create a ZIP
         ready for export.
         :param project: project object which identifies project to be exported
+        :param optimize_size: when True, only operation folders with visible DataTypes are exported
+        :param base_manifest: manifest of an archive the recipient already has (see `read_archive_manifest`).
+            When given, the operation folders unchanged since that archive are skipped.
+        :returns: path towards the ZIP file
+        """
+        if project is None:
+            raise ExportException("Please provide project to be exported")
+
+        export_folder = self._build_data_export_folder(project)
+        result_path = os.path.join(export_folder, self._get_project_zip_name(project))
+        with open(result_path, "wb") as archive_file:
+            for _ in self._prepare_project_archive(archive_file, project, optimize_size, base_manifest):
+                pass
+        return result_path
+
+
+    def stream_project(self, project, optimize_size=False, base_manifest=None):
+        """
+        Same as `export_project`, but the ZIP is not written on disk, it is produced while being read.
+        All DB queries are done before returning, thus the generator can be consumed outside the request.
+        :returns: a tuple (name of the ZIP file, generator over the archive bytes)
         """
         if project is None:
             raise ExportException("Please provide project to be exported")
 
+        buffer = ZipStreamBuffer()
+        archive_writer = self._prepare_project_archive(buffer, project, optimize_size, base_manifest)
+
+        def _stream():
+            for _ in archive_writer:
+                data = buffer.pop_data()
+                if data:
+                    yield data
+            yield buffer.pop_data()
+
+        return self._get_project_zip_name(project), _stream()
+
+
+    def _get_project_zip_name(self, project):
+        date_str = datetime.now().strftime("%Y-%m-%d_%H-%M")
+        return "%s_%s.%s" % (date_str, project.name, self.ZIP_FILE_EXTENSION)
+
+
+    def _prepare_project_archive(self, archive_file, project, optimize_size, base_manifest):
+        """
+        Collect everything to be exported for a project (DB queries included).
+        :param archive_file: file-like object receiving the ZIP (only `write` and `tell` are used)
+        :returns: generator writing the archive, and yielding after each chunk written
+        """
         files_helper = FilesHelper()
         project_folder = files_helper.get_project_folder(project)
         project_datatypes = self._gather_project_datatypes(project, optimize_size)
-        to_be_exported_folders = []
-        considered_op_ids = []
+        previous_folders = {}
+        if base_manifest is not None:
+            if base_manifest.get(KEY_PROJECT_GID) == project.gid:
+                previous_folders = base_manifest.get(KEY_OPERATION_FOLDERS, {})
+            else:
+                LOG.warning("The base manifest is not for project %s, exporting everything" % project.name)
 
         if optimize_size:
             ## take only the DataType with visibility flag set ON
-            for dt in project_datatypes:
-                if dt[KEY_OPERATION_ID] not in considered_op_ids:
-                    to_be_exported_folders.append({'folder': files_helper.get_project_folder(project,
-                                                                                             str(dt[KEY_OPERATION_ID])),
-                                                   'archive_path_prefix': str(dt[KEY_OPERATION_ID]) + os.sep})
-                    considered_op_ids.append(dt[KEY_OPERATION_ID])
-
+            considered_op_ids = set(dt[KEY_OPERATION_ID] for dt in project_datatypes)
+            folder_names = sorted(str(op_id) for op_id in considered_op_ids)
+            root_files = []
         else:
-            to_be_exported_folders.append({'folder': project_folder,
-                                           'archive_path_prefix': '', 'exclude': ["TEMP"]})
+            folder_names, root_files = self._list_project_folder(project_folder)
+
+        members = [(os.path.join(project_folder, file_name), file_name) for file_name in root_files]
+        manifest = {KEY_PROJECT_GID: project.gid, KEY_EXPORT_DATE: str(datetime.now()), KEY_OPERATION_FOLDERS: {}}
+        skipped_folders = set()
+        for folder_name in folder_names:
+            folder_members = self._list_folder_files(os.path.join(project_folder, folder_name), folder_name)
+            fingerprint = self._compute_fingerprint(folder_members)
+            manifest[KEY_OPERATION_FOLDERS][folder_name] = fingerprint
+            if previous_folders.get(folder_name) == fingerprint:
+                LOG.debug("Skipping unchanged folder %s" % folder_name)
+                skipped_folders.add(folder_name)
+                continue
+            members.extend(folder_members)
+
+        if skipped_folders:
+            ## Burst information only for the DataTypes in the archive
+            project_datatypes = [dt for dt in project_datatypes if str(dt[KEY_OPERATION_ID]) not in skipped_folders]
+        entries = [(BURST_INFO_FILE, self._get_bursts_info(project, project_datatypes,
+                                                           only_referenced=bool(skipped_folders)))]
+        linked = self._gather_linked_datatypes(project)
+        if linked is not None:
+            operation_xml_name, operation_xml_content, linked_members = linked
+            entries.append((operation_xml_name, operation_xml_content))
+            members.extend(linked_members)
+        if optimize_size:
+            ## Make sure the Project.xml file gets copied:
+            with open(files_helper.get_project_meta_file_path(project.name)) as project_xml:
+                entries.append((files_helper.TVB_PROJECT_FILE, project_xml.read()))
+        ## The manifest travels with the archive, to be the base of the next incremental export
+        entries.append((self.EXPORT_MANIFEST_FILE, json.dumps(manifest)))
 
-        # Compute path and name of the zip file
-        now = datetime.now()
-        date_str = now.strftime("%Y-%m-%d_%H-%M")
-        zip_file_name = "%s_%s.%s" % (date_str, project.name, self.ZIP_FILE_EXTENSION)
+        return self._write_project_archive(archive_file, members, entries)
 
-        export_folder = self._build_data_export_folder(project)
-        result_path = os.path.join(export_folder, zip_file_name)
-
-        with TvbZip(result_path, "w") as zip_file:
-            # Pack project [filtered] content into a ZIP file:
-            LOG.debug("Done preparing, now we will write folders " + str(len(to_be_exported_folders)))
-            LOG.debug(str(to_be_exported_folders))
-            for pack in to_be_exported_folders:
-                zip_file.write_folder(**pack)
-            LOG.debug("Done exporting files, now we will write the burst configurations...")
-            self._export_bursts(project, project_datatypes, zip_file)
-            LOG.debug("Done exporting burst configurations, now we will export linked DTs")
-            self._export_linked_datatypes(project, zip_file)
-            ## Make sure the Project.xml file gets copied:
-            if optimize_size:
-                LOG.debug("Done linked, now we write the project xml")
-                zip_file.write(files_helper.get_project_meta_file_path(project.name), files_helper.TVB_PROJECT_FILE)
+
+    def _write_project_archive(self, archive_file, members, entries):
+        """
+        Generator writing files (compressed in parallel) and in-memory entries into a ZIP.
+        It yields after each chunk of a file written, and once after the entries.
+        """
+        with TvbZip(archive_file, "w") as zip_file:
+            LOG.debug("Done preparing, now we will write %d files" % len(members))
+            for prepared in self._prepare_members(members):
+                for _ in zip_file.write_prepared(prepared):
+                    yield
+            LOG.debug("Done exporting files, now we write %d entries" % len(entries))
+            for archive_name, content in entries:
+                zip_file.writestr(archive_name, content)
+            yield
             LOG.debug("Done, closing")
 
-        return result_path
+
+    @classmethod
+    def read_archive_manifest(cls, archive_path):
+        """
+        :returns: the manifest stored in a previously exported project archive, to be used as `base_manifest`
+            for an incremental export, or None when the archive has none
+        """
+        with TvbZip(archive_path) as zip_file:
+            if cls.EXPORT_MANIFEST_FILE not in zip_file.namelist():
+                LOG.info("No manifest found in archive %s" % archive_path)
+                return None
+            return json.loads(zip_file.read(cls.EXPORT_MANIFEST_FILE))
+
+
+    def _list_project_folder(self, project_folder):
+        """
+        :returns: (names of sub-folders, names of files) found directly in the project folder
+        """
+        folder_names = []
+        file_names = []
+        for name in sorted(os.listdir(project_folder)):
+            if name in (FilesHelper.TEMP_FOLDER, self.EXPORT_MANIFEST_FILE):
+                continue
+            if os.path.isdir(os.path.join(project_folder, name)):
+                folder_names.append(name)
+            else:
+                file_names.append(name)
+        return folder_names, file_names
+
+
+    @staticmethod
+    def _list_folder_files(folder, archive_path_prefix):
+        """
+        :returns: list of (file path, archive name) for all files under a folder
+        """
+        members = []
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                members.append((file_path, archive_path_prefix + os.sep + os.path.relpath(file_path, folder)))
+        return members
+
+
+    @staticmethod
+    def _compute_fingerprint(members):
+        """
+        :returns: a hash changing whenever a file in the list is added, removed, resized or modified
+        """
+        fingerprint = hashlib.md5()
+        for file_path, archive_name in members:
+            file_stat = os.stat(file_path)
+            fingerprint.update(("%s:%d:%f;" % (archive_name, file_stat.st_size, file_stat.st_mtime)).encode('utf-8'))
+        return fingerprint.hexdigest()
+
+
+    @staticmethod
+    def _prepare_members(members):
+        """
+        Compress files in EXPORT_WORKERS threads, while keeping their order.
+        :returns: generator over PreparedZipMember instances, at most 2 * EXPORT_WORKERS prepared ahead.
+        """
+        workers = max(TvbProfile.current.EXPORT_WORKERS, 1)
+        pool = ThreadPool(workers)
+        try:
+            pending = deque()
+            for member in members:
+                pending.append(pool.apply_async(_prepare_archive_member, member))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
 
 
     @staticmethod
@@ -385,3 +544,19 @@ class ExportManager:
 
         burst_info = self._build_burst_export_dict(burst)
         return json.dumps(burst_info)
+
+
+
+def _prepare_archive_member(file_path, arcname):
+    """
+    Compute the archive entry for one file (called in export threads).
+    H5 files already holding compressed datasets are not deflated again.
+    """
+    compress = True
+    if file_path.endswith(FilesHelper.TVB_STORAGE_FILE_EXTENSION):
+        try:
+            compressed_fraction = HDF5StorageManager(*os.path.split(file_path)).get_compressed_fraction()
+            compress = compressed_fraction < H5_COMPRESSED_FRACTION
+        except Exception:
+            LOG.warning("Could not inspect %s, it will be compressed" % file_path)
+    return PreparedZipMember(file_path, arcname, compress)
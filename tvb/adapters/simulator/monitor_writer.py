@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Store the samples produced by a Simulator monitor into its TimeSeries, appending many samples at once,
+and optionally from a separate thread, so that the integration loop does not wait for the disk.
+"""
+
+import threading
+import Queue as queue
+import numpy
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+
+LOGGER = get_logger(__name__)
+
+
+
+class MonitorWriter(object):
+    """
+    Buffer monitor samples, and write them into the TimeSeries with one HDF5 append for each `batch_size` samples.
+    Everything happens in the calling thread.
+    """
+
+
+    def __init__(self, time_series, batch_size=None):
+        self.time_series = time_series
+        if batch_size is None:
+            batch_size = TvbProfile.current.MONITOR_WRITER_BATCH_SIZE
+        self.batch_size = max(batch_size, 1)
+        self.samples_count = 0
+        self._times = []
+        self._data = []
+
+
+    def write(self, time, data):
+        self.samples_count += 1
+        self._buffer(time, data)
+
+
+    def _buffer(self, time, data):
+        self._times.append(time)
+        self._data.append(data)
+        if len(self._times) >= self.batch_size:
+            self._write_pending()
+
+
+    def _write_pending(self):
+        if not self._times:
+            return
+        self.time_series.write_time_slice(self._times)
+        self.time_series.write_data_slice(numpy.array(self._data))
+        self._times = []
+        self._data = []
+
+
+    def flush(self):
+        """
+        Write everything received so far into the TimeSeries file (e.g. before a checkpoint).
+        """
+        self._write_pending()
+
+
+    def close(self):
+        """
+        Write everything still pending. After this, the TimeSeries file can be closed.
+        """
+        self._write_pending()
+
+
+    def discard(self):
+        """
+        Drop pending samples (e.g. when the simulation failed).
+        """
+        self._times = []
+        self._data = []
+
+
+
+class AsyncMonitorWriter(MonitorWriter):
+    """
+    Samples are passed through a bounded queue to a writer thread. When the disk falls behind and the queue gets
+    full, `write` blocks the simulation until the writer thread catches up.
+    """
+    _END = object()
+    _FLUSH = object()
+
+
+    def __init__(self, time_series, batch_size=None, queue_size=None):
+        super(AsyncMonitorWriter, self).__init__(time_series, batch_size)
+        if queue_size is None:
+            queue_size = TvbProfile.current.MONITOR_WRITER_QUEUE_SIZE
+        self._queue = queue.Queue(max(queue_size, 1))
+        self._error = None
+        self._discarded = False
+        self._thread = threading.Thread(target=self._write_from_queue, name="MonitorWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def write(self, time, data):
+        self._raise_error()
+        self.samples_count += 1
+        self._queue.put((time, data))
+
+
+    def _write_from_queue(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is self._END:
+                    self._write_pending()
+                    return
+                if entry is self._FLUSH:
+                    self._write_pending()
+                else:
+                    self._buffer(*entry)
+            finally:
+                self._queue.task_done()
+
+
+    def _write_pending(self):
+        if self._error is not None or self._discarded:
+            self._times = []
+            self._data = []
+            return
+        try:
+            super(AsyncMonitorWriter, self)._write_pending()
+        except Exception as excep:
+            # Keep consuming the queue, for the simulation not to block; the error is raised on next write/close
+            LOGGER.exception("Could not write monitor data into %s" % self.time_series)
+            self._error = excep
+            self._times = []
+            self._data = []
+
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+
+    def flush(self):
+        """
+        Block until the writer thread stored everything queued so far.
+        """
+        self._queue.put(self._FLUSH)
+        self._queue.join()
+        self._raise_error()
+
+
+    def close(self):
+        """
+        Wait for all queued samples to be written, and raise any error the writer thread met.
+        """
+        self._queue.put(self._END)
+        self._thread.join()
+        self._raise_error()
+
+
+    def discard(self):
+        self._discarded = True
+        self._queue.put(self._END)
+        self._thread.join()
+
+
+
+def create_monitor_writer(time_series):
+    """
+    :returns: a writer for the given TimeSeries, in a separate thread when MONITOR_WRITER_QUEUE_SIZE is positive
+    """
+    if TvbProfile.current.MONITOR_WRITER_QUEUE_SIZE > 0:
+        return AsyncMonitorWriter(time_series)
+    return MonitorWriter(time_series)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Checkpoints of a running simulation, for an interrupted operation (e.g. a killed cluster job) to be resumed
+from its latest checkpoint, instead of computing everything again.
+"""
+
+import os
+import json
+import time
+import numpy
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.datatypes.simulation_state import SimulationState
+
+LOGGER = get_logger(__name__)
+
+
+
+class SimulationCheckpoint(object):
+    """
+    Latest consistent state of a simulation, kept in the operation folder, next to the partially written
+    TimeSeries: a SimulationState H5 file (history, current state and monitors stock) and a JSON file with
+    the current step, the random state of the noise and how many samples of each TimeSeries are valid.
+    """
+    FILE_NAME = "simulation_checkpoint.json"
+
+
+    def __init__(self, storage_path):
+        self.storage_path = storage_path
+        self.file_path = os.path.join(storage_path, self.FILE_NAME)
+        self.interval_steps = TvbProfile.current.SIMULATION_CHECKPOINT_STEPS
+        self.interval_seconds = TvbProfile.current.SIMULATION_CHECKPOINT_SECONDS
+        self.start_step = None
+        self.current_step = None
+        self.random_state = None
+        self.state_gid = None
+        ## {monitor name: [TimeSeries gid, number of samples]}
+        self.time_series = dict()
+        self._last_save = time.time()
+
+
+    @classmethod
+    def load(cls, storage_path):
+        """
+        :returns: the checkpoint stored in the given operation folder, or None when there is none
+        """
+        checkpoint = cls(storage_path)
+        if not os.path.exists(checkpoint.file_path):
+            return None
+        with open(checkpoint.file_path) as checkpoint_file:
+            content = json.load(checkpoint_file)
+        checkpoint.start_step = content['start_step']
+        checkpoint.current_step = content['current_step']
+        checkpoint.state_gid = content['state_gid']
+        checkpoint.time_series = content['time_series']
+        if content['random_state'] is not None:
+            name, keys, position, has_gauss, cached_gaussian = content['random_state']
+            checkpoint.random_state = (str(name), numpy.array(keys, dtype=numpy.uint32),
+                                       position, has_gauss, cached_gaussian)
+        return checkpoint
+
+
+    def is_due(self):
+        return time.time() - self._last_save >= self.interval_seconds
+
+
+    def save(self, simulator, start_step, result_datatypes):
+        """
+        Store the Simulator state. All monitor samples up to this step should be already written into the
+        TimeSeries files in `result_datatypes` {monitor name: TimeSeries}.
+        """
+        state = SimulationState(storage_path=self.storage_path)
+        state.populate_from(simulator)
+        state.close_file()
+
+        time_series = dict()
+        for monitor_name, ts in result_datatypes.items():
+            ts.close_file()
+            shape = ts.get_data_shape('data')
+            time_series[monitor_name] = [ts.gid, shape[0] if shape else 0]
+
+        random_state = None
+        if hasattr(simulator.integrator, 'noise'):
+            name, keys, position, has_gauss, cached_gaussian = simulator.integrator.noise.random_stream.get_state()
+            random_state = [name, keys.tolist(), position, has_gauss, cached_gaussian]
+
+        content = {'start_step': int(start_step), 'current_step': int(simulator.current_step),
+                   'state_gid': state.gid, 'time_series': time_series, 'random_state': random_state}
+        temporary_path = self.file_path + ".tmp"
+        with open(temporary_path, 'w') as checkpoint_file:
+            json.dump(content, checkpoint_file)
+        ## Replace the previous checkpoint only once the new one is complete
+        os.rename(temporary_path, self.file_path)
+
+        previous_state_gid = self.state_gid
+        self.start_step = start_step
+        self.current_step = content['current_step']
+        self.state_gid = state.gid
+        self.time_series = time_series
+        self._last_save = time.time()
+        if previous_state_gid is not None:
+            self._remove_file(SimulationState, previous_state_gid)
+        LOGGER.debug("Simulation checkpoint saved at step %d in %s" % (self.current_step, self.storage_path))
+
+
+    def fill_into(self, simulator):
+        """
+        Bring the Simulator to the step of this checkpoint.
+        """
+        state = SimulationState(storage_path=self.storage_path, gid=self.state_gid)
+        state.fill_into(simulator)
+        simulator.current_step = self.current_step
+
+
+    def check_results(self, result_datatypes):
+        """
+        Read back the last valid sample of each TimeSeries written before the checkpoint. A killed process might
+        leave its TimeSeries files (kept open for appending) unreadable, in which case an exception is raised here,
+        before anything got copied.
+        """
+        for monitor_name, time_series in result_datatypes.items():
+            previous_gid, samples = self.time_series[monitor_name]
+            previous = time_series.__class__(storage_path=self.storage_path, gid=previous_gid)
+            if samples > 0:
+                last_sample = slice(samples - 1, samples)
+                previous.get_data('time', last_sample)
+                previous.get_data('data', last_sample)
+            previous.close_file()
+
+
+    def discard(self, result_datatypes):
+        """
+        Drop an unusable checkpoint, together with the TimeSeries files it refers to.
+        """
+        for monitor_name, (gid, _) in self.time_series.items():
+            if monitor_name in result_datatypes:
+                self._remove_file(result_datatypes[monitor_name].__class__, gid)
+        self.time_series = dict()
+        self.remove()
+
+
+    def copy_results(self, monitor_name, time_series, block_size=1024):
+        """
+        Copy into `time_series` the valid samples, computed before the checkpoint, for the given monitor.
+        :returns: the gid of the TimeSeries the samples were copied from
+        """
+        previous_gid, samples = self.time_series[monitor_name]
+        previous = time_series.__class__(storage_path=self.storage_path, gid=previous_gid)
+        for start in range(0, samples, block_size):
+            block = slice(start, min(start + block_size, samples))
+            time_series.write_time_slice(previous.get_data('time', block))
+            time_series.write_data_slice(previous.get_data('data', block))
+        return previous_gid
+
+
+    def remove_time_series(self, time_series_class, gid):
+        """
+        Drop a TimeSeries file left by the interrupted run, after its samples were copied and a new checkpoint saved.
+        """
+        self._remove_file(time_series_class, gid)
+
+
+    def remove(self):
+        """
+        Drop the checkpoint files, once the simulation finished.
+        """
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        if self.state_gid is not None:
+            self._remove_file(SimulationState, self.state_gid)
+            self.state_gid = None
+
+
+    def _remove_file(self, datatype_class, gid):
+        file_path = datatype_class(storage_path=self.storage_path, gid=gid).get_storage_file_path()
+        FILE_POOL.invalidate(file_path)
+        if os.path.exists(file_path):
+            os.remove(file_path)
@@ -39,7 +39,11 @@ Few supplementary steps are done here:
 .. moduleauthor:: Stuart A. Knock <Stuart@tvb.invalid>
 
 """
+import json
+import math
 import numpy
+import scipy.linalg
+from tvb.basic.profile import TvbProfile
 from tvb.simulator.simulator import Simulator
 from tvb.simulator.models import Model
 from tvb.simulator.monitors import Monitor
@@ -48,8 +52,11 @@ from tvb.simulator.coupling import Coupling
 from tvb.core.entities.storage import dao
 from tvb.core.adapters.abcadapter import ABCAsynchronous
 from tvb.core.adapters.exceptions import LaunchException
+from tvb.adapters.simulator.monitor_writer import create_monitor_writer
+from tvb.adapters.simulator.simulation_checkpoint import SimulationCheckpoint
 from tvb.basic.traits.parameters_factory import get_traited_subclasses
 from tvb.datatypes.equations import HRFKernelEquation
+from tvb.datatypes.connectivity import Connectivity
 from tvb.datatypes.cortex import Cortex
 from tvb.datatypes.simulation_state import SimulationState
 from tvb.datatypes import noise_framework
@@ -58,6 +65,17 @@ import tvb.datatypes.region_mapping as region_mapping
 
 
 
+def _equal_inputs(first, second):
+    """ Compare adapter inputs, which could be nested dictionaries with numpy arrays inside """
+    if isinstance(first, dict) and isinstance(second, dict):
+        return (sorted(first.keys()) == sorted(second.keys())
+                and all(_equal_inputs(first[key], second[key]) for key in first))
+    if isinstance(first, numpy.ndarray) or isinstance(second, numpy.ndarray):
+        return numpy.array_equal(first, second)
+    return first == second
+
+
+
 class SimulatorAdapter(ABCAsynchronous):
     """
     Interface between the Simulator and the Framework.
@@ -75,6 +93,11 @@ class SimulatorAdapter(ABCAsynchronous):
     # We exclude from this for example EEG, MEG or Bold which return 
     HAVE_STATE_VARIABLES = ["GlobalAverage", "SpatialAverage", "Raw", "SubSample", "TemporalAverage"]
 
+    # Monitors computing each node independently, thus usable when simulating a PSE batch with a tiled Connectivity
+    BATCH_MONITORS = ["Raw", "SubSample", "TemporalAverage", "Bold"]
+    # Inputs which need to be empty for a simulation to be part of a PSE batch
+    BATCH_EMPTY_INPUTS = ["surface", "stimulus", "initial_conditions", "simulation_state"]
+
 
     def __init__(self):
         super(SimulatorAdapter, self).__init__()
@@ -222,6 +245,100 @@ class SimulatorAdapter(ABCAsynchronous):
         return max(int(estimation), 1)
 
 
+    def get_input_dimensions(self, **kwargs):
+        """
+        Simulation costs grow with the number of nodes (surface vertices or regions) and of integration steps.
+        """
+        surface = kwargs.get('surface')
+        if surface is not None and surface != '':
+            number_of_nodes = surface.number_of_vertices
+        else:
+            number_of_nodes = kwargs['connectivity'].number_of_regions
+        number_of_steps = float(kwargs['simulation_length']) / float(kwargs['integrator_parameters']['dt'])
+        return {'nodes': number_of_nodes, 'steps': number_of_steps}
+
+
+    def get_batch_key(self, ranged_parameters, **kwargs):
+        """
+        Region simulations, differing only through ranged Model parameters, can be computed in a single simulator
+        instance, by placing each of them on a separate copy of the Connectivity (see launch_batch).
+        """
+        for input_name in self.BATCH_EMPTY_INPUTS:
+            if kwargs.get(input_name) not in (None, '', 'None'):
+                return None
+        monitors = kwargs.get('monitors')
+        monitors = [monitors] if isinstance(monitors, basestring) else monitors or []
+        if not monitors or any(monitor not in self.BATCH_MONITORS for monitor in monitors):
+            return None
+
+        model_prefix = "model_parameters_option_%s_" % kwargs.get('model')
+        for param_name in ranged_parameters:
+            if not param_name.startswith(model_prefix) or '_parameters_' in param_name[len(model_prefix):]:
+                # Only scalar parameters of the Model (not the noise, nor a sub-selection) are batched
+                return None
+
+        common_params = dict((key, value) for key, value in kwargs.items() if key not in ranged_parameters)
+        return json.dumps(common_params, sort_keys=True)
+
+
+    def launch_batch(self, kwargs_list):
+        """
+        Simulate a batch of parameter points in a single Simulator, having one copy of the Connectivity for each
+        point, and Model parameters spatialized over these copies.
+
+        :returns: for each point, a dictionary {monitor_name: (list of times, list of data slices)}
+        """
+        kwargs = dict(kwargs_list[0])
+        nr_of_points = len(kwargs_list)
+        nr_of_nodes = kwargs['connectivity'].number_of_regions
+
+        kwargs['model_parameters'] = dict(kwargs['model_parameters'])
+        for param_name in kwargs['model_parameters']:
+            point_values = [point_kwargs['model_parameters'][param_name] for point_kwargs in kwargs_list]
+            if all(_equal_inputs(point_value, point_values[0]) for point_value in point_values[1:]):
+                continue
+            if not all(isinstance(point_value, (numpy.ndarray, float, int)) for point_value in point_values):
+                raise LaunchException("Model parameter %s can not be varied inside a batch" % param_name)
+            kwargs['model_parameters'][param_name] = numpy.concatenate(
+                [numpy.ones(nr_of_nodes) * numpy.ravel(point_value) for point_value in point_values])
+        kwargs['connectivity'] = self._tile_connectivity(kwargs['connectivity'], nr_of_points)
+
+        batch_adapter = SimulatorAdapter()
+        batch_adapter.configure(**kwargs)
+        simulator = batch_adapter.algorithm
+        simulator.configure(full_configure=False)
+
+        monitors = kwargs['monitors']
+        results = [dict((monitor, ([], [])) for monitor in monitors) for _ in range(nr_of_points)]
+        self.log.debug("%s: Starting batch simulation for %d points..." % (str(self), nr_of_points))
+        for result in simulator(simulation_length=kwargs['simulation_length']):
+            for j, monitor in enumerate(monitors):
+                if result[j] is None:
+                    continue
+                time, data = result[j]
+                for point, point_results in enumerate(results):
+                    point_results[monitor][0].append(time)
+                    point_results[monitor][1].append(data[:, point * nr_of_nodes:(point + 1) * nr_of_nodes].copy())
+        return results
+
+
+    @staticmethod
+    def _tile_connectivity(connectivity, nr_of_copies):
+        """
+        :returns: a transient Connectivity, with `nr_of_copies` disconnected copies of the given one
+        """
+        tiled = Connectivity(use_storage=False)
+        tiled.weights = scipy.linalg.block_diag(*([connectivity.weights] * nr_of_copies))
+        tiled.tract_lengths = scipy.linalg.block_diag(*([connectivity.tract_lengths] * nr_of_copies))
+        tiled.centres = numpy.tile(connectivity.centres, (nr_of_copies, 1))
+        tiled.region_labels = numpy.tile(connectivity.region_labels, nr_of_copies)
+        if connectivity.hemispheres is not None and connectivity.hemispheres.size:
+            tiled.hemispheres = numpy.tile(connectivity.hemispheres, nr_of_copies)
+        tiled.speed = connectivity.speed
+        tiled.configure()
+        return tiled
+
+
     def _try_find_mapping(self, mapping_class, connectivity_gid):
         """
         Try to find a DataType instance of class "mapping_class", linked to the given Connectivity.
@@ -262,6 +379,14 @@ class SimulatorAdapter(ABCAsynchronous):
         self.algorithm.configure(full_configure=False)
         if simulation_state is not None:
             simulation_state.fill_into(self.algorithm)
+        start_step = self.algorithm.current_step
+
+        checkpoint = None
+        if self._use_checkpoints(stimulus):
+            checkpoint = SimulationCheckpoint.load(self.storage_path)
+            if checkpoint is None:
+                checkpoint = SimulationCheckpoint(self.storage_path)
+        resumed = checkpoint is not None and checkpoint.current_step is not None
 
         region_map = self._try_find_mapping(region_mapping.RegionMapping, connectivity.gid)
         region_volume_map = self._try_find_mapping(region_mapping.RegionVolumeMapping, connectivity.gid)
@@ -285,18 +410,59 @@ class SimulatorAdapter(ABCAsynchronous):
             ts.start_time = start_time
             result_datatypes[m_name] = ts
 
+        if resumed:
+            try:
+                checkpoint.check_results(result_datatypes)
+                checkpoint.fill_into(self.algorithm)
+                self.log.info("%s: Resuming simulation from step %d" % (str(self), checkpoint.current_step))
+                start_step = checkpoint.start_step
+            except Exception as excep:
+                self.log.warning("%s: Checkpoint can not be read, simulating again from the start" % str(self))
+                self.log.exception(excep)
+                checkpoint.discard(result_datatypes)
+                checkpoint = SimulationCheckpoint(self.storage_path)
+                resumed = False
+                self.algorithm.configure(full_configure=False)
+                if simulation_state is not None:
+                    simulation_state.fill_into(self.algorithm)
+        self.resumed_from_checkpoint = resumed
+
         #### Create Simulator State entity and persist it in DB. H5 file will be empty now.
         if not self._is_group_launch():
-            simulation_state = SimulationState(storage_path=self.storage_path)
-            self._capture_operation_results([simulation_state])
+            simulation_state = None
+            if resumed:
+                existing = dao.get_generic_entity(SimulationState, self.operation_id, "fk_from_operation")
+                simulation_state = existing[0] if existing else None
+            if simulation_state is None:
+                simulation_state = SimulationState(storage_path=self.storage_path)
+                self._capture_operation_results([simulation_state])
+
+        if resumed:
+            ### Continue the TimeSeries with the samples computed before the checkpoint
+            previous_gids = dict((m_name, checkpoint.copy_results(m_name, ts))
+                                 for m_name, ts in result_datatypes.items())
+            checkpoint.save(self.algorithm, start_step, result_datatypes)
+            for m_name, ts in result_datatypes.items():
+                checkpoint.remove_time_series(ts.__class__, previous_gids[m_name])
 
         ### Run simulation
-        self.log.debug("%s: Starting simulation..." % str(self))
-        for result in self.algorithm(simulation_length=simulation_length):
-            for j, monitor in enumerate(monitors):
-                if result[j] is not None:
-                    result_datatypes[monitor].write_time_slice([result[j][0]])
-                    result_datatypes[monitor].write_data_slice([result[j][1]])
+        writers = dict((monitor, create_monitor_writer(result_datatypes[monitor])) for monitor in monitors)
+        try:
+            if self.batch_result is not None:
+                self.log.debug("%s: Storing results already computed in a batch..." % str(self))
+                for monitor in monitors:
+                    times, data = self.batch_result[monitor]
+                    for time_slice, data_slice in zip(times, data):
+                        writers[monitor].write(time_slice, data_slice)
+            else:
+                self.log.debug("%s: Starting simulation..." % str(self))
+                self._run_simulation(simulation_length, monitors, writers, checkpoint, start_step, result_datatypes)
+        except Exception:
+            for writer in writers.values():
+                writer.discard()
+            raise
+        for writer in writers.values():
+            writer.close()
 
         self.log.debug("%s: Completed simulation, starting to store simulation state " % str(self))
         ### Populate H5 file for simulator state. This step could also be done while running sim, in background.
@@ -309,10 +475,58 @@ class SimulatorAdapter(ABCAsynchronous):
         for result in result_datatypes.values():
             result.close_file()
             final_results.append(result)
+        if checkpoint is not None:
+            checkpoint.remove()
         self.log.info("%s: Adapter simulation finished!!" % str(self))
         return final_results
 
 
+    def _use_checkpoints(self, stimulus):
+        """
+        Simulations are checkpointed by running them in segments; stimuli are computed relative to the start
+        of each Simulator call, so they can not be split.
+        """
+        if TvbProfile.current.SIMULATION_CHECKPOINT_STEPS <= 0 or self.batch_result is not None:
+            return False
+        if stimulus is not None:
+            self.log.info("%s: Simulations with stimulus are not checkpointed" % str(self))
+            return False
+        return True
+
+
+    def _run_simulation(self, simulation_length, monitors, writers, checkpoint, start_step, result_datatypes):
+        """
+        Run the Simulator, passing monitor results to their writers.
+        With checkpoints, the simulation is run in segments of `checkpoint.interval_steps`, saving the state after each.
+        """
+        if checkpoint is None:
+            for result in self.algorithm(simulation_length=simulation_length):
+                self._write_monitor_results(result, monitors, writers)
+            return
+
+        integrator_dt = self.algorithm.integrator.dt
+        end_step = start_step + int(math.ceil(simulation_length / integrator_dt))
+        random_state = checkpoint.random_state
+        while self.algorithm.current_step < end_step:
+            segment_steps = min(checkpoint.interval_steps, end_step - self.algorithm.current_step)
+            # The Simulator rounds the length up to a number of steps; half a step less keeps the count exact
+            for result in self.algorithm(simulation_length=(segment_steps - 0.5) * integrator_dt,
+                                         random_state=random_state):
+                self._write_monitor_results(result, monitors, writers)
+            random_state = None
+            if self.algorithm.current_step < end_step and checkpoint.is_due():
+                for writer in writers.values():
+                    writer.flush()
+                checkpoint.save(self.algorithm, start_step, result_datatypes)
+
+
+    @staticmethod
+    def _write_monitor_results(result, monitors, writers):
+        for j, monitor in enumerate(monitors):
+            if result[j] is not None:
+                writers[monitor].write(result[j][0], result[j][1])
+
+
     def _validate_model_parameters(self, model_instance, connectivity, surface):
         """
         Checks if the size of the model parameters is set correctly.
@@ -41,6 +41,30 @@ from tvb.basic.config.settings import DBSettings
 from tvb.basic.config.profile_settings import BaseSettingsProfile
 
 
+KEY_HDF5_FILE_POOL_SIZE = 'HDF5_FILE_POOL_SIZE'
+KEY_HDF5_STORAGE_PROFILE = 'HDF5_STORAGE_PROFILE'
+KEY_HDF5_STORAGE_PROFILE_BY_TYPE = 'HDF5_STORAGE_PROFILE_BY_TYPE'
+KEY_OPERATION_WORKERS = 'OPERATION_WORKERS'
+KEY_OPERATION_WORKER_MAX_OPERATIONS = 'OPERATION_WORKER_MAX_OPERATIONS'
+KEY_OPERATION_WORKER_MAX_MEMORY = 'OPERATION_WORKER_MAX_MEMORY'
+KEY_PSE_BATCH_SIZE = 'PSE_BATCH_SIZE'
+KEY_MONITOR_WRITER_BATCH_SIZE = 'MONITOR_WRITER_BATCH_SIZE'
+KEY_MONITOR_WRITER_QUEUE_SIZE = 'MONITOR_WRITER_QUEUE_SIZE'
+KEY_SIMULATION_CHECKPOINT_STEPS = 'SIMULATION_CHECKPOINT_STEPS'
+KEY_SIMULATION_CHECKPOINT_SECONDS = 'SIMULATION_CHECKPOINT_SECONDS'
+KEY_ESTIMATOR_MIN_SAMPLES = 'ESTIMATOR_MIN_SAMPLES'
+KEY_ESTIMATOR_HISTORY_SIZE = 'ESTIMATOR_HISTORY_SIZE'
+KEY_ESTIMATOR_SAFETY_FACTOR = 'ESTIMATOR_SAFETY_FACTOR'
+KEY_WEB_UNIT_OF_WORK = 'WEB_UNIT_OF_WORK'
+KEY_DATATYPE_ATTRIBUTE_CACHE_SIZE = 'DATATYPE_ATTRIBUTE_CACHE_SIZE'
+KEY_FILE_UPGRADE_WORKERS = 'FILE_UPGRADE_WORKERS'
+KEY_EXPORT_WORKERS = 'EXPORT_WORKERS'
+KEY_IMPORT_WORKERS = 'IMPORT_WORKERS'
+KEY_MEMORY_MAPPED_READS = 'MEMORY_MAPPED_READS'
+KEY_BCT_MATLAB_ADAPTERS = 'BCT_MATLAB_ADAPTERS'
+KEY_ANALYZER_WORKERS = 'ANALYZER_WORKERS'
+
+
 class WebSettingsProfile(BaseSettingsProfile):
     """
     Setting for working with storage and web interface
@@ -48,6 +72,66 @@ class WebSettingsProfile(BaseSettingsProfile):
     LOGGER_CONFIG_FILE_NAME = "logger_config.conf"
 
 
+    def __init__(self, web_enabled=True):
+        super(WebSettingsProfile, self).__init__(web_enabled)
+
+        # Max number of idle H5 files kept open by each TVB process. Zero disables the pool of H5 file handles.
+        self.HDF5_FILE_POOL_SIZE = self.manager.get_attribute(KEY_HDF5_FILE_POOL_SIZE, 32, int)
+        # Name of the chunking/compression profile for new H5 datasets (see hdf5_storage_profiles.STORAGE_PROFILES)
+        self.HDF5_STORAGE_PROFILE = self.manager.get_attribute(KEY_HDF5_STORAGE_PROFILE, 'default', str)
+        # Per DataType class overwrites of the above, e.g. "TimeSeries:time_window, CrossCorrelation:compressed"
+        self.HDF5_STORAGE_PROFILE_BY_TYPE = self.manager.get_attribute(KEY_HDF5_STORAGE_PROFILE_BY_TYPE, '', str)
+
+        # When True, async operations are passed to long-lived worker processes, instead of a new process each.
+        self.OPERATION_WORKERS = self.manager.get_attribute(KEY_OPERATION_WORKERS, False, eval)
+        # A worker process gets replaced after this many operations, or when using more memory (in MB) than below
+        self.OPERATION_WORKER_MAX_OPERATIONS = self.manager.get_attribute(KEY_OPERATION_WORKER_MAX_OPERATIONS,
+                                                                          100, int)
+        self.OPERATION_WORKER_MAX_MEMORY = self.manager.get_attribute(KEY_OPERATION_WORKER_MAX_MEMORY, 2048, int)
+
+        # Max number of compatible PSE points computed together, in a single vectorized simulation. 1 disables it.
+        # Memory grows with the square of (batch size x connectivity regions), and all batch results are kept in RAM.
+        self.PSE_BATCH_SIZE = self.manager.get_attribute(KEY_PSE_BATCH_SIZE, 1, int)
+
+        # Number of monitor samples written into the result TimeSeries with a single H5 append
+        self.MONITOR_WRITER_BATCH_SIZE = self.manager.get_attribute(KEY_MONITOR_WRITER_BATCH_SIZE, 64, int)
+        # Max monitor samples queued for the writer thread, before the simulation blocks. Zero writes without a thread
+        self.MONITOR_WRITER_QUEUE_SIZE = self.manager.get_attribute(KEY_MONITOR_WRITER_QUEUE_SIZE, 256, int)
+
+        # Simulations save a checkpoint every this many integration steps, for an interrupted operation to be resumed.
+        # Zero disables checkpoints. With the seconds below, checkpoints are skipped until that much time passed.
+        self.SIMULATION_CHECKPOINT_STEPS = self.manager.get_attribute(KEY_SIMULATION_CHECKPOINT_STEPS, 0, int)
+        self.SIMULATION_CHECKPOINT_SECONDS = self.manager.get_attribute(KEY_SIMULATION_CHECKPOINT_SECONDS, 0, int)
+
+        # Finished operations of an algorithm needed before their recorded resources replace the adapter estimates.
+        # Zero disables estimating from history. Only the latest HISTORY_SIZE records of an algorithm are fitted.
+        self.ESTIMATOR_MIN_SAMPLES = self.manager.get_attribute(KEY_ESTIMATOR_MIN_SAMPLES, 5, int)
+        self.ESTIMATOR_HISTORY_SIZE = self.manager.get_attribute(KEY_ESTIMATOR_HISTORY_SIZE, 200, int)
+        # Multiplier applied over the fitted time, memory and disk, as head-room for the cluster scheduler
+        self.ESTIMATOR_SAFETY_FACTOR = self.manager.get_attribute(KEY_ESTIMATOR_SAFETY_FACTOR, 1.5, float)
+
+        # Share one DB session between all DAO calls of a web request (not only for the pages which ask for it).
+        # Entities loaded in a request stay attached to its session, so keep it off unless all controllers allow it
+        self.WEB_UNIT_OF_WORK = self.manager.get_attribute(KEY_WEB_UNIT_OF_WORK, False, eval)
+        # Maximum size (in MB) of DataType attributes kept in memory for the visualizers. Zero disables the cache
+        self.DATATYPE_ATTRIBUTE_CACHE_SIZE = self.manager.get_attribute(KEY_DATATYPE_ATTRIBUTE_CACHE_SIZE, 256, int)
+
+        # Number of processes upgrading H5 files after a data version change. Up to 1, files are upgraded in-process
+        self.FILE_UPGRADE_WORKERS = self.manager.get_attribute(KEY_FILE_UPGRADE_WORKERS, 0, int)
+        # Number of threads compressing files, when exporting a project
+        self.EXPORT_WORKERS = self.manager.get_attribute(KEY_EXPORT_WORKERS, 4, int)
+        # Number of processes reading XML and H5 files, when importing a project. Up to 1, it is done in-process
+        self.IMPORT_WORKERS = self.manager.get_attribute(KEY_IMPORT_WORKERS, 0, int)
+        # Load array attributes stored contiguously in H5 files (e.g. surface vertices) as read-only memory maps,
+        # shared between processes. Code modifying such arrays in place needs to copy them first
+        self.MEMORY_MAPPED_READS = self.manager.get_attribute(KEY_MEMORY_MAPPED_READS, False, eval)
+        # BCT adapters (class names, comma separated) to run in Matlab/Octave, even when implemented with NumPy
+        self.BCT_MATLAB_ADAPTERS = self.manager.get_attribute(KEY_BCT_MATLAB_ADAPTERS, '', str)
+        # Number of processes computing independent blocks of an analyzer (e.g. FFT of groups of nodes), limited by
+        # the available cores and memory. Up to 1, blocks are computed in-process
+        self.ANALYZER_WORKERS = self.manager.get_attribute(KEY_ANALYZER_WORKERS, 0, int)
+
+
     def initialize_profile(self, change_logger_in_dev=True):
         """
         Specific initialization when functioning with storage
@@ -47,6 +47,7 @@ from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 import tvb.basic.traits.traited_interface as interface
 from tvb.core.adapters import input_tree
+from tvb.core.adapters import execution_estimator
 from tvb.core.adapters.input_tree import InputTreeManager
 from tvb.core.entities.load import load_entity_by_gid
 from tvb.core.utils import date2string, LESS_COMPLEX_TIME_FORMAT
@@ -167,6 +168,10 @@ class ABCAdapter(object):
         # Will be populate with current running operation's identifier
         self.operation_id = None
         self.user_id = None
+        # Will be populated with this operation's part of a launch_batch result, when executed in a batch
+        self.batch_result = None
+        # Set by launch, when the computation continued from a previous checkpoint instead of starting from scratch
+        self.resumed_from_checkpoint = False
         self.log = get_logger(self.__class__.__module__)
         self.tree_manager = InputTreeManager()
 
@@ -256,6 +261,63 @@ class ABCAdapter(object):
         return -1
 
 
+    def get_input_dimensions(self, **kwargs):
+        """
+        :returns: dictionary {name: positive number} with the input sizes which drive the time, memory and disk
+                  needed by this algorithm (e.g. number of nodes). The resources used by finished operations are
+                  recorded against these, for estimating the needs of new operations. Empty disables estimation.
+        """
+        return {}
+
+
+    def estimate_execution_time(self, **kwargs):
+        """
+        :returns: seconds expected for the operation, fitted over previous operations of this algorithm
+                  when enough were recorded, otherwise `get_execution_time_approximation`.
+        """
+        estimation = execution_estimator.estimate(self, kwargs, execution_estimator.EXECUTION_TIME)
+        if estimation is None:
+            return self.get_execution_time_approximation(**kwargs)
+        return estimation
+
+
+    def estimate_required_memory_size(self, **kwargs):
+        """
+        :returns: bytes expected to be needed, from previous operations or else `get_required_memory_size`.
+        """
+        estimation = execution_estimator.estimate(self, kwargs, execution_estimator.PEAK_MEMORY)
+        if estimation is None:
+            return self.get_required_memory_size(**kwargs)
+        return int(estimation)
+
+
+    def estimate_required_disk_size(self, **kwargs):
+        """
+        :returns: kilo-Bytes expected to be written, from previous operations or else `get_required_disk_size`.
+        """
+        estimation = execution_estimator.estimate(self, kwargs, execution_estimator.DISK_SIZE)
+        if estimation is None:
+            return self.get_required_disk_size(**kwargs)
+        return int(estimation)
+
+
+    def get_batch_key(self, ranged_parameters, **kwargs):
+        """
+        Operations from the same OperationGroup, having equal (not None) keys, are compatible to be computed
+        together in a single call of `launch_batch`.
+
+        Adapters returning keys also implement `launch_batch(kwargs_list)`, which gets a list of parameters
+        (after prepare_ui_inputs), one entry for each operation, and returns a list of the same length. Each
+        returned entry is given to the adapter instance of the corresponding operation, as `batch_result`,
+        before its usual launch (which should then only store the already computed results).
+
+        :param ranged_parameters: names of the parameters varied by the PSE
+        :param kwargs: operation parameters, as stored in DB (not yet passed through prepare_ui_inputs)
+        :returns: None when the operation should be executed alone
+        """
+        return None
+
+
     @abstractmethod
     def launch(self):
         """
@@ -294,7 +356,7 @@ class ABCAdapter(object):
         total_free_memory = psutil.virtual_memory().free + psutil.swap_memory().free
         total_existent_memory = psutil.virtual_memory().total + psutil.swap_memory().total
         memory_reference = (total_free_memory + total_existent_memory) / 2
-        adapter_required_memory = self.get_required_memory_size(**kwargs)
+        adapter_required_memory = self.estimate_required_memory_size(**kwargs)
 
         if adapter_required_memory > memory_reference:
             msg = "Machine does not have enough RAM memory for the operation (expected %.2g GB, but found %.2g GB)."
@@ -302,7 +364,7 @@ class ABCAdapter(object):
 
         # Compare the expected size of the operation results with the HDD space currently available for the user
         # TVB defines a quota per user.
-        required_disk_space = self.get_required_disk_size(**kwargs)
+        required_disk_space = self.estimate_required_disk_size(**kwargs)
         if available_disk_space < 0:
             msg = "You have exceeded you HDD space quota by %.2f MB Stopping execution."
             raise NoMemoryAvailableException(msg % (- available_disk_space / 2 ** 10))
@@ -315,13 +377,27 @@ class ABCAdapter(object):
         operation.estimated_disk_size = required_disk_space
         dao.store_entity(operation)
 
-        result = self.launch(**kwargs)
+        input_dimensions = execution_estimator.get_input_dimensions(self, kwargs)
+        memory_monitor = None
+        if input_dimensions:
+            memory_monitor = execution_estimator.PeakMemoryMonitor()
+            memory_monitor.start()
+        launch_start = datetime.now()
+        try:
+            result = self.launch(**kwargs)
+        finally:
+            peak_memory = memory_monitor.stop() if memory_monitor is not None else 0
+        execution_time = (datetime.now() - launch_start).total_seconds()
 
         if not isinstance(result, (list, tuple)):
             result = [result, ]
         self.__check_integrity(result)
 
-        return self._capture_operation_results(result, uid)
+        captured_results = self._capture_operation_results(result, uid)
+        if self.batch_result is None and not self.resumed_from_checkpoint:
+            ## Only a complete computation is representative for estimating the next ones
+            execution_estimator.record_resource_usage(self, operation, input_dimensions, execution_time, peak_memory)
+        return captured_results
 
 
     def _capture_operation_results(self, result, user_tag=None):
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Estimate the execution time, peak memory and disk size of an operation, from the resources recorded for
+previously finished operations of the same algorithm.
+
+Each algorithm is fitted with a power law over its input dimensions (e.g. nodes and integration steps),
+by least squares in log space. While not enough history exists, callers fall back to the adapter approximations.
+"""
+
+import json
+import threading
+import numpy
+import psutil
+from tvb.basic.profile import TvbProfile
+from tvb.basic.logger.builder import get_logger
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+
+
+LOGGER = get_logger(__name__)
+
+EXECUTION_TIME = "execution_time"
+PEAK_MEMORY = "peak_memory"
+DISK_SIZE = "disk_size"
+
+
+
+class PeakMemoryMonitor(object):
+    """
+    Sample, from a background thread while an operation runs, the resident memory of the current process and of
+    its child processes (e.g. parallel workers). The peak is recorded above the memory already used at `start`,
+    for it to depend on the operation only, and not on what the process did before.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_memory = 0
+        self._baseline = 0
+        self._process = psutil.Process()
+        self._stopped = threading.Event()
+        self._thread = None
+
+
+    def _current_memory(self):
+        memory = self._process.memory_info().rss
+        for child in self._process.children(recursive=True):
+            try:
+                memory += child.memory_info().rss
+            except psutil.Error:
+                ## The child finished meanwhile
+                pass
+        return memory
+
+
+    def _sample(self):
+        self.peak_memory = max(self.peak_memory, self._current_memory() - self._baseline)
+
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+
+    def start(self):
+        self._baseline = self._current_memory()
+        self._thread = threading.Thread(target=self._run, name="PeakMemoryMonitor")
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def stop(self):
+        """
+        :returns: the peak resident memory in bytes, observed since `start`, above the memory used at `start`.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._sample()
+        return self.peak_memory
+
+
+
+def get_input_dimensions(adapter_instance, kwargs):
+    """
+    :returns: the positive input dimensions declared by the adapter, or an empty dictionary when it has none.
+    """
+    try:
+        dimensions = adapter_instance.get_input_dimensions(**kwargs)
+    except Exception as excep:
+        LOGGER.debug("Could not compute input dimensions for %s: %s" % (adapter_instance.__class__.__name__, excep))
+        return {}
+    if not dimensions or any(value is None or value <= 0 for value in dimensions.values()):
+        return {}
+    return dict((name, float(value)) for name, value in dimensions.items())
+
+
+
+def record_resource_usage(adapter_instance, operation, input_dimensions, execution_time, peak_memory):
+    """
+    Store the resources used by a finished operation, for estimating the next operations of the same algorithm.
+    """
+    if not input_dimensions or adapter_instance.stored_adapter is None:
+        return
+    disk_size = dao.get_disk_size_for_operation(operation.id)
+    usage = model.OperationResourceUsage(adapter_instance.stored_adapter.id, input_dimensions,
+                                         execution_time, peak_memory, disk_size, operation.id)
+    try:
+        dao.store_entity(usage)
+    except Exception as excep:
+        LOGGER.warning("Could not record resources used by operation %s: %s" % (operation.id, excep))
+
+
+
+def estimate(adapter_instance, kwargs, measure):
+    """
+    :param measure: one of EXECUTION_TIME (seconds), PEAK_MEMORY (bytes) or DISK_SIZE (kB)
+    :returns: the estimated value for launching the adapter with `kwargs`,
+              or None when not enough operations with the same input dimensions were recorded yet.
+    """
+    min_samples = TvbProfile.current.ESTIMATOR_MIN_SAMPLES
+    if min_samples <= 0 or adapter_instance.stored_adapter is None:
+        return None
+    dimensions = get_input_dimensions(adapter_instance, kwargs)
+    if not dimensions:
+        return None
+
+    names = sorted(dimensions)
+    inputs, values = [], []
+    for usage in dao.get_resource_usage_for_algorithm(adapter_instance.stored_adapter.id,
+                                                      TvbProfile.current.ESTIMATOR_HISTORY_SIZE):
+        recorded = json.loads(usage.input_dimensions)
+        value = getattr(usage, measure)
+        if sorted(recorded) != names or value is None or value <= 0:
+            continue
+        inputs.append([recorded[name] for name in names])
+        values.append(value)
+
+    # Need more equations than unknowns (one exponent per dimension, plus the constant factor)
+    if len(values) < max(min_samples, len(names) + 2):
+        return None
+    return fit_power_law(inputs, values, [dimensions[name] for name in names])
+
+
+
+def fit_power_law(inputs, values, point):
+    """
+    Fit values = c * prod(inputs ** exponents) and evaluate it in `point`.
+    The result is raised with two standard deviations of the fit residuals, and multiplied with the safety factor.
+    """
+    log_inputs = numpy.log(numpy.array(inputs, dtype=float))
+    log_values = numpy.log(numpy.array(values, dtype=float))
+    design = numpy.hstack([numpy.ones((len(log_values), 1)), log_inputs])
+    coefficients = numpy.linalg.lstsq(design, log_values, rcond=-1)[0]
+    residuals = log_values - numpy.dot(design, coefficients)
+    log_estimate = coefficients[0] + numpy.dot(coefficients[1:], numpy.log(numpy.array(point, dtype=float)))
+    return float(numpy.exp(log_estimate + 2 * residuals.std())) * TvbProfile.current.ESTIMATOR_SAFETY_FACTOR
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Compute independent blocks of an analyzer (e.g. groups of nodes, or state variables) in a pool of processes.
+
+Blocks are read lazily in the calling process, while the previous ones are computed by the workers,
+and results come back in block order, to be written sequentially in the result H5 file.
+"""
+
+import multiprocessing
+from collections import deque
+import psutil
+from tvb.basic.profile import TvbProfile
+
+
+# Fraction of the free memory which the blocks kept in memory at once may use
+MEMORY_USAGE_LIMIT = 0.8
+
+
+
+def get_nr_of_workers(nr_of_items):
+    """
+    :param nr_of_items: max number of blocks the input can be split in
+    :returns: processes for computing blocks, from ANALYZER_WORKERS, limited by cores. Up to 1, work is in-process
+    """
+    return max(1, min(TvbProfile.current.ANALYZER_WORKERS, multiprocessing.cpu_count(), nr_of_items))
+
+
+def get_blocks_in_memory(nr_of_workers):
+    """
+    :returns: number of blocks kept in memory at once: one for each worker, and the next one being read
+    """
+    return nr_of_workers + 1 if nr_of_workers > 1 else 1
+
+
+def get_nr_of_blocks(required_memory, nr_of_items, nr_of_workers):
+    """
+    :param required_memory: bytes needed for computing all items at once
+    :returns: number of blocks, at least one for each worker, and more when the blocks in memory would not fit
+    """
+    free_memory = psutil.virtual_memory().free + psutil.swap_memory().free
+    in_memory = get_blocks_in_memory(nr_of_workers)
+    nr_of_blocks = min(nr_of_workers, nr_of_items)
+    while nr_of_blocks < nr_of_items and in_memory * required_memory / nr_of_blocks / free_memory > MEMORY_USAGE_LIMIT:
+        nr_of_blocks += 1
+    return nr_of_blocks
+
+
+def map_blocks(function, blocks, nr_of_workers):
+    """
+    Generator applying `function` on each element of `blocks`, with results in the same order.
+
+    :param function: module level function (to be sent to the worker processes), returning picklable results
+    :param blocks: iterable of arguments, consumed only when a worker is about to be free
+    """
+    if nr_of_workers <= 1:
+        for block in blocks:
+            yield function(block)
+        return
+
+    pool = multiprocessing.Pool(nr_of_workers)
+    try:
+        pending = deque()
+        for block in blocks:
+            pending.append(pool.apply_async(function, (block,)))
+            if len(pending) > nr_of_workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Process-wide cache for DataType attributes read by the web visualizers.
+
+Viewers request the same arrays (vertices, triangles, weights, ...) over and over, and every request used to
+load the entity from DB and read the H5 file again. Results are kept here, bounded in bytes, with the least
+recently used ones dropped first. An entry is only valid while the H5 files it was read from stay unchanged.
+"""
+
+import os
+import json
+import numpy
+import hashlib
+import threading
+from collections import OrderedDict
+from tvb.basic.logger.builder import get_logger
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.hdf5_file_pool import HDF5FilePool
+
+
+LOG = get_logger(__name__)
+
+MB = 1024 * 1024
+
+
+
+class CachedAttribute(object):
+    """
+    The value of one DataType attribute, together with the files it was read from.
+    """
+
+    def __init__(self, key, value, file_paths):
+        self.key = key
+        self.value = value
+        self.nbytes = value.nbytes if isinstance(value, numpy.ndarray) else 0
+        self.file_keys = dict((path, HDF5FilePool.compute_file_key(path)) for path in file_paths)
+
+
+    @property
+    def is_cacheable(self):
+        """
+        Only arrays read from existing files are kept; other results might depend on the DB state.
+        """
+        return (isinstance(self.value, numpy.ndarray) and len(self.file_keys) > 0
+                and None not in self.file_keys.values())
+
+
+    @property
+    def etag(self):
+        """
+        :returns: a strong HTTP entity tag, changing together with the files this value was read from.
+        """
+        fingerprint = repr((self.key, sorted(self.file_keys.items())))
+        return '"%s"' % hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+
+
+    @property
+    def last_modified(self):
+        """
+        :returns: the most recent modification time (seconds since epoch) of the files behind this value.
+        """
+        return max(file_key[3] for file_key in self.file_keys.values())
+
+
+    def is_still_valid(self):
+        for file_path, file_key in self.file_keys.items():
+            if HDF5FilePool.compute_file_key(file_path) != file_key:
+                return False
+        return True
+
+
+
+class DatatypeAttributeCache(object):
+    """
+    LRU cache of DataType attributes, keyed by (GID, attribute name, call arguments).
+
+    - Entries are dropped when the H5 files they were read from have been removed, replaced or modified.
+    - DataType removal and H5 file upgrades also invalidate the entries explicitly.
+    - Cached arrays are shared between callers, thus they are marked read-only.
+    """
+
+
+    def __init__(self, max_bytes=None):
+        """
+        :param max_bytes: upper bound for the total size of the cached arrays. When None, read it from the
+            current TvbProfile. A value smaller than 1 disables the cache.
+        """
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is None:
+            return TvbProfile.current.DATATYPE_ATTRIBUTE_CACHE_SIZE * MB
+        return self._max_bytes
+
+
+    @staticmethod
+    def compute_key(entity_gid, attribute_name, datatype_kwargs=None, kwargs=None):
+        """
+        :param datatype_kwargs: dictionary {argument name: GID} of entities passed to the attribute call
+        :param kwargs: other arguments passed to the attribute call, as received on the HTTP request
+        """
+        datatype_kwargs = json.dumps(datatype_kwargs or {}, sort_keys=True)
+        kwargs = json.dumps(kwargs or {}, sort_keys=True)
+        return entity_gid, attribute_name, datatype_kwargs, kwargs
+
+
+    def get(self, key):
+        """
+        :returns: the CachedAttribute stored for the given key, or None when missing or outdated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.is_still_valid():
+                self._discard(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            # Mark as most recently used
+            del self._entries[key]
+            self._entries[key] = entry
+            return entry
+
+
+    def put(self, key, value, file_paths):
+        """
+        Store a freshly read value, when it can be cached and it fits within the size limit.
+
+        :param file_paths: H5 files the value has been read from
+        :returns: the CachedAttribute wrapping the value (even when it was not stored)
+        """
+        entry = CachedAttribute(key, value, file_paths)
+        if not entry.is_cacheable or entry.nbytes > self.max_bytes:
+            return entry
+
+        value.setflags(write=False)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self.size_bytes += entry.nbytes
+            self._evict()
+        return entry
+
+
+    def invalidate(self, entity_gid):
+        """
+        Drop all entries of a DataType, or depending on it (e.g. when the DataType is removed).
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == entity_gid or entity_gid in key[2]:
+                    self._discard(key)
+
+
+    def invalidate_file(self, file_path):
+        """
+        Drop all entries read from a given H5 file (e.g. when the file is about to be upgraded).
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if file_path in entry.file_keys:
+                    self._discard(key)
+
+
+    def invalidate_folder(self, folder_path):
+        """
+        Drop all entries read from files under the given folder (e.g. an operation or a project being removed).
+        """
+        folder_path = os.path.join(folder_path, '')
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if any(file_path.startswith(folder_path) for file_path in entry.file_keys):
+                    self._discard(key)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+
+    def get_statistics(self):
+        """
+        :returns: dictionary with the current cache usage and its hit/miss counters.
+        """
+        with self._lock:
+            return {'entries': len(self._entries), 'size_bytes': self.size_bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry.nbytes
+
+
+    def _evict(self):
+        max_bytes = max(self.max_bytes, 0)
+        while self.size_bytes > max_bytes and self._entries:
+            key = next(iter(self._entries))
+            LOG.debug("Evicting cached attribute %s" % str(key[:2]))
+            self._discard(key)
+
+
+
+ATTRIBUTE_CACHE = DatatypeAttributeCache()
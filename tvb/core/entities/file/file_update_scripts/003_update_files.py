@@ -42,6 +42,9 @@ from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.services.import_service import ImportService
 from tvb.core.traits.types_mapped import SparseMatrix
 
+# Reads the DB (operation and project of the DataType), so FilesUpdateManager runs it in the main process only
+USES_DB = True
+
 
 
 def _update_localconnectivity_metadata(folder, file_name):
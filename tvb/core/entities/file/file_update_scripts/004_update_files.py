@@ -50,6 +50,9 @@ FIELD_PROJECTION_TYPE = "Projection_type"
 FIELD_SURFACE_MAPPING = "Has_surface_mapping"
 FIELD_VOLUME_MAPPING = "Has_volume_mapping"
 
+# Loads and stores DataTypes in DB, so FilesUpdateManager runs it in the main process only
+USES_DB = True
+
 
 def update(input_file):
     """
@@ -33,15 +33,20 @@
 """
 
 import os
+import time
+import zlib
 import shutil
 import json
-from zipfile import ZipFile, ZIP_DEFLATED, BadZipfile
+import tempfile
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED, BadZipfile
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.decorators import synchronized
 from tvb.core.entities.transient.structure_entities import DataTypeMetaData, GenericMetaData
 from tvb.core.entities.file.xml_metadata_handlers import XMLReader, XMLWriter
 from tvb.core.entities.file.exceptions import FileStructureException
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.core.entities.file.datatype_attribute_cache import ATTRIBUTE_CACHE
 
 
 from threading import Lock
@@ -112,6 +117,8 @@ class FilesHelper():
             if os.path.exists(new_full_name):
                 raise IOError("Path exists %s " % new_full_name)
 
+            FILE_POOL.invalidate_folder(path)
+            ATTRIBUTE_CACHE.invalidate_folder(path)
             os.rename(path, new_full_name)
             return path, new_full_name
         except Exception:
@@ -123,6 +130,8 @@ class FilesHelper():
         """ Remove all folders for project or THROW FileStructureException. """
         try:
             complete_path = self.get_project_folder(project_name)
+            FILE_POOL.invalidate_folder(complete_path)
+            ATTRIBUTE_CACHE.invalidate_folder(complete_path)
             if os.path.exists(complete_path):
                 if os.path.isdir(complete_path):
                     shutil.rmtree(complete_path)
@@ -236,6 +245,8 @@ class FilesHelper():
         try:
             complete_path = self.get_operation_folder(project_name, operation_id)
             self.logger.debug("Removing: " + str(complete_path))
+            FILE_POOL.invalidate_folder(complete_path)
+            ATTRIBUTE_CACHE.invalidate_folder(complete_path)
             if os.path.isdir(complete_path):
                 shutil.rmtree(complete_path)
             elif os.path.exists(complete_path):
@@ -251,6 +262,8 @@ class FilesHelper():
         Remove H5 storage fully.
         """
         try:
+            FILE_POOL.invalidate(datatype.get_storage_file_path())
+            ATTRIBUTE_CACHE.invalidate(datatype.gid)
             if os.path.exists(datatype.get_storage_file_path()):
                 os.remove(datatype.get_storage_file_path())
             else:
@@ -268,6 +281,8 @@ class FilesHelper():
             full_path = datatype.get_storage_file_path()
             folder = self.get_project_folder(new_project_name, str(new_op_id))
             full_new_file = os.path.join(folder, os.path.split(full_path)[1])
+            FILE_POOL.invalidate(full_path)
+            ATTRIBUTE_CACHE.invalidate_file(full_path)
             os.rename(full_path, full_new_file)
         except Exception:
             self.logger.exception("Could not move file")
@@ -492,6 +507,112 @@ class FilesHelper():
         return 0
 
 
+class PreparedZipMember(object):
+    """
+    A file ready to be appended to a TvbZip: CRC, sizes and (when asked for) the DEFLATE stream are computed here,
+    so that preparing several members can run in parallel threads (zlib releases the GIL while compressing).
+    Compressed data is kept in memory up to SPOOL_SIZE, in a temporary file above.
+    """
+    CHUNK_SIZE = 1024 * 1024
+    SPOOL_SIZE = 16 * 1024 * 1024
+
+
+    def __init__(self, file_path, arcname, compress=True):
+        self.file_path = file_path
+        self._compressed = None
+
+        file_stat = os.stat(file_path)
+        self.zinfo = ZipInfo(arcname.replace(os.sep, '/'), time.localtime(file_stat.st_mtime)[0:6])
+        self.zinfo.external_attr = (file_stat.st_mode & 0xFFFF) << 16
+        self.zinfo.compress_type = ZIP_DEFLATED if compress else ZIP_STORED
+
+        crc = 0
+        file_size = 0
+        compressor = None
+        if compress:
+            self._compressed = tempfile.SpooledTemporaryFile(self.SPOOL_SIZE)
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        for chunk in self._read_chunks(file_path):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            if compressor is not None:
+                self._compressed.write(compressor.compress(chunk))
+
+        self.zinfo.CRC = crc & 0xffffffff
+        self.zinfo.file_size = file_size
+        if compressor is not None:
+            self._compressed.write(compressor.flush())
+            self.zinfo.compress_size = self._compressed.tell()
+        else:
+            self.zinfo.compress_size = file_size
+
+
+    @classmethod
+    def _read_chunks(cls, file_path):
+        with open(file_path, "rb") as input_file:
+            while True:
+                chunk = input_file.read(cls.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+    def iter_data(self):
+        """
+        :returns: generator over the bytes to be written in the archive, after the member header
+        """
+        if self._compressed is None:
+            copied_size = 0
+            for chunk in self._read_chunks(self.file_path):
+                copied_size += len(chunk)
+                yield chunk
+            if copied_size != self.zinfo.file_size:
+                raise FileStructureException("File %s changed while being archived" % self.file_path)
+            return
+
+        try:
+            self._compressed.seek(0)
+            while True:
+                chunk = self._compressed.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            self._compressed.close()
+
+
+
+class ZipStreamBuffer(object):
+    """
+    Write-only file-like object, keeping the bytes of a ZIP being written until they are taken with `pop_data`.
+    ZipFile only needs `write` and `tell` for writing, thus archives can be streamed while being created.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+
+    def write(self, data):
+        self._chunks.append(data)
+        self._position += len(data)
+
+
+    def tell(self):
+        return self._position
+
+
+    def flush(self):
+        pass
+
+
+    def pop_data(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+
 class TvbZip(ZipFile):
     def __init__(self, dest_path, mode="r"):
         ZipFile.__init__(self, dest_path, mode, ZIP_DEFLATED, True)
@@ -502,6 +623,23 @@ class TvbZip(ZipFile):
     def __exit__(self, _type, _value, _traceback):
         self.close()
 
+    def write_prepared(self, prepared):
+        """
+        Append a PreparedZipMember. Unlike `write`, no seek is needed on the archive (see ZipStreamBuffer).
+        This is a generator, yielding after each chunk written, so that a streamed archive can be sent
+        without ever holding a complete member in memory. It needs to be consumed entirely.
+        """
+        zinfo = prepared.zinfo
+        zinfo.header_offset = self.fp.tell()
+        self._writecheck(zinfo)
+        self._didModify = True
+        self.fp.write(zinfo.FileHeader())
+        for chunk in prepared.iter_data():
+            self.fp.write(chunk)
+            yield
+        self.filelist.append(zinfo)
+        self.NameToInfo[zinfo.filename] = zinfo
+
     def write_folder(self, folder, archive_path_prefix="", exclude=None):
         """
         write folder contents in archive
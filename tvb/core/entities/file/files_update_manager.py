@@ -37,6 +37,8 @@ Manager for the file storage version updates.
 """
 
 import os
+import json
+import multiprocessing
 import tvb.core.entities.file.file_update_scripts as file_update_scripts
 from datetime import datetime
 from tvb.basic.config import stored
@@ -44,9 +46,12 @@ from tvb.basic.profile import TvbProfile
 from tvb.basic.traits.types_mapped import MappedType
 from tvb.core.code_versions.base_classes import UpdateManager
 from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.core.entities.file.datatype_attribute_cache import ATTRIBUTE_CACHE
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.file.exceptions import MissingDataFileException, FileStructureException
 from tvb.core.entities.storage import dao
+from tvb.core.entities.storage.session_maker import DB_ENGINE
 
 
 FILE_STORAGE_VALID = 'valid'
@@ -61,6 +66,7 @@ class FilesUpdateManager(UpdateManager):
     UPDATE_SCRIPTS_SUFFIX = "_update_files"
     PROJECTS_PAGE_SIZE = 20
     DATA_TYPES_PAGE_SIZE = 500
+    PROGRESS_FILE_NAME = "file_upgrade_progress.json"
     STATUS = True
     MESSAGE = "Done"
 
@@ -70,6 +76,7 @@ class FilesUpdateManager(UpdateManager):
                                                  TvbProfile.current.version.DATA_CHECKED_TO_VERSION,
                                                  TvbProfile.current.version.DATA_VERSION)
         self.files_helper = FilesHelper()
+        self._datatype_classes = {}
 
 
     def get_file_data_version(self, file_path):
@@ -118,8 +125,7 @@ class FilesUpdateManager(UpdateManager):
 
         file_version = self.get_file_data_version(input_file_name)
         self.log.info("Updating from version %s , file: %s " % (file_version, input_file_name))
-        for script_name in self.get_update_scripts(file_version):
-            self.run_update_script(script_name, input_file=input_file_name)
+        self.run_file_update_scripts(input_file_name, self.get_update_scripts(file_version))
 
         if datatype:
             # Compute and update the disk_size attribute of the DataType in DB:
@@ -129,52 +135,135 @@ class FilesUpdateManager(UpdateManager):
         return True
 
 
-    def __upgrade_datatype_list(self, datatypes):
+    def run_file_update_scripts(self, input_file_name, script_names):
         """
-        Upgrade a list of DataTypes to the current version.
-        
-        :param datatypes: The list of DataTypes that should be upgraded.
+        Run the given update scripts, in order, over one H5 file.
+        """
+        # Update scripts might rewrite the file, so no cached handle should survive them
+        FILE_POOL.invalidate(input_file_name)
+        ATTRIBUTE_CACHE.invalidate_file(input_file_name)
+        for script_name in script_names:
+            self.run_update_script(script_name, input_file=input_file_name)
+        FILE_POOL.invalidate(input_file_name)
+
 
-        :returns: (nr_of_dts_upgraded_fine, nr_of_dts_upgraded_fault) a two-tuple of integers representing
-            the number of DataTypes for which the upgrade worked fine, and the number of DataTypes for which
-            some kind of fault occurred
+    def script_uses_db(self, script_name):
         """
-        nr_of_dts_upgraded_fine = 0
-        nr_of_dts_upgraded_fault = 0
-        no_of_dts_ignored = 0
+        :returns: True when the update script declares (with USES_DB) that it reads or writes the DB.
+            Such scripts are not to be executed in the worker processes of run_all_updates.
+        """
+        script_module_name = self.update_scripts_module.__name__ + '.' + script_name.split('.')[0]
+        script_module = __import__(script_module_name, globals(), locals(), ['update'])
+        return getattr(script_module, 'USES_DB', False)
+
 
-        for datatype in datatypes:
+    def _get_datatype_class(self, module_name, class_name):
+        """
+        :returns: the DataType class with the given name, or None when it can not be imported anymore.
+        """
+        key = (module_name, class_name)
+        if key not in self._datatype_classes:
             try:
-                specific_datatype = dao.get_datatype_by_gid(datatype.gid, load_lazy=False)
-
-                if specific_datatype is None:
-                    datatype.invalid = True
-                    dao.store_entity(datatype)
-                    nr_of_dts_upgraded_fault += 1
-                elif isinstance(specific_datatype, MappedType):
-                    update_was_needed = self.upgrade_file(specific_datatype.get_storage_file_path(), specific_datatype)
-                    if update_was_needed:
-                        nr_of_dts_upgraded_fine += 1
-                    else:
-                        no_of_dts_ignored += 1
-                else:
-                    # Ignore DataTypeGroups
-                    self.log.debug("We will ignore, due to type: " + str(specific_datatype))
-                    no_of_dts_ignored += 1
-
-            except Exception as ex:
-                # The file/class is missing for some reason. Just mark the DataType as invalid.
-                datatype.invalid = True
-                dao.store_entity(datatype)
-                nr_of_dts_upgraded_fault += 1
-                self.log.exception(ex)
-
-        return nr_of_dts_upgraded_fine, nr_of_dts_upgraded_fault, no_of_dts_ignored
+                module = __import__(module_name, globals(), locals(), [class_name])
+                self._datatype_classes[key] = getattr(module, class_name)
+            except Exception:
+                self.log.exception("Could not import DataType class %s.%s" % key)
+                self._datatype_classes[key] = None
+        return self._datatype_classes[key]
+
+
+    @staticmethod
+    def _get_datatype_file_path(project_name, operation_id, class_name, gid):
+        """
+        Compute the H5 file path of a DataType, as MappedType.get_storage_file_path does, without loading it.
+        """
+        return os.path.join(TvbProfile.current.TVB_STORAGE, FilesHelper.PROJECTS_FOLDER, project_name,
+                            str(operation_id), "%s_%s%s" % (class_name, gid, FilesHelper.TVB_STORAGE_FILE_EXTENSION))
+
+
+    def __upgrade_datatype_list(self, datatypes, map_function):
+        """
+        Upgrade a page of DataTypes to the current version, and store the results in DB at once.
+
+        :param datatypes: list of tuples, as returned by dao.get_datatypes_to_upgrade
+        :param map_function: used to run `upgrade_file_task` over all the files (in this or in worker processes)
+
+        :returns: (nr_of_dts_upgraded_fine, nr_of_dts_upgraded_fault, nr_of_dts_ignored)
+        """
+        invalid_ids = []
+        no_of_dts_ignored = 0
+        tasks = []
+
+        for datatype_id, gid, class_name, module_name, operation_id, project_name in datatypes:
+            datatype_class = self._get_datatype_class(module_name, class_name)
+            if datatype_class is None or project_name is None:
+                invalid_ids.append(datatype_id)
+            elif issubclass(datatype_class, MappedType):
+                tasks.append((datatype_id, self._get_datatype_file_path(project_name, operation_id, class_name, gid)))
+            else:
+                # Ignore DataTypeGroups
+                self.log.debug("We will ignore, due to type: " + class_name)
+                no_of_dts_ignored += 1
+
+        disk_sizes = {}
+        for datatype_id, file_path, update_was_needed, disk_size, db_scripts in map_function(upgrade_file_task, tasks):
+            if update_was_needed and db_scripts:
+                # Scripts touching the DB run here, so that worker processes never write in it concurrently
+                try:
+                    self.run_file_update_scripts(file_path, db_scripts)
+                    disk_size = self.files_helper.compute_size_on_disk(file_path)
+                except Exception as ex:
+                    self.log.exception(ex)
+                    update_was_needed = None
+            if update_was_needed is None:
+                # The file is missing or could not be upgraded. Just mark the DataType as invalid.
+                invalid_ids.append(datatype_id)
+            elif update_was_needed:
+                # Workers had their own handles on it
+                FILE_POOL.invalidate(file_path)
+                ATTRIBUTE_CACHE.invalidate_file(file_path)
+                disk_sizes[datatype_id] = disk_size
+            else:
+                no_of_dts_ignored += 1
+
+        dao.update_datatypes_after_upgrade(disk_sizes, invalid_ids)
+        return len(disk_sizes), len(invalid_ids), no_of_dts_ignored
+
+
+    def _get_progress_file(self):
+        return os.path.join(TvbProfile.current.TVB_STORAGE, self.PROGRESS_FILE_NAME)
+
+
+    def _read_progress(self):
+        """
+        :returns: progress of a previous upgrade towards the current data version, which got interrupted.
+        """
+        progress = {'data_version': TvbProfile.current.version.DATA_VERSION,
+                    'last_id': 0, 'ok': 0, 'error': 0, 'ignored': 0}
+        try:
+            with open(self._get_progress_file()) as progress_file:
+                stored_progress = json.load(progress_file)
+            if stored_progress.get('data_version') == progress['data_version']:
+                progress.update(stored_progress)
+                self.log.info("Resuming H5 file updates after DataType with id %d" % progress['last_id'])
+        except (IOError, ValueError):
+            pass
+        return progress
+
+
+    def _write_progress(self, progress):
+        progress_file_path = self._get_progress_file()
+        with open(progress_file_path + ".tmp", 'w') as progress_file:
+            json.dump(progress, progress_file)
+        os.rename(progress_file_path + ".tmp", progress_file_path)
 
 
     def run_all_updates(self):
         """
         Upgrades all the data types from TVB storage to the latest data version.
+        Files are upgraded in FILE_UPGRADE_WORKERS processes (when more than one), except for the update scripts
+        declaring USES_DB, which always run in this process. Progress is stored after
+        each page of DataTypes, so an interrupted upgrade resumes (at the next start) where it stopped.
         
         :returns: a two entry tuple (status, message) where status is a boolean that is True in case
             the upgrade was successfully for all DataTypes and False otherwise, and message is a status
@@ -182,6 +271,7 @@ class FilesUpdateManager(UpdateManager):
         """
         if TvbProfile.current.version.DATA_CHECKED_TO_VERSION < TvbProfile.current.version.DATA_VERSION:
             total_count = dao.count_all_datatypes()
+            progress = self._read_progress()
 
             self.log.info("Starting to run H5 file updates from version %d to %d, for %d datatypes" % (
                 TvbProfile.current.version.DATA_CHECKED_TO_VERSION,
@@ -189,43 +279,74 @@ class FilesUpdateManager(UpdateManager):
 
             # Keep track of how many DataTypes were properly updated and how many 
             # were marked as invalid due to missing files or invalid manager.
-            no_ok = 0
-            no_error = 0
-            no_ignored = 0
+            no_processed = 0
             start_time = datetime.now()
 
-            # Read DataTypes in pages to limit the memory consumption
-            for current_idx in range(0, total_count, self.DATA_TYPES_PAGE_SIZE):
-                datatypes_for_page = dao.get_all_datatypes(current_idx, self.DATA_TYPES_PAGE_SIZE)
-                count_ok, count_error, count_ignored = self.__upgrade_datatype_list(datatypes_for_page)
-                no_ok += count_ok
-                no_error += count_error
-                no_ignored += count_ignored
+            pool = None
+            map_function = map
+            if TvbProfile.current.FILE_UPGRADE_WORKERS > 1:
+                # Connections and open H5 files are not to be shared with the forked workers
+                DB_ENGINE.dispose()
+                FILE_POOL.close_all()
+                ATTRIBUTE_CACHE.clear()
+                pool = multiprocessing.Pool(TvbProfile.current.FILE_UPGRADE_WORKERS)
+                map_function = pool.map
 
-                self.log.info("Updated H5 files so far: %d [fine:%d, error:%d, ignored:%d of total:%d, in: %s min]" % (
-                    current_idx + len(datatypes_for_page), no_ok, no_error, no_ignored, total_count,
-                    int((datetime.now() - start_time).seconds / 60)))
+            try:
+                # Read DataTypes in pages to limit the memory consumption
+                while True:
+                    datatypes_for_page = dao.get_datatypes_to_upgrade(progress['last_id'], self.DATA_TYPES_PAGE_SIZE)
+                    if not datatypes_for_page:
+                        break
+                    count_ok, count_error, count_ignored = self.__upgrade_datatype_list(datatypes_for_page,
+                                                                                        map_function)
+                    progress['ok'] += count_ok
+                    progress['error'] += count_error
+                    progress['ignored'] += count_ignored
+                    progress['last_id'] = datatypes_for_page[-1][0]
+                    self._write_progress(progress)
+                    no_processed += len(datatypes_for_page)
+
+                    elapsed = max((datetime.now() - start_time).total_seconds(), 0.001)
+                    self.log.info("Updated H5 files so far: %d [fine:%d, error:%d, ignored:%d of total:%d, "
+                                  "in: %s min, %.1f DataTypes/s]" % (
+                                      progress['ok'] + progress['error'] + progress['ignored'], progress['ok'],
+                                      progress['error'], progress['ignored'], total_count, int(elapsed / 60),
+                                      no_processed / elapsed))
+            finally:
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+
+            if progress['ok']:
+                # Sizes were written in bulk, thus the disk usage counters need to be recomputed
+                dao.rebuild_disk_usage_counters()
 
             # Now update the configuration file since update was done
             config_file_update_dict = {stored.KEY_LAST_CHECKED_FILE_VERSION: TvbProfile.current.version.DATA_VERSION}
+            elapsed = max((datetime.now() - start_time).total_seconds(), 0.001)
 
-            if no_error == 0:
+            if progress['error'] == 0:
                 # Everything went fine
                 config_file_update_dict[stored.KEY_FILE_STORAGE_UPDATE_STATUS] = FILE_STORAGE_VALID
                 FilesUpdateManager.STATUS = True
-                FilesUpdateManager.MESSAGE = ("File upgrade finished successfully for all %s entries. "
-                                              "Thank you for your patience!" % total_count)
+                FilesUpdateManager.MESSAGE = ("File upgrade finished successfully for all %s entries "
+                                              "(%.1f DataTypes/s). Thank you for your patience!"
+                                              % (total_count, no_processed / elapsed))
                 self.log.info(FilesUpdateManager.MESSAGE)
             else:
                 # Something went wrong
                 config_file_update_dict[stored.KEY_FILE_STORAGE_UPDATE_STATUS] = FILE_STORAGE_INVALID
                 FilesUpdateManager.STATUS = False
                 FilesUpdateManager.MESSAGE = ("Out of %s stored DataTypes, %s were upgraded successfully, but %s had "
-                                              "faults and were marked invalid" % (total_count, no_ok, no_error))
+                                              "faults and were marked invalid" % (total_count, progress['ok'],
+                                                                                  progress['error']))
                 self.log.warning(FilesUpdateManager.MESSAGE)
 
             TvbProfile.current.version.DATA_CHECKED_TO_VERSION = TvbProfile.current.version.DATA_VERSION
             TvbProfile.current.manager.add_entries_to_config_file(config_file_update_dict)
+            if os.path.exists(self._get_progress_file()):
+                os.remove(self._get_progress_file())
 
 
     @staticmethod
@@ -235,3 +356,32 @@ class FilesUpdateManager(UpdateManager):
         """
         folder, file_name = os.path.split(file_path)
         return HDF5StorageManager(folder, file_name)
+
+
+
+def upgrade_file_task(task):
+    """
+    Upgrade one H5 file. Module level function, to be callable in worker processes.
+    Only the update scripts before the first one declaring USES_DB are executed here, the rest are returned.
+
+    :param task: tuple (DataType id, H5 file path)
+    :returns: tuple (DataType id, file path, True / False when the upgrade was needed or not / None on error,
+        new disk size when upgraded, names of the update scripts still to be executed in the main process)
+    """
+    datatype_id, file_path = task
+    manager = FilesUpdateManager()
+    try:
+        if manager.is_file_up_to_date(file_path):
+            return datatype_id, file_path, False, None, []
+        file_version = manager.get_file_data_version(file_path)
+        manager.log.info("Updating from version %s , file: %s " % (file_version, file_path))
+        script_names = manager.get_update_scripts(file_version)
+        no_db_scripts = 0
+        while no_db_scripts < len(script_names) and not manager.script_uses_db(script_names[no_db_scripts]):
+            no_db_scripts += 1
+        manager.run_file_update_scripts(file_path, script_names[:no_db_scripts])
+        return (datatype_id, file_path, True, manager.files_helper.compute_size_on_disk(file_path),
+                script_names[no_db_scripts:])
+    except Exception as ex:
+        manager.log.exception(ex)
+        return datatype_id, file_path, None, None, []
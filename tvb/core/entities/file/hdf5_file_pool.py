@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Process-wide pool of open HDF5 file handles.
+
+Opening a h5py.File is expensive compared to reading a small slice from it, and visualizers or analyzers
+tend to read the same files many times in a row. The pool keeps recently used files open, up to a limit,
+and closes the least recently used ones when that limit is exceeded.
+"""
+
+import os
+import atexit
+import threading
+from collections import OrderedDict
+from tvb.basic.logger.builder import get_logger
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.exceptions import FileStorageException
+
+
+LOG = get_logger(__name__)
+
+READ_MODE = 'r'
+
+
+
+class PooledH5File(object):
+    """
+    One open h5py.File, as kept by the pool, together with the number of managers currently using it.
+    """
+
+    def __init__(self, file_path, h5_file, mode):
+        self.file_path = file_path
+        self.h5_file = h5_file
+        self.mode = mode
+        self.ref_count = 0
+        self.invalidated = False
+        self.file_key = HDF5FilePool.compute_file_key(file_path)
+
+
+    @property
+    def is_writable(self):
+        return self.mode != READ_MODE
+
+
+    @property
+    def is_open(self):
+        return self.h5_file is not None and self.h5_file.id.valid
+
+
+    def close(self):
+        """
+        Close the underlying H5 file, when still open.
+        """
+        if self.is_open:
+            LOG.debug("Closing pooled file: %s" % self.file_path)
+            try:
+                self.h5_file.close()
+            except Exception as excep:
+                ### The file is correctly closed, but the list of open files on HDF5 is not updated in a synch manner.
+                LOG.exception(excep)
+        self.h5_file = None
+
+
+
+class HDF5FilePool(object):
+    """
+    Keeps H5 files open between calls of HDF5StorageManager, with LRU eviction.
+
+    - Files are shared between all managers of the current process, pointing towards the same path.
+    - Files in use (acquired and not yet released) are never evicted; the limit might be exceeded temporarily.
+    - A file opened in read mode is upgraded to append mode, when a write is requested and nobody else uses it.
+      While others still read it, the write fails with FileStorageException.
+    - Files opened for writing are flushed and closed when released, so that other processes can open them.
+    - A handle is dropped when the file on disk has been removed or replaced, or when explicitly invalidated.
+    """
+
+
+    def __init__(self, max_size=None):
+        """
+        :param max_size: maximum number of idle files kept open. When None, read it from the current TvbProfile.
+            A value smaller than 1 disables pooling (every file gets closed when released).
+        """
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            return TvbProfile.current.HDF5_FILE_POOL_SIZE
+        return self._max_size
+
+
+    @staticmethod
+    def compute_file_key(file_path):
+        """
+        :returns: a tuple identifying the file on disk and its last change,
+            to detect files being removed, replaced or modified by somebody else.
+        """
+        try:
+            stat_info = os.stat(file_path)
+            return stat_info.st_dev, stat_info.st_ino, stat_info.st_size, stat_info.st_mtime
+        except OSError:
+            return None
+
+
+    def acquire(self, file_path, mode, open_callable):
+        """
+        Get an open H5 file for the given path, from the pool when possible.
+
+        :param file_path: full path towards the H5 file
+        :param mode: mode in which the file is needed ('r' or 'a' / 'w')
+        :param open_callable: function(file_path, mode) returning a new h5py.File, used when not found in the pool
+        :returns: PooledH5File instance, to be given back through `release`
+        """
+        with self._lock:
+            entry = self._entries.get(file_path)
+
+            if entry is not None and not self._is_still_valid(entry):
+                self._discard(entry)
+                entry = None
+
+            if entry is not None and mode != READ_MODE and not entry.is_writable:
+                if entry.ref_count == 0:
+                    LOG.debug("Upgrading pooled file %s to mode %s" % (file_path, mode))
+                    self._discard(entry)
+                    entry = None
+                else:
+                    # HDF5 does not allow a second handle with other access flags, on a file open in this process
+                    raise FileStorageException("File %s is currently open for reading (%d users), it can not be "
+                                               "written until they close it." % (file_path, entry.ref_count))
+
+            if entry is None:
+                self.misses += 1
+                entry = PooledH5File(file_path, open_callable(file_path, mode), mode)
+                self._entries[file_path] = entry
+            else:
+                self.hits += 1
+                # Mark as most recently used
+                del self._entries[file_path]
+                self._entries[file_path] = entry
+
+            entry.ref_count += 1
+            self._evict()
+            return entry
+
+
+    def release(self, entry):
+        """
+        Mark the given file as no longer used by the caller. Depending on the pool state, it is kept open or closed.
+        """
+        with self._lock:
+            entry.ref_count -= 1
+            if entry.ref_count > 0:
+                return
+            if entry.invalidated or entry.is_writable or self.max_size < 1 or not entry.is_open:
+                self._discard(entry)
+            else:
+                self._evict()
+
+
+    def invalidate(self, file_path):
+        """
+        Drop the handle for a file which is about to be removed, moved or rewritten.
+        When still in use, the file is closed at the moment it gets released.
+        """
+        with self._lock:
+            entry = self._entries.pop(file_path, None)
+            if entry is not None:
+                entry.invalidated = True
+                if entry.ref_count == 0:
+                    entry.close()
+
+
+    def invalidate_folder(self, folder_path):
+        """
+        Invalidate all the files under a given folder (e.g. an operation or a project being removed).
+        """
+        folder_path = os.path.join(folder_path, '')
+        with self._lock:
+            for file_path in list(self._entries):
+                if file_path.startswith(folder_path):
+                    self.invalidate(file_path)
+
+
+    def close_all(self):
+        """
+        Close all the files not in use, and empty the pool.
+        """
+        with self._lock:
+            for file_path in list(self._entries):
+                self.invalidate(file_path)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def _is_still_valid(self, entry):
+        if not entry.is_open:
+            return False
+        current_key = self.compute_file_key(entry.file_path)
+        if current_key is None or entry.file_key is None:
+            return False
+        if entry.is_writable:
+            # We are the ones changing it, so only check that it is still the same file
+            return entry.file_key[:2] == current_key[:2]
+        return entry.file_key == current_key
+
+
+    def _discard(self, entry):
+        if self._entries.get(entry.file_path) is entry:
+            del self._entries[entry.file_path]
+        entry.invalidated = True
+        if entry.ref_count == 0:
+            entry.close()
+
+
+    def _evict(self):
+        """
+        Close least recently used files which are not in use, until we are back within the pool limit.
+        """
+        max_size = max(self.max_size, 0)
+        if len(self._entries) <= max_size:
+            return
+        for entry in list(self._entries.values()):
+            if len(self._entries) <= max_size:
+                break
+            if entry.ref_count == 0:
+                self._discard(entry)
+
+
+
+FILE_POOL = HDF5FilePool()
+atexit.register(FILE_POOL.close_all)
@@ -36,7 +36,6 @@ Persistence of data in HDF5 format.
 """
 
 import os
-import copy
 import threading
 import h5py as hdf5
 import numpy as numpy
@@ -46,6 +45,8 @@ from tvb.basic.logger.builder import get_logger
 from tvb.basic.profile import TvbProfile
 from tvb.core.entities.file.exceptions import FileStructureException, MissingDataSetException
 from tvb.core.entities.file.exceptions import IncompatibleFileManagerException, MissingDataFileException
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.core.entities.file.hdf5_storage_profiles import DEFAULT_PROFILE, StorageProfile
 from tvb.core.entities.transient.structure_entities import GenericMetaData
 
 
@@ -62,6 +63,7 @@ class HDF5StorageManager(object):
     __file_title_ = "TVB data file"
     __storage_full_name = None
     __hfd5_file = None
+    __pooled_file = None
 
     TVB_ATTRIBUTE_PREFIX = "TVB_"
     ROOT_NODE_PATH = "/"
@@ -71,10 +73,11 @@ class HDF5StorageManager(object):
     LOCKS = {}
 
 
-    def __init__(self, storage_folder, file_name, buffer_size=600000):
+    def __init__(self, storage_folder, file_name, buffer_size=600000, storage_profile=None):
         """
         Creates a new storage manager instance.
         :param buffer_size: the size in Bytes of the amount of data that will be buffered before writing to file.
+        :param storage_profile: StorageProfile describing chunking and compression for the new datasets.
         """
         if storage_folder is None:
             raise FileStructureException("Please provide the folder where to store data")
@@ -83,6 +86,7 @@ class HDF5StorageManager(object):
         self.__storage_full_name = os.path.join(storage_folder, file_name)
         self.__buffer_size = buffer_size
         self.__buffer_array = None
+        self.__storage_profile = storage_profile or DEFAULT_PROFILE
         self.data_buffers = {}
 
 
@@ -119,7 +123,9 @@ class HDF5StorageManager(object):
 
             full_dataset_name = where + dataset_name
             if full_dataset_name not in hdf5File:
-                hdf5File.create_dataset(full_dataset_name, data=data_to_store)
+                dataset = hdf5File.create_dataset(full_dataset_name, data=data_to_store,
+                                                  **self.__dataset_layout(data_to_store))
+                self.__record_storage_profile(dataset)
 
             elif hdf5File[full_dataset_name].shape == data_to_store.shape:
                 hdf5File[full_dataset_name][...] = data_to_store[...]
@@ -166,7 +172,9 @@ class HDF5StorageManager(object):
                 data_shape_list[grow_dimension] = None
                 data_shape = tuple(data_shape_list)
                 dataset = hdf5File.create_dataset(where + dataset_name, data=data_to_store, shape=data_to_store.shape,
-                                                  dtype=data_to_store.dtype, maxshape=data_shape)
+                                                  dtype=data_to_store.dtype, maxshape=data_shape,
+                                                  **self.__dataset_layout(data_to_store, grow_dimension, True))
+                self.__record_storage_profile(dataset)
                 self.data_buffers[datapath] = HDF5StorageManager.H5pyStorageBuffer(dataset,
                                                                                    buffer_size=self.__buffer_size,
                                                                                    buffered_data=None,
@@ -178,6 +186,23 @@ class HDF5StorageManager(object):
             self.close_file()
 
 
+    def __dataset_layout(self, data_to_store, grow_dimension=0, resizable=False):
+        """
+        :returns: chunking and compression arguments for a new dataset, according to the current storage profile
+        """
+        if not isinstance(data_to_store, numpy.ndarray):
+            return {}
+        return self.__storage_profile.dataset_kwargs(data_to_store, grow_dimension, resizable)
+
+
+    def __record_storage_profile(self, dataset):
+        """
+        Keep the name of the storage profile used, as attribute on the dataset.
+        """
+        if not self.__storage_profile.is_default:
+            dataset.attrs[self.TVB_ATTRIBUTE_PREFIX + StorageProfile.METADATA_KEY] = self.__storage_profile.name
+
+
     def remove_data(self, dataset_name, where=ROOT_NODE_PATH):
         """
         Deleting a data set from H5 file.
@@ -203,13 +228,17 @@ class HDF5StorageManager(object):
             self.close_file()
 
 
-    def get_data(self, dataset_name, data_slice=None, where=ROOT_NODE_PATH, ignore_errors=False, close_file=True):
+    def get_data(self, dataset_name, data_slice=None, where=ROOT_NODE_PATH, ignore_errors=False, close_file=True,
+                 memory_map=False):
         """
         This method reads data from the given data set based on the slice specification
         
         :param dataset_name: Name of the data set from where to read data
         :param data_slice: Specify how to retrieve data from array {e.g (slice(1,10,1),slice(1,6,2)) }
         :param where: represents the path where dataset is stored (e.g. /data/info)  
+        :param memory_map: when True, a contiguous and uncompressed data set is returned as a read-only
+            numpy.memmap over the file, thus processes reading the same file share the OS page cache.
+            Chunked or compressed data sets are read as usual.
         :returns: a numpy.ndarray containing filtered data
         
         """
@@ -225,6 +254,9 @@ class HDF5StorageManager(object):
             hdf5File = self._open_h5_file('r')
             if datapath in hdf5File:
                 data_array = hdf5File[datapath]
+                mapped_array = self._memory_map_dataset(hdf5File, data_array) if memory_map else None
+                if mapped_array is not None:
+                    return mapped_array if data_slice is None else mapped_array[data_slice]
                 # Now read data
                 if data_slice is None:
                     result = data_array[()]
@@ -244,6 +276,25 @@ class HDF5StorageManager(object):
                 self.close_file()
 
 
+    def _memory_map_dataset(self, hdf5_file, dataset):
+        """
+        :returns: a read-only numpy.memmap over the bytes of a data set, or None when the data set is not
+            stored as one block of raw values in this file (chunked, compressed, external, empty or not numeric)
+        """
+        if (dataset.chunks is not None or not dataset.shape or dataset.size == 0
+                or dataset.dtype.kind not in "biufc" or dataset.id.get_create_plist().get_external_count() > 0):
+            return None
+        if hdf5_file.mode != 'r':
+            # Values might still wait in the HDF5 library buffers
+            hdf5_file.flush()
+        offset = dataset.id.get_offset()
+        if offset is None:
+            # Storage not allocated yet
+            return None
+        return numpy.memmap(self.__storage_full_name, dtype=dataset.dtype, mode='r',
+                            offset=offset, shape=dataset.shape)
+
+
     def get_data_shape(self, dataset_name, where=ROOT_NODE_PATH, ignore_errors=False):
         """
         This method reads data-size from the given data set 
@@ -293,24 +344,51 @@ class HDF5StorageManager(object):
         # Open file to read data
         hdf5File = self._open_h5_file()
         try:
-            node = hdf5File[where + dataset_name]
-        except KeyError:
-            LOG.debug("Trying to set metadata on a missing data set: %s" % dataset_name)
-            node = hdf5File.create_dataset(where + dataset_name, (1,))
+            self.__write_node_metadata(hdf5File, where + dataset_name, meta_dictionary, tvb_specific_metadata)
+        finally:
+            self.close_file()
 
+
+    def set_metadata_batch(self, metadata_by_dataset, tvb_specific_metadata=True, where=ROOT_NODE_PATH):
+        """
+        Set meta-data information on several nodes, with the file opened only once.
+
+        :param metadata_by_dataset: dictionary {dataset name: meta dictionary}. Name '' stands for the ROOT node.
+        :param tvb_specific_metadata: specify if the provided metadata is TVB specific (All keys will have a TVB prefix)
+        :param where: represents the path where datasets are stored (e.g. /data/info)
+        """
+        if not metadata_by_dataset:
+            return
+        LOG.debug("Setting metadata on nodes: %s" % list(metadata_by_dataset))
+        if where is None:
+            where = self.ROOT_NODE_PATH
+
+        hdf5File = self._open_h5_file()
         try:
-            # Now set meta-data
-            for meta_key in meta_dictionary:
-                key_to_store = meta_key
-                if tvb_specific_metadata:
-                    key_to_store = self.TVB_ATTRIBUTE_PREFIX + meta_key
-
-                processed_value = self._serialize_value(meta_dictionary[meta_key])
-                node.attrs[key_to_store] = processed_value
+            for dataset_name, meta_dictionary in metadata_by_dataset.items():
+                if meta_dictionary is not None:
+                    self.__write_node_metadata(hdf5File, where + (dataset_name or ''), meta_dictionary,
+                                               tvb_specific_metadata)
         finally:
             self.close_file()
 
 
+    def __write_node_metadata(self, hdf5_file, node_path, meta_dictionary, tvb_specific_metadata):
+        try:
+            node = hdf5_file[node_path]
+        except KeyError:
+            LOG.debug("Trying to set metadata on a missing data set: %s" % node_path)
+            node = hdf5_file.create_dataset(node_path, (1,))
+
+        for meta_key in meta_dictionary:
+            key_to_store = meta_key
+            if tvb_specific_metadata:
+                key_to_store = self.TVB_ATTRIBUTE_PREFIX + meta_key
+
+            processed_value = self._serialize_value(meta_dictionary[meta_key])
+            node.attrs[key_to_store] = processed_value
+
+
     def _serialize_value(self, value):
         """
         This method takes a value which will be stored as metadata and 
@@ -392,15 +470,7 @@ class HDF5StorageManager(object):
             hdf5File = self._open_h5_file('r')
             node = hdf5File[where + dataset_name]
             # Now retrieve metadata values
-            all_meta_data = {}
-
-            for meta_key in node.attrs:
-                new_key = meta_key
-                if meta_key.startswith(self.TVB_ATTRIBUTE_PREFIX):
-                    new_key = meta_key[len(self.TVB_ATTRIBUTE_PREFIX):]
-                value = node.attrs[meta_key]
-                all_meta_data[new_key] = self._deserialize_value(value)
-            return all_meta_data
+            return self.__read_node_metadata(node)
 
         except KeyError:
             if not ignore_errors:
@@ -422,6 +492,52 @@ class HDF5StorageManager(object):
             self.close_file()
 
 
+    def get_metadata_batch(self, where=ROOT_NODE_PATH):
+        """
+        Retrieve ALL meta-data information for a node and for all data sets under it, with the file opened only once.
+
+        :param where: represents the path of the node (e.g. /data/info)
+        :returns: dictionary {dataset name: meta dictionary}, where name '' stands for the node itself
+        """
+        LOG.debug("Retrieving metadata for all datasets under: %s" % where)
+        if where is None:
+            where = self.ROOT_NODE_PATH
+        all_meta_data = {}
+
+        def _visit(name, node):
+            node_path = self.ROOT_NODE_PATH + name
+            if isinstance(node, hdf5.Dataset) and node_path.startswith(where) and node_path != where:
+                all_meta_data[node_path[len(where):]] = self.__read_node_metadata(node)
+
+        try:
+            hdf5File = self._open_h5_file('r')
+            if where in hdf5File:
+                all_meta_data[''] = self.__read_node_metadata(hdf5File[where])
+            hdf5File.visititems(_visit)
+            return all_meta_data
+        except Exception as excep:
+            msg = "Failed to read metadata from H5 file! %s" % self.__storage_full_name
+            LOG.exception(excep)
+            LOG.error(msg)
+            raise FileStructureException(msg)
+        finally:
+            self.close_file()
+
+
+    def __read_node_metadata(self, node):
+        """
+        :returns: dictionary with all the attributes of a H5 node, without the TVB prefix on their names
+        """
+        all_meta_data = {}
+        for meta_key in node.attrs:
+            new_key = meta_key
+            if meta_key.startswith(self.TVB_ATTRIBUTE_PREFIX):
+                new_key = meta_key[len(self.TVB_ATTRIBUTE_PREFIX):]
+            value = node.attrs[meta_key]
+            all_meta_data[new_key] = self._deserialize_value(value)
+        return all_meta_data
+
+
     def get_file_data_version(self):
         """
         Checks the data version for the current file.
@@ -441,6 +557,27 @@ class HDF5StorageManager(object):
                                                "manager for this file?" % (self.__storage_full_name,))
 
 
+    def get_compressed_fraction(self):
+        """
+        :returns: the fraction (0 to 1) of the file size which is taken by chunk-compressed datasets.
+            Such files gain (almost) nothing from being compressed once more, e.g. when archived.
+        """
+        if not self.is_valid_hdf5_file():
+            return 0
+        compressed_sizes = []
+
+        def _visit(_name, item):
+            if isinstance(item, hdf5.Dataset) and item.compression is not None:
+                compressed_sizes.append(item.id.get_storage_size())
+
+        try:
+            hdf5_file = self._open_h5_file('r')
+            hdf5_file.visititems(_visit)
+        finally:
+            self.close_file()
+        return float(sum(compressed_sizes)) / max(os.path.getsize(self.__storage_full_name), 1)
+
+
     def get_gid_attribute(self):
         """
         Used for obtaining the gid of the DataType of
@@ -531,7 +668,7 @@ class HDF5StorageManager(object):
 
     def __close_file(self):
         """
-        Close file used to store data.
+        Give back to the pool the file used to store data.
         """
         hdf5_file = self.__hfd5_file
 
@@ -540,16 +677,14 @@ class HDF5StorageManager(object):
             LOG.debug("Closing file: %s" % self.__storage_full_name)
             try:
                 for h5py_buffer in self.data_buffers.values():
-                    h5py_buffer.flush_buffered_data()
+                    h5py_buffer.close()
                 self.data_buffers = {}
-                hdf5_file.close()
             except Exception as excep:
-                ### Do nothing is this situation.
-                ### The file is correctly closed, but the list of open files on HDF5 is not updated in a synch manner.
-                ### del _open_files[filename] might throw KeyError
                 LOG.exception(excep)
-            if not hdf5_file.fid.valid:
-                self.__hfd5_file = None
+        if self.__pooled_file is not None:
+            FILE_POOL.release(self.__pooled_file)
+            self.__pooled_file = None
+        self.__hfd5_file = None
 
 
     # -------------- Private methods  --------------
@@ -564,28 +699,42 @@ class HDF5StorageManager(object):
         """
         if self.__storage_full_name is None:
             raise FileStructureException("Invalid storage file. Please provide a valid path.")
+
+        # Check if file is still open from previous calls, in a mode which allows the current one.
+        if self.__hfd5_file is not None and self.__hfd5_file.fid.valid:
+            if mode == 'r' or self.__pooled_file.is_writable:
+                return self.__hfd5_file
+            self.__close_file()
+
+        self.__pooled_file = FILE_POOL.acquire(self.__storage_full_name, mode, self.__create_h5_file)
+        self.__hfd5_file = self.__pooled_file.h5_file
+        return self.__hfd5_file
+
+
+    def __create_h5_file(self, file_path, mode):
+        """
+        Actually open a new h5py.File. Called by the FILE_POOL when no usable handle is found there.
+        """
         try:
-            # Check if file is still open from previous writes.
-            if self.__hfd5_file is None or not self.__hfd5_file.fid.valid:
-                file_exists = os.path.exists(self.__storage_full_name)
-
-                # bug in some versions of hdf5 on windows prevent creating file with mode='a'
-                if not file_exists and mode == 'a':
-                    mode = 'w'
-
-                LOG.debug("Opening file: %s in mode: %s" % (self.__storage_full_name, mode))
-                self.__hfd5_file = hdf5.File(self.__storage_full_name, mode, libver='latest')
-
-                # If this is the first time we access file, write data version
-                if not file_exists:
-                    os.chmod(self.__storage_full_name, TvbProfile.current.ACCESS_MODE_TVB_FILES)
-                    self.__hfd5_file['/'].attrs[self.TVB_ATTRIBUTE_PREFIX +
-                                                TvbProfile.current.version.DATA_VERSION_ATTRIBUTE] = TvbProfile.current.version.DATA_VERSION
+            file_exists = os.path.exists(file_path)
+
+            # bug in some versions of hdf5 on windows prevent creating file with mode='a'
+            if not file_exists and mode == 'a':
+                mode = 'w'
+
+            LOG.debug("Opening file: %s in mode: %s" % (file_path, mode))
+            hdf5_file = hdf5.File(file_path, mode, libver='latest')
+
+            # If this is the first time we access file, write data version
+            if not file_exists:
+                os.chmod(file_path, TvbProfile.current.ACCESS_MODE_TVB_FILES)
+                hdf5_file['/'].attrs[self.TVB_ATTRIBUTE_PREFIX +
+                                     TvbProfile.current.version.DATA_VERSION_ATTRIBUTE] = TvbProfile.current.version.DATA_VERSION
         except (IOError, OSError) as err:
             LOG.exception("Could not open storage file.")
             raise FileStructureException("Could not open storage file. %s" % err)
 
-        return self.__hfd5_file
+        return hdf5_file
 
 
     def _check_data(self, data_list):
@@ -610,16 +759,36 @@ class HDF5StorageManager(object):
         """
         Helper class in order to buffer data for append operations, to limit the number of actual
         HDD I/O operations.
+
+        Chunks are copied in place into a preallocated array, which doubles its capacity along `grow_dimension`
+        when needed, thus buffering costs amortized O(1) per appended chunk. The H5 dataset is also resized
+        geometrically, and trimmed to the actual data length when the buffer gets closed.
         """
 
         def __init__(self, h5py_dataset, buffer_size=300, buffered_data=None, grow_dimension=-1):
-            self.buffered_data = buffered_data
             self.buffer_size = buffer_size
             if h5py_dataset is None:
                 raise MissingDataSetException("A H5pyStorageBuffer instance must have a h5py dataset for which the"
                                               "buffering is done. Please supply one to the 'h5py_dataset' parameter.")
             self.h5py_dataset = h5py_dataset
-            self.grow_dimension = grow_dimension
+            self.grow_dimension = grow_dimension % len(h5py_dataset.shape)
+            # Number of entries along grow_dimension actually written in the dataset (the rest is pre-allocated)
+            self.dataset_length = h5py_dataset.shape[self.grow_dimension]
+            self.__buffer = None
+            self.__buffered_length = 0
+            if buffered_data is not None:
+                self.buffer_data(buffered_data)
+
+
+        @property
+        def buffered_data(self):
+            """
+            :returns: a view on the data buffered so far, or None when the buffer is empty.
+            """
+            if self.__buffered_length == 0:
+                return None
+            return self.__buffer[self.__address(0, self.__buffered_length)]
+
 
         def buffer_data(self, data_list):
             """
@@ -627,49 +796,79 @@ class HDF5StorageManager(object):
             :returns: True if buffer is still fine, \
                       False if a flush is necessary since the buffer is full
             """
-            if self.buffered_data is None:
-                self.buffered_data = data_list
-            else:
-                self.buffered_data = self.__custom_numpy_append(self.buffered_data, data_list)
-            if self.buffered_data.nbytes > self.buffer_size:
-                return False
+            chunk_length = data_list.shape[self.grow_dimension]
+            required_length = self.__buffered_length + chunk_length
+
+            if self.__buffer is None or required_length > self.__buffer.shape[self.grow_dimension]:
+                self.__grow_buffer(data_list, required_length)
+
+            self.__buffer[self.__address(self.__buffered_length, required_length)] = data_list
+            self.__buffered_length = required_length
+
+            return self.buffered_data.nbytes <= self.buffer_size
+
+
+        def __grow_buffer(self, data_list, required_length):
+            """
+            Allocate a bigger buffer (at least double), and copy the data buffered so far into it.
+            When first allocated, make it large enough to hold `buffer_size` bytes.
+            """
+            if self.__buffer is None:
+                entry_size = max(data_list.nbytes // max(data_list.shape[self.grow_dimension], 1), 1)
+                capacity = max(required_length, self.buffer_size // entry_size + 1)
+                template = data_list
             else:
-                return True
-
-
-        def __custom_numpy_append(self, array1, array2):
-            array_1_shape = numpy.array(array1.shape)
-            array_2_shape = numpy.array(array2.shape)
-            result_shape = copy.deepcopy(array_1_shape)
-            result_shape[self.grow_dimension] += array_2_shape[self.grow_dimension]
-            result_array = numpy.empty(shape=tuple(result_shape), dtype=array1.dtype)
-            full_slice = slice(None, None, None)
-            full_index = [full_slice for _ in array_1_shape]
-            full_index[self.grow_dimension] = slice(0, array_1_shape[self.grow_dimension], None)
-            result_array[tuple(full_index)] = array1
-            full_index[self.grow_dimension] = slice(array_1_shape[self.grow_dimension],
-                                                    result_shape[self.grow_dimension], None)
-            result_array[tuple(full_index)] = array2
-            return result_array
-
-
-        def flush_buffered_data(self):
+                capacity = max(required_length, 2 * self.__buffer.shape[self.grow_dimension])
+                template = self.__buffer
+
+            new_shape = list(template.shape)
+            new_shape[self.grow_dimension] = capacity
+            new_buffer = numpy.empty(shape=tuple(new_shape), dtype=template.dtype)
+            if self.__buffered_length > 0:
+                new_buffer[self.__address(0, self.__buffered_length)] = self.buffered_data
+            self.__buffer = new_buffer
+
+
+        def __address(self, start, end):
+            """
+            For example, for the 3rd dimension of a 4D datashape (74, 1, 100, 1) and start=100, end=200,
+            we want to get the slice (:, :, 100:200, :)
+            """
+            address = [slice(None, None, None)] * (self.grow_dimension + 1)
+            address[self.grow_dimension] = slice(start, end, None)
+            return tuple(address)
+
+
+        def flush_buffered_data(self, exact_size=False):
             """
             Append the data buffered so far to the input dataset using :param grow_dimension: as the dimension that
-            will be expanded. 
+            will be expanded.
+            :param exact_size: when False, the dataset is enlarged geometrically, to avoid resizing it at every flush.
             """
-            if self.buffered_data is not None:
-                current_shape = self.h5py_dataset.shape
+            if self.__buffered_length == 0:
+                return
+            current_shape = self.h5py_dataset.shape
+            new_length = self.dataset_length + self.__buffered_length
+            if new_length > current_shape[self.grow_dimension]:
                 new_shape = list(current_shape)
-                new_shape[self.grow_dimension] += self.buffered_data.shape[self.grow_dimension]
-                ## Create the required slice to which the new data will be added.
-                ## For example if the 3nd dimension of a 4D datashape (74, 1, 100, 1)
-                ## we want to get the slice (:, :, 100:200, :) in order to add 100 new entries
-                full_slice = slice(None, None, None)
-                slice_to_add = slice(current_shape[self.grow_dimension], new_shape[self.grow_dimension], None)
-                appendTo_address = [full_slice for _ in new_shape]
-                appendTo_address[self.grow_dimension] = slice_to_add
-                ## Do the data reshape and copy the new data
+                if exact_size:
+                    new_shape[self.grow_dimension] = new_length
+                else:
+                    new_shape[self.grow_dimension] = max(new_length, 2 * current_shape[self.grow_dimension])
+                self.h5py_dataset.resize(tuple(new_shape))
+
+            self.h5py_dataset[self.__address(self.dataset_length, new_length)] = self.buffered_data
+            self.dataset_length = new_length
+            self.__buffered_length = 0
+
+
+        def close(self):
+            """
+            Write everything still buffered, and trim the dataset to the length actually written.
+            """
+            self.flush_buffered_data(exact_size=True)
+            if self.h5py_dataset.shape[self.grow_dimension] != self.dataset_length:
+                new_shape = list(self.h5py_dataset.shape)
+                new_shape[self.grow_dimension] = self.dataset_length
                 self.h5py_dataset.resize(tuple(new_shape))
-                self.h5py_dataset[tuple(appendTo_address)] = self.buffered_data
-                self.buffered_data = None
+            self.__buffer = None
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Layout profiles (chunking, compression, checksums) for the datasets created in TVB H5 files.
+
+A profile is chosen for each DataType class, from the current TvbProfile:
+    - HDF5_STORAGE_PROFILE is the name of the profile used by default;
+    - HDF5_STORAGE_PROFILE_BY_TYPE maps DataType class names towards profile names,
+      e.g. "TimeSeries:time_window, ConnectivityMeasure:compressed". Subclasses inherit the profile of their parents.
+"""
+
+from tvb.basic.logger.builder import get_logger
+from tvb.basic.profile import TvbProfile
+
+
+LOG = get_logger(__name__)
+
+# Chunk layouts, relative to the dimension on which a dataset grows (time, for TimeSeries)
+LAYOUT_AUTO = None
+LAYOUT_WINDOW = "window"
+LAYOUT_CHANNEL = "channel"
+
+
+
+class StorageProfile(object):
+    """
+    Describe how datasets should be created in a H5 file.
+    """
+    METADATA_KEY = "Storage_profile"
+
+
+    def __init__(self, name, chunk_layout=LAYOUT_AUTO, compression=None, compression_opts=None,
+                 shuffle=False, fletcher32=False, chunk_bytes=1024 * 1024):
+        """
+        :param chunk_layout: LAYOUT_AUTO lets h5py decide; LAYOUT_WINDOW makes chunks span all the other dimensions,
+            for reading windows along the growing dimension; LAYOUT_CHANNEL makes chunks long only along the
+            growing dimension, for reading one channel at a time
+        :param compression: None, 'gzip' or 'lzf'
+        :param chunk_bytes: approximate size of a chunk, when the layout is not automatic
+        """
+        self.name = name
+        self.chunk_layout = chunk_layout
+        self.compression = compression
+        self.compression_opts = compression_opts
+        self.shuffle = shuffle
+        self.fletcher32 = fletcher32
+        self.chunk_bytes = chunk_bytes
+
+
+    @property
+    def is_default(self):
+        return (self.chunk_layout is LAYOUT_AUTO and self.compression is None
+                and not self.shuffle and not self.fletcher32)
+
+
+    def compute_chunks(self, shape, itemsize, grow_dimension, resizable):
+        """
+        :returns: chunk shape for a dataset with the given shape, or None when h5py should decide
+        """
+        if self.chunk_layout is LAYOUT_AUTO or len(shape) == 0:
+            return None
+        grow_dimension = grow_dimension % len(shape)
+
+        chunks = [max(dim, 1) for dim in shape]
+        if self.chunk_layout == LAYOUT_CHANNEL:
+            chunks = [1] * len(shape)
+
+        other_dims_bytes = itemsize
+        for idx, dim in enumerate(chunks):
+            if idx != grow_dimension:
+                other_dims_bytes *= dim
+        chunks[grow_dimension] = max(1, self.chunk_bytes // other_dims_bytes)
+        if not resizable:
+            chunks[grow_dimension] = min(chunks[grow_dimension], max(shape[grow_dimension], 1))
+        return tuple(chunks)
+
+
+    def dataset_kwargs(self, data, grow_dimension=0, resizable=False):
+        """
+        :param data: numpy array to be written in a new dataset
+        :returns: dictionary of arguments for h5py create_dataset
+        """
+        if self.is_default or data.dtype.kind not in 'biufc' or data.size == 0:
+            return {}
+        kwargs = {'shuffle': self.shuffle, 'fletcher32': self.fletcher32}
+        if self.compression is not None:
+            kwargs['compression'] = self.compression
+            if self.compression_opts is not None:
+                kwargs['compression_opts'] = self.compression_opts
+        chunks = self.compute_chunks(data.shape, data.dtype.itemsize, grow_dimension, resizable)
+        if chunks is not None:
+            kwargs['chunks'] = chunks
+        return kwargs
+
+
+    def __repr__(self):
+        return "StorageProfile(%s)" % self.name
+
+
+
+DEFAULT_PROFILE = StorageProfile("default")
+
+STORAGE_PROFILES = dict((profile.name, profile) for profile in [
+    DEFAULT_PROFILE,
+    StorageProfile("time_window", chunk_layout=LAYOUT_WINDOW, compression="lzf", shuffle=True),
+    # Reading one node over all time is fast, at the price of slower appends along time
+    StorageProfile("channel", chunk_layout=LAYOUT_CHANNEL, compression="lzf", shuffle=True, chunk_bytes=64 * 1024),
+    StorageProfile("compressed", compression="gzip", compression_opts=4, shuffle=True, fletcher32=True),
+    StorageProfile("time_window_gzip", chunk_layout=LAYOUT_WINDOW, compression="gzip", compression_opts=4,
+                   shuffle=True, fletcher32=True),
+])
+
+
+def parse_profiles_by_type(config_value):
+    """
+    :param config_value: string like "TimeSeries:time_window, ConnectivityMeasure:compressed"
+    :returns: dictionary {class name: profile name}
+    """
+    result = {}
+    for entry in (config_value or "").split(","):
+        if ":" not in entry:
+            continue
+        class_name, profile_name = entry.split(":", 1)
+        result[class_name.strip()] = profile_name.strip()
+    return result
+
+
+def get_profile_by_name(profile_name):
+    if profile_name not in STORAGE_PROFILES:
+        LOG.warning("Unknown H5 storage profile %s, using the default one." % profile_name)
+        return DEFAULT_PROFILE
+    return STORAGE_PROFILES[profile_name]
+
+
+def get_storage_profile(datatype_class=None):
+    """
+    Find the StorageProfile configured for a DataType class, or its closest configured parent class.
+    """
+    by_type = parse_profiles_by_type(TvbProfile.current.HDF5_STORAGE_PROFILE_BY_TYPE)
+    if datatype_class is not None:
+        for klass in datatype_class.__mro__:
+            if klass.__name__ in by_type:
+                return get_profile_by_name(by_type[klass.__name__])
+    return get_profile_by_name(TvbProfile.current.HDF5_STORAGE_PROFILE)
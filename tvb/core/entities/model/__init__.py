@@ -42,5 +42,6 @@ from tvb.core.entities.model.model_operation import *
 from tvb.core.entities.model.model_workflow import *
 from tvb.core.entities.model.model_datatype import *
 from tvb.core.entities.model.model_burst import *
+from tvb.core.entities.model.model_disk_usage import *
 
     
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Change of DB structure from TVB version 1.5.8 to TVB 1.5.9:
+store the resources used by finished operations, for estimating the needs of new ones,
+and keep disk usage counters for users, projects and bursts.
+"""
+
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+
+
+
+def upgrade(migrate_engine):
+    """
+    Create the new tables OPERATION_RESOURCE_USAGE and DISK_USAGE, then fill the disk usage counters.
+    """
+    model.OperationResourceUsage.__table__.create(bind=migrate_engine, checkfirst=True)
+    model.DiskUsage.__table__.create(bind=migrate_engine, checkfirst=True)
+    dao.rebuild_disk_usage_counters()
+
+
+
+def downgrade(migrate_engine):
+    """
+    Drop tables OPERATION_RESOURCE_USAGE and DISK_USAGE.
+    """
+    model.OperationResourceUsage.__table__.drop(bind=migrate_engine, checkfirst=True)
+    model.DiskUsage.__table__.drop(bind=migrate_engine, checkfirst=True)
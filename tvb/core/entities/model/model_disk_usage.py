@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Disk usage counters for users, projects and bursts.
+They are updated on each DataType insert, update and delete (in the same flush), so reading the disk usage
+does not need to SUM over all DataTypes. `dao.rebuild_disk_usage_counters` recomputes them from scratch.
+"""
+
+from sqlalchemy import BigInteger, Integer, String, Column, UniqueConstraint, event, inspect, select, and_
+from tvb.core.entities.model.model_base import Base
+from tvb.core.entities.model.model_project import Project, User
+from tvb.core.entities.model.model_operation import Operation
+from tvb.core.entities.model.model_burst import BurstConfiguration
+from tvb.core.entities.model.model_datatype import DataType
+
+
+
+class DiskUsage(Base):
+    """
+    Total disk size (kB) of the DataTypes of a user, project or burst.
+    User and project totals include DataTypeGroups, burst totals do not (these already sum their members).
+    """
+    __tablename__ = "DISK_USAGE"
+    __table_args__ = (UniqueConstraint('scope', 'fk_entity'),)
+
+    SCOPE_USER = "user"
+    SCOPE_PROJECT = "project"
+    SCOPE_BURST = "burst"
+
+    id = Column(Integer, primary_key=True)
+    scope = Column(String, nullable=False)
+    fk_entity = Column(Integer, nullable=False)
+    disk_size = Column(BigInteger, default=0, nullable=False)
+
+
+    def __init__(self, scope, entity_id, disk_size=0):
+        self.scope = scope
+        self.fk_entity = entity_id
+        self.disk_size = disk_size
+
+
+
+def _datatype_contributions(connection, operation_id, burst_id, datatype_type, disk_size):
+    """
+    :returns: list of (scope, entity id, size) which one DataType adds to the counters
+    """
+    if not disk_size:
+        return []
+    contributions = []
+    if operation_id is not None:
+        operation_row = connection.execute(select([Operation.fk_launched_by, Operation.fk_launched_in]
+                                                  ).where(Operation.id == operation_id)).first()
+        if operation_row is not None:
+            contributions.append((DiskUsage.SCOPE_USER, operation_row[0], disk_size))
+            contributions.append((DiskUsage.SCOPE_PROJECT, operation_row[1], disk_size))
+    if burst_id is not None and datatype_type != "DataTypeGroup":
+        contributions.append((DiskUsage.SCOPE_BURST, burst_id, disk_size))
+    return contributions
+
+
+
+def _apply_contributions(connection, contributions, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) the contributions. Missing counters (not rebuilt yet) are left missing.
+    """
+    table = DiskUsage.__table__
+    for scope, entity_id, size in contributions:
+        connection.execute(table.update().where(and_(table.c.scope == scope, table.c.fk_entity == entity_id)
+                                                ).values(disk_size=table.c.disk_size + sign * size))
+
+
+
+def _previous_value(state, attribute_name):
+    history = state.attrs[attribute_name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, attribute_name)
+
+
+
+@event.listens_for(DataType, 'after_insert', propagate=True)
+def _datatype_inserted(_mapper, connection, target):
+    _apply_contributions(connection, _datatype_contributions(connection, target.fk_from_operation,
+                                                             target.fk_parent_burst, target.type,
+                                                             target.disk_size), 1)
+
+
+
+@event.listens_for(DataType, 'after_update', propagate=True)
+def _datatype_updated(_mapper, connection, target):
+    state = inspect(target)
+    tracked = ('fk_from_operation', 'fk_parent_burst', 'type', 'disk_size')
+    if not any(state.attrs[name].history.has_changes() for name in tracked):
+        return
+    previous = [_previous_value(state, name) for name in tracked]
+    _apply_contributions(connection, _datatype_contributions(connection, *previous), -1)
+    _apply_contributions(connection, _datatype_contributions(connection, target.fk_from_operation,
+                                                             target.fk_parent_burst, target.type,
+                                                             target.disk_size), 1)
+
+
+
+@event.listens_for(DataType, 'after_delete', propagate=True)
+def _datatype_deleted(_mapper, connection, target):
+    _apply_contributions(connection, _datatype_contributions(connection, target.fk_from_operation,
+                                                             target.fk_parent_burst, target.type,
+                                                             target.disk_size), -1)
+
+
+
+def _counter_listeners(scope):
+    """
+    Create an empty counter together with each new User, Project or BurstConfiguration, and remove it after.
+    """
+
+    def _entity_inserted(_mapper, connection, target):
+        connection.execute(DiskUsage.__table__.insert().values(scope=scope, fk_entity=target.id, disk_size=0))
+
+
+    def _entity_deleted(_mapper, connection, target):
+        table = DiskUsage.__table__
+        connection.execute(table.delete().where(and_(table.c.scope == scope, table.c.fk_entity == target.id)))
+
+
+    return _entity_inserted, _entity_deleted
+
+
+
+for _entity_class, _scope in ((User, DiskUsage.SCOPE_USER), (Project, DiskUsage.SCOPE_PROJECT),
+                              (BurstConfiguration, DiskUsage.SCOPE_BURST)):
+    _inserted_listener, _deleted_listener = _counter_listeners(_scope)
+    event.listen(_entity_class, 'after_insert', _inserted_listener)
+    event.listen(_entity_class, 'after_delete', _deleted_listener)
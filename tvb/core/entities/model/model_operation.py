@@ -39,7 +39,7 @@ Here we define entities for Operations and Algorithms.
 import json
 import datetime
 from sqlalchemy.orm import relationship, backref
-from sqlalchemy import Boolean, Integer, String, DateTime, Column, ForeignKey
+from sqlalchemy import Boolean, Integer, BigInteger, Float, String, DateTime, Column, ForeignKey
 from tvb.basic.logger.builder import get_logger
 from tvb.config import TVB_IMPORTER_CLASS, TVB_IMPORTER_MODULE
 from tvb.core.utils import string2date, generate_guid
@@ -473,6 +473,32 @@ class OperationProcessIdentifier(Base):
 
 
 
+class OperationResourceUsage(Base):
+    """
+    Resources (execution time, peak memory and disk) used by a finished operation, together with the
+    input dimensions which drove them. Used for estimating the needs of new operations of the same algorithm.
+    """
+    __tablename__ = "OPERATION_RESOURCE_USAGE"
+
+    id = Column(Integer, primary_key=True)
+    fk_from_operation = Column(Integer, ForeignKey('OPERATIONS.id', ondelete="SET NULL"), nullable=True)
+    fk_from_algo = Column(Integer, ForeignKey('ALGORITHMS.id', ondelete="CASCADE"))
+    input_dimensions = Column(String)
+    execution_time = Column(Float)
+    peak_memory = Column(BigInteger)
+    disk_size = Column(BigInteger)
+
+
+    def __init__(self, algorithm_id, input_dimensions, execution_time, peak_memory, disk_size, operation_id=None):
+        self.fk_from_algo = algorithm_id
+        self.fk_from_operation = operation_id
+        self.input_dimensions = json.dumps(input_dimensions)
+        self.execution_time = execution_time
+        self.peak_memory = peak_memory
+        self.disk_size = disk_size
+
+
+
 class ResultFigure(Base, Exportable):
     """
     Class for storing figures from results, visualize them eventually next to each other.
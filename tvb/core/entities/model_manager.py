@@ -65,8 +65,7 @@ def initialize_startup():
             shutil.rmtree(versions_repo)
         migratesqlapi.create(versions_repo, os.path.split(versions_repo)[1])
         _update_sql_scripts()
-        migratesqlapi.version_control(TvbProfile.current.db.DB_URL, versions_repo,
-                                      version=TvbProfile.current.version.DB_STRUCTURE_VERSION)
+        migratesqlapi.version_control(TvbProfile.current.db.DB_URL, versions_repo, version=_get_db_version())
         session = SA_SESSIONMAKER()
         model.Base.metadata.create_all(bind=session.connection())
         session.commit()
@@ -74,13 +73,49 @@ def initialize_startup():
         LOGGER.info("Database Default Tables created successfully!")
     else:
         _update_sql_scripts()
-        migratesqlapi.upgrade(TvbProfile.current.db.DB_URL, versions_repo,
-                              version=TvbProfile.current.version.DB_STRUCTURE_VERSION)
+        migratesqlapi.upgrade(TvbProfile.current.db.DB_URL, versions_repo, version=_get_db_version())
         LOGGER.info("Database already has some data, will not be re-created!")
+        _check_tables_exist(model.OperationResourceUsage, model.DiskUsage)
     return is_db_empty
 
 
 
+def _get_db_version():
+    """
+    :returns: the DB structure version to bring the database to. This is the library DB_STRUCTURE_VERSION, unless
+              db_update_scripts holds newer scripts (e.g. 018, adding the tables OPERATION_RESOURCE_USAGE and
+              DISK_USAGE), released before the library setting was raised to their number.
+    """
+    scripts_folder = os.path.dirname(scripts.__file__)
+    script_versions = [int(file_name.split('_')[0]) for file_name in os.listdir(scripts_folder)
+                       if file_name.endswith('_update_db.py') and file_name.split('_')[0].isdigit()]
+    library_version = TvbProfile.current.version.DB_STRUCTURE_VERSION
+    latest_script = max(script_versions) if script_versions else library_version
+    if latest_script > library_version:
+        LOGGER.info("DB update scripts reach version %d, ahead of DB_STRUCTURE_VERSION %d"
+                    % (latest_script, library_version))
+    return max(library_version, latest_script)
+
+
+
+def _check_tables_exist(*entities):
+    """
+    Warn about tables missing after the DB upgrade: features storing into them (operation resources
+    estimates, disk usage counters) will not record anything, as their storage errors are only logged.
+    """
+    session = SA_SESSIONMAKER()
+    try:
+        existing_tables = set(table.upper() for table in
+                              reflection.Inspector.from_engine(session.connection()).get_table_names())
+    finally:
+        session.close()
+    for entity in entities:
+        if entity.__tablename__.upper() not in existing_tables:
+            LOGGER.warning("Table %s is missing from the database, it should have been created by the DB "
+                           "update scripts!" % entity.__tablename__)
+
+
+
 def reset_database():
     """
     Remove all tables in DB.
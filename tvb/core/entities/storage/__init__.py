@@ -40,7 +40,7 @@ because they are too many to easily follow.
 
 """
 
-from tvb.core.entities.storage.session_maker import transactional, SA_SESSIONMAKER
+from tvb.core.entities.storage.session_maker import transactional, unit_of_work, SA_SESSIONMAKER
 from tvb.core.entities.storage.project_dao import CaseDAO
 from tvb.core.entities.storage.datatype_dao import DatatypeDAO
 from tvb.core.entities.storage.operation_dao import OperationDAO
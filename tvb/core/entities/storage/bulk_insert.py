@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Insert many new entities of a class with SQLAlchemy core statements, instead of one ORM flush and commit each.
+Used by the DAO layer when launching large bursts.
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.sql import text
+from tvb.basic.profile import TvbProfile
+
+
+BULK_INSERT_BATCH_SIZE = 500
+
+
+
+def insert_entities(session, entities_list, batch_size=BULK_INSERT_BATCH_SIZE):
+    """
+    Insert new entities (of classes mapped on a single table each, with an integer `id` primary key).
+    The caller commits. On return each entity has its `id` set and is detached, like after `dao.store_entity`.
+    ORM relationships are not cascaded, set the foreign key columns instead.
+    """
+    if not entities_list:
+        return entities_list
+    entity_classes = set(entity.__class__ for entity in entities_list)
+    if len(entity_classes) > 1:
+        for entity_class in entity_classes:
+            insert_entities(session, [entity for entity in entities_list if entity.__class__ is entity_class],
+                            batch_size)
+        return entities_list
+
+    mapper = inspect(entities_list[0].__class__)
+    table = mapper.local_table
+    columns = [(prop.key, prop.columns[0]) for prop in mapper.column_attrs if prop.columns[0].table is table]
+
+    rows = []
+    for entity in entities_list:
+        row = {}
+        for attribute_name, column in columns:
+            value = getattr(entity, attribute_name)
+            if value is None and column.default is not None and not column.primary_key:
+                value = column.default.arg(None) if column.default.is_callable else column.default.arg
+            row[column.key] = value
+        rows.append(row)
+
+    if TvbProfile.current.db.SELECTED_DB == 'postgres':
+        new_ids = _next_sequence_values(session, table, len(rows))
+        first_pending = 0
+    else:
+        # SQLite: insert the first row for its id. The DB stays locked for writing until commit, so the next ids
+        # are free for the rest of the rows.
+        first_id = session.execute(table.insert(), rows[0]).inserted_primary_key[0]
+        new_ids = range(first_id, first_id + len(rows))
+        first_pending = 1
+
+    for row, entity_id in zip(rows, new_ids):
+        row['id'] = entity_id
+    for start in range(first_pending, len(rows), batch_size):
+        session.execute(table.insert(), rows[start:start + batch_size])
+
+    for entity, row in zip(entities_list, rows):
+        entity.id = row['id']
+        make_transient_to_detached(entity)
+    return entities_list
+
+
+
+def _next_sequence_values(session, table, count):
+    """
+    :returns: `count` new values from the PostgreSQL sequence of the `id` column of the given table
+    """
+    result = session.execute(text("SELECT nextval(pg_get_serial_sequence(:table_name, 'id')) "
+                                  "FROM generate_series(1, :count)"),
+                             {'table_name': '"%s"' % table.name, 'count': count})
+    return sorted(row[0] for row in result)
@@ -37,7 +37,7 @@ DAO operations related to generic DataTypes are defined here.
 
 from sqlalchemy import func, or_, not_, and_
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.sql import text
+from sqlalchemy.sql import text, bindparam
 from sqlalchemy.orm import aliased
 from sqlalchemy.sql.expression import desc, cast
 from sqlalchemy.types import Text
@@ -158,12 +158,20 @@ class DatatypeDAO(RootDAO):
         # For those bursts the size will be zero
         ret = {b_id: 0 for b_id in burst_ids}
         try:
-            query = self.session.query(model.DataType.fk_parent_burst, func.sum(model.DataType.disk_size)
-                        ).group_by(model.DataType.fk_parent_burst
-                        ).filter(model.DataType.type != "DataTypeGroup"
-                        ).filter(model.DataType.fk_parent_burst.in_(burst_ids))
-            for b_id, size in query.all():
+            counters = self.session.query(model.DiskUsage.fk_entity, model.DiskUsage.disk_size
+                                          ).filter(model.DiskUsage.scope == model.DiskUsage.SCOPE_BURST
+                                          ).filter(model.DiskUsage.fk_entity.in_(burst_ids)).all()
+            for b_id, size in counters:
                 ret[b_id] = size or 0
+            # Bursts without a counter (not rebuilt since the DB update) are summed here
+            not_counted = list(set(burst_ids) - set(b_id for b_id, _ in counters))
+            if not_counted:
+                query = self.session.query(model.DataType.fk_parent_burst, func.sum(model.DataType.disk_size)
+                            ).group_by(model.DataType.fk_parent_burst
+                            ).filter(model.DataType.type != "DataTypeGroup"
+                            ).filter(model.DataType.fk_parent_burst.in_(not_counted))
+                for b_id, size in query.all():
+                    ret[b_id] = size or 0
         except SQLAlchemyError as excep:
             self.logger.exception(excep)
         return ret
@@ -228,6 +236,47 @@ class DatatypeDAO(RootDAO):
         return resulted_data
 
 
+    def get_datatypes_to_upgrade(self, after_id=0, page_size=500):
+        """
+        Return the minimal information needed for locating the H5 files of DataTypes, ordered by id.
+        Paging by id (instead of offset) keeps each page equally fast, and allows resuming after a given id.
+
+        :param after_id: only DataTypes with a larger id are returned
+        :returns: list of tuples (id, gid, type, module, operation id, project name)
+        """
+        resulted_data = []
+        try:
+            resulted_data = self.session.query(model.DataType.id, model.DataType.gid, model.DataType.type,
+                                               model.DataType.module, model.DataType.fk_from_operation,
+                                               model.Project.name
+                                               ).outerjoin(model.Operation,
+                                                           model.DataType.fk_from_operation == model.Operation.id
+                                               ).outerjoin(model.Project,
+                                                           model.Operation.fk_launched_in == model.Project.id
+                                               ).filter(model.DataType.id > after_id
+                                               ).order_by(model.DataType.id).limit(max(page_size, 0)).all()
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+        return resulted_data
+
+
+    def update_datatypes_after_upgrade(self, disk_sizes, invalid_ids):
+        """
+        Store in one go the results of upgrading a page of DataTypes.
+
+        :param disk_sizes: dictionary {DataType id: new disk size}
+        :param invalid_ids: ids of the DataTypes to be marked invalid
+        """
+        table = model.DataType.__table__
+        if disk_sizes:
+            self.session.execute(table.update().where(table.c.id == bindparam('datatype_id')
+                                                      ).values(disk_size=bindparam('new_size')),
+                                 [{'datatype_id': dt_id, 'new_size': size} for dt_id, size in disk_sizes.items()])
+        if invalid_ids:
+            self.session.execute(table.update().where(table.c.id.in_(invalid_ids)).values(invalid=True))
+        self.session.commit()
+
+
     def count_datatypes_generated_from(self, datatype_gid):
         """
         Returns a count of all the datatypes that were generated by an operation
@@ -379,6 +428,23 @@ class DatatypeDAO(RootDAO):
         return result_dt
 
 
+    def get_datatype_ids_by_gids(self, gids, page_size=500):
+        """
+        Find which of the given GIDs are already stored, with one IN query per page of GIDs.
+        :returns: dictionary {gid: DataType id}, only for the GIDs found in DB
+        """
+        result = {}
+        gids = list(gids)
+        try:
+            for start_idx in range(0, len(gids), page_size):
+                page = gids[start_idx:start_idx + page_size]
+                query = self.session.query(model.DataType.gid, model.DataType.id).filter(model.DataType.gid.in_(page))
+                result.update(query.all())
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+        return result
+
+
     def get_datatype_by_gid(self, gid, load_lazy=True):
         """
         Retrieve a DataType DB reference by a global identifier.
@@ -148,6 +148,19 @@ class OperationDAO(RootDAO):
         return result
 
 
+    def get_resource_usage_for_algorithm(self, algorithm_id, limit):
+        """
+        :returns: the latest OperationResourceUsage records (at most `limit`) stored for the given algorithm.
+        """
+        try:
+            return self.session.query(model.OperationResourceUsage
+                                      ).filter(model.OperationResourceUsage.fk_from_algo == algorithm_id
+                                               ).order_by(desc(model.OperationResourceUsage.id)).limit(limit).all()
+        except SQLAlchemyError as excep:
+            self.logger.exception(excep)
+            return []
+
+
     def get_operations_in_group(self, operation_group_id, is_count=False,
                                 only_first_operation=False, only_gids=False):
         """
@@ -447,7 +460,9 @@ class OperationDAO(RootDAO):
     def get_category_by_id(self, categ_id):
         """Retrieve category with given id"""
         try:
-            result = self.session.query(model.AlgorithmCategory).filter_by(id=categ_id).one()
+            result = self.session.query(model.AlgorithmCategory).get(categ_id)
+            if result is None:
+                raise NoResultFound("No category found for id %s" % categ_id)
         except SQLAlchemyError as excep:
             self.logger.exception(excep)
             result = None
@@ -472,7 +487,11 @@ class OperationDAO(RootDAO):
 
     def get_algorithm_by_id(self, algorithm_id):
         try:
-            result = self.session.query(model.Algorithm).filter_by(id=algorithm_id).one()
+            # get() is answered from the identity map, when already loaded in the current unit of work
+            result = self.session.query(model.Algorithm).get(algorithm_id)
+            if result is None:
+                # Same outcome as with query.one() before
+                raise NoResultFound("No algorithm found for id %s" % algorithm_id)
             result.algorithm_category
             return result
         except SQLAlchemyError as ex:
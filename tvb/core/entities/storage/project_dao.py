@@ -59,7 +59,9 @@ class CaseDAO(RootDAO):
         """Retrieve USER entity by ID."""
         user = None
         try:
-            user = self.session.query(model.User).filter_by(id=user_id).one()
+            user = self.session.query(model.User).get(user_id)
+            if user is None:
+                raise NoResultFound("No user found for id %s" % user_id)
         except SQLAlchemyError:
             self.logger.exception("Could not retrieve user for id " + str(user_id))
         return user
@@ -160,13 +162,48 @@ class CaseDAO(RootDAO):
         :returns 0 when no DT are found, or SUM from DB.
         """
         try:
-            total_size = self.session.query(func.sum(model.DataType.disk_size)).join(model.Operation
-                                        ).filter(model.Operation.fk_launched_by == user_id).scalar()
+            total_size = self.session.query(model.DiskUsage.disk_size
+                                            ).filter_by(scope=model.DiskUsage.SCOPE_USER, fk_entity=user_id).scalar()
+            if total_size is None:
+                # No counter yet for this user (not rebuilt since the DB update)
+                total_size = self.session.query(func.sum(model.DataType.disk_size)).join(model.Operation
+                                            ).filter(model.Operation.fk_launched_by == user_id).scalar()
             return total_size or 0
         except SQLAlchemyError as excep:
             self.logger.exception(excep)
             return -1
 
+
+    def rebuild_disk_usage_counters(self):
+        """
+        Recompute from scratch the disk usage counters of all users, projects and bursts.
+        :returns: the number of counters stored
+        """
+        datatypes_per_operation = self.session.query(model.DataType.disk_size, model.Operation.fk_launched_by,
+                                                     model.Operation.fk_launched_in
+                                                     ).join(model.Operation).subquery()
+        user_sizes = dict(self.session.query(datatypes_per_operation.c.fk_launched_by,
+                                             func.sum(datatypes_per_operation.c.disk_size)
+                                             ).group_by(datatypes_per_operation.c.fk_launched_by).all())
+        project_sizes = dict(self.session.query(datatypes_per_operation.c.fk_launched_in,
+                                                func.sum(datatypes_per_operation.c.disk_size)
+                                                ).group_by(datatypes_per_operation.c.fk_launched_in).all())
+        burst_sizes = dict(self.session.query(model.DataType.fk_parent_burst, func.sum(model.DataType.disk_size)
+                                              ).filter(model.DataType.type != "DataTypeGroup"
+                                                       ).group_by(model.DataType.fk_parent_burst).all())
+
+        counters = []
+        for scope, entity_class, sizes in ((model.DiskUsage.SCOPE_USER, model.User, user_sizes),
+                                           (model.DiskUsage.SCOPE_PROJECT, model.Project, project_sizes),
+                                           (model.DiskUsage.SCOPE_BURST, model.BurstConfiguration, burst_sizes)):
+            for (entity_id,) in self.session.query(entity_class.id).all():
+                counters.append(model.DiskUsage(scope, entity_id, sizes.get(entity_id) or 0))
+
+        self.session.query(model.DiskUsage).delete()
+        self.session.add_all(counters)
+        self.session.commit()
+        return len(counters)
+
     #
     # PROJECT RELATED METHODS
     #
@@ -204,8 +241,12 @@ class CaseDAO(RootDAO):
         :returns 0 when no DT are found, or SUM from DB.
         """
         try:
-            total_size = self.session.query(func.sum(model.DataType.disk_size)).join(model.Operation
-                                        ).filter(model.Operation.fk_launched_in == project_id).scalar()
+            total_size = self.session.query(model.DiskUsage.disk_size
+                                            ).filter_by(scope=model.DiskUsage.SCOPE_PROJECT, fk_entity=project_id
+                                                        ).scalar()
+            if total_size is None:
+                total_size = self.session.query(func.sum(model.DataType.disk_size)).join(model.Operation
+                                            ).filter(model.Operation.fk_launched_in == project_id).scalar()
             return total_size or 0
         except SQLAlchemyError as excep:
             self.logger.exception(excep)
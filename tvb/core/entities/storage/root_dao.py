@@ -75,12 +75,15 @@ class RootDAO(object):
         return saved_entity
 
 
-    def store_entities(self, entities_list):
+    def store_entities(self, entities_list, reload=True):
         """
-        Store in DB a list of generic entities.
+        Store in DB a list of generic entities, in one transaction.
+        :param reload: when False, the given entities (with their ids filled) are returned, without querying them again
         """
         self.session.add_all(entities_list)
         self.session.commit()
+        if not reload:
+            return entities_list
 
         stored_entities = []
         for entity in entities_list:
@@ -103,7 +106,9 @@ class RootDAO(object):
         # Need this since entity has attributes loaded automatically on DB load from 
         # traited DB events. This causes the session to see the entity as dirty and issues
         # an invalid commit() which leaves the entity unattached to any sessions later on.
-        self.session.expunge_all()
+        # Inside a unit of work, the shared identity map is kept (entities seen as dirty get detached on close).
+        if not self.session.is_unit_of_work_session():
+            self.session.expunge_all()
         return result
 
 
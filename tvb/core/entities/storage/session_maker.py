@@ -141,6 +141,7 @@ class SessionsStack(object):
     """
     Helper class that holds a stack of SqlAlchemy's session object and a counter that
     keeps track of how many transactions are opened.
+    While a unit of work is open (and no transaction), all DAO calls reuse the same session.
     """
 
 
@@ -151,6 +152,8 @@ class SessionsStack(object):
         """
         self.sessions_stack = []
         self.open_transactions = 0
+        self.open_units_of_work = 0
+        self.unit_of_work_session = None
 
 
     def close_session(self):
@@ -160,6 +163,11 @@ class SessionsStack(object):
         session if it's not part of a transaction, or just expunge all objects otherwise.
         """
         top_session = self.sessions_stack.pop()
+        if top_session is self.unit_of_work_session:
+            # Shared with the next DAO calls: loaded objects stay in its identity map until the unit of work ends.
+            # DAO methods commit their own changes, nothing else is to be saved silently.
+            self._detach_pending_changes(top_session)
+            return
         if top_session.dirty or top_session.deleted or top_session.new:
             top_session.commit()
         if self.open_transactions == 0:
@@ -176,13 +184,55 @@ class SessionsStack(object):
         Create a new session. If we are part of a transaction we bind it to the parent
         session, otherwise just create a new session.
         """
-        if self.open_transactions == 0:
+        if self.open_transactions == 0 and self.unit_of_work_session is not None:
+            # Changes done by the caller on loaded entities are saved only when given to a DAO store method
+            self._detach_pending_changes(self.unit_of_work_session)
+            new_session = self.unit_of_work_session
+        elif self.open_transactions == 0:
             new_session = SA_SESSIONMAKER()
         else:
             new_session = SA_SESSIONMAKER(bind=self.sessions_stack[-1].connection())
         self.sessions_stack.append(new_session)
 
 
+    def start_unit_of_work(self):
+        """
+        Open a session to be reused by all the DAO calls until the matching `close_unit_of_work`.
+        Units of work can be nested, only the outer one has effect. Inside a transaction they are ignored.
+        """
+        self.open_units_of_work += 1
+        if self.open_units_of_work == 1 and self.open_transactions == 0:
+            self.unit_of_work_session = SA_SESSIONMAKER()
+
+
+    def close_unit_of_work(self):
+        """
+        Close the shared session, when this is the outer unit of work. Loaded entities remain usable, detached.
+        """
+        if not self.open_units_of_work:
+            raise InvalidTransactionAccess("You are trying to close a unit of work that was not started.")
+        self.open_units_of_work -= 1
+        if self.open_units_of_work == 0 and self.unit_of_work_session is not None:
+            unit_session = self.unit_of_work_session
+            self.unit_of_work_session = None
+            self._detach_pending_changes(unit_session)
+            unit_session.close()
+
+
+    @staticmethod
+    def _detach_pending_changes(session):
+        """
+        Expunge the entities with changes not committed, from the session shared by a unit of work.
+        They keep their changes, but these are saved only if the entity is given to a DAO store method,
+        as happens with the detached entities returned outside of a unit of work.
+        """
+        pending = list(session.dirty) + list(session.new) + list(session.deleted)
+        if pending:
+            LOGGER.debug("Detaching %d entities with changes not committed in the unit of work" % len(pending))
+            for entity in pending:
+                session.expunge(entity)
+
+
     @property
     def current_session(self):
         """
@@ -240,20 +290,32 @@ class SessionsStack(object):
 
 
 
+class _ThreadSessionsStack(threading.local):
+    """
+    Thread-local holder of a SessionsStack. Each thread sees its own stack, created lazily on first access,
+    and dropped by Python when the thread exits.
+    """
+
+
+    def __init__(self):
+        self.stack = SessionsStack()
+
+
+
 @singleton
 class SessionMaker(object):
     """
     This is our custom SessionMaker class, aggregating SessionsStack class.
     It has the purpose of obtaining a new SessionsStack for each thread.
-    When calling self.session._something_ our mechanism comes in place and checks having a new stack for every threadID.
+    When calling self.session._something_ our mechanism comes in place and uses the stack of the current thread.
     """
 
 
     def __init__(self):
         """
-        Initialize a dictionary with thread : session pairs to make sure we are thread-safe.
+        Sessions stacks are kept in thread-local storage, so no lock nor cleanup of finished threads is needed.
         """
-        self.handled_sessions = {threading.current_thread(): SessionsStack()}
+        self._thread_sessions = _ThreadSessionsStack()
 
 
     def __getattr__(self, name):
@@ -261,68 +323,69 @@ class SessionMaker(object):
         __getattr__ is only called if `name` was not found in standard lookup (e.g. class or super-class attributes)
         In that case just delegate to the corresponding SQLAlchemy session.
         """
-        current_thread = threading.current_thread()
-        if current_thread not in self.handled_sessions:
-            # This if first session for a new threads. Just create a new one.
-            self.handled_sessions[current_thread] = SessionsStack()
-        for thread in self.handled_sessions.keys():
-            # If thread finished we just delete entry to avoid dangling unused objects.
-            if not thread.isAlive():
-                try:
-                    del self.handled_sessions[thread]
-                except Exception:
-                    ### Ignore this error because a concurrent thread might have removed this meanwhile.
-                    pass
-        delegate_method = getattr(self.handled_sessions[current_thread].current_session, name)
-        return delegate_method
+        return getattr(self._thread_sessions.stack.current_session, name)
 
 
     def open_session(self):
         """
         Open a new session for the current thread.
         """
-        current_thread = threading.current_thread()
-        if current_thread not in self.handled_sessions:
-            self.handled_sessions[current_thread] = SessionsStack()
-        self.handled_sessions[current_thread].open_session()
+        self._thread_sessions.stack.open_session()
 
 
     def close_session(self):
         """
         Close the session for the current thread.
         """
-        current_thread = threading.current_thread()
-        self.handled_sessions[current_thread].close_session()
+        self._thread_sessions.stack.close_session()
 
 
     def rollback_transaction(self):
         """
         Rollback a transaction for the current thread.
         """
-        current_thread = threading.current_thread()
-        self.handled_sessions[current_thread].rollback_transaction()
+        self._thread_sessions.stack.rollback_transaction()
 
 
     def start_transaction(self):
         """
         Start a new transaction for the current thread.
         """
-        current_thread = threading.current_thread()
-        if current_thread not in self.handled_sessions:
-            self.handled_sessions[current_thread] = SessionsStack()
-        self.handled_sessions[current_thread].start_transaction()
+        self._thread_sessions.stack.start_transaction()
 
 
     def close_transaction(self):
         """
         Close a transaction for the current thread.
         """
-        current_thread = threading.current_thread()
-        self.handled_sessions[current_thread].close_transaction()
+        self._thread_sessions.stack.close_transaction()
+
+
+    def is_unit_of_work_session(self):
+        """
+        :returns: True when the current DAO call uses the session shared by a unit of work.
+        """
+        stack = self._thread_sessions.stack
+        return stack.unit_of_work_session is not None and stack.current_session is stack.unit_of_work_session
+
+
+    def start_unit_of_work(self):
+        """
+        Start sharing one session between the next DAO calls of the current thread.
+        """
+        self._thread_sessions.stack.start_unit_of_work()
+
+
+    def close_unit_of_work(self):
+        """
+        Stop sharing the session between DAO calls of the current thread.
+        """
+        self._thread_sessions.stack.close_unit_of_work()
+
 
 
 ###
-### PUBLIC EXPOSED ENTITIES FOR USAGE: 2 decorators and 1 meta-class-factory.
+### PUBLIC EXPOSED ENTITIES FOR USAGE: 3 decorators and 1 meta-class-factory.
 ### 
 
 def transactional(func):
@@ -354,6 +417,30 @@ def transactional(func):
 
 
 
+def unit_of_work(func):
+    """
+    Decorator that makes all DAO calls resulting from the decorated method share one session, and thus one
+    connection and one identity map. Entities loaded by id a second time are served from that identity map.
+    Meant for read-mostly service and controller methods, e.g. rendering a page.
+    """
+
+    @wraps(func)
+    def dec(*args, **kwargs):
+        """
+        Decorate methods.
+        """
+        session_maker = SessionMaker()
+        session_maker.start_unit_of_work()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session_maker.close_unit_of_work()
+
+
+    return dec
+
+
+
 def add_session(func):
     """
     Decorator that handles session related precautions before/after method call.
@@ -38,6 +38,7 @@ from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql.expression import desc, not_, or_
 from tvb.core.entities import model
 from tvb.core.entities.storage.root_dao import RootDAO
+from tvb.core.entities.storage.bulk_insert import insert_entities
 
 
 class WorkflowDAO(RootDAO):
@@ -46,6 +47,35 @@ class WorkflowDAO(RootDAO):
     """
 
 
+    def store_workflows_with_steps(self, workflows, workflow_steps):
+        """
+        Insert new Workflows, each with its first WorkflowStep (at the same position in `workflow_steps`),
+        in batches and a single transaction.
+        """
+        insert_entities(self.session, workflows)
+        for workflow, step in zip(workflows, workflow_steps):
+            step.fk_workflow = workflow.id
+        insert_entities(self.session, workflow_steps)
+        self.session.commit()
+        return workflows
+
+
+    def store_workflow_steps_with_operations(self, workflow_steps, operations):
+        """
+        Insert new WorkflowSteps together with the Operations they launch, in batches and a single transaction.
+
+        :param operations: list as long as `workflow_steps`, with the new Operation for each step, or None
+        """
+        new_operations = [operation for operation in operations if operation is not None]
+        insert_entities(self.session, new_operations)
+        for step, operation in zip(workflow_steps, operations):
+            if operation is not None:
+                step.fk_operation = operation.id
+        insert_entities(self.session, workflow_steps)
+        self.session.commit()
+        return new_operations
+
+
     def get_non_validated_entities(self, reference_time):
         """
         Get a list of all categories, portlets and algorithm groups that were not found valid since the reference_time.
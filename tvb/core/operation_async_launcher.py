@@ -77,15 +77,22 @@ def do_operation_launch(operation_id):
         ## p = profiler.Profiler("/Users/lia.domide/TVB/profiler/")
         ## p.run(OperationService().initiate_prelaunch, curent_operation, adapter_instance, {}, **PARAMS)
 
-        OperationService().initiate_prelaunch(curent_operation, adapter_instance, {}, **PARAMS)
+        operation_service = OperationService()
+        operations_batch = operation_service.get_operation_batch(curent_operation, adapter_instance)
+        if len(operations_batch) > 1:
+            operation_service.initiate_batch_prelaunch(operations_batch, adapter_instance)
+        else:
+            operation_service.initiate_prelaunch(curent_operation, adapter_instance, {}, **PARAMS)
         LOGGER.debug("Successfully finished operation " + str(operation_id))
 
     except Exception as excep:
-        LOGGER.error("Could not execute operation " + str(sys.argv[1]))
+        LOGGER.error("Could not execute operation " + str(operation_id))
         LOGGER.exception(excep)
         parent_burst = dao.get_burst_for_operation_id(operation_id)
         if parent_burst is not None:
             WorkflowService().mark_burst_finished(parent_burst, error_message=str(excep))
+        ## When failing before computing its batch, the rest of the batch is still pending: send it on
+        OperationService().launch_pending_batch_members(operation_id)
 
 
 
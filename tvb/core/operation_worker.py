@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Long-lived process executing operations one after the other, to avoid paying the Python start-up
+(imports of numpy, scipy, simulator, adapters, DB connection) for every operation.
+
+It is started by the StandAloneClient (see backend_client.OperationWorker), e.g.:
+    python -m tvb.core.operation_worker TEST_SQLITE_PROFILE
+
+Operation ids are received one per line on stdin. After each operation, a line "DONE operation_id" is written
+on stdout, which is reserved for this protocol (anything else printed by an operation goes to stderr).
+The process ends when stdin gets closed.
+"""
+
+import os
+import sys
+from tvb.basic.profile import TvbProfile
+if __name__ == '__main__':
+    TvbProfile.set_profile(sys.argv[1], True)
+
+from tvb.basic.logger.builder import get_logger
+from tvb.config import SIMULATOR_MODULE
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.core.operation_async_launcher import do_operation_launch
+from tvb.core.services.backend_client import WORKER_DONE_MARKER
+
+
+LOGGER = get_logger(__name__)
+
+
+
+def run_worker(input_stream, output_stream):
+    """
+    Execute operations received on input_stream, until it gets closed.
+    """
+    # Pay the import of the heaviest adapter once, before receiving the first operation
+    __import__(SIMULATOR_MODULE)
+    LOGGER.info("Operation worker %s ready" % os.getpid())
+
+    for line in iter(input_stream.readline, ''):
+        operation_id = line.strip()
+        if not operation_id:
+            continue
+        LOGGER.debug("Worker %s received operation %s" % (os.getpid(), operation_id))
+        do_operation_launch(operation_id)
+        # Do not keep input files open between operations
+        FILE_POOL.close_all()
+        output_stream.write("%s %s\n" % (WORKER_DONE_MARKER, operation_id))
+        output_stream.flush()
+
+    LOGGER.info("Operation worker %s finished" % os.getpid())
+
+
+
+if __name__ == '__main__':
+    # Keep stdout only for the communication with the parent process
+    PROTOCOL_STREAM = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    run_worker(sys.stdin, PROTOCOL_STREAM)
@@ -36,13 +36,16 @@
 
 import os
 import sys
+import atexit
 import signal
+import psutil
 import Queue as queue
 import threading
 from subprocess import Popen, PIPE
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.utils import parse_json_parameters
+from tvb.core.adapters import execution_estimator
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.services.workflow_service import WorkflowService
@@ -56,6 +59,16 @@ LOCKS_QUEUE = queue.Queue(0)
 for i in range(TvbProfile.current.MAX_THREADS_NUMBER):
     LOCKS_QUEUE.put(1)
 
+# Answer of an operation worker, after finishing an operation (see tvb.core.operation_worker)
+WORKER_DONE_MARKER = "DONE"
+
+
+def _subprocess_environment():
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    # anything that was already in $PYTHONPATH should have been reproduced in sys.path
+    return env
+
 
 class OperationExecutor(threading.Thread):
     """
@@ -83,11 +96,7 @@ class OperationExecutor(threading.Thread):
         # We should no longer launch the operation.
         if self.stopped() is False:
 
-            env = os.environ.copy()
-            env['PYTHONPATH'] = os.pathsep.join(sys.path)
-            # anything that was already in $PYTHONPATH should have been reproduced in sys.path
-
-            launched_process = Popen(run_params, stdout=PIPE, stderr=PIPE, env=env)
+            launched_process = Popen(run_params, stdout=PIPE, stderr=PIPE, env=_subprocess_environment())
 
             LOGGER.debug("Storing pid=%s for operation id=%s launched on local machine." % (operation_id,
                                                                                             launched_process.pid))
@@ -105,18 +114,9 @@ class OperationExecutor(threading.Thread):
 
             if returned != 0 and not self.stopped():
                 # Process did not end as expected. (e.g. Segmentation fault)
-                workflow_service = WorkflowService()
-                operation = dao.get_operation_by_id(self.operation_id)
                 LOGGER.error("Operation suffered fatal failure! Exit code: %s Exit message: %s" % (returned,
                                                                                                    subprocess_result))
-
-                workflow_service.persist_operation_state(operation, model.STATUS_ERROR,
-                                                         "Operation failed unexpectedly! Please check the log files.")
-
-                burst_entity = dao.get_burst_for_operation_id(self.operation_id)
-                if burst_entity:
-                    message = "Error in operation process! Possibly segmentation fault."
-                    workflow_service.mark_burst_finished(burst_entity, error_message=message)
+                self._mark_operation_crashed()
 
             del launched_process
 
@@ -125,6 +125,21 @@ class OperationExecutor(threading.Thread):
         LOCKS_QUEUE.put(1)
 
 
+    def _mark_operation_crashed(self):
+        """
+        Set operation (and its burst) in error, when the process executing it died unexpectedly.
+        """
+        workflow_service = WorkflowService()
+        operation = dao.get_operation_by_id(self.operation_id)
+        workflow_service.persist_operation_state(operation, model.STATUS_ERROR,
+                                                 "Operation failed unexpectedly! Please check the log files.")
+
+        burst_entity = dao.get_burst_for_operation_id(self.operation_id)
+        if burst_entity:
+            message = "Error in operation process! Possibly segmentation fault."
+            workflow_service.mark_burst_finished(burst_entity, error_message=message)
+
+
     def stop(self):
         """ Mark current thread for stop"""
         self._stop.set()
@@ -160,20 +175,191 @@ class OperationExecutor(threading.Thread):
         return True
 
 
+class OperationWorker(object):
+    """
+    Long-lived Python process (see tvb.core.operation_worker), which executes operations one after the other.
+    """
+
+
+    def __init__(self):
+        run_params = [TvbProfile.current.PYTHON_INTERPRETER_PATH, '-m', 'tvb.core.operation_worker',
+                      TvbProfile.CURRENT_PROFILE_NAME]
+        self.process = Popen(run_params, stdin=PIPE, stdout=PIPE, env=_subprocess_environment())
+        self.nr_of_operations = 0
+        LOGGER.debug("Started operation worker with pid=%s" % self.pid)
+
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+
+    def run_operation(self, operation_id):
+        """
+        Send an operation to the worker, and wait for it to be finished.
+        :returns: True when the worker executed the operation, False when the worker died meanwhile
+        """
+        try:
+            self.process.stdin.write("%s\n" % operation_id)
+            self.process.stdin.flush()
+            answer = self.process.stdout.readline()
+        except IOError:
+            LOGGER.exception("Could not communicate with operation worker %s" % self.pid)
+            return False
+        self.nr_of_operations += 1
+        return answer.strip() == "%s %s" % (WORKER_DONE_MARKER, operation_id)
+
+
+    def should_retire(self):
+        """
+        :returns: True when this worker executed too many operations or uses too much memory, to be reused.
+        """
+        if self.nr_of_operations >= TvbProfile.current.OPERATION_WORKER_MAX_OPERATIONS:
+            return True
+        try:
+            used_memory = psutil.Process(self.pid).memory_info().rss
+        except psutil.Error:
+            return True
+        return used_memory > TvbProfile.current.OPERATION_WORKER_MAX_MEMORY * 1024 * 1024
+
+
+    def stop(self):
+        """
+        Ask the worker to finish (it will exit when its input gets closed).
+        """
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self.process.wait()
+        LOGGER.debug("Stopped operation worker with pid=%s" % self.pid)
+
+
+
+class OperationWorkerPool(object):
+    """
+    Keep idle OperationWorker processes, ready to receive the next operation.
+    """
+
+
+    def __init__(self):
+        self.idle_workers = []
+        self._lock = threading.Lock()
+
+
+    def start_workers(self, nr_of_workers=None):
+        """
+        Start workers in advance, to have them ready (numpy, simulator, DB connection) when operations arrive.
+        """
+        nr_of_workers = nr_of_workers or TvbProfile.current.MAX_THREADS_NUMBER
+        with self._lock:
+            while len(self.idle_workers) < nr_of_workers:
+                self.idle_workers.append(OperationWorker())
+
+
+    def get_worker(self):
+        with self._lock:
+            while self.idle_workers:
+                worker = self.idle_workers.pop()
+                if worker.is_alive():
+                    return worker
+        return OperationWorker()
+
+
+    def release_worker(self, worker):
+        """
+        Give back a worker after it finished an operation. Dead or retired workers are not reused.
+        """
+        if not worker.is_alive():
+            return
+        if worker.should_retire():
+            LOGGER.info("Recycling operation worker %s after %d operations" % (worker.pid, worker.nr_of_operations))
+            worker.stop()
+            return
+        with self._lock:
+            self.idle_workers.append(worker)
+
+
+    def shutdown(self):
+        with self._lock:
+            workers, self.idle_workers = self.idle_workers, []
+        for worker in workers:
+            worker.stop()
+
+
+
+WORKER_POOL = OperationWorkerPool()
+atexit.register(WORKER_POOL.shutdown)
+
+
+
+class PooledOperationExecutor(OperationExecutor):
+    """
+    Thread in charge for passing an operation to a warm OperationWorker, instead of starting a new process.
+    """
+
+
+    def run(self):
+        # Try to get a spot to launch own operation.
+        LOCKS_QUEUE.get(True)
+
+        # In the exceptional case where the user pressed stop while the Thread startup is done,
+        # We should no longer launch the operation.
+        if self.stopped() is False:
+            worker = WORKER_POOL.get_worker()
+
+            LOGGER.debug("Storing pid=%s for operation id=%s launched in a worker." % (worker.pid, self.operation_id))
+            dao.store_entity(model.OperationProcessIdentifier(self.operation_id, pid=worker.pid))
+
+            if self.stopped():
+                # Stopping an operation means killing the worker executing it.
+                self.stop_pid(worker.pid)
+
+            finished = worker.run_operation(self.operation_id)
+            LOGGER.info("Finished with launch of operation %s" % self.operation_id)
+
+            if not finished and not self.stopped():
+                LOGGER.error("Operation worker %s died while executing operation %s!" % (worker.pid,
+                                                                                         self.operation_id))
+                self._mark_operation_crashed()
+            WORKER_POOL.release_worker(worker)
+
+        # Give back empty spot now that you finished your operation
+        CURRENT_ACTIVE_THREADS.remove(self)
+        LOCKS_QUEUE.put(1)
+
+
+
 class StandAloneClient(object):
     """
     Instead of communicating with a back-end cluster, fire locally a new thread.
+    Depending on the OPERATION_WORKERS setting, each operation gets a new Python process,
+    or is passed to one of the pre-started OperationWorker processes.
     """
 
 
     @staticmethod
-    def execute(operation_id, user_name_label, adapter_instance):
+    def execute(operation_id, user_name_label, adapter_instance, batch_size=1):
         """Start asynchronous operation locally"""
-        thread = OperationExecutor(operation_id)
+        if TvbProfile.current.OPERATION_WORKERS:
+            thread = PooledOperationExecutor(operation_id)
+        else:
+            thread = OperationExecutor(operation_id)
         CURRENT_ACTIVE_THREADS.append(thread)
         thread.start()
 
 
+    @staticmethod
+    def start_workers():
+        """Prepare the warm operation workers, when enabled."""
+        if TvbProfile.current.OPERATION_WORKERS and not TvbProfile.current.cluster.IS_DEPLOY:
+            WORKER_POOL.start_workers()
+
+
     @staticmethod
     def stop_operation(operation_id):
         """
@@ -209,6 +395,20 @@ class StandAloneClient(object):
         return stopped
 
 
+    @staticmethod
+    def is_operation_alive(operation_id):
+        """
+        :returns: False when neither a thread in this process, nor the process recorded for the operation
+            is still executing it (e.g. the process got killed, or TVB was restarted meanwhile).
+        """
+        for thread in CURRENT_ACTIVE_THREADS:
+            if int(thread.operation_id) == operation_id and thread.is_alive():
+                return True
+        operation_process = dao.get_operation_process_for_operation(operation_id)
+        return operation_process is not None and operation_process.pid is not None and \
+            psutil.pid_exists(int(operation_process.pid))
+
+
 class ClusterSchedulerClient(object):
     """
     Simple class, to mimic the same behavior we are expecting from StandAloneClient, but firing behind
@@ -217,17 +417,20 @@ class ClusterSchedulerClient(object):
 
 
     @staticmethod
-    def _run_cluster_job(operation_identifier, user_name_label, adapter_instance):
+    def _run_cluster_job(operation_identifier, user_name_label, adapter_instance, batch_size=1):
         """
         Threaded Popen
         It is the function called by the ClusterSchedulerClient in a Thread.
         This function starts a new process.
+
+        :param batch_size: number of operations the job computes (see OperationService.get_operation_batch);
+                           the estimates being for one operation, they are scaled by it
         """
         # Load operation so we can estimate the execution time
         operation = dao.get_operation_by_id(operation_identifier)
         kwargs = parse_json_parameters(operation.parameters)
         kwargs = adapter_instance.prepare_ui_inputs(kwargs)
-        time_estimate = int(adapter_instance.get_execution_time_approximation(**kwargs))
+        time_estimate = int(adapter_instance.estimate_execution_time(**kwargs)) * batch_size
         hours = int(time_estimate / 3600)
         minutes = (int(time_estimate) % 3600) / 60
         seconds = int(time_estimate) % 60
@@ -242,6 +445,13 @@ class ClusterSchedulerClient(object):
             walltime = "%s:%s:%s" % (hours, str(minutes), str(seconds))
 
         call_arg = TvbProfile.current.cluster.SCHEDULE_COMMAND % (operation_identifier, user_name_label, walltime)
+        # Only ask for memory when previous operations of this algorithm tell how much it needs
+        memory_estimate = execution_estimator.estimate(adapter_instance, kwargs, execution_estimator.PEAK_MEMORY)
+        if memory_estimate is not None:
+            memory_estimate *= batch_size
+        if memory_estimate is not None and \
+                TvbProfile.current.cluster.CLUSTER_SCHEDULER == TvbProfile.current.cluster.SCHEDULER_SLURM:
+            call_arg = call_arg.replace("sbatch ", "sbatch --mem=%dM " % (int(memory_estimate / 2 ** 20) + 1), 1)
         LOGGER.info(call_arg)
         process_ = Popen([call_arg], stdout=PIPE, shell=True)
         job_id = process_.stdout.read().replace('\n', '').split(TvbProfile.current.cluster.JOB_ID_STRING)[-1]
@@ -251,12 +461,13 @@ class ClusterSchedulerClient(object):
 
 
     @staticmethod
-    def execute(operation_id, user_name_label, adapter_instance):
+    def execute(operation_id, user_name_label, adapter_instance, batch_size=1):
         """Call the correct system command to submit a job to the cluster."""
         thread = threading.Thread(target=ClusterSchedulerClient._run_cluster_job,
                                   kwargs={'operation_identifier': operation_id,
                                           'user_name_label': user_name_label,
-                                          'adapter_instance': adapter_instance})
+                                          'adapter_instance': adapter_instance,
+                                          'batch_size': batch_size})
         thread.start()
 
 
@@ -286,6 +497,22 @@ class ClusterSchedulerClient(object):
         return result == 0
 
 
+    @staticmethod
+    def is_operation_alive(operation_id):
+        """
+        :returns: False when the cluster job of the operation is no longer known to the scheduler
+            (e.g. it got killed when reaching its walltime).
+        """
+        operation_process = dao.get_operation_process_for_operation(operation_id)
+        if operation_process is None or not operation_process.job_id:
+            # Not submitted yet, or the submission failed
+            return False
+        status_command = TvbProfile.current.cluster.STATUS_COMMAND % operation_process.job_id
+        process_ = Popen([status_command], stdout=PIPE, stderr=PIPE, shell=True)
+        output = process_.communicate()[0]
+        return process_.returncode == 0 and operation_process.job_id in output
+
+
 if TvbProfile.current.cluster.IS_DEPLOY:
     # Return an entity capable to submit jobs to the cluster.
     BACKEND_CLIENT = ClusterSchedulerClient()
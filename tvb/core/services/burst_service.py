@@ -429,6 +429,7 @@ class BurstService(object):
         try:
             operation_ids = self._prepare_operations(burst_config, simulator_index, simulator_id, user_id)
             self.logger.debug("Starting a total of %s workflows" % (len(operation_ids, )))
+            operation_ids = self.operation_service.get_batch_leaders(operation_ids)
             wf_errs = 0
             for operation_id in operation_ids:
                 try:
@@ -520,7 +521,8 @@ class BurstService(object):
             for step in wf_steps:
                 if step.fk_operation is not None:
                     self.logger.debug("We will stop operation: %d" % step.fk_operation)
-                    any_stopped = self.operation_service.stop_operation(step.fk_operation) or any_stopped
+                    stopped = self.operation_service.stop_operation(step.fk_operation, launch_batch_members=False)
+                    any_stopped = stopped or any_stopped
 
         if any_stopped and burst_entity.status != burst_entity.BURST_CANCELED:
             self.workflow_service.mark_burst_finished(burst_entity, model.BurstConfiguration.BURST_CANCELED)
@@ -145,9 +145,7 @@ class FlowService:
         """
         For a list of dataType IDs and a project id create all the required links.
         """
-        for data in data_ids:
-            link = model.Links(data, project_id)
-            dao.store_entity(link)
+        dao.store_entities([model.Links(data, project_id) for data in data_ids], reload=False)
 
 
     @staticmethod
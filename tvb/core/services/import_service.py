@@ -37,6 +37,7 @@
 import os
 import json
 import shutil
+import multiprocessing
 from cgi import FieldStorage
 from datetime import datetime
 from cherrypy._cpreqbody import Part
@@ -47,6 +48,7 @@ from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao, transactional
+from tvb.core.entities.storage.session_maker import DB_ENGINE
 from tvb.core.entities.model.model_burst import BURST_INFO_FILE, BURSTS_DICT_KEY, DT_BURST_MAP
 from tvb.core.entities.transient.burst_configuration_entities import PortletConfiguration
 from tvb.core.services.exceptions import ProjectImportException
@@ -55,6 +57,8 @@ from tvb.core.project_versions.project_update_manager import ProjectUpdateManage
 from tvb.core.entities.file.xml_metadata_handlers import XMLReader
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+from tvb.core.entities.file.datatype_attribute_cache import ATTRIBUTE_CACHE
 from tvb.core.entities.file.files_update_manager import FilesUpdateManager
 from tvb.core.entities.file.exceptions import FileStructureException, MissingDataSetException
 from tvb.core.entities.file.exceptions import IncompatibleFileManagerException
@@ -204,6 +208,7 @@ class ImportService(object):
             new_project_path = os.path.join(TvbProfile.current.TVB_STORAGE,
                                             FilesHelper.PROJECTS_FOLDER, project_entity.name)
             if project_path != new_project_path:
+                FILE_POOL.invalidate_folder(project_path)
                 shutil.move(project_path, new_project_path)
 
             self.created_projects.append(project_entity)
@@ -304,15 +309,17 @@ class ImportService(object):
             if FilesHelper.TVB_OPERARATION_FILE in files:
                 # Found an operation folder - append TMP to its name
                 tmp_op_folder = root + 'tmp'
+                FILE_POOL.invalidate_folder(root)
                 os.rename(root, tmp_op_folder)
                 operation_file_path = os.path.join(tmp_op_folder, FilesHelper.TVB_OPERARATION_FILE)
                 pths.append(operation_file_path)
         return pths
 
 
-    def _load_operations_from_paths(self, project, op_paths):
+    def _load_operations_from_paths(self, project, op_paths, map_function=map):
         """
         Load operations from paths containing them.
+        :param map_function: used for parsing the XML files, e.g. the `map` of a process pool
         :returns: Operations ordered by start/creation date to be sure data dependency is resolved correct
         """
         def by_time(op):
@@ -320,8 +327,8 @@ class ImportService(object):
 
         operations = []
 
-        for operation_file_path in op_paths:
-            operation = self.__build_operation_from_file(project, operation_file_path)
+        for operation_file_path, operation_dict in zip(op_paths, map_function(read_operation_metadata_task, op_paths)):
+            operation = self.__build_operation_from_dict(project, operation_dict)
             operation.import_file = operation_file_path
             operations.append(operation)
 
@@ -329,25 +336,37 @@ class ImportService(object):
         return operations
 
 
-    def _load_datatypes_from_operation_folder(self, op_path, operation_entity, datatype_group):
+    def _load_datatypes_from_operation_folders(self, operation_folders, map_function=map):
         """
-        Loads datatypes from operation folder
+        Loads datatypes from operation folders. H5 files are upgraded and their meta-data read by `map_function`.
+        :param operation_folders: list of tuples (operation folder, operation entity, datatype group)
         :returns: Datatypes ordered by creation date (to solve any dependencies)
         """
-        all_datatypes = []
-        for file_name in os.listdir(op_path):
-            if file_name.endswith(FilesHelper.TVB_STORAGE_FILE_EXTENSION):
-                h5_file = os.path.join(op_path, file_name)
-                try:
-                    file_update_manager = FilesUpdateManager()
-                    file_update_manager.upgrade_file(h5_file)
-                    datatype = self.load_datatype_from_file(op_path, file_name, operation_entity.id, datatype_group)
-                    all_datatypes.append(datatype)
+        h5_files = []
+        folder_entities = {}
+        file_update_manager = FilesUpdateManager()
+        for op_path, operation_entity, datatype_group in operation_folders:
+            folder_entities[op_path] = operation_entity, datatype_group
+            for file_name in sorted(os.listdir(op_path)):
+                if file_name.endswith(FilesHelper.TVB_STORAGE_FILE_EXTENSION):
+                    h5_file = os.path.join(op_path, file_name)
+                    try:
+                        # Upgrade scripts might need the DB, thus they are not run in the worker processes
+                        file_update_manager.upgrade_file(h5_file)
+                        h5_files.append(h5_file)
+                    except IncompatibleFileManagerException:
+                        os.remove(h5_file)
+                        self.logger.warning("Incompatible H5 file will be ignored: %s" % h5_file)
+                        self.logger.exception("Incompatibility details ...")
 
-                except IncompatibleFileManagerException:
-                    os.remove(h5_file)
-                    self.logger.warning("Incompatible H5 file will be ignored: %s" % h5_file)
-                    self.logger.exception("Incompatibility details ...")
+        all_datatypes = []
+        for h5_file, meta_dictionary, disk_size in map_function(read_datatype_file_task, h5_files):
+            op_path, file_name = os.path.split(h5_file)
+            operation_entity, datatype_group = folder_entities[op_path]
+            datatype = self._build_datatype_from_metadata(meta_dictionary, op_path, file_name,
+                                                          operation_entity.id, datatype_group)
+            datatype.disk_size = disk_size
+            all_datatypes.append(datatype)
 
         all_datatypes.sort(key=lambda dt_date: dt_date.create_date)
         for dt in all_datatypes:
@@ -365,24 +384,45 @@ class ImportService(object):
             dt_burst_mappings = {}
 
         all_datatypes.sort(key=by_time)
+        existing_ids = dao.get_datatype_ids_by_gids([datatype.gid for datatype in all_datatypes])
 
+        new_datatypes = []
+        new_gids = set()
         for datatype in all_datatypes:
             old_burst_id = dt_burst_mappings.get(datatype.gid)
 
             if old_burst_id is not None:
                 datatype.fk_parent_burst = burst_ids_mapping[old_burst_id]
 
-            datatype_allready_in_tvb = dao.get_datatype_by_gid(datatype.gid)
-
-            if not datatype_allready_in_tvb:
+            if datatype.gid in existing_ids or datatype.gid in new_gids:
+                continue
+            if datatype.disk_size is None:
                 # Compute disk size. Similar to ABCAdapter._capture_operation_results.
                 # No need to close the h5 as we have not written to it.
                 associated_file = os.path.join(datatype.storage_path, datatype.get_storage_file_name())
                 datatype.disk_size = FilesHelper.compute_size_on_disk(associated_file)
+            if self._is_storable(datatype):
+                new_datatypes.append(datatype)
+                new_gids.add(datatype.gid)
+
+        # All in one transaction, inserted in the creation order
+        self.store_datatypes(new_datatypes)
+        FlowService.create_link(sorted(existing_ids.values()), project.id)
+
+
+    def _is_storable(self, datatype):
+        """
+        Check ahead that the data needed when storing a DataType is present,
+        because one failure would otherwise compromise the entire bulk insert.
+        """
+        try:
+            datatype.configure()
+            return True
+        except MissingDataSetException:
+            self.logger.error("Datatype %s has missing data and could not be imported properly." % (datatype,))
+            os.remove(datatype.get_storage_file_path())
+            return False
 
-                self.store_datatype(datatype)
-            else:
-                FlowService.create_link([datatype_allready_in_tvb.id], project.id)
 
     def _store_imported_images(self, project):
         """
@@ -401,31 +441,45 @@ class ImportService(object):
         This method scans provided folder and identify all operations that needs to be imported
         """
         op_paths = self._append_tmp_to_folders_containing_operations(import_path)
-        operations = self._load_operations_from_paths(project, op_paths)
-
-        imported_operations = []
-        datatypes = []
 
-        # Here we process each operation found
-        for operation in operations:
-            self.logger.debug("Importing operation " + str(operation))
-            old_operation_folder, _ = os.path.split(operation.import_file)
-            operation_entity, datatype_group = self.__import_operation(operation)
+        pool = None
+        map_function = map
+        if TvbProfile.current.IMPORT_WORKERS > 1 and op_paths:
+            # Workers only parse files, the DB is accessed from this process alone.
+            # Connections and open H5 files are not to be shared with the forked workers
+            DB_ENGINE.dispose()
+            FILE_POOL.close_all()
+            ATTRIBUTE_CACHE.clear()
+            pool = multiprocessing.Pool(TvbProfile.current.IMPORT_WORKERS)
+            map_function = pool.map
 
-            # Rename operation folder with the ID of the stored operation
-            new_operation_path = FilesHelper().get_operation_folder(project.name, operation_entity.id)
-            if old_operation_folder != new_operation_path:
-                # Delete folder of the new operation, otherwise move will fail
-                shutil.rmtree(new_operation_path)
-                shutil.move(old_operation_folder, new_operation_path)
-
-            operation_datatypes = self._load_datatypes_from_operation_folder(new_operation_path, operation_entity,
-                                                                             datatype_group)
-            imported_operations.append(operation_entity)
-            datatypes.extend(operation_datatypes)
+        try:
+            operations = self._load_operations_from_paths(project, op_paths, map_function)
+            imported_operations = self.__import_operations(operations)
+
+            operation_folders = []
+            for operation_entity, datatype_group in imported_operations:
+                self.logger.debug("Importing operation " + str(operation_entity))
+                old_operation_folder, _ = os.path.split(operation_entity.import_file)
+
+                # Rename operation folder with the ID of the stored operation
+                new_operation_path = FilesHelper().get_operation_folder(project.name, operation_entity.id)
+                if old_operation_folder != new_operation_path:
+                    # Delete folder of the new operation, otherwise move will fail
+                    FILE_POOL.invalidate_folder(old_operation_folder)
+                    FILE_POOL.invalidate_folder(new_operation_path)
+                    shutil.rmtree(new_operation_path)
+                    shutil.move(old_operation_folder, new_operation_path)
+                operation_folders.append((new_operation_path, operation_entity, datatype_group))
+
+            datatypes = self._load_datatypes_from_operation_folders(operation_folders, map_function)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         self._store_imported_datatypes_in_db(project, datatypes, dt_burst_mappings, burst_ids_mapping)
-        return imported_operations
+        return [operation_entity for operation_entity, _ in imported_operations]
 
 
     def _populate_image(self, file_name, project_id):
@@ -459,6 +513,16 @@ class ImportService(object):
         self.logger.debug("Loading datatType from file: %s" % file_name)
         storage_manager = HDF5StorageManager(storage_folder, file_name)
         meta_dictionary = storage_manager.get_metadata()
+        return self._build_datatype_from_metadata(meta_dictionary, storage_folder, file_name,
+                                                  op_id, datatype_group, move)
+
+
+    def _build_datatype_from_metadata(self, meta_dictionary, storage_folder, file_name, op_id,
+                                      datatype_group=None, move=True):
+        """
+        Creates an instance of datatype from the meta-data already read from its H5 file
+        :returns: datatype
+        """
         meta_structure = DataTypeMetaData(meta_dictionary)
 
         # Now try to determine class and instantiate it
@@ -484,6 +548,7 @@ class ImportService(object):
         current_file = os.path.join(storage_folder, file_name)
         new_file = type_instance.get_storage_file_path()
         if new_file != current_file and move:
+            FILE_POOL.invalidate(current_file)
             shutil.move(current_file, new_file)
 
         return type_instance
@@ -506,6 +571,22 @@ class ImportService(object):
             raise ProjectImportException(error_msg)
 
 
+    def store_datatypes(self, datatypes):
+        """Store a list of data types into DB, in one transaction"""
+        if not datatypes:
+            return []
+        self.logger.debug("Store %d datatypes" % len(datatypes))
+        try:
+            return dao.store_entities(datatypes, reload=False)
+        except IntegrityError as excep:
+            self.logger.exception(excep)
+            # Delete files if can't be imported
+            for datatype in datatypes:
+                if os.path.exists(datatype.get_storage_file_path()):
+                    os.remove(datatype.get_storage_file_path())
+            raise ProjectImportException("Could not import data. There is already one with the same name or gid.")
+
+
     def __populate_project(self, project_path):
         """
         Create and store a Project entity.
@@ -526,35 +607,47 @@ class ImportService(object):
             raise ProjectImportException(error_msg)
 
 
-    def __build_operation_from_file(self, project, operation_file):
+    def __build_operation_from_dict(self, project, operation_dict):
         """
-        Create Operation entity from metadata file.
+        Create Operation entity from the content of its metadata file.
         """
-        operation_dict = XMLReader(operation_file).read_metadata()
         operation_entity = manager_of_class(model.Operation).new_instance()
         return operation_entity.from_dict(operation_dict, dao, self.user_id, project.gid)
 
 
     @staticmethod
-    def __import_operation(operation_entity):
-        """
-        Store a Operation entity.
-        """
-        operation_entity = dao.store_entity(operation_entity)
-        operation_group_id = operation_entity.fk_operation_group
-        datatype_group = None
-
-        if operation_group_id is not None:
-            try:
-                datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
-            except SQLAlchemyError:
-                # If no dataType group present for current op. group, create it.
-                operation_group = dao.get_operationgroup_by_id(operation_group_id)
-                datatype_group = model.DataTypeGroup(operation_group, operation_id=operation_entity.id)
-                datatype_group.state = ADAPTERS['Upload']['defaultdatastate']
-                datatype_group = dao.store_entity(datatype_group)
+    def __import_operations(operation_entities):
+        """
+        Store Operation entities, in one transaction.
+        :returns: list of tuples (operation entity, datatype group or None)
+        """
+        # Related entities were loaded by separate queries, but only one instance per row can join the session
+        shared_entities = {}
+        for operation_entity in operation_entities:
+            for attribute in ('project', 'algorithm', 'operation_group'):
+                related = getattr(operation_entity, attribute)
+                if related is not None:
+                    setattr(operation_entity, attribute,
+                            shared_entities.setdefault((related.__class__, related.id), related))
+        dao.store_entities(operation_entities, reload=False)
+        result = []
+
+        for operation_entity in operation_entities:
+            operation_group_id = operation_entity.fk_operation_group
+            datatype_group = None
+
+            if operation_group_id is not None:
+                try:
+                    datatype_group = dao.get_datatypegroup_by_op_group_id(operation_group_id)
+                except SQLAlchemyError:
+                    # If no dataType group present for current op. group, create it.
+                    operation_group = dao.get_operationgroup_by_id(operation_group_id)
+                    datatype_group = model.DataTypeGroup(operation_group, operation_id=operation_entity.id)
+                    datatype_group.state = ADAPTERS['Upload']['defaultdatastate']
+                    datatype_group = dao.store_entity(datatype_group)
+            result.append((operation_entity, datatype_group))
 
-        return operation_entity, datatype_group
+        return result
 
 
     def load_burst_entity(self, json_burst, project_id):
@@ -610,3 +703,22 @@ class ImportService(object):
                 self.logger.exception("Could not restore Workflow Step " + view_step.get_algorithm().name)
 
         return burst_entity
+
+
+
+def read_operation_metadata_task(operation_file):
+    """
+    Parse one operation XML file. Module level function, to be callable in worker processes.
+    :returns: dictionary with the operation meta-data (a plain dict, to be sent between processes)
+    """
+    return dict(XMLReader(operation_file).read_metadata())
+
+
+def read_datatype_file_task(h5_file):
+    """
+    Read the meta-data of one imported H5 file. Module level function, to be callable in worker processes.
+    :returns: tuple (file path, meta-data dictionary, disk size)
+    """
+    folder, file_name = os.path.split(h5_file)
+    meta_dictionary = HDF5StorageManager(folder, file_name).get_metadata()
+    return h5_file, meta_dictionary, FilesHelper.compute_size_on_disk(h5_file)
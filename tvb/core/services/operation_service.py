@@ -57,6 +57,7 @@ from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.transient.structure_entities import DataTypeMetaData
 from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.services.exceptions import OperationException
 from tvb.core.services.workflow_service import WorkflowService
 from tvb.core.services.backend_client import BACKEND_CLIENT
 
@@ -151,7 +152,10 @@ class OperationService:
                 raise LaunchException("Invalid empty Operation!!!")
             return self.initiate_prelaunch(operations[0], adapter_instance, temp_files, **kwargs)
         else:
-            return self._send_to_cluster(operations, adapter_instance, current_user.username)
+            leaders = self.get_batch_leaders([operation.id for operation in operations])
+            self._send_to_cluster([operation for operation in operations if operation.id in leaders],
+                                  adapter_instance, current_user.username)
+            return operations
 
 
     @staticmethod
@@ -199,8 +203,8 @@ class OperationService:
         algorithm = dao.get_algorithm_by_id(algorithm_id)
         ops, _ = self.prepare_operations(user_id, project_id, algorithm, category, {},
                                          existing_dt_group=existing_dt_group, **kwargs)
-        for operation in ops:
-            self.launch_operation(operation.id, True)
+        for operation_id in self.get_batch_leaders([operation.id for operation in ops]):
+            self.launch_operation(operation_id, True)
 
 
     def prepare_operations(self, user_id, project_id, algorithm, category, metadata,
@@ -263,6 +267,9 @@ class OperationService:
         (in case of PSE).
         """
 
+        workflow_steps = []
+        operations = []
+        groups_to_store = []
         for step in workflow_step_list:
             operation_group = None
             if (group is not None) and not isinstance(step, model.WorkflowStepView):
@@ -295,16 +302,140 @@ class OperationService:
                                                 meta=json.dumps(metadata),
                                                 op_group_id=group_id, range_values=range_values, user_group=user_group)
                     operation.visible = step.step_visible
-                    operation = dao.store_entity(operation)
-                    cloned_w_step.fk_operation = operation.id
-
-                dao.store_entity(cloned_w_step)
+                    operations.append(operation)
+                else:
+                    operations.append(None)
+                workflow_steps.append(cloned_w_step)
 
             if operation_group is not None and operation is not None:
-                datatype_group = model.DataTypeGroup(operation_group, operation_id=operation.id,
-                                                     fk_parent_burst=burst_id,
-                                                     state=metadata[DataTypeMetaData.KEY_STATE])
-                dao.store_entity(datatype_group)
+                groups_to_store.append((operation_group, operation, metadata[DataTypeMetaData.KEY_STATE]))
+
+        ## Operations and steps of all workflows are inserted together, in batches
+        dao.store_workflow_steps_with_operations(workflow_steps, operations)
+
+        for operation_group, operation, state in groups_to_store:
+            datatype_group = model.DataTypeGroup(operation_group, operation_id=operation.id,
+                                                 fk_parent_burst=burst_id, state=state)
+            dao.store_entity(datatype_group)
+
+
+    def prepare_batches(self, operations, adapter_instance):
+        """
+        Split operations in batches of at most PSE_BATCH_SIZE compatible operations (see ABCAdapter.get_batch_key).
+        Only operations from the same OperationGroup get in the same batch. The split is deterministic, as it
+        is computed both when launching, and in the process executing the first operation of each batch.
+
+        :returns: list of batches, each batch being a list of operations (in the order received)
+        """
+        batch_size = TvbProfile.current.PSE_BATCH_SIZE
+        batches = []
+        open_batches = {}
+        for operation in operations:
+            batch_key = None
+            if batch_size > 1 and operation.fk_operation_group is not None and operation.range_values:
+                ranged_parameters = list(json.loads(operation.range_values))
+                batch_key = adapter_instance.get_batch_key(ranged_parameters,
+                                                           **utils.parse_json_parameters(operation.parameters))
+            if batch_key is None:
+                batches.append([operation])
+                continue
+            batch_key = (operation.fk_operation_group, operation.fk_from_algo, batch_key)
+            batch = open_batches.get(batch_key)
+            if batch is None or len(batch) >= batch_size:
+                batch = []
+                open_batches[batch_key] = batch
+                batches.append(batch)
+            batch.append(operation)
+        return batches
+
+
+    def get_batch_leaders(self, operation_ids):
+        """
+        :returns: ids of the operations to be actually sent for execution. When PSE batching is active, only the
+                  first operation of each batch is launched, and it will compute the entire batch.
+        """
+        if TvbProfile.current.PSE_BATCH_SIZE <= 1 or len(operation_ids) <= 1:
+            return operation_ids
+        operations = [dao.get_operation_by_id(operation_id) for operation_id in operation_ids]
+        adapter_instance = ABCAdapter.build_adapter(operations[0].algorithm)
+        return [batch[0].id for batch in self.prepare_batches(operations, adapter_instance)]
+
+
+    def get_operation_batch(self, operation, adapter_instance):
+        """
+        :returns: the list of operations to be computed together with the given one (itself included, first).
+                  Only the leader of a batch gets more than itself: the operations in its batch still pending
+                  (others, e.g. canceled by the user, are left out, as only leaders are ever sent for execution).
+        """
+        if TvbProfile.current.PSE_BATCH_SIZE <= 1 or operation.fk_operation_group is None:
+            return [operation]
+        group_operations = sorted(dao.get_operations_in_group(operation.fk_operation_group), key=lambda op: op.id)
+        for batch in self.prepare_batches(group_operations, adapter_instance):
+            if batch[0].id == operation.id:
+                return [operation] + [op for op in batch[1:] if op.status == model.STATUS_PENDING]
+        return [operation]
+
+
+    def launch_pending_batch_members(self, operation_id):
+        """
+        When the given operation leads a batch, but will not compute it (e.g. it was stopped, or it failed before
+        starting), send on the operations of its batch still pending, each on its own. They would otherwise stay
+        pending forever, as only batch leaders are ever sent for execution.
+        """
+        if TvbProfile.current.PSE_BATCH_SIZE <= 1:
+            return
+        operation = dao.get_operation_by_id(operation_id)
+        if operation.fk_operation_group is None:
+            return
+        adapter_instance = ABCAdapter.build_adapter(operation.algorithm)
+        members = self.get_operation_batch(operation, adapter_instance)[1:]
+        if members:
+            self.logger.info("Operation %s will not compute its batch, launching %s on their own"
+                             % (operation.id, [op.id for op in members]))
+            self._send_to_cluster(members, adapter_instance, operation.user.username)
+
+
+    def initiate_batch_prelaunch(self, operations, adapter_instance):
+        """
+        Compute a batch of compatible operations with a single adapter_instance.launch_batch call, then go through
+        the usual launch flow for each of them (results storage, status, next workflow steps).
+        When computing the batch fails, the operations are executed one after the other.
+        An operation failing (e.g. disk quota exceeded) is marked as such, without stopping the rest of the batch;
+        the first such error is re-raised once all operations were processed.
+        """
+        # Operations in a batch are all for the same algorithm
+        adapters = [adapter_instance] + [ABCAdapter.build_adapter(adapter_instance.stored_adapter)
+                                         for _ in operations[1:]]
+        kwargs_list = [utils.parse_json_parameters(op.parameters) for op in operations]
+        try:
+            filtered_kwargs = [adapter.prepare_ui_inputs(kwargs) for adapter, kwargs in zip(adapters, kwargs_list)]
+            self.logger.debug("Computing operations %s in a batch" % [op.id for op in operations])
+            batch_results = adapter_instance.launch_batch(filtered_kwargs)
+        except Exception as excep:
+            self.logger.warning("Could not compute operations in a batch, they will be executed one by one")
+            self.logger.exception(excep)
+            batch_results = [None] * len(operations)
+
+        first_error = None
+        for idx, operation in enumerate(operations):
+            if idx > 0 and dao.get_operation_by_id(operation.id).status != model.STATUS_PENDING:
+                # e.g. canceled by the user meanwhile
+                self.logger.debug("Operation %s is no longer pending, skip it from batch" % operation.id)
+                continue
+            adapter, kwargs, batch_result = adapters[idx], kwargs_list[idx], batch_results[idx]
+            adapter.batch_result = batch_result
+            try:
+                self.initiate_prelaunch(operation, adapter, {}, **kwargs)
+            except Exception as excep:
+                self.logger.error("Operation %s failed, continue with the rest of its batch" % operation.id)
+                if dao.get_operation_by_id(operation.id).status not in (model.STATUS_ERROR, model.STATUS_FINISHED):
+                    # Failed after its own launch (e.g. when preparing the next workflow step)
+                    self.logger.exception(excep)
+                    self.workflow_service.persist_operation_state(operation, model.STATUS_ERROR, unicode(excep))
+                if first_error is None:
+                    first_error = sys.exc_info()
+        if first_error is not None:
+            raise first_error[0], first_error[1], first_error[2]
 
 
     def initiate_prelaunch(self, operation, adapter_instance, temp_files, **kwargs):
@@ -364,7 +495,8 @@ class OperationService:
         """ Initiate operation on cluster"""
         for operation in operations:
             try:
-                BACKEND_CLIENT.execute(str(operation.id), current_username, adapter_instance)
+                batch_size = len(self.get_operation_batch(operation, adapter_instance))
+                BACKEND_CLIENT.execute(str(operation.id), current_username, adapter_instance, batch_size)
             except Exception as excep:
                 self._handle_exception(excep, {}, "Could not start operation!", operation)
 
@@ -527,11 +659,46 @@ class OperationService:
     ######## Methods related to stopping and restarting operations start here ################
     ##########################################################################################
 
-    def stop_operation(self, operation_id):
+    def stop_operation(self, operation_id, launch_batch_members=True):
         """
         Stop the operation given by the operation id.
+
+        :param launch_batch_members: when the operation leads a PSE batch, send on the other operations of the
+                                     batch on their own; False when those are to be stopped too
+        """
+        result = BACKEND_CLIENT.stop_operation(int(operation_id))
+        if launch_batch_members:
+            self.launch_pending_batch_members(int(operation_id))
+        return result
+
+
+    def resume_operation(self, operation_id):
+        """
+        Launch again an operation which did not finish (e.g. its process or cluster job got killed), with the same
+        parameters and operation folder. Adapters keeping checkpoints in that folder (e.g. the Simulator, when
+        SIMULATION_CHECKPOINT_STEPS is set) continue from their latest checkpoint, instead of computing it all again.
+        Started operations are accepted too, when nothing executes them anymore (e.g. a cluster job killed at its
+        walltime never gets to update the operation status).
         """
-        return BACKEND_CLIENT.stop_operation(int(operation_id))
+        operation = dao.get_operation_by_id(operation_id)
+        if operation.status == model.STATUS_STARTED:
+            if BACKEND_CLIENT.is_operation_alive(operation.id):
+                raise OperationException("Operation %s is still running, it can not be resumed" % operation.id)
+        elif operation.status not in (model.STATUS_ERROR, model.STATUS_CANCELED):
+            raise OperationException("Only failed, canceled or stale started operations can be resumed, not %s"
+                                     % operation.status)
+        operation_process = dao.get_operation_process_for_operation(operation.id)
+        if operation_process is not None:
+            # The new process or job gets recorded when launched
+            dao.remove_entity(model.OperationProcessIdentifier, operation_process.id)
+        operation.status = model.STATUS_PENDING
+        operation.completion_date = None
+        operation.additional_info = ''
+        dao.store_entity(operation)
+        operation = dao.get_operation_by_id(operation_id)
+        adapter_instance = ABCAdapter.build_adapter(operation.algorithm)
+        self._send_to_cluster([operation], adapter_instance, operation.user.username)
+        return operation
 
 
 
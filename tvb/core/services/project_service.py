@@ -47,7 +47,7 @@ from tvb.core.services.flow_service import FlowService
 from tvb.core.utils import string2date, date2string, format_timedelta, format_bytes_human
 from tvb.core.removers_factory import get_remover
 from tvb.core.entities import model
-from tvb.core.entities.storage import dao, transactional
+from tvb.core.entities.storage import dao, transactional, unit_of_work
 from tvb.core.entities.transient.context_overlay import CommonDetails, DataTypeOverlayDetails, OperationOverlayDetails
 from tvb.core.entities.transient.filtering import StaticFiltersFactory
 from tvb.core.entities.transient.structure_entities import StructureNode, DataTypeMetaData
@@ -161,6 +161,7 @@ class ProjectService:
         return dao.get_filtered_operations(project_id, filters, is_count=True)
 
 
+    @unit_of_work
     def retrieve_project_full(self, project_id, applied_filters=None, current_page=1):
         """
         Return a Tuple with Project entity and Operations for current Project.
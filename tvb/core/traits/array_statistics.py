@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Summary statistics (min, max, mean, variance, also over non-zero values) of an array written in chunks.
+Each chunk is reduced once, and merged into the running totals with the pairwise update of Chan et al.,
+so the result equals the statistics of the full array, without reading it back.
+"""
+
+import numpy
+import tvb.basic.traits.types_mapped_light as mapped
+
+_METADATA = mapped.MappedTypeLight
+
+
+
+class _RunningMoments(object):
+    """
+    Count, min, max, mean and sum of squared deviations from the mean, of the values seen so far.
+    """
+
+
+    def __init__(self):
+        self.count = 0
+        self.minimum = None
+        self.maximum = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+
+    def update(self, values, with_extremes, with_variance):
+        """
+        :param values: flat array with the new chunk
+        """
+        count = values.size
+        if count == 0:
+            return
+        chunk_mean = values.mean()
+        if with_variance:
+            chunk_m2 = values.var() * count
+        else:
+            chunk_m2 = 0.0
+
+        if with_extremes:
+            chunk_min = values.min()
+            chunk_max = values.max()
+            if self.count == 0 or chunk_min < self.minimum:
+                self.minimum = chunk_min
+            if self.count == 0 or chunk_max > self.maximum:
+                self.maximum = chunk_max
+
+        total = self.count + count
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + chunk_m2 + numpy.abs(delta) ** 2 * self.count * count / total
+        self.count = total
+
+
+    @property
+    def variance(self):
+        return self.m2 / self.count
+
+
+
+class ArrayStatistics(object):
+    """
+    Accumulate the array meta-data listed in `included_info` (MappedType.METADATA_ARRAY_* keys).
+    """
+
+
+    def __init__(self, included_info):
+        self.included_info = included_info
+        self._all = _RunningMoments()
+        self._non_zero = _RunningMoments()
+        self._with_non_zero = any(key in included_info for key in (_METADATA.METADATA_ARRAY_MIN_NON_ZERO,
+                                                                   _METADATA.METADATA_ARRAY_MAX_NON_ZERO,
+                                                                   _METADATA.METADATA_ARRAY_MEAN_NON_ZERO,
+                                                                   _METADATA.METADATA_ARRAY_VAR_NON_ZERO))
+
+
+    def update(self, data):
+        """
+        Add a new chunk.
+        """
+        data = numpy.asarray(data).ravel()
+        self._all.update(data,
+                         _METADATA.METADATA_ARRAY_MIN in self.included_info or
+                         _METADATA.METADATA_ARRAY_MAX in self.included_info,
+                         _METADATA.METADATA_ARRAY_VAR in self.included_info)
+        if self._with_non_zero:
+            self._non_zero.update(data[data.nonzero()],
+                                  _METADATA.METADATA_ARRAY_MIN_NON_ZERO in self.included_info or
+                                  _METADATA.METADATA_ARRAY_MAX_NON_ZERO in self.included_info,
+                                  _METADATA.METADATA_ARRAY_VAR_NON_ZERO in self.included_info)
+
+
+    def to_metadata(self):
+        """
+        :returns: dictionary {METADATA_ARRAY_* key: value}, without the statistics not defined (e.g. no value yet)
+        """
+        result = dict()
+        self._add_moments(result, self._all, _METADATA.METADATA_ARRAY_MIN, _METADATA.METADATA_ARRAY_MAX,
+                          _METADATA.METADATA_ARRAY_MEAN, _METADATA.METADATA_ARRAY_VAR)
+        self._add_moments(result, self._non_zero, _METADATA.METADATA_ARRAY_MIN_NON_ZERO,
+                          _METADATA.METADATA_ARRAY_MAX_NON_ZERO, _METADATA.METADATA_ARRAY_MEAN_NON_ZERO,
+                          _METADATA.METADATA_ARRAY_VAR_NON_ZERO)
+        return result
+
+
+    def _add_moments(self, result, moments, min_key, max_key, mean_key, var_key):
+        if moments.count == 0:
+            return
+        values = {min_key: moments.minimum, max_key: moments.maximum,
+                  mean_key: moments.mean, var_key: moments.variance}
+        for key, value in values.items():
+            if key in self.included_info:
+                result[key] = value
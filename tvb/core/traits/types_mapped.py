@@ -49,10 +49,12 @@ from tvb.basic.traits.exceptions import ValidationException, MissingEntityExcept
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.profile import TvbProfile
 from tvb.core.traits.core import compute_table_name
+from tvb.core.traits.array_statistics import ArrayStatistics
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.core.entities.file.hdf5_storage_profiles import get_storage_profile
 from tvb.core.entities.file.exceptions import MissingDataSetException
 
 
@@ -64,6 +66,8 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
     #### Transient fields below
     storage_path = None
     _current_metadata = {}
+    _current_statistics = None
+    _stored_metadata = None
     framework_metadata = None
     logger = get_logger(__name__)
     _ui_complex_datatype = False
@@ -181,6 +185,7 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         parent_project = dao.get_project_for_operation(operation_id)
         self.storage_path = FilesHelper().get_project_folder(parent_project, str(operation_id))
         self._storage_manager = None
+        self._stored_metadata = None
 
 
     # ---------------------------- FILE STORAGE -------------------------------
@@ -198,8 +203,10 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         store_manager = self._get_file_storage_mng()
         store_manager.store_data(data_name, data, where)
         ### Also store Array specific meta-data.
-        meta_dictionary = self.__retrieve_array_metadata(data, data_name)
-        self.set_metadata(meta_dictionary, data_name, where=where)
+        statistics = self.__create_array_statistics(data_name)
+        if statistics is not None:
+            self.__update_array_statistics(statistics, data, data_name)
+            self.set_metadata(statistics.to_metadata(), data_name, where=where)
 
 
     def store_data_chunk(self, data_name, data, grow_dimension=-1, close_file=True, where=ROOT_NODE_PATH):
@@ -219,25 +226,29 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         store_manager = self._get_file_storage_mng()
         store_manager.append_data(data_name, data, grow_dimension, close_file, where)
 
-        ### Start updating array meta-data after new chunk of data stored. 
-        new_metadata = self.__retrieve_array_metadata(data, data_name)
-        previous_meta = dict()
-        if data_name in self._current_metadata:
-            previous_meta = self._current_metadata[data_name]
-        self.__merge_metadata(new_metadata, previous_meta, data)
-        self._current_metadata[data_name] = new_metadata
+        ### Update array meta-data with the new chunk of data. It is written in H5 on close_file.
+        if self._current_statistics is None:
+            self._current_statistics = dict()
+        if data_name not in self._current_statistics:
+            self._current_statistics[data_name] = self.__create_array_statistics(data_name)
+        statistics = self._current_statistics[data_name]
+        if statistics is not None:
+            self.__update_array_statistics(statistics, data, data_name)
+            self._current_metadata[data_name] = statistics.to_metadata()
 
 
-    def get_data(self, data_name, data_slice=None, where=ROOT_NODE_PATH, ignore_errors=False, close_file=True):
+    def get_data(self, data_name, data_slice=None, where=ROOT_NODE_PATH, ignore_errors=False, close_file=True,
+                 memory_map=False):
         """
         This method reads data from the given data set based on the slice specification
             :param data_name: Name of the data set from where to read data
             :param data_slice: Specify how to retrieve data from array {e.g [slice(1,10,1),slice(1,6,2)] ]
             :param where: represents the path where dataset is stored (e.g. /data/info)
+            :param memory_map: when True, contiguous uncompressed data sets are returned as read-only numpy.memmap
             :returns: a numpy.ndarray containing filtered data
         """
         store_manager = self._get_file_storage_mng()
-        return store_manager.get_data(data_name, data_slice, where, ignore_errors, close_file)
+        return store_manager.get_data(data_name, data_slice, where, ignore_errors, close_file, memory_map)
 
 
     def get_data_shape(self, data_name, where=ROOT_NODE_PATH):
@@ -299,8 +310,13 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
     def __read_storage_array_metadata(self, array_name, included_info=None):
         """
         Retrieve from HDF5 specific meta-data about an array.
+        The meta-data of all arrays is read at once, as summaries usually describe several arrays.
         """
-        summary_hdf5 = self.get_metadata(array_name)
+        if self._stored_metadata is None:
+            self._stored_metadata = self.get_metadata_batch()
+        if array_name not in self._stored_metadata:
+            raise MissingDataSetException("Could not locate dataset: %s" % array_name)
+        summary_hdf5 = self._stored_metadata[array_name]
         result = dict()
         if included_info is None:
             if array_name in self.trait:
@@ -326,10 +342,24 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         """
         if meta_dictionary is None:
             return
+        self._stored_metadata = None
         store_manager = self._get_file_storage_mng()
         store_manager.set_metadata(meta_dictionary, data_name, tvb_specific_metadata, where)
 
 
+    def set_metadata_batch(self, metadata_by_data_name, tvb_specific_metadata=True, where=ROOT_NODE_PATH):
+        """
+        Set meta-data information on several data-sets, with one access to the storage file.
+            :param metadata_by_data_name: dictionary {data-set name: meta dictionary}, '' standing for the ROOT node
+            :param tvb_specific_metadata: specify if the provided metadata is
+                                 specific to TVB (keys will have a TVB prefix).
+            :param where: represents the path where data-sets are stored (e.g. /data/info)
+        """
+        self._stored_metadata = None
+        store_manager = self._get_file_storage_mng()
+        store_manager.set_metadata_batch(metadata_by_data_name, tvb_specific_metadata, where)
+
+
     def persist_full_metadata(self):
         """
         Gather all instrumented attributed on current entity, 
@@ -364,8 +394,10 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
                     else:
                         meta_dictionary[capitalized_name] = json.dumps(field_value)
 
-        # Now store collected meta data
-        self.set_metadata(meta_dictionary)
+        # Now store collected meta data, together with the one of the arrays not yet written
+        all_metadata = dict(self._current_metadata)
+        all_metadata[''] = meta_dictionary
+        self.set_metadata_batch(all_metadata)
 
 
     def load_from_metadata(self, meta_dictionary):
@@ -420,6 +452,7 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
                                   specific to TVB (keys will have a TVB prefix).
             :param where: represents the path where data-set is stored (e.g. /data/info)
         """
+        self._stored_metadata = None
         store_manager = self._get_file_storage_mng()
         store_manager.remove_metadata(meta_key, data_name, tvb_specific_metadata, where)
 
@@ -436,15 +469,23 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         return store_manager.get_metadata(data_name, where)
 
 
+    def get_metadata_batch(self, where=ROOT_NODE_PATH):
+        """
+        Retrieve meta-data information for a node and all the data-sets under it, with one access to the storage file.
+            :param where: represents the path of the node (e.g. /data/info)
+            :returns: a dictionary {data-set name: metadata dictionary}, '' standing for the node itself
+        """
+        store_manager = self._get_file_storage_mng()
+        return store_manager.get_metadata_batch(where)
+
+
     def close_file(self):
         """
         Close file used to store data.
         """
-        for data_name, new_metadata in six.iteritems(self._current_metadata):
-            ## Remove transient metadata, used just for performance issues
-            if self._METADATA_ARRAY_SIZE in new_metadata:
-                del new_metadata[self._METADATA_ARRAY_SIZE]
-            self.set_metadata(new_metadata, data_name)
+        if self._current_metadata:
+            self.set_metadata_batch(self._current_metadata)
+        self._stored_metadata = None
         store_manager = self._get_file_storage_mng()
         store_manager.close_file()
 
@@ -455,7 +496,8 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
         """
         if not hasattr(self, "_storage_manager") or self._storage_manager is None:
             file_name = self.get_storage_file_name()
-            self._storage_manager = HDF5StorageManager(self.storage_path, file_name)
+            self._storage_manager = HDF5StorageManager(self.storage_path, file_name,
+                                                       storage_profile=get_storage_profile(self.__class__))
         return self._storage_manager
 
 
@@ -479,70 +521,26 @@ class MappedType(model.DataType, mapped.MappedTypeLight):
     # ---------------------------- ARRAY ATTR METADATA ----------------------------
     # -------- see also store_data, store_data_chunk and close_file----------------
 
-    def __retrieve_array_metadata(self, data, data_name):
+    def __create_array_statistics(self, data_name):
         """
-        :param data: New NumPy array to invoke meta-data methods on.
-        :param data_name: String, representing attribute name.  
+        :param data_name: String, representing attribute name.
+        :returns: accumulator for the meta-data configured on the attribute, or None for non traited attributes
         """
         if data_name not in self.trait:
             ### Ignore non traited attributes (e.g. sparse-matrix sub-sections).
-            return dict()
+            return None
         traited_attr = self.trait[data_name].trait.stored_metadata or self.trait[data_name].stored_metadata
+        return ArrayStatistics(traited_attr)
 
-        if isinstance(data, list):
-            data = numpy.array(data)
 
-        meta_dictionary = {}
-        for key, value in six.iteritems(self.METADATA_FORMULAS):
-            if key != self.METADATA_ARRAY_SHAPE and key in traited_attr:
-                try:
-                    meta_dictionary[key] = eval(value.replace("$ARRAY$", "data").replace("$MASK$", "data"))
-                except Exception:
-                    self.logger.exception("Could not evaluate %s on %s" % (value, data_name))
-
-        ## Append size only for chunk computing purposes. It will not be stored in H5 in this form
-        ## but we will use H5 native shape support
-        meta_dictionary[self._METADATA_ARRAY_SIZE] = data.size
-        return meta_dictionary
-
-
-    def __merge_metadata(self, result_meta, merge_meta, new_data):
-        """
-        Merge after new chunk added.
-        """
-        if self.METADATA_ARRAY_VAR in result_meta:
-            del result_meta[self.METADATA_ARRAY_VAR]
-        if self.METADATA_ARRAY_VAR_NON_ZERO in result_meta:
-            del result_meta[self.METADATA_ARRAY_VAR_NON_ZERO]
-
-        if (self.METADATA_ARRAY_MIN in merge_meta
-                and merge_meta[self.METADATA_ARRAY_MIN] < result_meta[self.METADATA_ARRAY_MIN]):
-            result_meta[self.METADATA_ARRAY_MIN] = merge_meta[self.METADATA_ARRAY_MIN]
-        if (self.METADATA_ARRAY_MIN_NON_ZERO in merge_meta
-                and merge_meta[self.METADATA_ARRAY_MIN_NON_ZERO] < result_meta[self.METADATA_ARRAY_MIN_NON_ZERO]):
-            result_meta[self.METADATA_ARRAY_MIN_NON_ZERO] = merge_meta[self.METADATA_ARRAY_MIN_NON_ZERO]
-
-        if (self.METADATA_ARRAY_MAX in merge_meta
-                and merge_meta[self.METADATA_ARRAY_MAX] > result_meta[self.METADATA_ARRAY_MAX]):
-            result_meta[self.METADATA_ARRAY_MAX] = merge_meta[self.METADATA_ARRAY_MAX]
-        if (self.METADATA_ARRAY_MAX_NON_ZERO in merge_meta
-                and merge_meta[self.METADATA_ARRAY_MAX_NON_ZERO] > result_meta[self.METADATA_ARRAY_MAX_NON_ZERO]):
-            result_meta[self.METADATA_ARRAY_MAX_NON_ZERO] = merge_meta[self.METADATA_ARRAY_MAX_NON_ZERO]
-
-        if self.METADATA_ARRAY_MEAN in merge_meta and self._METADATA_ARRAY_SIZE in merge_meta:
-            prev_no = merge_meta[self._METADATA_ARRAY_SIZE]
-            curr_no = new_data.size
-            result_meta[self.METADATA_ARRAY_MEAN] = (merge_meta[self.METADATA_ARRAY_MEAN] * prev_no +
-                                                     result_meta[self.METADATA_ARRAY_MEAN] * curr_no) / (prev_no +
-                                                                                                         curr_no)
-            result_meta[self._METADATA_ARRAY_SIZE] = prev_no + curr_no
-        if self.METADATA_ARRAY_MEAN_NON_ZERO in merge_meta and self._METADATA_ARRAY_SIZE_NON_ZERO in merge_meta:
-            prev_no = merge_meta[self._METADATA_ARRAY_SIZE_NON_ZERO]
-            curr_no = new_data.nonzero()[0].shape[0]
-            result_meta[self.METADATA_ARRAY_MEAN_NON_ZERO] = (merge_meta[self.METADATA_ARRAY_MEAN_NON_ZERO] * prev_no +
-                                                              result_meta[self.METADATA_ARRAY_MEAN_NON_ZERO] * curr_no
-                                                              ) / (prev_no + curr_no)
-            result_meta[self._METADATA_ARRAY_SIZE] = prev_no + curr_no
+    def __update_array_statistics(self, statistics, data, data_name):
+        """
+        :param data: New NumPy array (complete or just a chunk) to compute meta-data on.
+        """
+        try:
+            statistics.update(data)
+        except Exception:
+            self.logger.exception("Could not compute array meta-data on %s" % data_name)
 
     # ---------------------------- END ARRAY ATTR METADATA ------------------------
 
@@ -613,7 +611,8 @@ class Array(mapped.Array):
             return None
         elif self.trait.file_storage == FILE_STORAGE_DEFAULT:
             try:
-                return inst.get_data(self.trait.name, ignore_errors=True)
+                return inst.get_data(self.trait.name, ignore_errors=True,
+                                     memory_map=TvbProfile.current.MEMORY_MAPPED_READS)
             except StorageException as exc:
                 self.logger.debug("Missing dataSet " + self.trait.name)
                 self.logger.debug(exc)
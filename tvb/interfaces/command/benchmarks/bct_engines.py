@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Compare the time needed for computing BCT measures in-process with NumPy, against Matlab / Octave (when available),
+on random connectomes of the given sizes.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.bct_engines [nr_of_nodes ...]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+import numpy
+from time import time
+from tvb.adapters.analyzers import bct_native
+from tvb.adapters.analyzers.bct_adapters import BCT_PATH
+from tvb.adapters.analyzers.matlab_worker import MatlabWorker
+from tvb.basic.profile import TvbProfile
+
+MEASURES = ["deg = degrees_und(CIJ);",
+            "strength = strengths_und(CIJ);",
+            "C = clustering_coef_wu(CIJ);",
+            "T = transitivity_wu(CIJ);",
+            "D = distance_wei(CIJ);",
+            "C = betweenness_bin(CIJ);",
+            "C = betweenness_wei(CIJ);",
+            "v = eigenvector_centrality_und(CIJ)",
+            "[coreness, kn] = kcoreness_centrality_bu(CIJ);",
+            "[Ci, Q] = modularity_und(CIJ);",
+            "[Ci, Q] = modularity_dir(CIJ); P = participation_coef(CIJ, Ci);"]
+MEAN_DEGREE = 20
+
+
+def _connectome(nr_of_nodes):
+    """
+    Random undirected weighted graph, with connections between close nodes more likely, as in a brain.
+    """
+    positions = numpy.random.random((nr_of_nodes, 1))
+    probability = min(1.0, float(MEAN_DEGREE) / nr_of_nodes)
+    weights = numpy.random.random((nr_of_nodes, nr_of_nodes))
+    connected = numpy.random.random((nr_of_nodes, nr_of_nodes)) < probability * 2 * (1 - abs(positions - positions.T))
+    weights = numpy.triu(weights * connected, 1)
+    return weights + weights.T
+
+
+def _time_native(code, weights):
+    start = time()
+    bct_native.execute(code, {'CIJ': weights})
+    return time() - start
+
+
+def _time_matlab(code, weights):
+    worker = MatlabWorker()
+    worker.add_to_path(BCT_PATH)
+    start = time()
+    worker.matlab(code, {'CIJ': weights})
+    return time() - start
+
+
+def run(nr_of_nodes=68):
+    """
+    :returns: list of tuples (BCT code, native seconds, Matlab seconds or None when Matlab/Octave is not available)
+    """
+    weights = _connectome(nr_of_nodes)
+    with_matlab = not not TvbProfile.current.MATLAB_EXECUTABLE
+    results = []
+    for code in MEASURES:
+        native_time = _time_native(code, weights)
+        matlab_time = _time_matlab(code, weights) if with_matlab else None
+        results.append((code, native_time, matlab_time))
+    return results
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [68, 1000]
+    for nr_of_nodes in sizes:
+        print("Connectome of %d nodes" % nr_of_nodes)
+        print("%-64s | %10s | %10s" % ("BCT code", "NumPy (s)", "Matlab (s)"))
+        for code, native_time, matlab_time in run(nr_of_nodes):
+            matlab_text = "%10.3f" % matlab_time if matlab_time is not None else "%10s" % "-"
+            print("%-64s | %10.3f | %s" % (code, native_time, matlab_text))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Compare storing the Workflows, Operations and WorkflowSteps of a PSE burst one entity at a time, with the
+batched bulk inserts used when launching a burst. A throw-away project is created and removed in the current DB.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.burst_launch [grid_size ...]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+from time import time
+from tvb.config import SIMULATOR_MODULE, SIMULATOR_CLASS
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.services.project_service import ProjectService
+from tvb.core.services.user_service import UserService
+
+STEPS_AFTER_SIMULATION = 3
+
+
+def _burst_entities(project, user, algorithm, grid_size):
+    """
+    :returns: new (not stored) workflows, their simulation steps, and per analysis step operations and steps
+    """
+    workflows = [model.Workflow(project.id, None) for _ in range(grid_size)]
+    simulation_steps = [model.WorkflowStep(algorithm.id, static_param={}, step_index=0) for _ in range(grid_size)]
+    analysis = []
+    for step_index in range(1, STEPS_AFTER_SIMULATION + 1):
+        operations = [model.Operation(user.id, project.id, algorithm.id, '{}') for _ in range(grid_size)]
+        steps = [model.WorkflowStep(algorithm.id, static_param={}, step_index=step_index) for _ in range(grid_size)]
+        analysis.append((operations, steps))
+    return workflows, simulation_steps, analysis
+
+
+def _store_one_by_one(workflows, simulation_steps, analysis):
+    for workflow, simulation_step in zip(workflows, simulation_steps):
+        workflow = dao.store_entity(workflow)
+        simulation_step.fk_workflow = workflow.id
+        dao.store_entity(simulation_step)
+    for operations, steps in analysis:
+        for workflow, operation, step in zip(workflows, operations, steps):
+            operation = dao.store_entity(operation)
+            step.fk_workflow = workflow.id
+            step.fk_operation = operation.id
+            dao.store_entity(step)
+
+
+def _store_bulk(workflows, simulation_steps, analysis):
+    dao.store_workflows_with_steps(workflows, simulation_steps)
+    all_operations, all_steps = [], []
+    for operations, steps in analysis:
+        for workflow, step in zip(workflows, steps):
+            step.fk_workflow = workflow.id
+        all_operations.extend(operations)
+        all_steps.extend(steps)
+    dao.store_workflow_steps_with_operations(all_steps, all_operations)
+
+
+def run(grid_sizes=(100, 500, 2000)):
+    """
+    :returns: list of tuples (grid size, seconds storing one by one, seconds storing in bulk)
+    """
+    user = UserService.get_administrators()[0]
+    project = ProjectService().store_project(user, True, None, name="BurstLaunchBenchmark",
+                                             description="Temporary project, for benchmarking", users=[])
+    algorithm = dao.get_algorithm_by_module(SIMULATOR_MODULE, SIMULATOR_CLASS)
+    results = []
+    try:
+        for grid_size in grid_sizes:
+            start = time()
+            _store_one_by_one(*_burst_entities(project, user, algorithm, grid_size))
+            one_by_one_time = time() - start
+
+            start = time()
+            _store_bulk(*_burst_entities(project, user, algorithm, grid_size))
+            bulk_time = time() - start
+            results.append((grid_size, one_by_one_time, bulk_time))
+    finally:
+        ProjectService().remove_project(project.id)
+    return results
+
+
+def main():
+    grid_sizes = [int(arg) for arg in sys.argv[1:]] or [100, 500, 2000]
+    print("Burst launch persistence, %d steps after the simulation" % STEPS_AFTER_SIMULATION)
+    print("%10s %14s %10s %9s" % ("grid size", "one by one (s)", "bulk (s)", "speedup"))
+    for grid_size, one_by_one_time, bulk_time in run(grid_sizes):
+        print("%10d %14.3f %10.3f %8.2fx" % (grid_size, one_by_one_time, bulk_time,
+                                             one_by_one_time / max(bulk_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Measure small DAO calls per second issued concurrently from many threads, the way CherryPy worker threads
+query the DB while serving requests. The per-thread session registry in use is compared with the previous one,
+which scanned all known threads on every session access.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.dao_threads [nr_of_threads ...]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+import threading
+from time import time
+from tvb.config import SIMULATOR_MODULE, SIMULATOR_CLASS
+from tvb.core.entities.storage import dao
+from tvb.core.entities.storage.session_maker import SessionsStack
+
+
+class _ScanningSessionMaker(object):
+    """
+    The previous registry: a dictionary {thread: SessionsStack}, cleaned of finished threads on every access.
+    """
+
+    def __init__(self):
+        self.handled_sessions = {}
+
+
+    def _stack(self):
+        current_thread = threading.current_thread()
+        if current_thread not in self.handled_sessions:
+            self.handled_sessions[current_thread] = SessionsStack()
+        for thread in self.handled_sessions.keys():
+            if not thread.isAlive():
+                try:
+                    del self.handled_sessions[thread]
+                except Exception:
+                    pass
+        return self.handled_sessions[current_thread]
+
+
+    def __getattr__(self, name):
+        return getattr(self._stack().current_session, name)
+
+
+    def open_session(self):
+        self._stack().open_session()
+
+
+    def close_session(self):
+        self._stack().close_session()
+
+
+def _calls_per_second(nr_of_threads, calls_per_thread):
+    algorithm_id = dao.get_algorithm_by_module(SIMULATOR_MODULE, SIMULATOR_CLASS).id
+
+    def _worker():
+        for _ in range(calls_per_thread):
+            dao.get_algorithm_by_id(algorithm_id)
+
+    threads = [threading.Thread(target=_worker, name="CP Server Thread-%d" % idx) for idx in range(nr_of_threads)]
+    start = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return nr_of_threads * calls_per_thread / (time() - start)
+
+
+def run(threads_counts=(1, 10, 50), calls_per_thread=200):
+    """
+    :returns: list of tuples (number of threads, calls/s with the scanning registry, calls/s thread-local registry)
+    """
+    results = []
+    for nr_of_threads in threads_counts:
+        dao.session = _ScanningSessionMaker()
+        try:
+            scanning = _calls_per_second(nr_of_threads, calls_per_thread)
+        finally:
+            del dao.session
+        thread_local = _calls_per_second(nr_of_threads, calls_per_thread)
+        results.append((nr_of_threads, scanning, thread_local))
+    return results
+
+
+def main():
+    threads_counts = [int(arg) for arg in sys.argv[1:]] or [1, 10, 50]
+    print("%8s %22s %22s" % ("threads", "scanning (calls/s)", "thread-local (calls/s)"))
+    for nr_of_threads, scanning, thread_local in run(threads_counts):
+        print("%8d %22.1f %22.1f" % (nr_of_threads, scanning, thread_local))
+
+
+if __name__ == "__main__":
+    main()
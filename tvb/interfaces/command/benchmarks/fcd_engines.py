@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Compare the time and memory needed for computing the FCD matrix with sliding window statistics, against the loop of
+FcdCalculator.evaluate (correlation of each window from scratch, then of each pair of windows), on a random
+region time series stored in a temporary H5 file.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.fcd_engines [nr_of_time_points nr_of_nodes]
+"""
+
+import os
+import sys
+import shutil
+import resource
+import tempfile
+import multiprocessing
+import h5py
+import numpy
+from time import time
+from tvb.adapters.analyzers import sliding_window_fcd
+
+# (sliding window, spanning) in time points, typical of BOLD or downsampled region time series
+WINDOWS = [(60, 2), (60, 10), (120, 2), (120, 20), (300, 30)]
+
+
+
+class _H5TimeSeries(object):
+    """
+    Data read in slices from the H5 file, as a stored TimeSeries.
+    """
+
+    def __init__(self, file_name):
+        self.h5_file = h5py.File(file_name, 'r')
+        self.data = self.h5_file['data']
+
+
+    def read_data_shape(self):
+        return self.data.shape
+
+
+    def read_data_slice(self, data_slice):
+        return self.data[data_slice]
+
+
+
+def _fcd_calculator_loop(time_series, sw, sp):
+    shape = time_series.read_data_shape()
+    nr_of_windows = sliding_window_fcd.get_nr_of_windows(shape[0], sw, sp)
+    fcd = numpy.zeros((nr_of_windows, nr_of_windows, shape[1], shape[3]))
+    for mode in range(shape[3]):
+        for var in range(shape[1]):
+            fc_stream = {}
+            start = -sp
+            for window in range(nr_of_windows):
+                start += sp
+                data_slice = (slice(int(start), int(start + sw) + 1), slice(var, var + 1),
+                              slice(shape[2]), slice(mode, mode + 1))
+                fc = numpy.corrcoef(time_series.read_data_slice(data_slice).squeeze().T)
+                fc_stream[window] = fc[numpy.triu_indices(len(fc), 1)]
+            for i in range(nr_of_windows):
+                for j in range(i, nr_of_windows):
+                    fcd[i, j, var, mode] = fcd[j, i, var, mode] = numpy.corrcoef(fc_stream[i], fc_stream[j])[0, 1]
+    return fcd
+
+
+def _measure(function, file_name, sw, sp, results):
+    """
+    Executed in a new process, so the peak memory of each path is measured separately.
+    """
+    time_series = _H5TimeSeries(file_name)
+    memory_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time()
+    function(time_series, float(sw), float(sp))
+    duration = time() - start
+    memory_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memory_before
+    results.put((duration, memory_peak / 1024.0))
+
+
+def _run_in_process(function, file_name, sw, sp):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_measure, args=(function, file_name, sw, sp, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def run(nr_of_time_points=2000, nr_of_nodes=76):
+    """
+    :returns: list of tuples (sw, sp, number of windows, (seconds, MB) for FcdCalculator, (seconds, MB) streaming)
+    """
+    folder = tempfile.mkdtemp()
+    try:
+        file_name = os.path.join(folder, "time_series.h5")
+        with h5py.File(file_name, 'w') as h5_file:
+            h5_file['data'] = numpy.random.randn(nr_of_time_points, 1, nr_of_nodes, 1).cumsum(axis=0)
+        results = []
+        for sw, sp in WINDOWS:
+            if sw >= nr_of_time_points:
+                continue
+            nr_of_windows = sliding_window_fcd.get_nr_of_windows(nr_of_time_points, sw, sp)
+            current = _run_in_process(_fcd_calculator_loop, file_name, sw, sp)
+            streaming = _run_in_process(sliding_window_fcd.compute_fcd, file_name, sw, sp)
+            results.append((sw, sp, nr_of_windows, current, streaming))
+        return results
+    finally:
+        shutil.rmtree(folder)
+
+
+def main():
+    arguments = [int(arg) for arg in sys.argv[1:]]
+    print("%8s | %8s | %8s | %22s | %22s" % ("sw", "sp", "windows", "FcdCalculator (s, MB)", "Streaming (s, MB)"))
+    for sw, sp, nr_of_windows, current, streaming in run(*arguments):
+        print("%8d | %8d | %8d | %10.3f %10.1f | %10.3f %10.1f" % ((sw, sp, nr_of_windows) + current + streaming))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Micro-benchmark for reading many small slices from the same H5 file, with and without the pool of open H5 files.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.h5_file_pool [nr_of_slices]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+import shutil
+import tempfile
+import numpy
+from time import time
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
+
+DATASET_NAME = "data"
+
+
+def _read_slices(storage, nr_of_slices, shape):
+    start = time()
+    for i in range(nr_of_slices):
+        row = i % shape[0]
+        storage.get_data(DATASET_NAME, (slice(row, row + 1), slice(None)))
+    return time() - start
+
+
+def run(nr_of_slices=2000, shape=(1000, 100)):
+    """
+    :returns: tuple (seconds without pool, seconds with pool) spent for reading `nr_of_slices` rows
+    """
+    folder = tempfile.mkdtemp(prefix="tvb_h5_bench_")
+    try:
+        storage = HDF5StorageManager(folder, "bench.h5")
+        storage.store_data(DATASET_NAME, numpy.random.random(shape))
+
+        initial_size = FILE_POOL._max_size
+        try:
+            FILE_POOL._max_size = 0
+            FILE_POOL.close_all()
+            no_pool_time = _read_slices(storage, nr_of_slices, shape)
+
+            FILE_POOL._max_size = max(TvbProfile.current.HDF5_FILE_POOL_SIZE, 1)
+            pool_time = _read_slices(storage, nr_of_slices, shape)
+        finally:
+            FILE_POOL._max_size = initial_size
+            FILE_POOL.close_all()
+        return no_pool_time, pool_time
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def main():
+    nr_of_slices = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    no_pool_time, pool_time = run(nr_of_slices)
+    print("get_data for %d slices of one row" % nr_of_slices)
+    print("  without pool: %8.3f s (%8.1f us / call)" % (no_pool_time, 1e6 * no_pool_time / nr_of_slices))
+    print("  with pool:    %8.3f s (%8.1f us / call)" % (pool_time, 1e6 * pool_time / nr_of_slices))
+    print("  speedup:      %8.2fx" % (no_pool_time / max(pool_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
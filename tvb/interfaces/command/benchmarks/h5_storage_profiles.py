@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Compare the H5 storage profiles on a TimeSeries-like dataset (time, state variables, nodes, modes):
+write throughput, file size, and latency of reading a time window over all nodes, or one node over all time.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.h5_storage_profiles [nr_of_nodes] [nr_of_time_points]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import os
+import sys
+import shutil
+import tempfile
+import numpy
+from time import time
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.core.entities.file.hdf5_storage_profiles import STORAGE_PROFILES
+
+DATASET_NAME = "data"
+APPEND_CHUNK = 100
+WINDOW_LENGTH = 500
+NR_OF_READS = 20
+
+
+def _write(folder, profile, data):
+    storage = HDF5StorageManager(folder, profile.name + ".h5", storage_profile=profile)
+    start = time()
+    for idx in range(0, data.shape[0], APPEND_CHUNK):
+        storage.append_data(DATASET_NAME, data[idx:idx + APPEND_CHUNK], grow_dimension=0, close_file=False)
+    storage.close_file()
+    return storage, time() - start
+
+
+def _time_reads(storage, slices):
+    start = time()
+    for data_slice in slices:
+        storage.get_data(DATASET_NAME, data_slice)
+    return (time() - start) / len(slices)
+
+
+def run(nr_of_nodes=1000, nr_of_time_points=10000):
+    """
+    :returns: list of tuples (profile name, write MB/s, file size in MB, window read ms, channel read ms)
+    """
+    data = numpy.sin(numpy.linspace(0, 100, nr_of_time_points * 2 * nr_of_nodes))
+    data = data.reshape((nr_of_time_points, 2, nr_of_nodes, 1)) + 0.01 * numpy.random.random((1, 2, nr_of_nodes, 1))
+    data_mb = data.nbytes / 2.0 ** 20
+
+    windows = [(slice(start, start + WINDOW_LENGTH),)
+               for start in numpy.random.randint(0, nr_of_time_points - WINDOW_LENGTH, NR_OF_READS)]
+    channels = [(slice(None), slice(0, 1), slice(node, node + 1))
+                for node in numpy.random.randint(0, nr_of_nodes, NR_OF_READS)]
+
+    results = []
+    folder = tempfile.mkdtemp(prefix="tvb_h5_profiles_")
+    try:
+        for name in sorted(STORAGE_PROFILES):
+            storage, write_time = _write(folder, STORAGE_PROFILES[name], data)
+            file_size = os.path.getsize(os.path.join(folder, name + ".h5")) / 2.0 ** 20
+            window_time = _time_reads(storage, windows)
+            channel_time = _time_reads(storage, channels)
+            results.append((name, data_mb / write_time, file_size, 1000 * window_time, 1000 * channel_time))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def main():
+    nr_of_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nr_of_time_points = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    print("TimeSeries of %d time points x 2 state variables x %d nodes" % (nr_of_time_points, nr_of_nodes))
+    print("%-18s | %12s | %10s | %16s | %16s" % ("Profile", "Write (MB/s)", "Size (MB)",
+                                                 "Window read (ms)", "Channel read (ms)"))
+    for result in run(nr_of_nodes, nr_of_time_points):
+        print("%-18s | %12.1f | %10.1f | %16.2f | %16.2f" % result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Compare simulating a PSE over a Model parameter point by point, with a single vectorized simulation of the
+entire batch (as done when PSE_BATCH_SIZE > 1). Process start-up, which is also saved by batching, is not included.
+
+Execute:
+    python -m tvb.interfaces.command.benchmarks.pse_batch [nr_of_points] [simulation_length]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+import numpy
+from time import time
+from tvb.adapters.simulator.simulator_adapter import SimulatorAdapter
+from tvb.datatypes.connectivity import Connectivity
+from tvb.simulator import coupling, integrators, models, monitors
+from tvb.simulator.simulator import Simulator
+
+
+def _simulate(connectivity, a_values, simulation_length):
+    simulator = Simulator(connectivity=connectivity, coupling=coupling.Linear(a=numpy.array([0.0042])),
+                          model=models.Generic2dOscillator(a=a_values),
+                          integrator=integrators.HeunDeterministic(dt=0.1),
+                          monitors=[monitors.TemporalAverage(period=1.0)])
+    simulator.configure()
+    for _ in simulator(simulation_length=simulation_length):
+        pass
+
+
+def run(nr_of_points=16, simulation_length=200.0):
+    """
+    :returns: tuple (seconds for simulating points one by one, seconds for one batched simulation)
+    """
+    connectivity = Connectivity(load_default=True, use_storage=False)
+    connectivity.configure()
+    a_values = numpy.linspace(-2.0, 2.0, nr_of_points)
+
+    start = time()
+    for a_value in a_values:
+        _simulate(connectivity, numpy.array([a_value]), simulation_length)
+    individual_time = time() - start
+
+    start = time()
+    tiled = SimulatorAdapter._tile_connectivity(connectivity, nr_of_points)
+    _simulate(tiled, numpy.repeat(a_values, connectivity.number_of_regions), simulation_length)
+    batch_time = time() - start
+    return individual_time, batch_time
+
+
+def main():
+    nr_of_points = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    simulation_length = float(sys.argv[2]) if len(sys.argv) > 2 else 200.0
+    individual_time, batch_time = run(nr_of_points, simulation_length)
+    print("PSE of %d points, %.1f ms each" % (nr_of_points, simulation_length))
+    print("  point by point: %8.3f s" % individual_time)
+    print("  one batch:      %8.3f s" % batch_time)
+    print("  speedup:        %8.2fx" % (individual_time / max(batch_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
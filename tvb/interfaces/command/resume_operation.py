@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Launch again operations which did not finish: failed, canceled, or left started by a process or cluster job which
+got killed (e.g. at its walltime). Simulations with checkpoints continue from their latest one.
+
+Execute:
+    python -m tvb.interfaces.command.resume_operation <operation_id> [<operation_id> ...]
+"""
+
+if __name__ == "__main__":
+    from tvb.basic.profile import TvbProfile
+    TvbProfile.set_profile(TvbProfile.COMMAND_PROFILE)
+
+import sys
+from tvb.core.services.exceptions import OperationException
+from tvb.core.services.operation_service import OperationService
+
+
+def main(operation_ids):
+    operation_service = OperationService()
+    for operation_id in operation_ids:
+        try:
+            operation_service.resume_operation(int(operation_id))
+            print("Resumed operation %s" % operation_id)
+        except OperationException as excep:
+            print("Could not resume operation %s: %s" % (operation_id, excep))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("You should specify the ids of the operations to be resumed!")
+    else:
+        main(sys.argv[1:])
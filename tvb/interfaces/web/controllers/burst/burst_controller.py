@@ -48,6 +48,7 @@ from cherrypy.lib.static import serve_fileobj
 from tvb.config import SIMULATOR_MODULE, SIMULATOR_CLASS, MEASURE_METRICS_MODULE, MEASURE_METRICS_CLASS
 from tvb.basic.profile import TvbProfile
 from tvb.core.utils import generate_guid, string2bool
+from tvb.core.entities.storage import unit_of_work
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.services.import_service import ImportService
 from tvb.adapters.exporters.export_manager import ExportManager
@@ -147,6 +148,7 @@ class BurstController(BurstBaseController):
 
 
     @expose_fragment('burst/burst_history')
+    @unit_of_work
     def load_burst_history(self):
         """
         Load the available burst that are stored in the database at this time.
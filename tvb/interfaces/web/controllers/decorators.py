@@ -33,7 +33,6 @@ Decorators for Cherrypy exposed methods are defined here.
 
 .. moduleauthor:: Mihai Andrei <mihai.andrei@codemart.ro>
 """
-import numpy
 import os
 import json
 import cherrypy
@@ -43,8 +42,8 @@ from functools import wraps
 from genshi.template import TemplateLoader
 from tvb.basic.profile import TvbProfile
 from tvb.basic.logger.builder import get_logger
-from tvb.core.utils import TVBJSONEncoder
-from tvb.interfaces.web.controllers import common
+from tvb.core.utils import TVBJSONEncoder, string2bool
+from tvb.interfaces.web.controllers import common, ndarray_transport
 
 # some of these decorators could be cherrypy tools
 
@@ -90,28 +89,18 @@ def jsonify(func):
 
 def ndarray_to_http_binary(func):
     """
-    Decorator to wrap calls that return numpy arrays. It serializes them as binary http response
+    Decorator to wrap calls that return numpy arrays (or NdArraySource instances).
+    It streams them as binary http response. Clients may add the request parameters `transport_dtype`
+    ('float32' or 'float16', for less precision on floating point arrays) and `compress` (gzip the response).
     """
     @wraps(func)
     def deco(*a, **b):
+        transport_dtype = b.pop('transport_dtype', None)
+        compress = string2bool(b.pop('compress', False))
         x = func(*a, **b)
-        if not isinstance(x, numpy.ndarray):
-            raise ValueError('Datatype attribute must be an ndarray for binary transport not %s' % type(x) )
-
-        # map some unsupported dtypes to supported ones
-        if x.dtype == numpy.int64:
-            x = numpy.asarray(x, dtype=numpy.int32)
-
-        if x.dtype not in [numpy.float32, numpy.float64, numpy.int32]:
-            raise ValueError('Datatype not supported by binary transport %s' % x.dtype)
-
-        x = numpy.ascontiguousarray(x)
-        cherrypy.response.headers["Content-Type"] = "application/x.ndarray"
-        cherrypy.response.headers["Content-Length"] = x.nbytes
-        cherrypy.response.headers["X-Array-Shape"] = str(x.shape)
-        cherrypy.response.headers["X-Array-Type"] = str(x.dtype)
-
-        return x.tostring()
+        if not isinstance(x, ndarray_transport.NdArraySource):
+            x = ndarray_transport.InMemoryArraySource(x)
+        return ndarray_transport.send_ndarray(x, transport_dtype, compress)
 
     return deco
 
@@ -146,7 +135,8 @@ def handle_error(redirect):
                     raise cherrypy.HTTPError(ex.status, str(ex))
 
             except cherrypy.HTTPRedirect as ex:
-                if redirect:
+                if redirect or ex.status == 304:
+                    # 304 (Not Modified) is a valid answer for ajax calls too
                     raise
                 else:
                     log = get_logger(_LOGGER_NAME)
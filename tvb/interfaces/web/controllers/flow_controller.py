@@ -41,19 +41,23 @@ import cherrypy
 import formencode
 import numpy
 import six
+from cherrypy.lib import cptools, httputil
 from tvb.basic.filters.chain import FilterChain
 from tvb.core.adapters import constants
 from tvb.core.adapters.input_tree import InputTreeManager, MAXIMUM_DATA_TYPES_DISPLAYED, KEY_WARNING, WARNING_OVERFLOW
+from tvb.basic.traits.core import FILE_STORAGE_NONE
 from tvb.datatypes.arrays import MappedArray
+from tvb.basic.traits.types_mapped import Array, SparseMatrix
 from tvb.core.utils import url2path, parse_json_parameters, string2date, string2bool
 from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.file.datatype_attribute_cache import ATTRIBUTE_CACHE, CachedAttribute
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.services.exceptions import OperationException
 from tvb.core.services.operation_service import OperationService, RANGE_PARAMETER_1, RANGE_PARAMETER_2
 from tvb.core.services.project_service import ProjectService
 from tvb.core.services.burst_service import BurstService
-from tvb.interfaces.web.controllers import common
+from tvb.interfaces.web.controllers import common, ndarray_transport
 from tvb.interfaces.web.controllers.base_controller import BaseController
 from tvb.interfaces.web.controllers.decorators import expose_page, settings, context_selected, expose_numpy_array
 from tvb.interfaces.web.controllers.decorators import expose_fragment, handle_error, check_user, expose_json
@@ -547,13 +551,21 @@ class FlowController(BaseController):
 
 
     def _read_datatype_attribute(self, entity_gid, dataset_name, datatype_kwargs='null', **kwargs):
+        datatype_kwargs = json.loads(datatype_kwargs)
+        cache_key = ATTRIBUTE_CACHE.compute_key(entity_gid, dataset_name, datatype_kwargs, kwargs)
+        cached = ATTRIBUTE_CACHE.get(cache_key)
+        if cached is not None:
+            self._validate_cache_headers(cached)
+            return cached.value
+
         self.logger.debug("Starting to read HDF5: " + entity_gid + "/" + dataset_name + "/" + str(kwargs))
         entity = ABCAdapter.load_entity_by_gid(entity_gid)
+        file_paths = [entity.get_storage_file_path()]
 
-        datatype_kwargs = json.loads(datatype_kwargs)
         if datatype_kwargs:
             for key, value in six.iteritems(datatype_kwargs):
                 kwargs[key] = ABCAdapter.load_entity_by_gid(value)
+                file_paths.append(kwargs[key].get_storage_file_path())
 
         result = getattr(entity, dataset_name)
         if callable(result):
@@ -561,9 +573,35 @@ class FlowController(BaseController):
                 result = result(**kwargs)
             else:
                 result = result()
+
+        cached = ATTRIBUTE_CACHE.put(cache_key, result, file_paths)
+        if cached.is_cacheable:
+            self._validate_cache_headers(cached)
         return result
 
 
+    @staticmethod
+    def _validate_cache_headers(cached):
+        """
+        Set ETag and Last-Modified on the current response, and answer with 304 (Not Modified)
+        when the client already has this version of the attribute.
+        """
+        cherrypy.response.headers['ETag'] = cached.etag
+        cherrypy.response.headers['Last-Modified'] = httputil.HTTPDate(cached.last_modified)
+        # Clients may keep the data, but should check with us before reusing it
+        cherrypy.response.headers['Cache-Control'] = 'private, no-cache'
+        cptools.validate_etags()
+        cptools.validate_since()
+
+
+    @expose_json
+    def get_attribute_cache_statistics(self):
+        """
+        :returns: usage and hit/miss counters of the DataType attributes cache, as JSON.
+        """
+        return ATTRIBUTE_CACHE.get_statistics()
+
+
     @expose_json
     def read_datatype_attribute(self, entity_gid, dataset_name, flatten=False, datatype_kwargs='null', **kwargs):
         """
@@ -591,8 +629,43 @@ class FlowController(BaseController):
 
 
     @expose_numpy_array
-    def read_binary_datatype_attribute(self, entity_gid, dataset_name, datatype_kwargs='null', **kwargs):
-        return self._read_datatype_attribute(entity_gid, dataset_name, datatype_kwargs, **kwargs)
+    def read_binary_datatype_attribute(self, entity_gid, dataset_name, datatype_kwargs='null', data_slice=None,
+                                       **kwargs):
+        """
+        Retrieve from a given DataType a property or a method result, as a binary stream (see ndarray_transport).
+
+        :param data_slice: optional slicing of the result, e.g. "0:100,::2"
+        Large arrays stored in H5 are streamed directly from their file, without being loaded at once.
+        """
+        data_slice = ndarray_transport.parse_data_slice(data_slice)
+        if datatype_kwargs == 'null' and not kwargs:
+            source = self._get_stored_array_source(entity_gid, dataset_name, data_slice)
+            if source is not None:
+                return source
+        result = self._read_datatype_attribute(entity_gid, dataset_name, datatype_kwargs, **kwargs)
+        return ndarray_transport.InMemoryArraySource(result, data_slice)
+
+
+    def _get_stored_array_source(self, entity_gid, dataset_name, data_slice):
+        """
+        :returns: H5DatasetSource when the attribute is a large array, stored in H5 and not already cached.
+        """
+        cache_key = ATTRIBUTE_CACHE.compute_key(entity_gid, dataset_name)
+        if cache_key in ATTRIBUTE_CACHE:
+            return None
+        entity = ABCAdapter.load_entity_by_gid(entity_gid)
+        attribute = entity.trait.get(dataset_name) if hasattr(entity, 'trait') else None
+        if (not isinstance(attribute, Array) or isinstance(attribute, SparseMatrix)
+                or attribute.trait.file_storage == FILE_STORAGE_NONE):
+            return None
+
+        source = ndarray_transport.H5DatasetSource(entity, dataset_name, data_slice)
+        if numpy.prod(source.full_shape) * source.dtype.itemsize <= ndarray_transport.CHUNK_BYTES:
+            # Small arrays are better kept in cache
+            return None
+        slice_key = ATTRIBUTE_CACHE.compute_key(entity_gid, dataset_name, None, {'data_slice': str(data_slice)})
+        self._validate_cache_headers(CachedAttribute(slice_key, None, [entity.get_storage_file_path()]))
+        return source
 
 
     @expose_fragment("flow/genericAdapterFormFields")
@@ -693,7 +766,7 @@ class FlowController(BaseController):
             op_group = ProjectService.get_operation_group_by_id(operation_id)
             operations_in_group = ProjectService.get_operations_in_group(op_group)
             for operation in operations_in_group:
-                tmp_res = operation_service.stop_operation(operation.id)
+                tmp_res = operation_service.stop_operation(operation.id, launch_batch_members=False)
                 if remove_after_stop:
                     ProjectService().remove_operation(operation.id)
                 result = result or tmp_res
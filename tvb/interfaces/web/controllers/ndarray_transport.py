@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Binary transport of numpy arrays towards the browser (see HLPR_fetchNdArray in genericTVB.js).
+
+Arrays are sent in C order, chunk by chunk, as raw bytes. Shape and dtype travel as X-Array-Shape and
+X-Array-Type headers. Arrays stored in H5 files are read block by block while streaming, so the whole
+array is never loaded (or copied) on the server. Single byte ranges (HTTP Range) are supported, as well as
+gzip compression and float16 / float32 down-casting when asked for by the client.
+"""
+
+import numpy
+import cherrypy
+from abc import ABCMeta, abstractmethod
+from cherrypy.lib import encoding, httputil
+
+
+MIME_TYPE = "application/x.ndarray"
+
+# Size of the blocks read and sent at once
+CHUNK_BYTES = 1024 * 1024
+
+SUPPORTED_DTYPES = [numpy.float32, numpy.float64, numpy.int32, numpy.int16, numpy.uint16, numpy.uint8]
+
+# Types not known in JavaScript, sent as the closest supported one. uint32 goes as float64, which holds it exactly;
+# int64 is narrowed to int32.
+MAPPED_DTYPES = {numpy.dtype(numpy.int64): numpy.int32,
+                 numpy.dtype(numpy.int8): numpy.int16,
+                 numpy.dtype(numpy.uint32): numpy.float64,
+                 numpy.dtype(numpy.bool_): numpy.uint8}
+
+# Precision reductions a client may ask for, on floating point arrays
+DOWNCAST_DTYPES = {'float32': numpy.float32, 'float16': numpy.float16}
+
+
+
+def parse_data_slice(data_slice):
+    """
+    :param data_slice: slicing as written in Python, for each dimension, e.g. "10:20,::2" or "5,:"
+        A single index keeps its dimension (5 is read as 5:6).
+    :returns: tuple of slice instances (empty when data_slice is None)
+    """
+    if data_slice is None or not data_slice.strip():
+        return ()
+    result = []
+    for dimension in data_slice.split(','):
+        parts = [int(part) if part.strip() else None for part in dimension.split(':')]
+        if len(parts) == 1:
+            if parts[0] is None:
+                raise ValueError("Invalid data slice %s" % data_slice)
+            result.append(slice(parts[0], parts[0] + 1 if parts[0] != -1 else None))
+        elif len(parts) <= 3:
+            result.append(slice(*parts))
+        else:
+            raise ValueError("Invalid data slice %s" % data_slice)
+    return tuple(result)
+
+
+
+class NdArraySource(object):
+    """
+    An array which can be read row by row (along its first dimension) while being sent.
+    """
+    __metaclass__ = ABCMeta
+
+    def __init__(self, shape, dtype):
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+
+
+    @abstractmethod
+    def read_rows(self, start, stop):
+        """
+        :returns: ndarray with the rows [start, stop) along the first dimension
+        """
+
+
+
+class InMemoryArraySource(NdArraySource):
+    """
+    An array already computed, or read from cache.
+    """
+
+    def __init__(self, array, data_slice=()):
+        if not isinstance(array, numpy.ndarray):
+            raise ValueError('Datatype attribute must be an ndarray for binary transport not %s' % type(array))
+        if data_slice:
+            array = array[data_slice]
+        if array.ndim == 0:
+            array = array.reshape(1)
+        super(InMemoryArraySource, self).__init__(array.shape, array.dtype)
+        self.array = array
+
+
+    def read_rows(self, start, stop):
+        return self.array[start:stop]
+
+
+
+class H5DatasetSource(NdArraySource):
+    """
+    A DataType array stored in its H5 file, read one block of rows at a time.
+    """
+
+    def __init__(self, datatype, dataset_name, data_slice=()):
+        self.datatype = datatype
+        self.dataset_name = dataset_name
+        full_shape = datatype.get_data_shape(dataset_name)
+        self.full_shape = full_shape
+        if len(data_slice) > len(full_shape):
+            raise ValueError("Too many dimensions in slice, for array of shape %s" % str(full_shape))
+
+        self.slices = []
+        shape = []
+        for idx, size in enumerate(full_shape):
+            start, stop, step = (data_slice[idx] if idx < len(data_slice) else slice(None)).indices(size)
+            if step < 1:
+                raise ValueError("Only positive steps are supported when slicing stored arrays")
+            self.slices.append((start, step))
+            shape.append(len(range(start, stop, step)))
+
+        dtype = datatype.get_data(dataset_name, (slice(0, 0),)).dtype
+        super(H5DatasetSource, self).__init__(shape, dtype)
+
+
+    def read_rows(self, start, stop):
+        first_start, first_step = self.slices[0]
+        rows = slice(first_start + start * first_step, first_start + stop * first_step, first_step)
+        others = tuple(slice(dim_start, dim_start + size * step, step)
+                       for (dim_start, step), size in zip(self.slices[1:], self.shape[1:]))
+        return self.datatype.get_data(self.dataset_name, (rows,) + others)
+
+
+
+def get_transport_dtype(source_dtype, transport_dtype=None):
+    """
+    :param transport_dtype: 'float32' or 'float16', to reduce precision (and size) of floating point arrays
+    :returns: the numpy dtype in which the given array is to be sent
+    """
+    source_dtype = numpy.dtype(source_dtype).newbyteorder('=')
+    dtype = numpy.dtype(MAPPED_DTYPES.get(source_dtype, source_dtype))
+    if transport_dtype:
+        if transport_dtype not in DOWNCAST_DTYPES:
+            raise ValueError('Transport type not supported %s' % transport_dtype)
+        if source_dtype.kind == 'f' and numpy.dtype(DOWNCAST_DTYPES[transport_dtype]).itemsize < dtype.itemsize:
+            return numpy.dtype(DOWNCAST_DTYPES[transport_dtype])
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError('Datatype not supported by binary transport %s' % dtype)
+    return dtype
+
+
+def send_ndarray(source, transport_dtype=None, compress=False):
+    """
+    Prepare the current CherryPy response for streaming an array.
+
+    :param source: NdArraySource to be sent
+    :param transport_dtype: optional precision reduction (see get_transport_dtype)
+    :param compress: when True and accepted by the client, gzip the stream (not applied to partial responses)
+    :returns: generator of byte chunks, to be used as response body
+    """
+    dtype = get_transport_dtype(source.dtype, transport_dtype)
+    row_size = int(numpy.prod(source.shape[1:], dtype=numpy.int64)) * dtype.itemsize
+    total_size = source.shape[0] * row_size
+
+    response = cherrypy.serving.response
+    response.headers["Content-Type"] = MIME_TYPE
+    response.headers["X-Array-Shape"] = str(source.shape)
+    response.headers["X-Array-Type"] = str(dtype)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.stream = True
+
+    byte_range = (0, total_size)
+    ranges = httputil.get_ranges(cherrypy.serving.request.headers.get('Range'), total_size)
+    if ranges == []:
+        response.headers['Content-Range'] = "bytes */%s" % total_size
+        raise cherrypy.HTTPError(416, "Requested Range Not Satisfiable")
+    if ranges is not None and len(ranges) == 1:
+        # Multiple ranges are rare for arrays, and answering with the full content is allowed
+        byte_range = ranges[0]
+        response.status = 206
+        response.headers['Content-Range'] = "bytes %s-%s/%s" % (byte_range[0], byte_range[1] - 1, total_size)
+
+    body = _iterate_bytes(source, dtype, row_size, byte_range[0], byte_range[1])
+    accepted = [str(value) for value in cherrypy.serving.request.headers.elements('Accept-Encoding')]
+    if compress and response.status != 206 and ('gzip' in accepted or 'x-gzip' in accepted):
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return encoding.compress(body, 6)
+
+    response.headers["Content-Length"] = byte_range[1] - byte_range[0]
+    return body
+
+
+def _iterate_bytes(source, dtype, row_size, start_byte, stop_byte):
+    """
+    Read the rows holding the bytes in [start_byte, stop_byte), in blocks of about CHUNK_BYTES.
+    """
+    if row_size == 0 or start_byte >= stop_byte:
+        return
+    rows_per_chunk = max(1, CHUNK_BYTES // row_size)
+    first_row = start_byte // row_size
+    last_row = (stop_byte - 1) // row_size + 1
+    for chunk_start in range(first_row, last_row, rows_per_chunk):
+        chunk_stop = min(chunk_start + rows_per_chunk, last_row)
+        chunk = numpy.ascontiguousarray(source.read_rows(chunk_start, chunk_stop), dtype=dtype).tostring()
+        chunk_offset = chunk_start * row_size
+        yield chunk[max(start_byte - chunk_offset, 0): stop_byte - chunk_offset]
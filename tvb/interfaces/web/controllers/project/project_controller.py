@@ -728,13 +728,13 @@ class ProjectController(BaseController):
         """
         current_project = self.project_service.find_project(project_id)
         export_mng = ExportManager()
-        export_file = export_mng.export_project(current_project)
+        # The archive is produced while being downloaded, without a temporary ZIP on disk
+        zip_name, archive_stream = export_mng.stream_project(current_project)
 
-        # Register export file for delete when download complete
-        # We force parent folder deletion because export process generated it.
-        self.mark_file_for_delete(export_file, True)
-
-        return serve_file(export_file, "application/x-download", "attachment")
+        cherrypy.response.headers['Content-Type'] = "application/x-download"
+        cherrypy.response.headers['Content-Disposition'] = 'attachment; filename="%s"' % zip_name
+        cherrypy.response.stream = True
+        return archive_stream
 
 
     #methods related to data structure - graph
@@ -38,6 +38,7 @@ import shutil
 import cherrypy
 import tvb.interfaces.web.controllers.base_controller as bc
 from tvb.basic.logger.builder import get_logger
+from tvb.core.entities.storage.session_maker import SessionMaker
 
 # Constants for upload
 from tvb.interfaces.web.controllers.common import get_from_session
@@ -72,6 +73,16 @@ class RequestHandler(object):
                 raise cherrypy.HTTPRedirect("/tvb?error=True")
 
 
+    @staticmethod
+    def start_unit_of_work():
+        """
+        This method is executed at the start of a request, for all DAO calls of the request to share one DB session.
+        The session is closed at the end of the request.
+        """
+        SessionMaker().start_unit_of_work()
+        cherrypy.request.hooks.attach('on_end_request', SessionMaker().close_unit_of_work)
+
+
     @staticmethod
     def clean_files_on_disk():
         """
@@ -52,6 +52,7 @@ from tvb.basic.logger.builder import get_logger
 from tvb.core.adapters.abcdisplayer import ABCDisplayer
 from tvb.core.decorators import user_environment_execution
 from tvb.core.services.initializer import initialize, reset
+from tvb.core.services.backend_client import StandAloneClient
 from tvb.core.services.exceptions import InvalidSettingsException
 from tvb.interfaces.web.request_handler import RequestHandler
 from tvb.interfaces.web.controllers.base_controller import BaseController
@@ -83,6 +84,7 @@ def init_cherrypy(arguments=None):
     #### Mount static folders from modules marked for introspection
     arguments = arguments or []
     CONFIGUER = TvbProfile.current.web.CHERRYPY_CONFIGURATION
+    CONFIGUER['/']['tools.unit_of_work.on'] = TvbProfile.current.WEB_UNIT_OF_WORK
     for module in arguments:
         module_inst = __import__(str(module), globals(), locals(), ["__init__"])
         module_path = os.path.dirname(os.path.abspath(module_inst.__file__))
@@ -116,6 +118,8 @@ def init_cherrypy(arguments=None):
     cherrypy.tools.upload = Tool('on_start_resource', RequestHandler.check_upload_size)
     # This tools clean up files on disk (mainly after export)
     cherrypy.tools.cleanup = Tool('on_end_request', RequestHandler.clean_files_on_disk)
+    # This tool makes all DAO calls of a request share one DB session
+    cherrypy.tools.unit_of_work = Tool('on_start_resource', RequestHandler.start_unit_of_work)
     # ----------------- End register additional request handlers ----------------
 
     #### HTTP Server is fired now ######  
@@ -144,6 +148,9 @@ def start_tvb(arguments, browser=True):
         LOGGER.exception(excep)
         sys.exit()
 
+    #### Have the operation workers warm, when enabled
+    StandAloneClient.start_workers()
+
     #### Mark that the interface is Web
     ABCDisplayer.VISUALIZERS_ROOT = TvbProfile.current.web.VISUALIZERS_ROOT
     ABCDisplayer.VISUALIZERS_URL_PREFIX = TvbProfile.current.web.VISUALIZERS_URL_PREFIX
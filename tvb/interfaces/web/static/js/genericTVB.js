@@ -1098,7 +1098,29 @@ NdArr.prototype.unflatten = function () {
 };
 
 /**
- * Retrieves from server a numpy array
+ * Decode IEEE 754 half precision numbers (as sent when transport_dtype=float16 is requested)
+ */
+function _float16ToFloat32(halfs) {
+    const result = new Float32Array(halfs.length);
+    for (let i = 0; i < halfs.length; ++i) {
+        const h = halfs[i];
+        const sign = (h & 0x8000) ? -1 : 1;
+        const exponent = (h & 0x7C00) >> 10;
+        const fraction = h & 0x03FF;
+        if (exponent === 0) {
+            result[i] = sign * Math.pow(2, -14) * (fraction / 1024);
+        } else if (exponent === 0x1F) {
+            result[i] = fraction ? NaN : sign * Infinity;
+        } else {
+            result[i] = sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+        }
+    }
+    return result;
+}
+
+/**
+ * Retrieves from server a numpy array.
+ * The url may also ask for data_slice, transport_dtype (float32/float16) or compress=true (see ndarray_transport.py)
  */
 function HLPR_fetchNdArray(binary_url, onload, kwargs) {
     const oReq = new XMLHttpRequest();
@@ -1122,6 +1144,18 @@ function HLPR_fetchNdArray(binary_url, onload, kwargs) {
             case "float32":
                 floatArray = new Float32Array(arrayBuffer);
                 break;
+            case "float16":
+                floatArray = _float16ToFloat32(new Uint16Array(arrayBuffer));
+                break;
+            case "int16":
+                floatArray = new Int16Array(arrayBuffer);
+                break;
+            case "uint16":
+                floatArray = new Uint16Array(arrayBuffer);
+                break;
+            case "uint8":
+                floatArray = new Uint8Array(arrayBuffer);
+                break;
             default:
                 throw "datatype not supported " + dtype;
         }
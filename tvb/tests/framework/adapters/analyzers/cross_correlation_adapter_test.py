@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test the adapters computing correlations of TimeSeries nodes.
+"""
+
+import numpy
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.adapters.analyzers import streaming_covariance
+from tvb.adapters.analyzers.cross_correlation_adapter import CrossCorrelateAdapter
+from tvb.adapters.analyzers.cross_correlation_adapter import PearsonCorrelationCoefficientAdapter
+from tvb.analyzers.correlation_coefficient import CorrelationCoefficient
+from tvb.core.adapters import parallel_blocks
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+
+
+
+class TestCrossCorrelateAdapter(TransactionalTestCase):
+    """
+    Launch the CrossCorrelateAdapter on a stored TimeSeries.
+    """
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, connectivity = self.datatypes_factory.create_connectivity()
+        self.time_series = self.datatypes_factory.create_timeseries(connectivity)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def _launch(self, folder_name):
+        adapter = CrossCorrelateAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, folder_name)
+        adapter.configure(self.time_series)
+        return adapter.launch(self.time_series)
+
+
+    def test_launch_in_worker_processes(self):
+        """
+        State variables computed in worker processes are written in the same order as when computed in-process.
+        """
+        original_get_nr_of_workers = parallel_blocks.get_nr_of_workers
+        try:
+            cross_corr = self._launch("cross_corr_in_process")
+            parallel_blocks.get_nr_of_workers = lambda nr_of_items: min(3, nr_of_items)
+            parallel_cross_corr = self._launch("cross_corr_in_workers")
+        finally:
+            parallel_blocks.get_nr_of_workers = original_get_nr_of_workers
+
+        expected = cross_corr.get_data('array_data')
+        assert expected.shape[3] == self.time_series.read_data_shape()[1]
+        assert numpy.allclose(parallel_cross_corr.get_data('array_data'), expected)
+        assert numpy.allclose(parallel_cross_corr.time, cross_corr.time)
+
+
+
+class TestPearsonCorrelationCoefficientAdapter(TransactionalTestCase):
+    """
+    Launch the PearsonCorrelationCoefficientAdapter on a stored TimeSeries, reading it in blocks of time points.
+    """
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, connectivity = self.datatypes_factory.create_connectivity()
+        self.time_series = self.datatypes_factory.create_timeseries(connectivity)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def test_launch_in_time_blocks(self):
+        """
+        Coefficients accumulated over blocks of time points (with the last one smaller) are the ones of
+        CorrelationCoefficient, computed on all time points at once.
+        """
+        t_start, t_end = self.time_series.sample_period, self.time_series.sample_period * 8
+        adapter = PearsonCorrelationCoefficientAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, "pearson")
+        adapter.configure(self.time_series, t_start, t_end)
+
+        original_block_elements = streaming_covariance.TIME_BLOCK_ELEMENTS
+        try:
+            streaming_covariance.TIME_BLOCK_ELEMENTS = 3 * self.time_series.read_data_shape()[2]
+            result = adapter.launch(self.time_series, t_start, t_end)
+        finally:
+            streaming_covariance.TIME_BLOCK_ELEMENTS = original_block_elements
+
+        expected = CorrelationCoefficient(time_series=self.time_series, t_start=t_start, t_end=t_end).evaluate()
+        assert numpy.allclose(result.array_data, expected.array_data)
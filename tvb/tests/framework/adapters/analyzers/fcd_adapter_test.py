@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Test the FCD adapter, computing with sliding window statistics and streamed epochs, against FcdCalculator.
+"""
+
+import numpy
+import pytest
+pytest.importorskip("sklearn")
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.adapters.analyzers.fcd_adapter import FunctionalConnectivityDynamicsAdapter
+from tvb.analyzers.fcd_matrix import FcdCalculator
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.datatypes.time_series import TimeSeriesRegion
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+
+
+
+class TestFcdAdapter(TransactionalTestCase):
+    """
+    Launch the FunctionalConnectivityDynamicsAdapter on a stored TimeSeries with several state variables and modes.
+    """
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, self.connectivity = self.datatypes_factory.create_connectivity(nodes=6)
+        self.data = 100 + numpy.cumsum(numpy.random.randn(200, 2, 6, 2), axis=0)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def test_launch_same_as_fcd_calculator(self):
+        adapter = FunctionalConnectivityDynamicsAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, "fcd")
+        time_series = TimeSeriesRegion(storage_path=adapter.storage_path, connectivity=self.connectivity,
+                                       sample_period=1.0)
+        time_series.write_data_slice(self.data)
+        time_series.write_time_slice(numpy.arange(self.data.shape[0]))
+        time_series.close_file()
+        adapter.configure(time_series, 40., 4.)
+        results = adapter.launch(time_series, 40., 4.)
+
+        in_memory_ts = TimeSeriesRegion(use_storage=False)
+        in_memory_ts.data = self.data
+        in_memory_ts.sample_period = 1.0
+        in_memory_ts.connectivity = self.connectivity
+        fcd, fcd_segmented, eigvect_dict, eigval_dict, _ = FcdCalculator(time_series=in_memory_ts,
+                                                                         sw=40., sp=4.).evaluate()
+
+        numpy.testing.assert_allclose(results[0].get_data('array_data'), fcd)
+        expected = [fcd_segmented] if numpy.amax(fcd_segmented) == 1.1 else []
+        for mode in eigvect_dict.keys():
+            for var in eigvect_dict[mode].keys():
+                for ep in eigvect_dict[mode][var].keys():
+                    expected.extend(eigvect_dict[mode][var][ep][:3])
+        assert len(expected) == len(results) - 1
+        for result, expected_data in zip(results[1:], expected):
+            numpy.testing.assert_allclose(result.get_data('array_data'), expected_data, atol=1e-8)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test the FFT adapter, computing blocks of nodes in-process, or in worker processes.
+"""
+
+import numpy
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.adapters.analyzers.fourier_adapter import FourierAdapter
+from tvb.core.adapters import parallel_blocks
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+
+
+
+class TestFourierAdapter(TransactionalTestCase):
+    """
+    Launch the FourierAdapter on a stored TimeSeries.
+    """
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, connectivity = self.datatypes_factory.create_connectivity()
+        self.time_series = self.datatypes_factory.create_timeseries(connectivity)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def _launch(self, folder_name, memory_factor=None):
+        adapter = FourierAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, folder_name)
+        adapter.configure(self.time_series)
+        adapter.get_required_memory_size()
+        if memory_factor is not None:
+            adapter._prepare_blocks = lambda: (1, 0)
+            adapter.memory_factor = memory_factor
+        return adapter.launch(self.time_series)
+
+
+    def test_launch_in_blocks(self):
+        """
+        The spectrum computed in blocks of nodes (with the last one smaller) is the same as the one for all nodes.
+        """
+        spectra = self._launch("fft_one_block")
+        expected = spectra.get_data('array_data')
+        assert expected.shape[2] == self.time_series.read_data_shape()[2]
+
+        spectra = self._launch("fft_blocks", memory_factor=3)
+        assert numpy.allclose(spectra.get_data('array_data'), expected)
+        assert numpy.allclose(spectra.get_data('power'), self._launch("fft_again").get_data('power'))
+
+
+    def test_launch_in_worker_processes(self):
+        original_get_nr_of_workers = parallel_blocks.get_nr_of_workers
+        try:
+            spectra = self._launch("fft_in_process")
+            parallel_blocks.get_nr_of_workers = lambda nr_of_items: min(2, nr_of_items)
+            parallel_spectra = self._launch("fft_in_workers")
+        finally:
+            parallel_blocks.get_nr_of_workers = original_get_nr_of_workers
+
+        assert numpy.allclose(parallel_spectra.get_data('array_data'), spectra.get_data('array_data'))
+        assert numpy.allclose(parallel_spectra.get_data('average_power'), spectra.get_data('average_power'))
+        assert parallel_spectra.segment_length == spectra.segment_length
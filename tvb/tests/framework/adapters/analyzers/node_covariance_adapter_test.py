@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test the adapter computing the temporal covariance of TimeSeries nodes.
+"""
+
+import numpy
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.adapters.analyzers import streaming_covariance
+from tvb.adapters.analyzers.node_covariance_adapter import NodeCovarianceAdapter
+from tvb.analyzers.node_covariance import NodeCovariance
+from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.datatypes.time_series import TimeSeries
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+
+
+
+class TestNodeCovarianceAdapter(TransactionalTestCase):
+    """
+    Launch the NodeCovarianceAdapter on a stored TimeSeries, reading it in blocks of time points.
+    """
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, connectivity = self.datatypes_factory.create_connectivity()
+        self.time_series = self.datatypes_factory.create_timeseries(connectivity)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def test_launch_in_time_blocks(self):
+        """
+        Covariance accumulated over blocks of time points (with the last one smaller) is the one of
+        NodeCovariance, computed on all time points at once.
+        """
+        adapter = NodeCovarianceAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, "covariance")
+        adapter.configure(self.time_series)
+
+        original_block_elements = streaming_covariance.TIME_BLOCK_ELEMENTS
+        try:
+            streaming_covariance.TIME_BLOCK_ELEMENTS = 3 * self.time_series.read_data_shape()[2]
+            covariance = adapter.launch(self.time_series)
+        finally:
+            streaming_covariance.TIME_BLOCK_ELEMENTS = original_block_elements
+
+        in_memory_ts = TimeSeries(use_storage=False)
+        in_memory_ts.data = self.time_series.read_data_slice(tuple(slice(size) for size in adapter.input_shape))
+        expected = NodeCovariance(time_series=in_memory_ts).evaluate().array_data
+        # One matrix was written for each (mode, state variable)
+        nr_of_nodes = expected.shape[0]
+        expected = expected.transpose((0, 1, 3, 2)).reshape((nr_of_nodes, nr_of_nodes, -1, 1))
+        assert numpy.allclose(covariance.get_data('array_data'), expected)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test the FCD matrix computed with sliding window statistics, against the FcdCalculator loop.
+"""
+
+import numpy
+from tvb.adapters.analyzers import sliding_window_fcd
+
+
+
+class _ArrayTimeSeries(object):
+    """
+    Time series data read in slices, as a stored TimeSeries.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.read_slices = []
+
+
+    def read_data_shape(self):
+        return self.data.shape
+
+
+    def read_data_slice(self, data_slice):
+        self.read_slices.append(data_slice)
+        return self.data[data_slice]
+
+
+
+def _fcd_calculator_loop(data, sw, sp):
+    """
+    FCD as computed in FcdCalculator.evaluate: full correlation of each window, then of each pair of windows.
+    """
+    nr_of_windows = int((data.shape[0] - sw) / sp)
+    fcd = numpy.zeros((nr_of_windows, nr_of_windows, data.shape[1], data.shape[3]))
+    for mode in range(data.shape[3]):
+        for var in range(data.shape[1]):
+            fc_stream = {}
+            start = -sp
+            for window in range(nr_of_windows):
+                start += sp
+                fc = numpy.corrcoef(data[int(start):int(start + sw) + 1, var, :, mode].T)
+                fc_stream[window] = fc[numpy.triu_indices(len(fc), 1)]
+            for i in range(nr_of_windows):
+                for j in range(i, nr_of_windows):
+                    fcd[i, j, var, mode] = fcd[j, i, var, mode] = numpy.corrcoef(fc_stream[i], fc_stream[j])[0, 1]
+    return fcd
+
+
+
+class TestSlidingWindowFcd(object):
+    """
+    Compare with the FCD computed on each window from scratch.
+    """
+
+    def test_windows_overlapping_or_not(self):
+        data = 100 + numpy.cumsum(numpy.random.randn(300, 2, 8, 2), axis=0)
+        for sw, sp in [(40., 4.), (40., 2.5), (25., 13.), (9., 1.)]:
+            fcd = sliding_window_fcd.compute_fcd(_ArrayTimeSeries(data), sw, sp)
+            assert numpy.allclose(fcd, _fcd_calculator_loop(data, sw, sp))
+
+
+    def test_recomputed_after_many_updates(self):
+        data = numpy.random.randn(500, 1, 5, 1)
+        original_max_updates = sliding_window_fcd.MAX_INCREMENTAL_UPDATES
+        try:
+            sliding_window_fcd.MAX_INCREMENTAL_UPDATES = 7
+            fcd = sliding_window_fcd.compute_fcd(_ArrayTimeSeries(data), 50., 1.)
+        finally:
+            sliding_window_fcd.MAX_INCREMENTAL_UPDATES = original_max_updates
+        assert numpy.allclose(fcd, _fcd_calculator_loop(data, 50., 1.))
+
+
+    def test_time_points_read_once(self):
+        time_series = _ArrayTimeSeries(numpy.random.randn(100, 1, 4, 1))
+        sliding_window_fcd.compute_fcd(time_series, 20., 5.)
+        read_time_points = [data_slice[0] for data_slice in time_series.read_slices]
+        assert read_time_points[0] == slice(0, 21)
+        assert all(previous.stop == current.start for previous, current in zip(read_time_points, read_time_points[1:]))
+        assert read_time_points[-1].stop == 96
+
+
+    def test_constant_node(self):
+        data = numpy.random.randn(60, 1, 4, 1)
+        data[:, :, 2] = 1.0
+        fcd = sliding_window_fcd.compute_fcd(_ArrayTimeSeries(data), 20., 5.)
+        assert numpy.isnan(fcd).all()
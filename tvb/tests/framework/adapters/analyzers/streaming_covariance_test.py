@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test covariance and correlation accumulated over blocks of time points.
+"""
+
+import numpy
+from tvb.adapters.analyzers.streaming_covariance import StreamingCovariance
+
+
+
+class TestStreamingCovariance(object):
+    """
+    Compare with numpy, on all time points at once.
+    """
+
+    def _accumulate(self, data, block_lengths):
+        covariance = StreamingCovariance(data.shape[1])
+        start = 0
+        for length in block_lengths:
+            covariance.update(data[start:start + length])
+            start += length
+        assert covariance.count == data.shape[0]
+        return covariance
+
+
+    def test_blocks_of_any_length(self):
+        data = numpy.random.randn(100, 7)
+        covariance = self._accumulate(data, [1, 30, 0, 40, 29])
+        assert numpy.allclose(covariance.covariance(), numpy.cov(data.T))
+        assert numpy.allclose(covariance.correlation(), numpy.corrcoef(data.T))
+
+
+    def test_large_offset(self):
+        """
+        Values far from zero do not lose the precision of their small variations.
+        """
+        data = 1e8 + numpy.random.randn(1000, 5)
+        covariance = self._accumulate(data, [100] * 10)
+        assert numpy.allclose(covariance.covariance(), numpy.cov(data.T))
+        assert numpy.allclose(covariance.correlation(), numpy.corrcoef(data.T))
+
+
+    def test_constant_node(self):
+        data = numpy.random.randn(20, 3)
+        data[:, 1] = 5.0
+        correlation = self._accumulate(data, [7, 13]).correlation()
+        assert numpy.isnan(correlation[1]).all()
+        assert numpy.allclose(numpy.diag(correlation)[[0, 2]], 1.0)
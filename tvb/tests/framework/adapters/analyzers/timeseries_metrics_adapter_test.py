@@ -47,6 +47,9 @@ from tvb.core.services.operation_service import OperationService
 from tvb.core.services.flow_service import FlowService
 from tvb.tests.framework.core.factory import TestFactory
 from tvb.tests.framework.adapters.storeadapter import StoreAdapter
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+from tvb.adapters.analyzers import streaming_metrics
+from tvb.datatypes.time_series import TimeSeries
 
 
 
@@ -113,3 +116,60 @@ class TestTimeSeriesMetricsAdapter(TransactionalTestCase):
         for metric_value in resulted_metric.metrics.values():
             assert isinstance(metric_value, (float, int))
 
+
+
+class TestTimeSeriesMetricsInTimeBlocks(TransactionalTestCase):
+    """
+    Compute all metrics while reading the time series once, in blocks of time points.
+    """
+
+
+    def transactional_setup_method(self):
+        self.datatypes_factory = DatatypesFactory()
+        self.test_project = self.datatypes_factory.get_project()
+        _, connectivity = self.datatypes_factory.create_connectivity()
+        self.time_series = self.datatypes_factory.create_timeseries(connectivity)
+
+
+    def transactional_teardown_method(self):
+        FilesHelper().remove_project_structure(self.test_project.name)
+
+
+    def _evaluate_on_full_data(self, algorithm_name, start_point):
+        unstored_ts = TimeSeries(use_storage=False)
+        shape = self.time_series.read_data_shape()
+        unstored_ts.data = self.time_series.read_data_slice(tuple(slice(size) for size in shape))
+        algorithm = TimeseriesMetricsAdapter.available_algorithms[algorithm_name](time_series=unstored_ts)
+        algorithm.start_point = start_point
+        return algorithm.evaluate()
+
+
+    def test_launch_in_time_blocks(self):
+        """
+        Metrics are the same as the ones of the algorithms on the full data, which is read only once.
+        """
+        read_slices = []
+        original_read_data_slice = self.time_series.read_data_slice
+        def read_data_slice(data_slice):
+            read_slices.append(data_slice[0])
+            return original_read_data_slice(data_slice)
+
+        shape = self.time_series.read_data_shape()
+        adapter = TimeseriesMetricsAdapter()
+        adapter.storage_path = FilesHelper().get_project_folder(self.test_project, "metrics")
+        original_block_elements = streaming_metrics.TIME_BLOCK_ELEMENTS
+        try:
+            streaming_metrics.TIME_BLOCK_ELEMENTS = 3 * numpy.prod(shape[1:])
+            self.time_series.read_data_slice = read_data_slice
+            result = adapter.launch(self.time_series, start_point=2.0)
+        finally:
+            streaming_metrics.TIME_BLOCK_ELEMENTS = original_block_elements
+            del self.time_series.read_data_slice
+
+        assert [(data_slice.start, data_slice.stop) for data_slice in read_slices] == [(0, 3), (3, 6), (6, 9), (9, 10)]
+        for algorithm_name in TimeseriesMetricsAdapter.available_algorithms:
+            expected = self._evaluate_on_full_data(algorithm_name, 2.0)
+            if not isinstance(expected, dict):
+                expected = {algorithm_name: expected}
+            for metric_name, metric_value in expected.items():
+                assert numpy.allclose(result.metrics[metric_name], metric_value)
@@ -33,15 +33,19 @@
 """
 import pytest
 import os.path
+import json
 import shutil
 import zipfile
+from io import BytesIO
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from contextlib import closing
 from tvb.core.entities.storage import dao
+from tvb.core.entities.model.model_burst import BURST_INFO_FILE, DT_BURST_MAP
 from tvb.core.entities.file.files_helper import FilesHelper
 from tvb.adapters.exporters.export_manager import ExportManager
 from tvb.adapters.exporters.exceptions import ExportException, InvalidExportDataException
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+from tvb.tests.framework.core.factory import TestFactory
 from tvb.basic.profile import TvbProfile
 
 
@@ -180,3 +184,45 @@ class TestExporters(TransactionalTestCase):
         # Now check if the generated file is a correct ZIP file
         assert zipfile.is_zipfile(export_file), "Generated file is not a valid ZIP file"
 
+
+
+    def test_stream_project(self):
+        """
+        Test that a streamed project holds the same content as the exported ZIP
+        """
+        self.datatypeFactory.create_datatype_with_storage()
+        export_file = self.export_manager.export_project(self.project)
+        zip_name, archive_stream = self.export_manager.stream_project(self.project)
+
+        assert zip_name.endswith(self.project.name + ".zip")
+        with closing(zipfile.ZipFile(BytesIO(b"".join(archive_stream)))) as streamed_zip:
+            assert streamed_zip.testzip() is None
+            streamed_names = set(streamed_zip.namelist())
+        with closing(zipfile.ZipFile(export_file)) as exported_zip:
+            assert set(exported_zip.namelist()) == streamed_names
+        assert ExportManager.EXPORT_MANIFEST_FILE in streamed_names
+        assert FilesHelper.TVB_PROJECT_FILE in streamed_names
+
+
+    def test_export_project_incremental(self):
+        """
+        Test that an incremental export only holds the operation folders changed since a previous archive
+        """
+        first_datatype = self.datatypeFactory.create_datatype_with_storage()
+        first_folder = str(first_datatype.fk_from_operation) + "/"
+        base_manifest = ExportManager.read_archive_manifest(self.export_manager.export_project(self.project))
+        # Other exports in between do not change the base of the incremental export
+        self.export_manager.stream_project(self.project)
+
+        operation = TestFactory.create_operation(test_user=self.datatypeFactory.user, test_project=self.project)
+        second_datatype = self.datatypeFactory.create_datatype_with_storage(operation_id=operation.id)
+        second_folder = str(second_datatype.fk_from_operation) + "/"
+        export_file = self.export_manager.export_project(self.project, base_manifest=base_manifest)
+
+        with closing(zipfile.ZipFile(export_file)) as zip_file:
+            names = zip_file.namelist()
+            burst_info = json.loads(zip_file.read(BURST_INFO_FILE))
+        assert not any(name.startswith(first_folder) for name in names)
+        assert any(name.startswith(second_folder) for name in names)
+        assert first_datatype.gid not in burst_info[DT_BURST_MAP]
+        assert second_datatype.gid in burst_info[DT_BURST_MAP]
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for the writers storing Simulator monitor samples into TimeSeries.
+"""
+
+import threading
+import numpy
+import pytest
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+from tvb.adapters.simulator.monitor_writer import MonitorWriter, AsyncMonitorWriter
+
+
+
+class _RecordingTimeSeries(object):
+    """
+    Replaces a TimeSeries, remembering every append.
+    """
+
+
+    def __init__(self, fail=False, release=None):
+        self.times = []
+        self.data = []
+        self.fail = fail
+        self.release = release
+
+
+    def write_time_slice(self, partial_result):
+        if self.release is not None:
+            self.release.wait()
+        if self.fail:
+            raise IOError("Disk full")
+        self.times.append(list(partial_result))
+
+
+    def write_data_slice(self, partial_result):
+        self.data.append(partial_result)
+
+
+
+class TestMonitorWriter(BaseTestCase):
+    """
+    Check that samples reach the TimeSeries complete, ordered and in batches.
+    """
+
+
+    @staticmethod
+    def _write_samples(writer, count=10):
+        for i in range(count):
+            writer.write(i * 0.5, numpy.ones((1, 3, 1)) * i)
+        writer.close()
+
+
+    def _check_stored(self, time_series, count=10):
+        times = [t for batch in time_series.times for t in batch]
+        assert times == [i * 0.5 for i in range(count)]
+        data = numpy.concatenate(time_series.data)
+        assert data.shape == (count, 1, 3, 1)
+        assert numpy.all(data[:, 0, 0, 0] == numpy.arange(count))
+
+
+    def test_sync_writer_batches(self):
+        time_series = _RecordingTimeSeries()
+        self._write_samples(MonitorWriter(time_series, batch_size=4))
+        assert [len(batch) for batch in time_series.times] == [4, 4, 2]
+        self._check_stored(time_series)
+
+
+    def test_async_writer_same_result(self):
+        time_series = _RecordingTimeSeries()
+        self._write_samples(AsyncMonitorWriter(time_series, batch_size=4, queue_size=2), count=101)
+        assert all(len(batch) <= 4 for batch in time_series.times)
+        self._check_stored(time_series, count=101)
+
+
+    def test_async_writer_blocks_when_queue_full(self):
+        release = threading.Event()
+        time_series = _RecordingTimeSeries(release=release)
+        writer = AsyncMonitorWriter(time_series, batch_size=1, queue_size=2)
+        producer = threading.Thread(target=self._write_samples, args=(writer,))
+        producer.daemon = True
+        producer.start()
+        producer.join(0.5)
+        assert producer.is_alive()
+        assert time_series.times == []
+        release.set()
+        producer.join(10)
+        assert not producer.is_alive()
+        self._check_stored(time_series)
+
+
+    def test_async_writer_error(self):
+        writer = AsyncMonitorWriter(_RecordingTimeSeries(fail=True), batch_size=2, queue_size=2)
+        with pytest.raises(IOError):
+            self._write_samples(writer, count=100)
+        writer.discard()
+        assert not writer._thread.is_alive()
+
+
+    def test_discard(self):
+        time_series = _RecordingTimeSeries()
+        writer = AsyncMonitorWriter(time_series, batch_size=4, queue_size=8)
+        writer.write(0.0, numpy.zeros((1, 3, 1)))
+        writer.discard()
+        assert not writer._thread.is_alive()
+        assert time_series.times == []
+
+
+    def test_async_flush(self):
+        time_series = _RecordingTimeSeries()
+        writer = AsyncMonitorWriter(time_series, batch_size=4, queue_size=2)
+        for i in range(6):
+            writer.write(i * 0.5, numpy.ones((1, 3, 1)) * i)
+        writer.flush()
+        assert [len(batch) for batch in time_series.times] == [4, 2]
+        assert writer.samples_count == 6
+        for i in range(6, 10):
+            writer.write(i * 0.5, numpy.ones((1, 3, 1)) * i)
+        writer.close()
+        self._check_stored(time_series)
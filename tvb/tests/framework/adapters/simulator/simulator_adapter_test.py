@@ -33,15 +33,24 @@
 """
 
 import json
+import numpy
 import pytest
+import os
 from copy import copy
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.basic.profile import TvbProfile
+from tvb.adapters.simulator.simulator_adapter import SimulatorAdapter
+from tvb.adapters.simulator.simulation_checkpoint import SimulationCheckpoint
 from tvb.config import SIMULATOR_CLASS, SIMULATOR_MODULE
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.entities import model
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL
 from tvb.core.entities.storage import dao
 from tvb.core.services.project_service import initialize_storage
+from tvb.core.services import operation_service as operation_service_module
 from tvb.core.services.operation_service import OperationService
+from tvb.core.services.exceptions import OperationException
+from tvb.datatypes.simulation_state import SimulationState
 from tvb.datatypes.time_series import TimeSeriesRegion
 from tvb.tests.framework.core.factory import TestFactory
 from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
@@ -256,3 +265,287 @@ class TestSimulatorAdapter(TransactionalTestCase):
         filtered_params = self.simulator_adapter.prepare_ui_inputs(params)
         self.simulator_adapter.configure(**filtered_params)
         OperationService().initiate_prelaunch(self.operation, self.simulator_adapter, {}, **params)
+
+
+    @staticmethod
+    def _constant_initial_parameters():
+        """ Simulator parameters with constant initial conditions, for results to be reproducible """
+        params = copy(SIMULATOR_PARAMETERS)
+        params["model_parameters_option_Generic2dOscillator_state_variable_range_parameters_parameters_V"] = "[0.5 0.5]"
+        params["model_parameters_option_Generic2dOscillator_state_variable_range_parameters_parameters_W"] = "[0.2 0.2]"
+        return params
+
+
+    def _range_parameters(self, param_name, values):
+        """ Simulator parameters for a PSE over a Model parameter, with constant initial conditions """
+        params = self._constant_initial_parameters()
+        params[model.RANGE_PARAMETER_1] = param_name
+        params[param_name] = json.dumps(values)
+        return params
+
+
+    def test_batch_key(self):
+        """
+        Test that only PSE over Model parameters for region simulations with node-wise monitors can be batched.
+        """
+        ranged = ["model_parameters_option_Generic2dOscillator_a"]
+        params = copy(SIMULATOR_PARAMETERS)
+        key = self.simulator_adapter.get_batch_key(ranged, **params)
+        assert key is not None
+        params["model_parameters_option_Generic2dOscillator_a"] = "[-1.0]"
+        assert key == self.simulator_adapter.get_batch_key(ranged, **params)
+
+        params["simulation_length"] = "64"
+        assert key != self.simulator_adapter.get_batch_key(ranged, **params)
+
+        assert self.simulator_adapter.get_batch_key(["coupling_parameters_option_Linear_a"], **params) is None
+        noise_param = "model_parameters_option_Generic2dOscillator_noise_parameters_option_Noise_ntau"
+        assert self.simulator_adapter.get_batch_key([noise_param], **params) is None
+
+        params = copy(SIMULATOR_PARAMETERS)
+        params["monitors"] = ["TemporalAverage", "GlobalAverage"]
+        assert self.simulator_adapter.get_batch_key(ranged, **params) is None
+
+        params = copy(SIMULATOR_PARAMETERS)
+        params["surface"] = "GID_surface"
+        assert self.simulator_adapter.get_batch_key(ranged, **params) is None
+
+
+    def test_launch_batch_same_as_individual(self):
+        """
+        Test that simulating a batch of parameter points gives the same results as simulating them one by one.
+        """
+        params = self._range_parameters("model_parameters_option_Generic2dOscillator_a", [-2.0, -1.0, 0.5])
+        kwargs_list = []
+        for value in (-2.0, -1.0, 0.5):
+            point_params = copy(params)
+            point_params["model_parameters_option_Generic2dOscillator_a"] = "[%s]" % value
+            kwargs_list.append(self.simulator_adapter.prepare_ui_inputs(point_params))
+
+        batch_results = self.simulator_adapter.launch_batch([copy(kwargs) for kwargs in kwargs_list])
+        assert 3 == len(batch_results)
+
+        for kwargs, batch_result in zip(kwargs_list, batch_results):
+            adapter = SimulatorAdapter()
+            adapter.configure(**kwargs)
+            adapter.algorithm.configure(full_configure=False)
+            expected = [result[0] for result in adapter.algorithm(simulation_length=kwargs['simulation_length'])
+                        if result[0] is not None]
+            times, data = batch_result["TemporalAverage"]
+            assert len(expected) == len(times) == 32
+            numpy.testing.assert_allclose([result[0] for result in expected], times)
+            numpy.testing.assert_allclose(numpy.array([result[1] for result in expected]), numpy.array(data))
+
+
+    def test_batch_prelaunch(self):
+        """
+        Test that a PSE executed in batches gets one TimeSeries result for each operation.
+        """
+        params = self._range_parameters("model_parameters_option_Generic2dOscillator_a", [-2.0, -1.0, 0.5])
+        algorithm = self.simulator_adapter.stored_adapter
+        operation_service = OperationService()
+        category = dao.get_category_by_id(algorithm.fk_category)
+        operations, _ = operation_service.prepare_operations(self.test_user.id, self.test_project.id, algorithm,
+                                                             category, {}, **params)
+        backup_batch_size = TvbProfile.current.PSE_BATCH_SIZE
+        try:
+            TvbProfile.current.PSE_BATCH_SIZE = 2
+            batches = operation_service.prepare_batches(operations, self.simulator_adapter)
+            assert [2, 1] == [len(batch) for batch in batches]
+            assert [batches[0][0].id, batches[1][0].id] == operation_service.get_batch_leaders(
+                [op.id for op in operations])
+
+            leader = dao.get_operation_by_id(batches[0][0].id)
+            batch = operation_service.get_operation_batch(leader, self.simulator_adapter)
+            assert [op.id for op in batches[0]] == [op.id for op in batch]
+            assert [batches[0][1].id] == [op.id for op in operation_service.get_operation_batch(batch[1],
+                                                                                                  self.simulator_adapter)]
+            operation_service.initiate_batch_prelaunch(batch, self.simulator_adapter)
+        finally:
+            TvbProfile.current.PSE_BATCH_SIZE = backup_batch_size
+
+        for operation in batch:
+            assert model.STATUS_FINISHED == dao.get_operation_by_id(operation.id).status
+            results = dao.get_results_for_operation(operation.id)
+            assert 1 == len(results)
+            time_series = dao.get_datatype_by_gid(results[0].gid)
+            assert time_series.read_data_shape() == (32, 1, self.CONNECTIVITY_NODES, 1)
+        assert model.STATUS_PENDING == dao.get_operation_by_id(batches[1][0].id).status
+
+
+    def test_batch_without_canceled_operations(self):
+        """
+        Test that a batch leader still gets the pending operations of its batch, when some others were canceled.
+        """
+        params = self._range_parameters("model_parameters_option_Generic2dOscillator_a", [-2.0, -1.0, 0.5])
+        algorithm = self.simulator_adapter.stored_adapter
+        operation_service = OperationService()
+        category = dao.get_category_by_id(algorithm.fk_category)
+        operations, _ = operation_service.prepare_operations(self.test_user.id, self.test_project.id, algorithm,
+                                                             category, {}, **params)
+        operations[1].status = model.STATUS_CANCELED
+        dao.store_entity(operations[1])
+        backup_batch_size = TvbProfile.current.PSE_BATCH_SIZE
+        try:
+            TvbProfile.current.PSE_BATCH_SIZE = 3
+            leader = dao.get_operation_by_id(operations[0].id)
+            batch = operation_service.get_operation_batch(leader, self.simulator_adapter)
+        finally:
+            TvbProfile.current.PSE_BATCH_SIZE = backup_batch_size
+        assert [operations[0].id, operations[2].id] == [op.id for op in batch]
+
+
+    def test_stopped_leader_sends_batch_on(self, monkeypatch):
+        """
+        Test that the pending operations of a batch are sent on, each on its own, when their leader is stopped,
+        and that a batch leader is sent with the size of its batch.
+        """
+        params = self._range_parameters("model_parameters_option_Generic2dOscillator_a", [-2.0, -1.0, 0.5])
+        algorithm = self.simulator_adapter.stored_adapter
+        operation_service = OperationService()
+        category = dao.get_category_by_id(algorithm.fk_category)
+        operations, _ = operation_service.prepare_operations(self.test_user.id, self.test_project.id, algorithm,
+                                                             category, {}, **params)
+        executed = []
+        monkeypatch.setattr(operation_service_module.BACKEND_CLIENT, "execute",
+                            lambda op_id, user_name, adapter, batch_size=1: executed.append((int(op_id), batch_size)))
+        monkeypatch.setattr(TvbProfile.current, "PSE_BATCH_SIZE", 3)
+
+        operation_service.launch_operation(operations[0].id, True)
+        assert [(operations[0].id, 3)] == executed
+
+        del executed[:]
+        operation_service.stop_operation(operations[0].id)
+        assert model.STATUS_CANCELED == dao.get_operation_by_id(operations[0].id).status
+        assert [(operations[1].id, 1), (operations[2].id, 1)] == executed
+
+
+    def _expected_temporal_average(self, params):
+        """ TemporalAverage data, when simulating the given parameters directly """
+        adapter = SimulatorAdapter()
+        kwargs = adapter.prepare_ui_inputs(params)
+        adapter.configure(**kwargs)
+        adapter.algorithm.configure(full_configure=False)
+        return numpy.array([result[0][1] for result in adapter.algorithm(simulation_length=kwargs['simulation_length'])
+                            if result[0] is not None])
+
+
+    def _check_checkpointed_result(self, expected):
+        results = dao.get_results_for_operation(self.operation.id)
+        assert 1 == len(results)
+        time_series = dao.get_datatype_by_gid(results[0].gid)
+        numpy.testing.assert_allclose(expected, time_series.get_data('data'))
+        assert 1 == len(dao.get_generic_entity(SimulationState, self.operation.id, "fk_from_operation"))
+        operation_folder = os.path.dirname(time_series.get_storage_file_path())
+        assert [time_series.get_storage_file_name()] == [file_name for file_name in os.listdir(operation_folder)
+                                                         if file_name.startswith("TimeSeries")]
+        assert not os.path.exists(os.path.join(operation_folder, SimulationCheckpoint.FILE_NAME))
+
+
+    def test_checkpointed_launch(self):
+        """
+        Test that a simulation run in segments, with checkpoints in between, gives the same results.
+        """
+        params = self._constant_initial_parameters()
+        backup_steps = TvbProfile.current.SIMULATION_CHECKPOINT_STEPS
+        try:
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = 500
+            OperationService().initiate_prelaunch(self.operation, self.simulator_adapter, {}, **params)
+        finally:
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = backup_steps
+        self._check_checkpointed_result(self._expected_temporal_average(params))
+
+
+    def test_resume_from_checkpoint(self):
+        """
+        Test that an interrupted simulation continues from its latest checkpoint, when launched again.
+        """
+        params = self._constant_initial_parameters()
+        original_save = SimulationCheckpoint.save
+        saved_steps = []
+
+        def _interrupted_save(checkpoint, *args):
+            original_save(checkpoint, *args)
+            saved_steps.append(checkpoint.current_step)
+            if len(saved_steps) == 2:
+                raise Exception("Job killed")
+
+        backup_steps = TvbProfile.current.SIMULATION_CHECKPOINT_STEPS
+        try:
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = 500
+            SimulationCheckpoint.save = _interrupted_save
+            with pytest.raises(Exception):
+                OperationService().initiate_prelaunch(self.operation, self.simulator_adapter, {}, **params)
+            assert [500, 1000] == saved_steps
+            assert model.STATUS_ERROR == dao.get_operation_by_id(self.operation.id).status
+
+            adapter = ABCAdapter.build_adapter(self.simulator_adapter.stored_adapter)
+            OperationService().initiate_prelaunch(self.operation, adapter, {}, **params)
+            ## The resumed run saves a checkpoint as soon as it copied the previous results
+            assert [500, 1000, 1000, 1500, 2000, 2500] == saved_steps
+        finally:
+            SimulationCheckpoint.save = original_save
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = backup_steps
+        self._check_checkpointed_result(self._expected_temporal_average(params))
+
+
+    def test_resume_from_unreadable_checkpoint(self):
+        """
+        Test that an interrupted simulation starts over, when the results before its checkpoint can not be read.
+        """
+        params = self._constant_initial_parameters()
+        original_save = SimulationCheckpoint.save
+        saved_steps = []
+
+        def _interrupted_save(checkpoint, *args):
+            original_save(checkpoint, *args)
+            saved_steps.append(checkpoint.current_step)
+            if len(saved_steps) == 2:
+                raise Exception("Job killed")
+
+        backup_steps = TvbProfile.current.SIMULATION_CHECKPOINT_STEPS
+        try:
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = 500
+            SimulationCheckpoint.save = _interrupted_save
+            with pytest.raises(Exception):
+                OperationService().initiate_prelaunch(self.operation, self.simulator_adapter, {}, **params)
+            assert [500, 1000] == saved_steps
+
+            ## Corrupt the TimeSeries file written before the checkpoint, as a kill while appending might
+            checkpoint = SimulationCheckpoint.load(self.simulator_adapter.storage_path)
+            [(gid, _)] = checkpoint.time_series.values()
+            file_path = TimeSeriesRegion(storage_path=checkpoint.storage_path, gid=gid).get_storage_file_path()
+            FILE_POOL.invalidate(file_path)
+            with open(file_path, 'r+b') as ts_file:
+                ts_file.seek(os.path.getsize(file_path) // 2)
+                ts_file.truncate()
+
+            adapter = ABCAdapter.build_adapter(self.simulator_adapter.stored_adapter)
+            OperationService().initiate_prelaunch(self.operation, adapter, {}, **params)
+            assert [500, 1000, 500, 1000, 1500, 2000, 2500] == saved_steps
+            assert not adapter.resumed_from_checkpoint
+        finally:
+            SimulationCheckpoint.save = original_save
+            TvbProfile.current.SIMULATION_CHECKPOINT_STEPS = backup_steps
+        self._check_checkpointed_result(self._expected_temporal_average(params))
+
+
+    def test_resume_only_interrupted(self):
+        """
+        Test that finished operations can not be resumed.
+        """
+        self.operation.status = model.STATUS_FINISHED
+        dao.store_entity(self.operation)
+        with pytest.raises(OperationException):
+            OperationService().resume_operation(self.operation.id)
+
+
+    def test_resume_not_while_running(self):
+        """
+        Test that a started operation can not be resumed while its process still executes it.
+        """
+        self.operation.status = model.STATUS_STARTED
+        dao.store_entity(self.operation)
+        dao.store_entity(model.OperationProcessIdentifier(self.operation.id, pid=os.getpid()))
+        with pytest.raises(OperationException):
+            OperationService().resume_operation(self.operation.id)
@@ -112,6 +112,21 @@ class TestTVBImporter(TransactionalTestCase):
         assert 9, count == "9 datatypes should have been imported from group."
 
 
+    def test_zip_import_in_worker_processes(self):
+        """
+            Same as the ZIP import, but with XML and H5 files read in a pool of processes
+        """
+        import_workers = TvbProfile.current.IMPORT_WORKERS
+        TvbProfile.current.IMPORT_WORKERS = 2
+        try:
+            self._import(self.zip_file_path)
+        finally:
+            TvbProfile.current.IMPORT_WORKERS = import_workers
+        count = FlowService().get_available_datatypes(self.test_project.id,
+                                                      self.datatype.module + "." + self.datatype.type)[1]
+        assert 9 == count, "9 datatypes should have been imported from group."
+
+
     def test_h5_import(self):
         """
             This method tests import of TVB data in h5 format. Single data type / import
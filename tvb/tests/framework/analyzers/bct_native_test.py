@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Check the NumPy implementations of BCT functions on small graphs with known measures.
+"""
+
+import numpy
+import pytest
+from tvb.adapters.analyzers import bct_native
+
+
+
+def _two_cliques():
+    """
+    Two undirected cliques of 4 nodes, linked by the edge 3 - 4.
+    """
+    graph = numpy.kron(numpy.eye(2), numpy.ones((4, 4)))
+    numpy.fill_diagonal(graph, 0)
+    graph[3, 4] = graph[4, 3] = 1
+    return graph
+
+
+def _star(nr_leaves):
+    graph = numpy.zeros((nr_leaves + 1, nr_leaves + 1))
+    graph[0, 1:] = graph[1:, 0] = 1
+    return graph
+
+
+
+class TestBCTNative(object):
+    """
+    Test the measures computed without Matlab / Octave.
+    """
+
+    def test_degrees_and_strengths(self):
+        graph = numpy.array([[0, 2, 0], [0, 0, 3], [1, 0, 0.]])
+        in_degree, out_degree, degree = bct_native.degrees_dir(graph)
+        assert numpy.array_equal(in_degree, [1, 1, 1])
+        assert numpy.array_equal(degree, [2, 2, 2])
+        in_strength, out_strength, _ = bct_native.strengths_dir(graph)
+        assert numpy.array_equal(in_strength, [1, 2, 3])
+        assert numpy.array_equal(out_strength, [2, 3, 1])
+        assert bct_native.density_dir(graph) == (0.5, 3, 3)
+
+
+    def test_betweenness_of_star(self):
+        """
+        All the paths between the leaves pass through the center (ordered pairs, as BCT counts).
+        """
+        edges, nodes = bct_native.edge_betweenness_bin(_star(4))
+        assert numpy.array_equal(nodes, [12, 0, 0, 0, 0])
+        # each edge is on the paths from its leaf to the other 4 nodes
+        assert numpy.array_equal(edges[1:, 0], [4, 4, 4, 4])
+        assert numpy.allclose(bct_native.betweenness_wei(_star(4)), nodes)
+
+
+    def test_betweenness_counts_alternative_paths(self):
+        # square 0 - 1 - 2 - 3 - 0, with a shorter route 0 - 1 - 2, when weighted
+        square = numpy.zeros((4, 4))
+        for start, end, length in [(0, 1, 1), (1, 2, 1), (2, 3, 2), (3, 0, 2)]:
+            square[start, end] = square[end, start] = length
+        assert numpy.array_equal(bct_native.betweenness_bin(square), [1, 1, 1, 1])
+        assert numpy.array_equal(bct_native.betweenness_wei(square), [1, 2, 1, 0])
+
+
+    def test_distances(self):
+        path = numpy.diag([1., 1., 1.], 1)
+        distance = bct_native.distance_bin(path)
+        assert numpy.array_equal(distance[0], [0, 1, 2, 3])
+        assert numpy.isinf(distance[3, 0])
+        reachable, distance = bct_native.breadthdist(path)
+        assert numpy.isinf(distance[0, 0])
+        assert reachable[0].tolist() == [0, 1, 1, 1]
+        assert numpy.array_equal(bct_native.distance_wei(path * 2)[0], [0, 2, 4, 6])
+
+
+    def test_clustering(self):
+        graph = _two_cliques()
+        clustering = bct_native.clustering_coef_bu(graph)
+        assert numpy.allclose(clustering, [1, 1, 1, 0.5, 0.5, 1, 1, 1])
+        assert numpy.allclose(bct_native.clustering_coef_wu(graph), clustering)
+        assert numpy.allclose(bct_native.clustering_coef_bd(graph), clustering)
+        # 8 triangles (counted 6 times each) over 60 connected triples
+        assert bct_native.transitivity_bu(graph) == pytest.approx(48. / 60)
+
+
+    def test_modularity(self):
+        communities, modularity = bct_native.modularity_und(_two_cliques())
+        assert len(set(communities[:4])) == 1
+        assert len(set(communities[4:])) == 1
+        assert communities[0] != communities[4]
+        # the degrees add to 26, and to 13 in each community
+        assert modularity == pytest.approx((24 - 2 * 13 * 13 / 26.) / 26)
+        _, directed_modularity = bct_native.modularity_dir(_two_cliques())
+        assert directed_modularity == pytest.approx(modularity)
+
+
+    def test_participation(self):
+        participation = bct_native.participation_coef(_two_cliques(), [1, 1, 1, 1, 2, 2, 2, 2])
+        assert numpy.allclose(participation, [0, 0, 0, 0.375, 0.375, 0, 0, 0])
+
+
+    def test_centralities(self):
+        coreness, core_sizes = bct_native.kcoreness_centrality_bu(_two_cliques())
+        assert numpy.array_equal(coreness, [3] * 8)
+        assert numpy.array_equal(core_sizes[:4], [8, 8, 8, 0])
+        # Node 2 only has an outgoing connection: coreness 0, but counted in the size of the 1-core
+        coreness, core_sizes = bct_native.kcoreness_centrality_bd(numpy.array([[0, 1, 0], [1, 0, 0], [1, 0, 0.]]))
+        assert numpy.array_equal(coreness, [2, 2, 0])
+        assert numpy.array_equal(core_sizes, [3, 2, 0])
+        centrality = bct_native.eigenvector_centrality_und(_star(4))
+        assert numpy.allclose(centrality, [0.5 ** 0.5] + [0.5 ** 1.5] * 4)
+
+
+    def test_execute_matlab_code(self):
+        code = "[Ci, Q]=modularity_dir(W); P = participation_coef(W, Ci);"
+        assert bct_native.is_supported(code)
+        assert not bct_native.is_supported("[Wq,twalk,wlq]  = findwalks(A);")
+        assert not bct_native.is_supported("A = A'; D = distance_bin(A);")
+        result = bct_native.execute(code, {'W': _two_cliques()})
+        assert numpy.allclose(result['P'], [0, 0, 0, 0.375, 0.375, 0, 0, 0])
+        assert 'W' in result and 'Q' in result
+        with pytest.raises(ValueError):
+            bct_native.execute("[Wq,twalk,wlq]  = findwalks(A);", {'A': _two_cliques()})
@@ -32,8 +32,10 @@
 .. moduleauthor:: Lia Domide <lia.domide@codemart.ro>
 """
 
+import os
 import numpy
 import pytest
+import tvb_data
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from tvb.core.adapters.abcadapter import ABCAdapter
 from tvb.core.entities.model import STATUS_FINISHED
@@ -55,17 +57,17 @@ class TestBCT(TransactionalTestCase):
                                    "ClusteringCoefficientBU", "ClusteringCoefficientWU",
                                    "TransitivityBinaryUnDirected", "TransitivityWeightedUnDirected"]
 
-    @pytest.mark.skipif(get_matlab_executable() is None, reason="Matlab or Octave not installed!")
     def transactional_setup_method(self):
         """
         Sets up the environment for running the tests;
         creates a test user, a test project, a connectivity and a list of BCT adapters;
-        imports a CFF data-set
+        imports a connectivity ZIP
         """
         self.test_user = TestFactory.create_user("BCT_User")
         self.test_project = TestFactory.create_project(self.test_user, "BCT-Project")
         ### Make sure Connectivity is in DB
-        TestFactory.import_cff(test_user=self.test_user, test_project=self.test_project)
+        zip_path = os.path.join(os.path.dirname(tvb_data.__file__), 'connectivity', 'connectivity_66.zip')
+        TestFactory.import_zip_connectivity(self.test_user, self.test_project, 'John Doe', zip_path)
         self.connectivity = dao.get_generic_entity(Connectivity, 'John Doe', 'subject')[0]
 
         # make weights matrix symmetric, or else some BCT algorithms will run infinitely:
@@ -86,10 +88,10 @@ class TestBCT(TransactionalTestCase):
         """
         self.clean_database(True)
 
-    @pytest.mark.skipif(get_matlab_executable() is None, reason="Matlab or Octave not installed!")
     def test_bct_all(self):
         """
         Iterate all BCT algorithms and execute them.
+        Without Matlab or Octave, only the algorithms with a native implementation are available.
         """
         for adapter_instance in self.bct_adapters:
             algorithm = adapter_instance.stored_adapter
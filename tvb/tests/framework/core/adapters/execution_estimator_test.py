@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for estimating operation resources from the history of an algorithm.
+"""
+
+import json
+import subprocess
+import sys
+import pytest
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.basic.profile import TvbProfile
+from tvb.core.adapters import execution_estimator
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.services.operation_service import OperationService
+from tvb.tests.framework.core.factory import TestFactory
+
+
+
+class TestExecutionEstimator(TransactionalTestCase):
+    """
+    Fit of recorded resources and fall back to the adapter approximations.
+    """
+
+    def transactional_setup_method(self):
+        self.adapter = TestFactory.create_adapter("tvb.tests.framework.adapters.testadapter1", "TestAdapter1")
+        self.adapter.get_input_dimensions = lambda **kwargs: {'nodes': kwargs['test1_val1'],
+                                                              'steps': kwargs['test1_val2']}
+        self.algorithm_id = self.adapter.stored_adapter.id
+
+
+    def _store_usage(self, nodes, steps):
+        usage = model.OperationResourceUsage(self.algorithm_id, {'nodes': nodes, 'steps': steps},
+                                             execution_time=1e-3 * nodes * steps, peak_memory=2 ** 20 * nodes,
+                                             disk_size=4 * nodes * steps)
+        dao.store_entity(usage)
+
+
+    def test_fallback_without_history(self):
+        for nodes in range(1, TvbProfile.current.ESTIMATOR_MIN_SAMPLES):
+            self._store_usage(nodes, 100)
+        kwargs = dict(test1_val1=10, test1_val2=100)
+        assert execution_estimator.estimate(self.adapter, kwargs, execution_estimator.EXECUTION_TIME) is None
+        assert self.adapter.estimate_execution_time(**kwargs) == self.adapter.get_execution_time_approximation()
+        assert self.adapter.estimate_required_memory_size(**kwargs) == self.adapter.get_required_memory_size()
+        assert self.adapter.estimate_required_disk_size(**kwargs) == self.adapter.get_required_disk_size()
+
+
+    def test_power_law_fit(self):
+        for nodes, steps in [(10, 100), (20, 100), (40, 200), (80, 50), (160, 400), (320, 1000)]:
+            self._store_usage(nodes, steps)
+        kwargs = dict(test1_val1=1000, test1_val2=5000)
+        safety = TvbProfile.current.ESTIMATOR_SAFETY_FACTOR
+
+        assert self.adapter.estimate_execution_time(**kwargs) == pytest.approx(1e-3 * 1000 * 5000 * safety)
+        assert self.adapter.estimate_required_memory_size(**kwargs) == pytest.approx(2 ** 20 * 1000 * safety, 1e-6)
+        assert self.adapter.estimate_required_disk_size(**kwargs) == pytest.approx(4 * 1000 * 5000 * safety, 1e-6)
+
+
+    def test_other_dimensions_ignored(self):
+        for nodes in range(1, 10):
+            usage = model.OperationResourceUsage(self.algorithm_id, {'nodes': nodes}, 1, 1, 1)
+            dao.store_entity(usage)
+        kwargs = dict(test1_val1=10, test1_val2=100)
+        assert execution_estimator.estimate(self.adapter, kwargs, execution_estimator.DISK_SIZE) is None
+
+
+    def test_usage_recorded_on_launch(self):
+        operation = TestFactory.create_operation(algorithm=self.adapter.stored_adapter,
+                                                 operation_status=model.STATUS_STARTED)
+        OperationService().initiate_prelaunch(operation, self.adapter, {}, test1_val1=5, test1_val2=3)
+
+        records = dao.get_resource_usage_for_algorithm(self.algorithm_id, 10)
+        assert len(records) == 1
+        assert records[0].fk_from_operation == operation.id
+        assert json.loads(records[0].input_dimensions) == {'nodes': 5, 'steps': 3}
+        assert records[0].execution_time >= 0
+        assert records[0].peak_memory >= 0
+
+
+    def test_usage_not_recorded_for_partial_launch(self):
+        self.adapter.resumed_from_checkpoint = True
+        operation = TestFactory.create_operation(algorithm=self.adapter.stored_adapter,
+                                                 operation_status=model.STATUS_STARTED)
+        OperationService().initiate_prelaunch(operation, self.adapter, {}, test1_val1=5, test1_val2=3)
+        assert len(dao.get_resource_usage_for_algorithm(self.algorithm_id, 10)) == 0
+
+
+    def test_peak_memory_of_children(self):
+        monitor = execution_estimator.PeakMemoryMonitor(interval=0.05)
+        monitor.start()
+        child = subprocess.Popen([sys.executable, "-c",
+                                  "import time; data = 'x' * (100 * 2 ** 20); time.sleep(1)"])
+        child.wait()
+        peak_memory = monitor.stop()
+        ## Above the memory used before, and counting the child process
+        assert 90 * 2 ** 20 < peak_memory < 2 ** 30
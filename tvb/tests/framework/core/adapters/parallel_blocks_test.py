@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test computing analyzer blocks in worker processes.
+"""
+
+import os
+import time
+from tvb.basic.profile import TvbProfile
+from tvb.core.adapters import parallel_blocks
+
+
+
+def _slow_for_first_blocks(block):
+    time.sleep(0.05 * (5 - block))
+    return block * block, os.getpid()
+
+
+
+class TestParallelBlocks(object):
+    """
+    Test the block workers, independent of an adapter.
+    """
+
+    def test_results_in_block_order(self):
+        results = list(parallel_blocks.map_blocks(_slow_for_first_blocks, range(5), 3))
+        assert [result for result, _ in results] == [0, 1, 4, 9, 16]
+        assert os.getpid() not in [pid for _, pid in results]
+
+
+    def test_in_process(self):
+        results = list(parallel_blocks.map_blocks(_slow_for_first_blocks, range(2), 1))
+        assert results == [(0, os.getpid()), (1, os.getpid())]
+
+
+    def test_blocks_read_ahead_of_workers_only(self):
+        read_blocks = []
+
+        def read():
+            for block in range(5):
+                read_blocks.append(block)
+                yield block
+
+        results = parallel_blocks.map_blocks(_slow_for_first_blocks, read(), 2)
+        assert next(results)[0] == 0
+        # two blocks in the workers, and the next one read
+        assert read_blocks == [0, 1, 2]
+        assert [result for result, _ in results] == [1, 4, 9, 16]
+
+
+    def test_nr_of_workers_and_blocks(self, monkeypatch):
+        monkeypatch.setattr(TvbProfile.current, "ANALYZER_WORKERS", 8)
+        monkeypatch.setattr(parallel_blocks.multiprocessing, "cpu_count", lambda: 4)
+        assert parallel_blocks.get_nr_of_workers(100) == 4
+        assert parallel_blocks.get_nr_of_workers(3) == 3
+        assert parallel_blocks.get_blocks_in_memory(4) == 5
+        assert parallel_blocks.get_nr_of_blocks(1000, 100, 4) == 4
+        assert parallel_blocks.get_nr_of_blocks(1000, 2, 4) == 2
+        monkeypatch.setattr(TvbProfile.current, "ANALYZER_WORKERS", 0)
+        assert parallel_blocks.get_nr_of_workers(100) == 1
+        assert parallel_blocks.get_blocks_in_memory(1) == 1
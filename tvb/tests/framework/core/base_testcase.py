@@ -139,7 +139,7 @@ class BaseTestCase(object):
         op_service = OperationService()
         operations = self.get_all_entities(model.Operation)
         for operation in operations:
-            op_service.stop_operation(operation.id)
+            op_service.stop_operation(operation.id, launch_batch_members=False)
 
 
     def delete_project_folders(self):
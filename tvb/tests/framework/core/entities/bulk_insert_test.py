@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for inserting Workflows, Operations and WorkflowSteps in bulk.
+"""
+
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.tests.framework.core.factory import TestFactory
+
+
+
+class TestBulkInsert(TransactionalTestCase):
+    """
+    Entities inserted in bulk should be found in DB as if stored one by one.
+    """
+
+    def transactional_setup_method(self):
+        self.test_user = TestFactory.create_user()
+        self.test_project = TestFactory.create_project(self.test_user)
+        self.algorithm = dao.get_algorithm_by_module('tvb.tests.framework.adapters.testadapter1', 'TestAdapter1')
+
+
+    def _new_operation(self, parameters):
+        return model.Operation(self.test_user.id, self.test_project.id, self.algorithm.id, parameters)
+
+
+    def test_workflows_with_steps(self):
+        workflows = [model.Workflow(self.test_project.id, None) for _ in range(7)]
+        steps = [model.WorkflowStep(self.algorithm.id, static_param={'idx': idx}, step_index=0) for idx in range(7)]
+        dao.store_workflows_with_steps(workflows, steps)
+
+        assert len(set(workflow.id for workflow in workflows)) == 7
+        for idx, workflow in enumerate(workflows):
+            stored_steps = dao.get_workflow_steps(workflow.id)
+            assert len(stored_steps) == 1
+            assert stored_steps[0].id == steps[idx].id
+            assert stored_steps[0].static_param == {'idx': idx}
+
+
+    def test_steps_with_operations(self):
+        workflow = dao.store_entity(model.Workflow(self.test_project.id, None))
+        operations = [self._new_operation('{"idx": %d}' % idx) for idx in range(5)] + [None]
+        steps = [model.WorkflowStep(self.algorithm.id, workflow_id=workflow.id, step_index=idx) for idx in range(5)]
+        steps.append(model.WorkflowStepView(self.algorithm.id, workflow_id=workflow.id))
+        stored_operations = dao.store_workflow_steps_with_operations(steps, operations)
+
+        assert len(stored_operations) == 5
+        for idx, operation in enumerate(operations[:-1]):
+            loaded = dao.get_operation_by_id(operation.id)
+            assert loaded.parameters == '{"idx": %d}' % idx
+            assert loaded.gid == operation.gid
+            assert loaded.visible
+            assert dao.get_workflow_step_for_operation(operation.id).id == steps[idx].id
+        assert len(dao.get_workflow_steps(workflow.id)) == 5
+        assert len(dao.get_visualization_steps(workflow.id)) == 1
+
+
+    def test_entities_usable_after_insert(self):
+        operations = [self._new_operation('{}') for _ in range(3)]
+        steps = [model.WorkflowStep(self.algorithm.id, step_index=1) for _ in range(3)]
+        dao.store_workflow_steps_with_operations(steps, operations)
+        operations[1].status = model.STATUS_FINISHED
+        dao.store_entity(operations[1])
+        assert dao.get_operation_by_id(operations[1].id).status == model.STATUS_FINISHED
+        assert dao.get_operation_by_id(operations[0].id).status == model.STATUS_PENDING
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the disk usage counters of users, projects and bursts.
+"""
+
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.tests.framework.core.factory import TestFactory
+
+
+
+class TestDiskUsage(TransactionalTestCase):
+    """
+    Counters should follow DataTypes being stored, changed and removed.
+    """
+
+    def transactional_setup_method(self):
+        self.test_user = TestFactory.create_user()
+        self.test_project = TestFactory.create_project(self.test_user)
+        self.operation = TestFactory.create_operation(test_user=self.test_user, test_project=self.test_project)
+        self.burst = dao.store_entity(model.BurstConfiguration(self.test_project.id))
+
+
+    def _store_datatype(self, disk_size, datatype_class=model.DataType):
+        datatype = datatype_class(operation_id=self.operation.id, fk_parent_burst=self.burst.id, disk_size=disk_size)
+        return dao.store_entity(datatype)
+
+
+    def _assert_usage(self, user_size, project_size, burst_size):
+        assert dao.compute_user_generated_disk_size(self.test_user.id) == user_size
+        assert dao.get_project_disk_size(self.test_project.id) == project_size
+        assert dao.compute_bursts_disk_size([self.burst.id]) == {self.burst.id: burst_size}
+
+
+    def test_counters_follow_datatypes(self):
+        self._assert_usage(0, 0, 0)
+        first = self._store_datatype(100)
+        self._store_datatype(20)
+        self._assert_usage(120, 120, 120)
+
+        first.disk_size = 150
+        dao.store_entity(first)
+        self._assert_usage(170, 170, 170)
+
+        dao.remove_entity(model.DataType, first.id)
+        self._assert_usage(20, 20, 20)
+
+
+    def test_groups_not_counted_in_burst(self):
+        self._store_datatype(10)
+        group = model.DataTypeGroup(model.OperationGroup(self.test_project.id), operation_id=self.operation.id,
+                                    fk_parent_burst=self.burst.id)
+        group.disk_size = 10
+        dao.store_entity(group)
+        self._assert_usage(20, 20, 10)
+
+
+    def test_rebuild(self):
+        self._store_datatype(100)
+        self._store_datatype(5)
+        dao.remove_entity(model.DiskUsage, dao.get_generic_entity(model.DiskUsage, self.burst.id, "fk_entity")[0].id)
+        # Without a counter the burst size is summed over its DataTypes
+        self._assert_usage(105, 105, 105)
+
+        for counter in dao.get_generic_entity(model.DiskUsage, self.test_user.id, "fk_entity"):
+            counter.disk_size = 1
+            dao.store_entity(counter)
+        assert dao.rebuild_disk_usage_counters() > 0
+        self._assert_usage(105, 105, 105)
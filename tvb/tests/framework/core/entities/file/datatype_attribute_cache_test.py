@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+    Module used to test the cache of DataType attributes, served to the web visualizers.
+"""
+
+import os
+import numpy
+import shutil
+import pytest
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.datatype_attribute_cache import DatatypeAttributeCache
+
+
+class TestDatatypeAttributeCache(object):
+    """
+    Tests for keeping DataType attributes in memory, while their files are not changed.
+    """
+
+    def setup_method(self):
+        self.storage_folder = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "test_attribute_cache")
+        if os.path.exists(self.storage_folder):
+            shutil.rmtree(self.storage_folder)
+        os.makedirs(self.storage_folder)
+        self.file_path = self._write_file("entity.h5", "initial content")
+        self.cache = DatatypeAttributeCache(max_bytes=10 * 1024)
+
+    def teardown_method(self):
+        shutil.rmtree(self.storage_folder)
+
+    def _write_file(self, file_name, content):
+        file_path = os.path.join(self.storage_folder, file_name)
+        with open(file_path, "w") as file_handle:
+            file_handle.write(content)
+        return file_path
+
+    def test_hit_and_miss(self):
+        key = self.cache.compute_key("gid1", "weights", None, {"length": "2"})
+        assert self.cache.get(key) is None
+        stored = self.cache.put(key, numpy.ones((10, 10)), [self.file_path])
+        assert stored.is_cacheable
+        entry = self.cache.get(key)
+        assert entry is stored
+        assert self.cache.hits == 1 and self.cache.misses == 1
+        assert self.cache.size_bytes == 800
+        assert self.cache.get(self.cache.compute_key("gid1", "weights", None, {"length": "3"})) is None
+
+    def test_cached_array_readonly(self):
+        key = self.cache.compute_key("gid1", "weights")
+        self.cache.put(key, numpy.ones(10), [self.file_path])
+        with pytest.raises(ValueError):
+            self.cache.get(key).value[0] = 2
+
+    def test_only_arrays_cached(self):
+        key = self.cache.compute_key("gid1", "title")
+        entry = self.cache.put(key, "some title", [self.file_path])
+        assert not entry.is_cacheable
+        assert self.cache.get(key) is None
+        assert len(self.cache) == 0
+
+    def test_file_changed(self):
+        key = self.cache.compute_key("gid1", "weights")
+        old_etag = self.cache.put(key, numpy.ones(10), [self.file_path]).etag
+        self._write_file("entity.h5", "upgraded and longer content")
+        assert self.cache.get(key) is None
+        assert len(self.cache) == 0
+        assert self.cache.put(key, numpy.ones(10), [self.file_path]).etag != old_etag
+
+    def test_file_removed(self):
+        key = self.cache.compute_key("gid1", "weights")
+        self.cache.put(key, numpy.ones(10), [self.file_path])
+        os.remove(self.file_path)
+        assert self.cache.get(key) is None
+
+    def test_size_limit(self):
+        keys = [self.cache.compute_key("gid%d" % i, "weights") for i in range(3)]
+        for key in keys:
+            self.cache.put(key, numpy.ones(500), [self.file_path])
+        # 4000 bytes each, only two fit in 10KB, the least recently used is dropped
+        assert len(self.cache) == 2
+        assert self.cache.size_bytes == 8000
+        assert self.cache.get(keys[0]) is None
+        too_big = self.cache.put(self.cache.compute_key("gid9", "weights"), numpy.ones(2000), [self.file_path])
+        assert too_big.is_cacheable
+        assert len(self.cache) == 2
+
+    def test_invalidate(self):
+        other_file = self._write_file("other.h5", "other content")
+        key1 = self.cache.compute_key("gid1", "weights")
+        key2 = self.cache.compute_key("gid2", "project", {"connectivity": "gid1"})
+        key3 = self.cache.compute_key("gid3", "weights")
+        self.cache.put(key1, numpy.ones(10), [self.file_path])
+        self.cache.put(key2, numpy.ones(10), [other_file, self.file_path])
+        self.cache.put(key3, numpy.ones(10), [other_file])
+        self.cache.invalidate("gid1")
+        assert len(self.cache) == 1
+        self.cache.invalidate_file(other_file)
+        assert len(self.cache) == 0
+        self.cache.put(key1, numpy.ones(10), [self.file_path])
+        self.cache.invalidate_folder(self.storage_folder)
+        assert len(self.cache) == 0
+        assert self.cache.size_bytes == 0
@@ -33,7 +33,9 @@
 """
 
 import os
+import zipfile
 import pytest
+from io import BytesIO
 from tvb.tests.framework.core.base_testcase import TransactionalTestCase
 from tvb.basic.profile import TvbProfile
 from tvb.basic.traits.types_mapped import MappedType
@@ -41,7 +43,7 @@ from tvb.core.entities.file.xml_metadata_handlers import XMLReader
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
 from tvb.core.entities.file.exceptions import FileStructureException
-from tvb.core.entities.file.files_helper import FilesHelper
+from tvb.core.entities.file.files_helper import FilesHelper, TvbZip, PreparedZipMember, ZipStreamBuffer
 from tvb.tests.framework.core.factory import TestFactory
 
 
@@ -251,6 +253,43 @@ class TestFilesHelper(TransactionalTestCase):
         with pytest.raises(FileStructureException):
             self.files_helper.remove_folder(folder_name, False)
 
+
+    def test_write_prepared_members_in_stream(self):
+        """
+        Members prepared outside the archive can be written into a non-seekable stream.
+        """
+        text_path = os.path.join(root_storage, "test_text.txt")
+        binary_path = os.path.join(root_storage, "test_binary.bin")
+        with open(text_path, "w") as text_file:
+            text_file.write("TVB " * 10000)
+        with open(binary_path, "wb") as binary_file:
+            binary_file.write(os.urandom(3 * PreparedZipMember.CHUNK_SIZE + 7))
+
+        buffer = ZipStreamBuffer()
+        archive_bytes = []
+        with TvbZip(buffer, "w") as zip_file:
+            for _ in zip_file.write_prepared(PreparedZipMember(text_path, "folder/text.txt")):
+                archive_bytes.append(buffer.pop_data())
+            for _ in zip_file.write_prepared(PreparedZipMember(binary_path, "binary.bin", compress=False)):
+                archive_bytes.append(buffer.pop_data())
+                # A stored member is never buffered entirely
+                assert len(archive_bytes[-1]) <= PreparedZipMember.CHUNK_SIZE + 1024
+            zip_file.writestr("entry.json", "{}")
+        archive_bytes.append(buffer.pop_data())
+
+        with zipfile.ZipFile(BytesIO(b"".join(archive_bytes))) as result:
+            assert result.testzip() is None
+            assert result.getinfo("folder/text.txt").compress_type == zipfile.ZIP_DEFLATED
+            assert result.getinfo("binary.bin").compress_type == zipfile.ZIP_STORED
+            with open(text_path, "rb") as text_file:
+                assert result.read("folder/text.txt") == text_file.read()
+            with open(binary_path, "rb") as binary_file:
+                assert result.read("binary.bin") == binary_file.read()
+            assert result.read("entry.json") == b"{}"
+        os.remove(text_path)
+        os.remove(binary_path)
+
+
     def _dictContainsSubset(self, expected, actual, msg=None):
         """Checks whether actual is a superset of expected."""
         missing = []
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for upgrading the H5 files of all DataTypes, after a data version change.
+"""
+
+import os
+import json
+from tvb.tests.framework.core.base_testcase import TransactionalTestCase
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.storage import dao
+from tvb.core.entities.file.files_update_manager import FilesUpdateManager
+from tvb.core.entities.file.hdf5_storage_manager import HDF5StorageManager
+from tvb.tests.framework.datatypes.datatypes_factory import DatatypesFactory
+
+
+
+def _set_file_version(file_path, version):
+    storage_manager = HDF5StorageManager(*os.path.split(file_path))
+    root_metadata = storage_manager.get_metadata()
+    root_metadata[TvbProfile.current.version.DATA_VERSION_ATTRIBUTE] = version
+    storage_manager.set_metadata(root_metadata)
+
+
+def _fake_update_script(_manager, _script_name, input_file):
+    _set_file_version(input_file, TvbProfile.current.version.DATA_VERSION)
+    SCRIPT_PROCESSES.append(os.getpid())
+
+
+SCRIPT_PROCESSES = []
+
+
+
+class TestFilesUpdateManager(TransactionalTestCase):
+    """
+    Upgrade DataTypes with outdated files, serially or in worker processes, and resume interrupted upgrades.
+    """
+
+    def transactional_setup_method(self):
+        factory = DatatypesFactory()
+        self.datatypes = [factory.create_connectivity(nodes=3)[1] for _ in range(3)]
+        self.old_version = TvbProfile.current.version.DATA_VERSION - 1
+        for datatype in self.datatypes:
+            _set_file_version(datatype.get_storage_file_path(), self.old_version)
+            datatype = dao.get_datatype_by_id(datatype.id)
+            datatype.disk_size = 0
+            dao.store_entity(datatype)
+
+        self.backup_checked_version = TvbProfile.current.version.DATA_CHECKED_TO_VERSION
+        self.backup_workers = TvbProfile.current.FILE_UPGRADE_WORKERS
+        TvbProfile.current.version.DATA_CHECKED_TO_VERSION = self.old_version
+        TvbProfile.current.manager.add_entries_to_config_file = lambda _entries: None
+        FilesUpdateManager.get_update_scripts = lambda _self, _version=None: ["fake"]
+        FilesUpdateManager.run_update_script = _fake_update_script
+        FilesUpdateManager.script_uses_db = lambda _self, _script_name: False
+        del SCRIPT_PROCESSES[:]
+        self.manager = FilesUpdateManager()
+
+
+    def transactional_teardown_method(self):
+        TvbProfile.current.version.DATA_CHECKED_TO_VERSION = self.backup_checked_version
+        TvbProfile.current.FILE_UPGRADE_WORKERS = self.backup_workers
+        del TvbProfile.current.manager.add_entries_to_config_file
+        del FilesUpdateManager.get_update_scripts
+        del FilesUpdateManager.run_update_script
+        del FilesUpdateManager.script_uses_db
+
+
+    def _assert_upgraded(self, datatype, expected=True):
+        assert self.manager.is_file_up_to_date(datatype.get_storage_file_path()) == expected
+        assert (dao.get_datatype_by_id(datatype.id).disk_size > 0) == expected
+
+
+    def test_upgrade(self):
+        self.manager.run_all_updates()
+        for datatype in self.datatypes:
+            self._assert_upgraded(datatype)
+        assert FilesUpdateManager.STATUS
+        assert not os.path.exists(self.manager._get_progress_file())
+
+
+    def test_upgrade_in_workers(self):
+        TvbProfile.current.FILE_UPGRADE_WORKERS = 2
+        self.manager.run_all_updates()
+        for datatype in self.datatypes:
+            self._assert_upgraded(datatype)
+
+
+    def test_db_scripts_in_main_process(self):
+        TvbProfile.current.FILE_UPGRADE_WORKERS = 2
+        FilesUpdateManager.script_uses_db = lambda _self, _script_name: True
+        self.manager.run_all_updates()
+        for datatype in self.datatypes:
+            self._assert_upgraded(datatype)
+        assert [os.getpid()] * len(self.datatypes) == SCRIPT_PROCESSES
+
+
+    def test_missing_file_invalid(self):
+        os.remove(self.datatypes[0].get_storage_file_path())
+        self.manager.run_all_updates()
+        assert dao.get_datatype_by_id(self.datatypes[0].id).invalid
+        self._assert_upgraded(self.datatypes[1])
+        assert not FilesUpdateManager.STATUS
+
+
+    def test_resume(self):
+        with open(self.manager._get_progress_file(), 'w') as progress_file:
+            json.dump({'data_version': TvbProfile.current.version.DATA_VERSION, 'last_id': self.datatypes[0].id,
+                       'ok': 1, 'error': 0, 'ignored': 0}, progress_file)
+        self.manager.run_all_updates()
+        self._assert_upgraded(self.datatypes[0], False)
+        self._assert_upgraded(self.datatypes[1])
+        self._assert_upgraded(self.datatypes[2])
+        assert not os.path.exists(self.manager._get_progress_file())
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+    Module used to test the pool of open H5 files, used by HDF5StorageManager.
+"""
+
+import os
+import numpy
+import shutil
+import pytest
+import tvb.core.entities.file.hdf5_storage_manager as hdf5
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.exceptions import FileStorageException
+from tvb.core.entities.file.hdf5_file_pool import FILE_POOL, HDF5FilePool
+
+STORAGE_FILE_NAME = "test_pool.h5"
+DATASET_NAME = "dataset1"
+
+
+class TestHDF5FilePool(object):
+    """
+    Tests for keeping H5 files open between calls of the storage manager.
+    """
+
+    def setup_method(self):
+        self.storage_folder = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "test_hdf5_pool")
+        if os.path.exists(self.storage_folder):
+            shutil.rmtree(self.storage_folder)
+        os.makedirs(self.storage_folder)
+        self.file_path = os.path.join(self.storage_folder, STORAGE_FILE_NAME)
+        self.storage = hdf5.HDF5StorageManager(self.storage_folder, STORAGE_FILE_NAME)
+        self.test_array = numpy.random.random((10, 10))
+
+    def teardown_method(self):
+        self.storage.close_file()
+        FILE_POOL.invalidate_folder(self.storage_folder)
+        if os.path.exists(self.storage_folder):
+            shutil.rmtree(self.storage_folder)
+
+    def test_reads_reuse_open_file(self):
+        """
+        After the first read, consecutive reads should not open the file again.
+        """
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        self.storage.get_data(DATASET_NAME, (slice(0, 2),))
+        misses = FILE_POOL.misses
+        for i in range(5):
+            data = self.storage.get_data(DATASET_NAME, (slice(i, i + 1),))
+            numpy.testing.assert_array_equal(self.test_array[i:i + 1], data)
+        assert misses == FILE_POOL.misses
+        assert self.file_path in FILE_POOL._entries
+
+    def test_write_after_read_upgrades_mode(self):
+        """
+        A file kept open for reading must be reopened when a write is requested.
+        """
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        self.storage.get_data(DATASET_NAME)
+        assert not FILE_POOL._entries[self.file_path].is_writable
+
+        self.storage.set_metadata({"key": "value"}, DATASET_NAME)
+        assert self.storage.get_metadata(DATASET_NAME)["key"] == "value"
+
+    def test_write_while_reading_fails(self):
+        """
+        A file still used for reading can not be written.
+        """
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        pool = HDF5FilePool(max_size=2)
+        entry = pool.acquire(self.file_path, 'r', lambda file_path, mode: hdf5.hdf5.File(file_path, mode))
+        with pytest.raises(FileStorageException):
+            pool.acquire(self.file_path, 'a', lambda file_path, mode: hdf5.hdf5.File(file_path, mode))
+        assert entry.ref_count == 1
+        pool.release(entry)
+        pool.close_all()
+
+    def test_invalidate_closes_file(self):
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        self.storage.get_data(DATASET_NAME)
+        entry = FILE_POOL._entries[self.file_path]
+        FILE_POOL.invalidate(self.file_path)
+        assert self.file_path not in FILE_POOL._entries
+        assert not entry.is_open
+
+    def test_replaced_file_is_detected(self):
+        """
+        When the file gets removed and recreated behind the pool, the stale handle is not used.
+        """
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        self.storage.get_data(DATASET_NAME)
+        os.remove(self.file_path)
+
+        other_array = numpy.random.random((3, 3))
+        self.storage.store_data(DATASET_NAME, other_array)
+        numpy.testing.assert_array_equal(other_array, self.storage.get_data(DATASET_NAME))
+
+    def test_lru_eviction(self):
+        """
+        Idle files above the limit are closed, least recently used first.
+        """
+        pool = HDF5FilePool(max_size=2)
+        paths = [os.path.join(self.storage_folder, "file_%d.h5" % i) for i in range(3)]
+        for path in paths:
+            hdf5.HDF5StorageManager(*os.path.split(path)).store_data(DATASET_NAME, self.test_array)
+
+        opened = []
+        for path in paths:
+            entry = pool.acquire(path, 'r', lambda file_path, mode: hdf5.hdf5.File(file_path, mode))
+            opened.append(entry)
+            pool.release(entry)
+
+        assert len(pool) == 2
+        assert paths[0] not in pool._entries
+        assert not opened[0].is_open
+        assert opened[2].is_open
+        pool.close_all()
+
+    def test_file_in_use_is_not_evicted(self):
+        pool = HDF5FilePool(max_size=0)
+        self.storage.store_data(DATASET_NAME, self.test_array)
+        entry = pool.acquire(self.file_path, 'r', lambda file_path, mode: hdf5.hdf5.File(file_path, mode))
+        assert entry.is_open
+        pool.release(entry)
+        assert not entry.is_open
+        assert len(pool) == 0
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+    Module used to test chunking and compression profiles for H5 datasets.
+"""
+
+import os
+import numpy
+import shutil
+import tvb.core.entities.file.hdf5_storage_manager as hdf5
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities.file.hdf5_storage_profiles import STORAGE_PROFILES, StorageProfile, get_storage_profile
+from tvb.core.entities.file.hdf5_storage_profiles import parse_profiles_by_type, LAYOUT_WINDOW, LAYOUT_CHANNEL
+from tvb.datatypes.time_series import TimeSeries, TimeSeriesRegion
+from tvb.datatypes.connectivity import Connectivity
+
+STORAGE_FILE_NAME = "test_profiles.h5"
+DATASET_NAME = "data"
+
+
+class TestHDF5StorageProfiles(object):
+    """
+    Tests for creating datasets according to a StorageProfile.
+    """
+
+    def setup_method(self):
+        self.storage_folder = os.path.join(TvbProfile.current.TVB_TEMP_FOLDER, "test_hdf5_profiles")
+        if os.path.exists(self.storage_folder):
+            shutil.rmtree(self.storage_folder)
+        os.makedirs(self.storage_folder)
+        self.initial_by_type = TvbProfile.current.HDF5_STORAGE_PROFILE_BY_TYPE
+
+    def teardown_method(self):
+        TvbProfile.current.HDF5_STORAGE_PROFILE_BY_TYPE = self.initial_by_type
+        if os.path.exists(self.storage_folder):
+            shutil.rmtree(self.storage_folder)
+
+    def test_window_chunks(self):
+        profile = StorageProfile("test", chunk_layout=LAYOUT_WINDOW, chunk_bytes=8 * 2 * 76 * 100)
+        assert (100, 2, 76, 1) == profile.compute_chunks((10, 2, 76, 1), 8, 0, True)
+        assert (10, 2, 76, 1) == profile.compute_chunks((10, 2, 76, 1), 8, 0, False)
+
+    def test_channel_chunks(self):
+        profile = StorageProfile("test", chunk_layout=LAYOUT_CHANNEL, chunk_bytes=8 * 1000)
+        assert (1000, 1, 1, 1) == profile.compute_chunks((10, 2, 76, 1), 8, 0, True)
+        assert (1, 1000) == profile.compute_chunks((76, 10), 8, -1, True)
+
+    def test_default_profile_keeps_h5py_defaults(self):
+        assert {} == STORAGE_PROFILES["default"].dataset_kwargs(numpy.zeros((3, 3)))
+
+    def test_append_with_profile(self):
+        """
+        Datasets created through append_data follow the profile, and record its name.
+        """
+        storage = hdf5.HDF5StorageManager(self.storage_folder, STORAGE_FILE_NAME,
+                                          storage_profile=STORAGE_PROFILES["time_window_gzip"])
+        full_data = numpy.random.random((50, 2, 10, 1))
+        for idx in range(0, 50, 5):
+            storage.append_data(DATASET_NAME, full_data[idx:idx + 5], grow_dimension=0, close_file=False)
+        storage.close_file()
+
+        numpy.testing.assert_array_equal(full_data, storage.get_data(DATASET_NAME))
+        assert "time_window_gzip" == storage.get_metadata(DATASET_NAME)[StorageProfile.METADATA_KEY]
+
+        h5_file = storage._open_h5_file('r')
+        dataset = h5_file["/" + DATASET_NAME]
+        assert "gzip" == dataset.compression
+        assert dataset.shuffle and dataset.fletcher32
+        assert (2, 10, 1) == dataset.chunks[1:]
+        storage.close_file()
+
+    def test_store_data_with_profile(self):
+        storage = hdf5.HDF5StorageManager(self.storage_folder, STORAGE_FILE_NAME,
+                                          storage_profile=STORAGE_PROFILES["compressed"])
+        data = numpy.random.random((20, 3))
+        storage.store_data(DATASET_NAME, data)
+        storage.store_data("strings", numpy.array(["a", "b"]))
+        numpy.testing.assert_array_equal(data, storage.get_data(DATASET_NAME))
+        numpy.testing.assert_array_equal(numpy.array(["a", "b"]), storage.get_data("strings"))
+
+    def test_profile_by_type(self):
+        assert {"TimeSeries": "channel", "Connectivity": "compressed"} == parse_profiles_by_type(
+            "TimeSeries:channel, Connectivity : compressed,invalid")
+
+        TvbProfile.current.HDF5_STORAGE_PROFILE_BY_TYPE = "TimeSeries:channel"
+        assert "channel" == get_storage_profile(TimeSeriesRegion).name
+        assert "channel" == get_storage_profile(TimeSeries).name
+        assert TvbProfile.current.HDF5_STORAGE_PROFILE == get_storage_profile(Connectivity).name
@@ -162,6 +162,31 @@ class TestHDF5Storage(object):
         with pytest.raises(FileStructureException):
             self.storage.store_data(DATASET_NAME_1, None)
 
+    def test_get_data_memory_mapped(self):
+        """
+        Test that contiguous data sets are read as read-only memory maps, also when sliced
+        """
+        self.storage.store_data(DATASET_NAME_1, self.test_2D_array)
+        self.storage.store_data(DATASET_NAME_2, self.test_3D_array, where=STORE_PATH)
+
+        read_data = self.storage.get_data(DATASET_NAME_1, memory_map=True)
+        assert isinstance(read_data, numpy.memmap)
+        assert not read_data.flags.writeable
+        self._assert_arrays_are_equal(self.test_2D_array, read_data)
+
+        read_data = self.storage.get_data(DATASET_NAME_2, (slice(1, 3), slice(None), 0), STORE_PATH, memory_map=True)
+        assert isinstance(read_data, numpy.memmap)
+        self._assert_arrays_are_equal(self.test_3D_array[1:3, :, 0], read_data)
+
+    def test_get_data_memory_mapped_chunked(self):
+        """
+        Test that chunked data sets fall back to a normal read, when a memory map is asked
+        """
+        self.storage.append_data(DATASET_NAME_1, self.test_3D_array)
+        read_data = self.storage.get_data(DATASET_NAME_1, memory_map=True)
+        assert not isinstance(read_data, numpy.memmap)
+        self._assert_arrays_are_equal(self.test_3D_array, read_data)
+
     def test_append_data1(self):
         """
         Test data store using append method
@@ -235,6 +260,39 @@ class TestHDF5Storage(object):
         read_data = self.storage.get_data(DATASET_NAME_1)
         self._assert_arrays_are_equal(self.test_3D_array, read_data)
 
+    def test_append_many_chunks_with_small_buffer(self):
+        """
+        Test appending more chunks than fit into the buffer, which forces intermediate flushes
+        and a geometric growth of the dataset, trimmed at close.
+        """
+        storage = hdf5.HDF5StorageManager(self.storage_folder, STORAGE_FILE_NAME, buffer_size=100)
+        full_data = numpy.random.random((4, 37, 3))
+        for index in range(full_data.shape[1]):
+            storage.append_data(DATASET_NAME_1, full_data[:, index:index + 1, :], grow_dimension=1, close_file=False)
+        storage.close_file()
+
+        assert full_data.shape == storage.get_data_shape(DATASET_NAME_1)
+        self._assert_arrays_are_equal(full_data, storage.get_data(DATASET_NAME_1))
+
+    def test_buffer_grows_in_place(self):
+        """
+        Test that the storage buffer keeps all appended chunks, in order, when it needs to grow.
+        """
+        chunks = [numpy.random.random((2, size)) for size in [3, 1, 5, 2, 30]]
+        self.storage.append_data(DATASET_NAME_1, chunks[0])
+
+        h5_file = self.storage._open_h5_file()
+        storage_buffer = hdf5.HDF5StorageManager.H5pyStorageBuffer(h5_file["/" + DATASET_NAME_1], buffer_size=10 ** 6)
+        for chunk in chunks[1:]:
+            assert storage_buffer.buffer_data(chunk)
+        self._assert_arrays_are_equal(numpy.hstack(chunks[1:]), storage_buffer.buffered_data)
+
+        storage_buffer.flush_buffered_data()
+        assert storage_buffer.buffered_data is None
+        storage_buffer.close()
+        self.storage.close_file()
+        self._assert_arrays_are_equal(numpy.hstack(chunks), self.storage.get_data(DATASET_NAME_1))
+
     def test_close_file_multiple_time(self):
         """
         Test closing H5 file multiple times.
@@ -326,6 +384,32 @@ class TestHDF5Storage(object):
         read_meta_value = self.storage.get_metadata(DATASET_NAME_1, where=STORE_PATH)
         assert META_VALUE == read_meta_value[META_KEY]
 
+    def test_metadata_batch(self):
+        """
+        This method checks metadata set and read for the root and several datasets at once
+        """
+        self.storage.store_data(DATASET_NAME_1, self.test_2D_array)
+        self.storage.store_data(DATASET_NAME_2, self.test_3D_array)
+
+        self.storage.set_metadata_batch({'': META_DICT, DATASET_NAME_1: {META_KEY: 1}, DATASET_NAME_2: {META_KEY: 2}})
+        all_metadata = self.storage.get_metadata_batch()
+        assert META_VALUE == all_metadata[''][META_KEY]
+        assert 1 == all_metadata[DATASET_NAME_1][META_KEY]
+        assert 2 == all_metadata[DATASET_NAME_2][META_KEY]
+        assert self.storage.get_metadata(DATASET_NAME_2) == all_metadata[DATASET_NAME_2]
+
+    def test_metadata_batch_on_path(self):
+        """
+        This method checks metadata read at once for the datasets stored under a given path
+        """
+        self.storage.store_data(DATASET_NAME_1, self.test_2D_array)
+        self.storage.store_data(DATASET_NAME_2, self.test_3D_array, where=STORE_PATH)
+        self.storage.set_metadata_batch({DATASET_NAME_2: META_DICT}, where=STORE_PATH)
+
+        all_metadata = self.storage.get_metadata_batch(STORE_PATH)
+        assert [DATASET_NAME_2] == list(all_metadata)
+        assert META_VALUE == all_metadata[DATASET_NAME_2][META_KEY]
+
     def test_delete_metadata(self):
         """
         Test deletion of metadata for a dataset or root node.
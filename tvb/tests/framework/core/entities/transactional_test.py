@@ -36,8 +36,9 @@ import threading
 from tvb.tests.framework.core.base_testcase import BaseTestCase, transactional_test
 from tvb.basic.profile import TvbProfile
 from tvb.core.entities import model
-from tvb.core.entities.storage import dao, transactional
-from tvb.core.entities.storage.session_maker import add_session, SessionMaker
+from sqlalchemy import event
+from tvb.core.entities.storage import dao, transactional, unit_of_work
+from tvb.core.entities.storage.session_maker import add_session, SessionMaker, DB_ENGINE
 from tvb.core.entities.storage.exceptions import NestedTransactionUnsupported
 from tvb.tests.framework.core.factory import TestFactory
 
@@ -171,6 +172,78 @@ class TestsTransactional(BaseTestCase):
                          n_of_threads, n_of_users_per_thread, n_of_threads * n_of_users_per_thread,
                          initial_user_count + n_of_threads * n_of_users_per_thread, final_user_count)
 
+    def test_sessions_stack_per_thread(self):
+        """
+        A transaction open in one thread should not be seen by the DAO calls of another thread.
+        """
+        session_maker = SessionMaker()
+        session_maker.start_transaction()
+        seen_in_thread = []
+
+        def _count_users():
+            seen_in_thread.append(session_maker._thread_sessions.stack.open_transactions)
+            seen_in_thread.append(dao.get_all_users(is_count=True))
+
+        try:
+            worker = threading.Thread(target=_count_users)
+            worker.start()
+            worker.join()
+            assert session_maker._thread_sessions.stack.open_transactions == 1
+        finally:
+            session_maker.close_transaction()
+        assert seen_in_thread[0] == 0
+        assert seen_in_thread[1] == dao.get_all_users(is_count=True)
+
+    def test_unit_of_work(self):
+        """
+        DAO calls inside a unit of work share one session: an entity loaded again by id needs no new query.
+        """
+        user = TestFactory.create_user('unit_user', 'pass', 'test@test.test', True, 'test')
+        statements = []
+
+        def _count_statement(*_):
+            statements.append(1)
+
+        @unit_of_work
+        def _load_twice():
+            first = dao.get_user_by_id(user.id)
+            nr_of_statements = len(statements)
+            second = dao.get_user_by_id(user.id)
+            assert len(statements) == nr_of_statements
+            TestFactory.create_user('unit_user_2', 'pass', 'test@test.test', True, 'test')
+            return first, second
+
+        event.listen(DB_ENGINE, 'before_cursor_execute', _count_statement)
+        try:
+            first_user, second_user = _load_twice()
+        finally:
+            event.remove(DB_ENGINE, 'before_cursor_execute', _count_statement)
+        assert first_user is second_user
+        assert first_user.username == 'unit_user'
+        assert dao.get_user_by_id(user.id) is not first_user
+        assert dao.get_user_by_name('unit_user_2') is not None
+        assert SESSIONMAKER._thread_sessions.stack.unit_of_work_session is None
+
+    def test_unit_of_work_no_silent_save(self):
+        """
+        Changes done on entities loaded in a unit of work are saved only when the entity is stored.
+        """
+        user = TestFactory.create_user('unit_user', 'pass', 'test@test.test', True, 'test')
+        other_user = TestFactory.create_user('unit_other', 'pass', 'test@test.test', True, 'test')
+
+        @unit_of_work
+        def _change_users():
+            changed = dao.get_user_by_id(user.id)
+            changed.email = 'changed@test.test'
+            stored = dao.get_user_by_id(other_user.id)
+            stored.email = 'stored@test.test'
+            dao.store_entity(stored)
+
+        _change_users()
+        assert dao.get_user_by_id(user.id).email == 'test@test.test'
+        assert dao.get_user_by_id(other_user.id).email == 'stored@test.test'
+
+
     @transactional_test
     def test_transaction_nested(self):
         """
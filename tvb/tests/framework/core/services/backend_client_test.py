@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the warm OperationWorker pool of the StandAloneClient.
+"""
+
+import time
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+from tvb.basic.profile import TvbProfile
+from tvb.core.entities import model
+from tvb.core.entities.storage import dao
+from tvb.core.services import backend_client
+from tvb.core.services.backend_client import OperationWorkerPool
+from tvb.core.services.operation_service import OperationService
+from tvb.core.services.project_service import initialize_storage
+from tvb.tests.framework.core.factory import TestFactory
+from tvb.tests.framework.datatypes.datatype1 import Datatype1
+
+
+
+class TestOperationWorkerPool(BaseTestCase):
+    """
+    Launch operations through PooledOperationExecutor, with a private OperationWorkerPool.
+    """
+
+
+    def setup_method(self):
+        self.clean_database()
+        initialize_storage()
+        self.test_user = TestFactory.create_user()
+        self.test_project = TestFactory.create_project(self.test_user)
+        self.operation_service = OperationService()
+        self.backup_workers = TvbProfile.current.OPERATION_WORKERS
+        self.backup_max_operations = TvbProfile.current.OPERATION_WORKER_MAX_OPERATIONS
+        self.backup_pool = backend_client.WORKER_POOL
+        TvbProfile.current.OPERATION_WORKERS = True
+        backend_client.WORKER_POOL = OperationWorkerPool()
+
+
+    def teardown_method(self):
+        backend_client.WORKER_POOL.shutdown()
+        backend_client.WORKER_POOL = self.backup_pool
+        TvbProfile.current.OPERATION_WORKERS = self.backup_workers
+        TvbProfile.current.OPERATION_WORKER_MAX_OPERATIONS = self.backup_max_operations
+        self.clean_database()
+
+
+    def _launch(self, module, class_name, **data):
+        adapter = TestFactory.create_adapter(module, class_name)
+        algo = adapter.stored_adapter
+        algo_category = dao.get_category_by_id(algo.fk_category)
+        operations, _ = self.operation_service.prepare_operations(self.test_user.id, self.test_project.id, algo,
+                                                                  algo_category, {}, **data)
+        self.operation_service._send_to_cluster(operations, adapter)
+        return operations[0].id
+
+
+    @staticmethod
+    def _wait_for(operation_id, timeout=60):
+        end = time.time() + timeout
+        while time.time() < end:
+            operation = dao.get_operation_by_id(operation_id)
+            if operation.status not in (model.STATUS_PENDING, model.STATUS_STARTED):
+                return operation
+            time.sleep(0.2)
+        raise AssertionError("Operation %s did not finish in %s seconds" % (operation_id, timeout))
+
+
+    def _launch_test_adapter1(self):
+        return self._launch("tvb.tests.framework.adapters.testadapter1", "TestAdapter1",
+                            test1_val1=5, test1_val2=5)
+
+
+    def _worker_pid(self, operation_id):
+        return dao.get_operation_process_for_operation(operation_id).pid
+
+
+    def test_worker_is_reused(self):
+        backend_client.WORKER_POOL.start_workers(1)
+
+        first_id = self._launch_test_adapter1()
+        assert model.STATUS_FINISHED == self._wait_for(first_id).status
+        second_id = self._launch_test_adapter1()
+        assert model.STATUS_FINISHED == self._wait_for(second_id).status
+
+        assert self._worker_pid(first_id) == self._worker_pid(second_id)
+        assert 1 == len(dao.get_generic_entity(Datatype1, first_id, "fk_from_operation"))
+
+
+    def test_worker_is_retired(self):
+        TvbProfile.current.OPERATION_WORKER_MAX_OPERATIONS = 1
+        backend_client.WORKER_POOL.start_workers(1)
+
+        first_id = self._launch_test_adapter1()
+        assert model.STATUS_FINISHED == self._wait_for(first_id).status
+        second_id = self._launch_test_adapter1()
+        assert model.STATUS_FINISHED == self._wait_for(second_id).status
+
+        assert self._worker_pid(first_id) != self._worker_pid(second_id)
+
+
+    def test_stop_operation_kills_worker(self):
+        operation_id = self._launch("tvb.tests.framework.adapters.testadapter2", "TestAdapter2", test=5)
+        end = time.time() + 30
+        while dao.get_operation_process_for_operation(operation_id) is None and time.time() < end:
+            time.sleep(0.2)
+        pid = self._worker_pid(operation_id)
+
+        self.operation_service.stop_operation(operation_id)
+
+        assert model.STATUS_CANCELED == self._wait_for(operation_id).status
+        for thread in list(backend_client.CURRENT_ACTIVE_THREADS):
+            thread.join(10)
+        assert pid not in [worker.pid for worker in backend_client.WORKER_POOL.idle_workers]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+Tests for the streaming array meta-data computed while storing chunks.
+"""
+
+import numpy
+from tvb.tests.framework.core.base_testcase import BaseTestCase
+from tvb.basic.traits.types_mapped import MappedType
+from tvb.core.traits.array_statistics import ArrayStatistics
+
+
+
+class TestArrayStatistics(BaseTestCase):
+    """
+    Statistics merged over chunks should equal the ones computed on the full array.
+    """
+
+
+    @staticmethod
+    def _merged_statistics(chunks, included_info=MappedType.DEFAULT_WITH_ZERO_METADATA):
+        statistics = ArrayStatistics(included_info)
+        for chunk in chunks:
+            statistics.update(chunk)
+        return statistics.to_metadata()
+
+
+    def test_chunks_same_as_full_array(self):
+        full_array = numpy.random.RandomState(42).normal(3.0, 2.0, (100, 4, 5))
+        full_array[full_array < 2] = 0
+        metadata = self._merged_statistics([full_array[:1], full_array[1:37], full_array[37:]])
+
+        non_zero = full_array[full_array.nonzero()]
+        expected = {MappedType.METADATA_ARRAY_MIN: full_array.min(),
+                    MappedType.METADATA_ARRAY_MAX: full_array.max(),
+                    MappedType.METADATA_ARRAY_MEAN: full_array.mean(),
+                    MappedType.METADATA_ARRAY_VAR: full_array.var(),
+                    MappedType.METADATA_ARRAY_MIN_NON_ZERO: non_zero.min(),
+                    MappedType.METADATA_ARRAY_MAX_NON_ZERO: non_zero.max(),
+                    MappedType.METADATA_ARRAY_MEAN_NON_ZERO: non_zero.mean(),
+                    MappedType.METADATA_ARRAY_VAR_NON_ZERO: non_zero.var()}
+        for key, value in expected.items():
+            if key in MappedType.DEFAULT_WITH_ZERO_METADATA:
+                assert numpy.allclose(metadata.pop(key), value), key
+        assert metadata == {}
+
+
+    def test_only_included_info(self):
+        metadata = self._merged_statistics([numpy.arange(10)], [MappedType.METADATA_ARRAY_MAX,
+                                                                MappedType.METADATA_ARRAY_VAR])
+        assert metadata == {MappedType.METADATA_ARRAY_MAX: 9, MappedType.METADATA_ARRAY_VAR: numpy.arange(10).var()}
+
+
+    def test_empty_and_zero_chunks(self):
+        metadata = self._merged_statistics([numpy.zeros((0, 3)), numpy.zeros((2, 3))])
+        assert metadata == {MappedType.METADATA_ARRAY_MIN: 0.0, MappedType.METADATA_ARRAY_MAX: 0.0,
+                            MappedType.METADATA_ARRAY_MEAN: 0.0, MappedType.METADATA_ARRAY_VAR: 0.0}
+        assert self._merged_statistics([]) == {}
@@ -36,6 +36,7 @@ import numpy
 import copy
 from tvb.tests.framework.core.base_testcase import BaseTestCase
 from tvb.datatypes.arrays import MappedArray
+from tvb.datatypes.time_series import TimeSeries
 from tvb.basic.traits import types_basic as basic
 from tvb.basic.traits.types_mapped import MappedType
 from tvb.core.entities import model
@@ -142,4 +143,21 @@ class TestMapping(BaseTestCase):
             assert  metadata[actual_datatype.METADATA_ARRAY_MIN] == 0
             assert actual_datatype.METADATA_ARRAY_MEAN in metadata
             assert  metadata[actual_datatype.METADATA_ARRAY_MEAN] == 7.5
-        
\ No newline at end of file
+        
+
+    def test_chunked_array_metadata(self):
+        """
+        Meta-data of an array written in chunks (e.g. simulation results) should describe the full array.
+        """
+        storage_path = self.flow_service.file_helper.get_project_folder(self.operation.project, str(self.operation.id))
+        full_data = numpy.random.RandomState(7).normal(size=(30, 1, 5, 1))
+        time_series = TimeSeries(storage_path=storage_path)
+        for chunk in (full_data[:4], full_data[4:5], full_data[5:]):
+            time_series.write_data_slice(chunk)
+        time_series.close_file()
+
+        metadata = time_series.get_metadata('data')
+        assert numpy.allclose(metadata[time_series.METADATA_ARRAY_MIN], full_data.min())
+        assert numpy.allclose(metadata[time_series.METADATA_ARRAY_MAX], full_data.max())
+        assert numpy.allclose(metadata[time_series.METADATA_ARRAY_MEAN], full_data.mean())
+        assert numpy.allclose(metadata[time_series.METADATA_ARRAY_VAR], full_data.var())
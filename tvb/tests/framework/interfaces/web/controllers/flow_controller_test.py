@@ -33,12 +33,15 @@
 
 import copy
 import json
+import numpy
 import cherrypy
+import pytest
 from time import sleep
 from tvb.tests.framework.interfaces.web.controllers.base_controller_test import BaseControllersTest
 from tvb.tests.framework.core.factory import TestFactory
 from tvb.core.entities import model
 from tvb.core.entities.storage import dao
+from tvb.core.entities.file.datatype_attribute_cache import ATTRIBUTE_CACHE
 from tvb.core.services.operation_service import OperationService
 from tvb.interfaces.web.controllers import common
 from tvb.interfaces.web.controllers.flow_controller import FlowController
@@ -152,6 +155,48 @@ class TestFlowContoller(BaseControllersTest):
         assert returned_data == str(range(101))
         
         
+    def test_read_binary_datatype_attribute_cached(self):
+        """
+        Read an array twice, and check the second read is served from cache, then revalidated by ETag.
+        """
+        _, connectivity = DatatypesFactory().create_connectivity(nodes=4)
+        hits = ATTRIBUTE_CACHE.hits
+        first = ''.join(self.flow_c.read_binary_datatype_attribute(connectivity.gid, "weights"))
+        etag = cherrypy.response.headers['ETag']
+        assert 'Last-Modified' in cherrypy.response.headers
+
+        cherrypy.serving.response = cherrypy._cprequest.Response()
+        assert first == ''.join(self.flow_c.read_binary_datatype_attribute(connectivity.gid, "weights"))
+        assert ATTRIBUTE_CACHE.hits == hits + 1
+        assert etag == cherrypy.response.headers['ETag']
+
+        cherrypy.serving.response = cherrypy._cprequest.Response()
+        cherrypy.request.method = "GET"
+        cherrypy.request.headers['If-None-Match'] = etag
+        try:
+            with pytest.raises(cherrypy.HTTPRedirect) as redirect:
+                self.flow_c.read_binary_datatype_attribute(connectivity.gid, "weights")
+            assert redirect.value.status == 304
+        finally:
+            del cherrypy.request.headers['If-None-Match']
+            cherrypy.serving.response = cherrypy._cprequest.Response()
+
+
+    def test_read_binary_stored_array_streamed(self):
+        """
+        A large array stored in H5 is streamed from its file, with slicing applied while reading.
+        """
+        _, connectivity = DatatypesFactory().create_connectivity(nodes=400)
+        hits = ATTRIBUTE_CACHE.hits
+        body = self.flow_c.read_binary_datatype_attribute(connectivity.gid, "weights", data_slice="10:20,::4")
+        assert cherrypy.response.headers['X-Array-Shape'] == "(10, 100)"
+        assert cherrypy.response.headers['ETag']
+        assert ''.join(body) == numpy.ones((10, 100)).tostring()
+        assert ATTRIBUTE_CACHE.hits == hits
+        assert ATTRIBUTE_CACHE.compute_key(connectivity.gid, "weights") not in ATTRIBUTE_CACHE
+        cherrypy.serving.response = cherrypy._cprequest.Response()
+
+
     def test_get_simple_adapter_interface(self):
         adapter = dao.get_algorithm_by_module('tvb.tests.framework.adapters.testadapter1', 'TestAdapter1')
         result = self.flow_c.get_simple_adapter_interface(adapter.id)
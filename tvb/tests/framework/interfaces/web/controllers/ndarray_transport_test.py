@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#
+# TheVirtualBrain-Framework Package. This package holds all Data Management, and 
+# Web-UI helpful to run brain-simulations. To use it, you also need do download
+# TheVirtualBrain-Scientific Package (for simulators). See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+"""
+    Module used to test the binary transport of numpy arrays, towards the visualizers.
+"""
+
+import gzip
+import numpy
+import pytest
+import cherrypy
+from io import BytesIO
+from cherrypy.lib.httputil import HeaderMap
+from tvb.interfaces.web.controllers import ndarray_transport
+from tvb.interfaces.web.controllers.ndarray_transport import InMemoryArraySource, parse_data_slice, send_ndarray
+
+
+class TestNdArrayTransport(object):
+    """
+    Tests for streaming arrays as binary http responses.
+    """
+
+    def setup_method(self):
+        cherrypy.serving.request = cherrypy._cprequest.Request(None, None)
+        cherrypy.serving.request.headers = HeaderMap()
+        cherrypy.serving.response = cherrypy._cprequest.Response()
+        self.array = numpy.arange(60, dtype=numpy.float64).reshape((10, 6))
+
+    def teardown_method(self):
+        cherrypy.serving.request = cherrypy._cprequest.Request(None, None)
+        cherrypy.serving.response = cherrypy._cprequest.Response()
+
+    def _send(self, array, *args):
+        body = b''.join(send_ndarray(InMemoryArraySource(array), *args))
+        return body, cherrypy.serving.response.headers
+
+    def test_parse_data_slice(self):
+        assert parse_data_slice(None) == ()
+        assert parse_data_slice("2:5, ::3") == (slice(2, 5), slice(None, None, 3))
+        assert parse_data_slice("4,:") == (slice(4, 5), slice(None))
+        with pytest.raises(ValueError):
+            parse_data_slice("1:2:3:4")
+
+    def test_full_array(self):
+        body, headers = self._send(self.array)
+        assert headers["X-Array-Shape"] == "(10, 6)"
+        assert headers["X-Array-Type"] == "float64"
+        assert headers["Content-Length"] == self.array.nbytes
+        numpy.testing.assert_array_equal(numpy.frombuffer(body, numpy.float64).reshape((10, 6)), self.array)
+
+    def test_chunks(self, monkeypatch):
+        monkeypatch.setattr(ndarray_transport, "CHUNK_BYTES", 100)
+        chunks = list(send_ndarray(InMemoryArraySource(self.array)))
+        assert len(chunks) == 5
+        assert b''.join(chunks) == self.array.tostring()
+
+    def test_dtypes(self):
+        for dtype in [numpy.uint8, numpy.uint16, numpy.int16, numpy.int32]:
+            body, headers = self._send(self.array.astype(dtype))
+            assert headers["X-Array-Type"] == numpy.dtype(dtype).name
+        body, headers = self._send(self.array.astype(numpy.int64))
+        assert headers["X-Array-Type"] == "int32"
+        large = numpy.array([2 ** 32 - 1, 2 ** 31], dtype=numpy.uint32)
+        body, headers = self._send(large)
+        assert headers["X-Array-Type"] == "float64"
+        numpy.testing.assert_array_equal(numpy.frombuffer(body, numpy.float64), large)
+        body, headers = self._send(large, "float16")
+        assert headers["X-Array-Type"] == "float64"
+        with pytest.raises(ValueError):
+            self._send(self.array.astype(numpy.complex128))
+
+    def test_downcast(self):
+        body, headers = self._send(self.array, "float16")
+        assert headers["X-Array-Type"] == "float16"
+        numpy.testing.assert_array_equal(numpy.frombuffer(body, numpy.float16), self.array.flatten())
+        body, headers = self._send(self.array.astype(numpy.int32), "float16")
+        assert headers["X-Array-Type"] == "int32"
+
+    def test_range(self):
+        cherrypy.serving.request.headers['Range'] = "bytes=52-99"
+        body, headers = self._send(self.array)
+        assert cherrypy.serving.response.status == 206
+        assert headers["Content-Range"] == "bytes 52-99/480"
+        assert body == self.array.tostring()[52:100]
+
+    def test_range_not_satisfiable(self):
+        cherrypy.serving.request.headers['Range'] = "bytes=500-"
+        with pytest.raises(cherrypy.HTTPError):
+            self._send(self.array)
+
+    def test_gzip(self):
+        cherrypy.serving.request.headers['Accept-Encoding'] = "gzip, deflate"
+        body, headers = self._send(self.array, None, True)
+        assert headers["Content-Encoding"] == "gzip"
+        assert "Content-Length" not in headers
+        assert gzip.GzipFile(fileobj=BytesIO(body)).read() == self.array.tostring()